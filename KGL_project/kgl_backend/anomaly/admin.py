@@ -16,17 +16,22 @@ class AnomalyResultAdmin(admin.ModelAdmin):
         "timestamp",
         "created_at",
     )
-    list_select_related = ("behavior_log",)
-    search_fields = ("behavior_log__user_id", "behavior_log__session_id")  # 검색에는 더블 언더스코어 허용
+    list_select_related = ("behavior_log__user_session", "sensor_window__user_session")
+    search_fields = (
+        "behavior_log__user_session__user_id", "behavior_log__user_session__session_id",
+        "sensor_window__user_session__user_id", "sensor_window__user_session__session_id",
+    )  # 검색에는 더블 언더스코어 허용
     list_filter = ("modality", "detection_method", "is_anomaly")
 
 
     def user_id(self, obj):
-        return getattr(obj.behavior_log, "user_id", None)
+        return getattr(obj.behavior_log or obj.sensor_window, "user_id", None)
     user_id.short_description = "User"
-    user_id.admin_order_field = "behavior_log__user_id"
+    user_id.admin_order_field = "behavior_log__user_session__user_id"
 
     def action_type(self, obj):
+        if obj.sensor_window_id:
+            return f"sensor_window:{obj.sensor_window.sensor_type}"
         return getattr(obj.behavior_log, "action_type", None)
     action_type.short_description = "Action"
     action_type.admin_order_field = "behavior_log__action_type"
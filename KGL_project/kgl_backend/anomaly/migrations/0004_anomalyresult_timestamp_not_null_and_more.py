@@ -0,0 +1,31 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_timestamp(apps, schema_editor):
+    AnomalyResult = apps.get_model('anomaly', 'AnomalyResult')
+    AnomalyResult.objects.filter(timestamp__isnull=True).update(timestamp=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anomaly', '0003_anomalyresult_detection_method_and_more'),
+        ('behavior', '0004_remove_userbehaviorlog_is_processed_by_ml_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timestamp, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='anomalyresult',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='anomalyresult',
+            name='behavior_log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='behavior.userbehaviorlog'),
+        ),
+    ]
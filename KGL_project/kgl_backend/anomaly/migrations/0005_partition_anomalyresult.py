@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from behavior.partitioning import convert_to_partitioned
+
+
+def partition_anomalyresult(apps, schema_editor):
+    # PostgreSQL 에서만 동작하고 SQLite 개발 DB 는 단일 테이블로 유지된다.
+    convert_to_partitioned(schema_editor.connection, 'anomaly_anomalyresult')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anomaly', '0004_anomalyresult_timestamp_not_null_and_more'),
+        ('behavior', '0005_partition_userbehaviorlog'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_anomalyresult, migrations.RunPython.noop),
+    ]
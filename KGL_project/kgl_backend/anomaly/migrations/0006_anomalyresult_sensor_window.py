@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anomaly', '0005_partition_anomalyresult'),
+        ('behavior', '0006_sensorwindow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anomalyresult',
+            name='sensor_window',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='behavior.sensorwindow'),
+        ),
+        migrations.AlterField(
+            model_name='anomalyresult',
+            name='behavior_log',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='behavior.userbehaviorlog'),
+        ),
+    ]
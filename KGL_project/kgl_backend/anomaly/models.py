@@ -1,13 +1,22 @@
 # anomaly/models.py
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class AnomalyResult(models.Model):
 
-    behavior_log = models.ForeignKey('behavior.UserBehaviorLog', on_delete=models.CASCADE)
+    # PostgreSQL 에서는 두 테이블 모두 timestamp 로 파티셔닝되어 DB 레벨 FK 를 걸 수 없다.
+    # (CASCADE 삭제는 Django ORM 이 처리하고, 보존 기간 정리는 파티션 DROP 으로 함께 이뤄진다.)
+    behavior_log = models.ForeignKey(
+        'behavior.UserBehaviorLog', on_delete=models.CASCADE, db_constraint=False, null=True, blank=True,
+    )
+    # 창 단위로 저장된 센서 데이터(behavior.SensorWindow)의 결과는 behavior_log 대신 여기에 연결된다.
+    sensor_window = models.ForeignKey(
+        'behavior.SensorWindow', on_delete=models.CASCADE, null=True, blank=True,
+    )
 
     modality = models.CharField(max_length=50, null=True, blank=True)
-    timestamp = models.DateTimeField(null=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
 
     anomaly_score = models.FloatField()
     is_anomaly = models.BooleanField()
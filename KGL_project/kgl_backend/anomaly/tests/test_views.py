@@ -0,0 +1,75 @@
+# anomaly/tests/test_views.py
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from anomaly.models import AnomalyResult
+from anomaly.views import _incremental_since
+
+UPDATES = "/api/mobile/anomaly/updates"
+
+
+def _result(ts, **kw):
+    return AnomalyResult.objects.create(
+        modality="touch_pressure", timestamp=ts, anomaly_score=1.0, is_anomaly=True, **kw
+    )
+
+
+@override_settings(ANOMALY_POLL_SLACK_MINUTES=60, LOG_PARTITION_RETENTION_DAYS=7)
+class MobileAnomalyUpdatesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.now = timezone.now()
+
+    def _ids(self, resp):
+        return [item["id"] for item in resp.json()["items"]] if resp.status_code == 200 else []
+
+    def test_since_id_returns_newer_rows(self):
+        first = _result(self.now - timedelta(hours=1))
+        second = _result(self.now)
+        resp = self.client.get(UPDATES, {"since_id": first.id})
+        self.assertEqual(self._ids(resp), [second.id])
+        self.assertEqual(self.client.get(UPDATES, {"since_id": second.id}).status_code, 204)
+
+    def test_since_id_not_cut_by_default_lookback_on_partitioned_table(self):
+        # 오래 폴링하지 않은 클라이언트: since_id 행과 그 뒤 결과가 MOBILE_ANOMALY_LOOKBACK_HOURS 보다 오래됐다.
+        old = _result(self.now - timedelta(days=3))
+        later = _result(self.now - timedelta(days=2))
+        with mock.patch("anomaly.views.is_partitioned", return_value=True):
+            resp = self.client.get(UPDATES, {"since_id": old.id})
+        self.assertEqual(self._ids(resp), [later.id])
+
+    def test_since_id_bound_tolerates_late_results_within_slack(self):
+        anchor = _result(self.now)
+        late = _result(self.now - timedelta(minutes=30))    # 늦게 올라온 결과 (id 는 크고 timestamp 는 앞선다)
+        too_late = _result(self.now - timedelta(hours=3))   # 여유를 넘으면 파티션 하한에 걸린다
+        with mock.patch("anomaly.views.is_partitioned", return_value=True):
+            resp = self.client.get(UPDATES, {"since_id": anchor.id})
+        self.assertEqual(self._ids(resp), [late.id])
+        # 단일 테이블에서는 하한을 걸지 않는다.
+        self.assertEqual(self._ids(self.client.get(UPDATES, {"since_id": anchor.id})), [late.id, too_late.id])
+
+    def test_expired_since_id_falls_back_to_retention(self):
+        # since_id 행이 보존 기간으로 지워졌으면 보존 기간(+1일) 전체를 본다.
+        kept = _result(self.now - timedelta(days=6))
+        gone = _result(self.now - timedelta(days=5))
+        gone_id = gone.id
+        gone.delete()
+        with mock.patch("anomaly.views.is_partitioned", return_value=True):
+            resp = self.client.get(UPDATES, {"since_id": kept.id - 1})
+            self.assertEqual(self._ids(resp), [kept.id])
+            since = _incremental_since({"since_id": str(gone_id)})
+        self.assertAlmostEqual((self.now - since).total_seconds(), timedelta(days=8).total_seconds(), delta=60)
+
+    def test_created_after_bound(self):
+        old = _result(self.now - timedelta(minutes=10))
+        new = _result(self.now - timedelta(minutes=5))
+        AnomalyResult.objects.filter(pk=old.pk).update(created_at=self.now - timedelta(minutes=10))
+        with mock.patch("anomaly.views.is_partitioned", return_value=True):
+            resp = self.client.get(UPDATES, {"created_after": (self.now - timedelta(minutes=7)).isoformat()})
+            since = _incremental_since({"created_after": (self.now - timedelta(minutes=7)).isoformat()})
+        self.assertEqual(self._ids(resp), [new.id])
+        self.assertAlmostEqual((self.now - since).total_seconds(), 67 * 60, delta=5)
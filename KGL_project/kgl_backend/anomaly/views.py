@@ -3,26 +3,80 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.utils.dateparse import parse_datetime
-from django.utils.timezone import make_aware
-from datetime import timezone
+from django.utils.timezone import make_aware, now
+from django.conf import settings
+from django.db.models import Q
+from datetime import timezone, timedelta
+
+from behavior.partitioning import is_partitioned, timestamp_window, retention_days
 
 from .models import AnomalyResult
 from .serializers import AnomalyResultSerializer, MobileAnomalySerializer
 
 
+def _incremental_since(params):
+    """since_id / created_after 증분 조회의 timestamp 하한 (파티션 프루닝용).
+    since_id 행의 timestamp(pk 조회 한 번) 또는 created_after 에서 ANOMALY_POLL_SLACK_MINUTES 만큼 더 내려간다 —
+    timestamp 는 기록 시각이 아니라 이벤트 시각이라 늦게 올라온 결과는 id 가 커도 timestamp 가 앞설 수 있다.
+    since_id 행이 이미 보존 기간으로 지워졌으면 보존 기간 전체를 본다 (그보다 오래된 행은 남아 있지 않다)."""
+    anchor = None
+    try:
+        since_id = int(params.get("since_id") or 0)
+    except ValueError:
+        since_id = 0
+    if since_id:
+        anchor = AnomalyResult.objects.filter(id=since_id).values_list("timestamp", flat=True).first()
+    if anchor is None and params.get("created_after"):
+        anchor = parse_datetime(params["created_after"])
+        if anchor and anchor.tzinfo is None:
+            anchor = make_aware(anchor, timezone=timezone.utc)
+    if anchor is None:
+        return now() - timedelta(days=retention_days() + 1)
+    return anchor - timedelta(minutes=getattr(settings, "ANOMALY_POLL_SLACK_MINUTES", 60))
+
+
+def _filter_timestamp_window(qs, request, default_lookback):
+    """?since=&until= (ISO8601, AnomalyResult.timestamp 기준) 로 자른다. timestamp 범위 조건이 있어야 PostgreSQL 이
+    일 파티션을 프루닝할 수 있다.
+    파티션 테이블에서 since 가 없으면 since_id / created_after 증분 조회는 _incremental_since 를, 그 밖에는
+    default_lookback 을 하한으로 건다. 단일 테이블에서는 since/until 만 적용한다."""
+    params = request.query_params
+    since, until = timestamp_window(params)
+    if since is None and is_partitioned(AnomalyResult._meta.db_table):
+        if params.get("since_id") or params.get("created_after"):
+            since = _incremental_since(params)
+        elif default_lookback is not None:
+            since = now() - default_lookback
+    if since:
+        qs = qs.filter(timestamp__gte=since)
+    if until:
+        qs = qs.filter(timestamp__lt=until)
+    return qs
+
+
 class AnomalyResultList(generics.ListAPIView):
-    queryset = AnomalyResult.objects.all().order_by('-timestamp').select_related('behavior_log')
+    # ?since=&until= — 파티션 테이블에서 since 를 주지 않으면 보존 기간(+1일) 안의 결과만 돌려준다.
+    queryset = AnomalyResult.objects.all().order_by('-timestamp').select_related('behavior_log__user_session', 'sensor_window__user_session')
     serializer_class = AnomalyResultSerializer
 
+    def get_queryset(self):
+        return _filter_timestamp_window(
+            super().get_queryset(), self.request, timedelta(days=retention_days() + 1)
+        )
 
 
 class MobileAnomalyUpdates(APIView):
+    # ?since_id= / ?created_after= 증분 폴링, ?since=&until= 시간 범위. 파티션 테이블에서 셋 다 없으면
+    # 최근 MOBILE_ANOMALY_LOOKBACK_HOURS 시간만 본다.
     authentication_classes = []
     permission_classes = []
 
     def get(self, request):
 
-        qs = AnomalyResult.objects.all().select_related('behavior_log')
+        qs = AnomalyResult.objects.all().select_related('behavior_log__user_session', 'sensor_window__user_session')
+        qs = _filter_timestamp_window(
+            qs, request, timedelta(hours=getattr(settings, "MOBILE_ANOMALY_LOOKBACK_HOURS", 24))
+        )
         only_abnormal = request.query_params.get("only_abnormal", "true").lower() != "false"
         if only_abnormal:
             qs = qs.filter(is_anomaly=True)
@@ -40,7 +94,7 @@ class MobileAnomalyUpdates(APIView):
             if "user_id" in field_names:
                 qs = qs.filter(user_id=user_id)
             else:
-                qs = qs.filter(behavior_log__user_id=user_id)
+                qs = qs.filter(Q(behavior_log__user_session__user_id=user_id) | Q(sensor_window__user_session__user_id=user_id))
 
         modality = request.query_params.get("modality")
         if modality:
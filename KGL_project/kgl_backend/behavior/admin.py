@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserBehaviorLog
+from .models import UserBehaviorLog, SensorWindow, Device, Session
 
 @admin.register(UserBehaviorLog)
 class UserBehaviorLogAdmin(admin.ModelAdmin):
@@ -10,4 +10,38 @@ class UserBehaviorLogAdmin(admin.ModelAdmin):
             "sequence_index",
             "timestamp",
             "session_id",
-        )
\ No newline at end of file
+        )
+        list_select_related = ("user_session", "device")
+        search_fields = ("user_session__user_id", "user_session__session_id")
+        raw_id_fields = ("user_session", "device")
+
+
+@admin.register(Device)
+class DeviceAdmin(admin.ModelAdmin):
+        list_display = ("id", "fingerprint", "first_seen")
+        search_fields = ("fingerprint",)
+
+
+@admin.register(Session)
+class SessionAdmin(admin.ModelAdmin):
+        list_display = ("id", "user_id", "session_id", "first_seen")
+        search_fields = ("user_id", "session_id")
+
+
+@admin.register(SensorWindow)
+class SensorWindowAdmin(admin.ModelAdmin):
+        list_display = (
+            "id",
+            "user_id",
+            "sensor_type",
+            "sample_count",
+            "window_start",
+            "window_end",
+            "magnitude_mean",
+            "magnitude_max",
+        )
+        list_filter = ("sensor_type",)
+        list_select_related = ("user_session",)
+        search_fields = ("user_session__user_id", "user_session__session_id")
+        raw_id_fields = ("user_session", "device")
+        exclude = ("ts_offsets", "sequence_indexes", "x", "y", "z")
@@ -0,0 +1,217 @@
+# behavior/async_views.py
+# ASGI(uvicorn 등)로 띄웠을 때 쓰는 비동기 수집 엔드포인트 (network / sensor / touch).
+#
+#   uvicorn nac_backend.asgi:application --workers 4
+#
+# 동기 DRF 뷰(views.py)와 같은 저장/판정 헬퍼를 쓰고 응답 본문도 같다. 차이는 대기 방식뿐이다.
+#   - DB 작업은 ASYNC_INGEST_DB_THREADS 크기의 전용 스레드 풀에서 동기 ORM 으로 처리한다.
+#     (Django 의 async ORM 메서드는 내부적으로 thread_sensitive 단일 스레드에 직렬화되므로 쓰지 않는다)
+#   - ML 서버 호출은 httpx.AsyncClient 로 이벤트 루프에서 기다려, 응답 대기 중에 스레드를 점유하지 않는다.
+import asyncio
+import json
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from . import sensor_windows, views
+from .columnar import (
+    MEDIA_TYPE as COLUMNAR_MEDIA_TYPE, ColumnarFormatError, ColumnBatch, decode_batch, encode_batch, logs_to_batch,
+)
+from .sensor_windows import SENSOR_TYPE_ACTIONS
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - 선택 의존성, 없으면 requests 를 스레드 풀에서 호출
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+_db_executor = None
+_clients = weakref.WeakKeyDictionary()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=int(getattr(settings, "ASYNC_INGEST_DB_THREADS", 8)),
+            thread_name_prefix="ingest-db",
+        )
+    return _db_executor
+
+
+def _in_db_thread(fn, *args, **kwargs):
+    # 풀 스레드의 연결은 요청 시그널로 정리되지 않으므로 작업마다 만료된 연결을 닫는다.
+    close_old_connections()
+    return fn(*args, **kwargs)
+
+
+async def run_db(fn, *args, **kwargs):
+    return await sync_to_async(_in_db_thread, thread_sensitive=False, executor=_executor())(fn, *args, **kwargs)
+
+
+def _ml_client():
+    # AsyncClient 는 생성한 이벤트 루프에 묶이므로 루프마다 하나씩 둔다.
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        max_conn = int(getattr(settings, "ASYNC_ML_MAX_CONNECTIONS", 64))
+        client = httpx.AsyncClient(
+            base_url=settings.ML_SERVER_URL,
+            timeout=10,
+            limits=httpx.Limits(max_connections=max_conn, max_keepalive_connections=max_conn),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def call_ml_server(logs_payload, endpoint):
+    if httpx is None:
+        return await run_db(views._call_ml_server, logs_payload, endpoint)
+    if endpoint == "predict_hybrid" and views._ml_columns_available():
+        batch = logs_to_batch(views._ml_json_logs(logs_payload))
+        if batch is not None:
+            result = await call_ml_server_columns(batch)
+            if result is not False:
+                return result
+    try:
+        r = await _ml_client().post(f"/{endpoint}", json=views._ml_json_logs(logs_payload))
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        logger.error(f"통합 ML 서버 호출 실패: {e}")
+        return None
+
+
+async def call_ml_server_columns(batch: ColumnBatch, endpoint="predict_columns"):
+    if httpx is None:
+        return await run_db(views._call_ml_server_columns, batch, endpoint)
+    if not views._ml_columns_available():
+        return False
+    try:
+        r = await _ml_client().post(f"/{endpoint}", content=encode_batch(batch),
+                                    headers={"Content-Type": COLUMNAR_MEDIA_TYPE, "Accept": COLUMNAR_MEDIA_TYPE})
+        if r.status_code not in (404, 405, 415):
+            r.raise_for_status()
+        return views._ml_columns_response(r.status_code, r.headers.get("content-type"), r.content, r.json)
+    except Exception as e:
+        logger.error(f"통합 ML 서버(columnar) 호출 실패: {e}")
+        return None
+
+
+def _error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+class AsyncIngestView(View):
+    http_method_names = ["post", "options"]
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # 모바일 클라이언트는 세션/CSRF 토큰 없이 보낸다 (DRF APIView 와 동일하게 면제).
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    @staticmethod
+    def parse(request, allow_columnar=True):
+        """(data, error_response). data 는 list 또는 ColumnBatch."""
+        content_type = request.content_type or ""
+        if content_type == COLUMNAR_MEDIA_TYPE:
+            if not allow_columnar:
+                return None, _error(f"Unsupported media type \"{content_type}\"", 415)
+            try:
+                return decode_batch(request.body), None
+            except ColumnarFormatError as e:
+                return None, _error(f"Columnar parse error - {e}")
+        try:
+            return json.loads(request.body or b"null"), None
+        except ValueError as e:
+            return None, _error(f"JSON parse error - {e}")
+
+
+class AsyncNetworkDataIngestView(AsyncIngestView):
+    async def post(self, request):
+        data, err = self.parse(request, allow_columnar=False)
+        if err:
+            return err
+        if not isinstance(data, list):
+            return _error("Expected a JSON array")
+
+        created_logs, created_anomalies, errors = await run_db(views._save_network, data)
+        if errors:
+            return JsonResponse(errors, status=400)
+        return JsonResponse(views.network_body(created_logs, created_anomalies), status=201)
+
+
+async def _ingest_columnar(batch: ColumnBatch, action_types, param_names):
+    objs, ml_batch, fallback_logs = await run_db(views._store_columnar, batch, action_types, param_names)
+    ml_results = await call_ml_server_columns(ml_batch)
+    if ml_results is False:
+        ml_results = await call_ml_server(fallback_logs(), "predict_hybrid")
+    return len(objs), await run_db(views._finalize_logs, objs, ml_results, "hybrid")
+
+
+async def _ingest_rows(payloads):
+    objs, errors = await run_db(views._save_payloads, payloads)
+    if errors:
+        return None, errors
+    ml_results = await call_ml_server(payloads, "predict_hybrid")
+    return (len(objs), await run_db(views._finalize_logs, objs, ml_results, "hybrid")), None
+
+
+class AsyncSensorDataIngestView(AsyncIngestView):
+    async def post(self, request):
+        data, err = self.parse(request)
+        if err:
+            return err
+        if not isinstance(data, (list, ColumnBatch)):
+            return _error("Expected a JSON array")
+
+        if sensor_windows.windows_enabled():
+            columns, errors = views._sensor_columns(data)
+            if errors:
+                return JsonResponse(errors, status=400)
+            windows = await run_db(views._store_sensor_windows, **columns)
+            ml_results = await call_ml_server_columns(sensor_windows.to_ml_batch(windows))
+            if ml_results is False:
+                ml_results = await call_ml_server(sensor_windows.to_ml_logs(windows), "predict_hybrid")
+            saved = await run_db(views._finalize_sensor_windows, windows, ml_results)
+            created = sum(w.sample_count for w in windows)
+            return JsonResponse(views.sensor_body(created, saved, window_count=len(windows)), status=201)
+
+        if isinstance(data, ColumnBatch):
+            actions = [SENSOR_TYPE_ACTIONS.get(t, "sensor_unknown") for t in data.strings("type", "unknown")]
+            created, saved = await _ingest_columnar(data, actions, ["x", "y", "z", "magnitude"])
+            return JsonResponse(views.sensor_body(created, saved), status=201)
+
+        result, errors = await _ingest_rows([views._sensor_payload(item) for item in data])
+        if errors:
+            return JsonResponse(errors, status=400)
+        return JsonResponse(views.sensor_body(*result), status=201)
+
+
+class AsyncTouchDataIngestView(AsyncIngestView):
+    async def post(self, request):
+        data, err = self.parse(request)
+        if err:
+            return err
+        if isinstance(data, ColumnBatch):
+            param_names = [k for k in data.columns if k not in views._COLUMNAR_RESERVED]
+            created, saved = await _ingest_columnar(
+                data, data.strings("action_type", "touch_unknown"), param_names,
+            )
+            return JsonResponse(views.touch_body(created, saved), status=201)
+        if not isinstance(data, list):
+            return _error("Expected a JSON array")
+
+        result, errors = await _ingest_rows([views._touch_payload(item) for item in data])
+        if errors:
+            return JsonResponse(errors, status=400)
+        return JsonResponse(views.touch_body(*result), status=201)
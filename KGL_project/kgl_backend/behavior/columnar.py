@@ -0,0 +1,205 @@
+# behavior/columnar.py
+# 센서/터치 배치 업로드용 컬럼 기반 MessagePack 포맷.
+#
+#   {
+#     "v": 1,
+#     "kind": "sensor" | "touch",
+#     "n": <행 수>,
+#     "meta": {"user_id": str, "session_id": str, "device_info": {...}},   # 배치 공통값
+#     "columns": {
+#        "<숫자 컬럼>": {"dtype": "<f4" | "<f8" | "<i4" | "<i8", "data": <little-endian bytes>},
+#        "<문자열 컬럼>": ["...", ...],
+#     }
+#   }
+#
+# 숫자 컬럼의 결측값은 NaN 으로 보낸다. ML 서버(kgl_model/columnar.py)도 같은 포맷을 사용한다.
+# ML 서버 /predict_columns 는 Accept 에 MEDIA_TYPE 이 있으면 결과도 이 포맷(kind="results")으로 돌려준다.
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 선택 의존성
+    msgpack = None
+
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/x-kgl-columns+msgpack"
+
+_ALLOWED_DTYPES = {"<f4", "<f8", "<i4", "<i8", "|u1", "|b1"}
+
+Column = Union[np.ndarray, List[Optional[str]]]
+
+
+class ColumnarFormatError(ValueError):
+    pass
+
+
+class ColumnBatch:
+    """디코딩된 업로드 한 건. columns 는 numpy 배열(숫자) 또는 문자열 리스트."""
+
+    def __init__(self, kind: str, columns: Dict[str, Column], meta: Optional[Dict[str, Any]] = None):
+        self.kind = kind
+        self.columns = columns
+        self.meta = meta or {}
+        lengths = {len(c) for c in columns.values()}
+        if len(lengths) > 1:
+            raise ColumnarFormatError(f"column length mismatch: {sorted(lengths)}")
+        self.n = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self.n
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def get(self, name: str, default=None):
+        return self.columns.get(name, default)
+
+    def numeric(self, name: str, dtype=np.float64, fill=np.nan) -> np.ndarray:
+        col = self.columns.get(name)
+        if col is None:
+            return np.full(self.n, fill, dtype=dtype)
+        if isinstance(col, np.ndarray):
+            return col.astype(dtype, copy=False)
+        return np.array([fill if v is None else v for v in col], dtype=dtype)
+
+    def strings(self, name: str, default: Optional[str] = None) -> List[Optional[str]]:
+        col = self.columns.get(name)
+        if col is None:
+            return [default] * self.n
+        if isinstance(col, np.ndarray):
+            return [str(v) for v in col.tolist()]
+        return [default if v is None else str(v) for v in col]
+
+    def select(self, mask: np.ndarray) -> "ColumnBatch":
+        idx = np.flatnonzero(mask)
+        cols = {}
+        for k, v in self.columns.items():
+            cols[k] = v[idx] if isinstance(v, np.ndarray) else [v[i] for i in idx]
+        return ColumnBatch(self.kind, cols, dict(self.meta))
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ColumnarFormatError("msgpack is not installed")
+
+
+def encode_columns(columns: Dict[str, Column]) -> Dict[str, Any]:
+    out = {}
+    for name, col in columns.items():
+        if isinstance(col, np.ndarray):
+            arr = np.ascontiguousarray(col)
+            if arr.dtype.kind == "f":
+                arr = arr.astype("<f8" if arr.dtype.itemsize > 4 else "<f4", copy=False)
+            elif arr.dtype.kind in "iu" and arr.dtype.itemsize > 1:
+                arr = arr.astype("<i8" if arr.dtype.itemsize > 4 else "<i4", copy=False)
+            out[name] = {"dtype": arr.dtype.str, "data": arr.tobytes()}
+        else:
+            out[name] = list(col)
+    return out
+
+
+def decode_columns(raw_columns: Dict[str, Any]) -> Dict[str, Column]:
+    columns: Dict[str, Column] = {}
+    for name, spec in raw_columns.items():
+        if isinstance(spec, dict):
+            dtype = spec.get("dtype")
+            if dtype not in _ALLOWED_DTYPES:
+                raise ColumnarFormatError(f"unsupported dtype for column '{name}': {dtype}")
+            data = spec.get("data") or b""
+            if not isinstance(data, (bytes, bytearray)):
+                raise ColumnarFormatError(f"column '{name}' data must be bytes")
+            if len(data) % np.dtype(dtype).itemsize:
+                raise ColumnarFormatError(f"column '{name}' is not a multiple of {dtype}")
+            columns[name] = np.frombuffer(data, dtype=dtype)
+        elif isinstance(spec, list):
+            columns[name] = spec
+        else:
+            raise ColumnarFormatError(f"column '{name}' must be a typed array or list")
+    return columns
+
+
+def encode_batch(batch: ColumnBatch) -> bytes:
+    _require_msgpack()
+    return msgpack.packb({
+        "v": FORMAT_VERSION,
+        "kind": batch.kind,
+        "n": batch.n,
+        "meta": batch.meta,
+        "columns": encode_columns(batch.columns),
+    }, use_bin_type=True)
+
+
+def _declared_n(value) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ColumnarFormatError(f"declared n must be an integer, got {value!r}")
+    return value
+
+
+def decode_batch(raw: bytes) -> ColumnBatch:
+    _require_msgpack()
+    try:
+        doc = msgpack.unpackb(raw, raw=False)
+    except Exception as e:
+        raise ColumnarFormatError(f"invalid msgpack body: {e}")
+    if not isinstance(doc, dict) or not isinstance(doc.get("columns"), dict):
+        raise ColumnarFormatError("expected a map with 'columns'")
+    if doc.get("v", FORMAT_VERSION) != FORMAT_VERSION:
+        raise ColumnarFormatError(f"unsupported format version: {doc.get('v')}")
+    batch = ColumnBatch(str(doc.get("kind") or ""), decode_columns(doc["columns"]), doc.get("meta") or {})
+    if "n" in doc and _declared_n(doc["n"]) != batch.n:
+        raise ColumnarFormatError(f"declared n={doc['n']} but columns have {batch.n} rows")
+    return batch
+
+
+# ML 서버가 params 가 아닌 상위 필드로 읽는 컬럼 이름 (kgl_model/columnar.py 의 _ROW_FIELDS)
+_ROW_FIELDS = {"seq", "ts", "timestamp", "action_type", "type", "user_id", "session_id"}
+
+
+def logs_to_batch(logs: List[Dict[str, Any]], kind: str = "") -> Optional[ColumnBatch]:
+    """/predict_hybrid 용 로그 dict 리스트를 컬럼 배치로. 열로 옮길 수 없는 값(중첩 dict/list,
+    params 키와 상위 필드 이름 충돌)이 있으면 None 을 돌려주고 호출자는 JSON 으로 보낸다."""
+    n = len(logs)
+    names: Dict[str, None] = {}
+    for log in logs:
+        for k, v in (log.get("params") or {}).items():
+            if k == "type":
+                continue  # 센서 종류는 action_type 에 이미 들어 있다
+            if k in _ROW_FIELDS or isinstance(v, (dict, list)):
+                return None
+            names.setdefault(k)
+
+    columns: Dict[str, Column] = {
+        "seq": np.array([int(log.get("sequence_index") or 0) for log in logs], dtype=np.int64),
+        "timestamp": [v.isoformat() if isinstance(v, datetime) else (None if v is None else str(v))
+                      for v in (log.get("timestamp") for log in logs)],
+        "action_type": [str(log.get("action_type") or "unknown") for log in logs],
+    }
+    meta: Dict[str, Any] = {}
+    if n:
+        meta = {"device_info": logs[0].get("device_info") or {}, "location": logs[0].get("location")}
+    for field in ("user_id", "session_id"):
+        values = [log.get(field) for log in logs]
+        if len(set(values)) > 1:
+            columns[field] = [None if v is None else str(v) for v in values]
+        elif n:
+            meta[field] = values[0]
+
+    for name in names:
+        values = [(log.get("params") or {}).get(name) for log in logs]
+        if all(v is None or isinstance(v, (int, float)) for v in values):
+            columns[name] = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+        else:
+            columns[name] = [None if v is None else str(v) for v in values]
+    return ColumnBatch(kind, columns, meta)
+
+
+def decode_results(raw: bytes) -> List[Dict[str, Any]]:
+    """/predict_columns 의 컬럼 결과를 JSON 응답과 같은 행 dict 리스트로 (timestamp 는 보내지 않으므로 없다).
+    row(결과 행의 입력 행 번호)도 남긴다 — 모달리티를 알 수 없는 입력 행은 결과에서 빠지므로 위치로는 맞출 수 없다."""
+    batch = decode_batch(raw)
+    names = list(batch.columns)
+    values = [c.tolist() if isinstance(c, np.ndarray) else list(c) for c in (batch.columns[k] for k in names)]
+    return [dict(zip(names, row)) for row in zip(*values)]
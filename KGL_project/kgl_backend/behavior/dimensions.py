@@ -0,0 +1,120 @@
+# behavior/dimensions.py
+# Device / Session 차원 테이블의 프로세스 로컬 intern 캐시.
+# 한 번 확인한 (user_id, session_id) 와 device_info 지문은 pk 를 캐시해 두어,
+# 같은 세션의 다음 배치부터는 차원 조회 쿼리 없이 FK 를 채운다.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+
+from .models import Device, Session
+
+CACHE_SIZE = 10000
+
+
+def device_fingerprint(info: Optional[Dict[str, Any]]) -> str:
+    canonical = json.dumps(info or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class InternCache:
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            pk = self._data.get(key)
+            if pk is not None:
+                self._data.move_to_end(key)
+            return pk
+
+    def update(self, items: Dict[Hashable, int]):
+        with self._lock:
+            for k, v in items.items():
+                self._data[k] = v
+                self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_devices = InternCache()
+_sessions = InternCache()
+
+
+def clear_caches():
+    _devices.clear()
+    _sessions.clear()
+
+
+def _remember(cache: InternCache, found: Dict[Hashable, int]):
+    # 롤백된 트랜잭션에서 만든 pk 가 캐시에 남지 않도록 커밋 이후에만 기록한다.
+    if not found:
+        return
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.update(found))
+    else:
+        cache.update(found)
+
+
+def resolve_sessions(pairs: Iterable[Tuple[str, str]]) -> List[int]:
+    pairs = [(str(u), str(s)) for u, s in pairs]
+    resolved = {p: _sessions.get(p) for p in set(pairs)}
+    missing = [p for p, pk in resolved.items() if pk is None]
+    if missing:
+        Session.objects.bulk_create(
+            [Session(user_id=u, session_id=s) for u, s in missing], ignore_conflicts=True,
+        )
+        users = {u for u, _ in missing}
+        sessions = {s for _, s in missing}
+        found = {
+            (u, s): pk
+            for pk, u, s in Session.objects.filter(user_id__in=users, session_id__in=sessions)
+            .values_list("pk", "user_id", "session_id")
+            if (u, s) in resolved
+        }
+        resolved.update(found)
+        _remember(_sessions, found)
+    return [resolved[p] for p in pairs]
+
+
+def resolve_devices(infos: Iterable[Optional[Dict[str, Any]]]) -> List[int]:
+    infos = [info or {} for info in infos]
+    # 같은 dict 객체(배치 공통 device_info 등)는 한 번만 지문을 계산한다.
+    by_obj: Dict[int, str] = {}
+    keys = []
+    for info in infos:
+        k = by_obj.get(id(info))
+        if k is None:
+            k = by_obj[id(info)] = device_fingerprint(info)
+        keys.append(k)
+    resolved = {k: _devices.get(k) for k in set(keys)}
+    missing = {k for k, pk in resolved.items() if pk is None}
+    if missing:
+        first_info = {}
+        for k, info in zip(keys, infos):
+            if k in missing:
+                first_info.setdefault(k, info)
+        Device.objects.bulk_create(
+            [Device(fingerprint=k, info=first_info[k]) for k in missing], ignore_conflicts=True,
+        )
+        found = dict(Device.objects.filter(fingerprint__in=missing).values_list("fingerprint", "pk"))
+        resolved.update(found)
+        _remember(_devices, found)
+    return [resolved[k] for k in keys]
+
+
+def session_pk_for(user_id: str, session_id: str) -> int:
+    return resolve_sessions([(user_id, session_id)])[0]
+
+
+def device_pk_for(info: Optional[Dict[str, Any]]) -> int:
+    return resolve_devices([info])[0]
@@ -0,0 +1,51 @@
+# behavior/management/commands/manage_log_partitions.py
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from behavior import partitioning
+
+
+class Command(BaseCommand):
+    help = ("UserBehaviorLog / AnomalyResult 의 미래 일 파티션을 미리 만들고, 보존 기간이 지난 파티션과 "
+            "default 파티션의 만료 행을 삭제합니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=partitioning.premake_days(),
+                            help="오늘부터 미리 생성할 일 수")
+        parser.add_argument("--drop-expired", action="store_true",
+                            help="보존 기간이 지난 파티션을 DROP 하고 default 파티션의 만료 행을 DELETE")
+        parser.add_argument("--retention-days", type=int, default=partitioning.retention_days())
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **opts):
+        if not partitioning.is_postgres():
+            self.stdout.write("파티셔닝은 PostgreSQL 에서만 지원됩니다. (현재 DB: 단일 테이블)")
+            return
+
+        today = timezone.now().astimezone(dt_timezone.utc).date()
+        end = today + timedelta(days=opts["days"])
+        cutoff = partitioning.retention_cutoff(today, opts["retention_days"])
+
+        for table in partitioning.PARTITIONED_TABLES:
+            if not partitioning.is_partitioned(table):
+                self.stderr.write(f"{table}: 파티션 테이블이 아닙니다. migrate 를 먼저 실행하세요.")
+                continue
+
+            if opts["dry_run"]:
+                expired = partitioning.expired_partitions(table, cutoff) if opts["drop_expired"] else []
+                self.stdout.write(f"{table}: create {today}..{end}, drop {expired}")
+                continue
+
+            # 생성과 삭제를 한 트랜잭션으로 묶지 않는다: 각 DDL 이 자기 트랜잭션에서 커밋되므로 CREATE 실패가
+            # DROP 을 막지 않고, DROP 의 ACCESS EXCLUSIVE 락도 그 파티션 하나 동안만 잡힌다.
+            created = partitioning.create_daily_partitions(table, today, end)
+            dropped, purged = [], 0
+            if opts["drop_expired"]:
+                dropped = partitioning.drop_expired_partitions(table, cutoff)
+                purged = partitioning.purge_default_partition(table, cutoff)
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: created {len(created)}, dropped {len(dropped)}, purged {purged} rows from default"
+            ))
@@ -0,0 +1,84 @@
+# behavior/middleware.py
+import io
+import logging
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 선택 의존성
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class _TooLarge(Exception):
+    pass
+
+
+def _gunzip(body: bytes, limit: int) -> bytes:
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    out = d.decompress(body, limit + 1)
+    if len(out) > limit:
+        raise _TooLarge()
+    return out
+
+
+def _unzstd(body: bytes, limit: int) -> bytes:
+    if zstandard is None:
+        raise ValueError("zstandard is not installed")
+    with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)) as r:
+        out = r.read(limit + 1)
+    if len(out) > limit:
+        raise _TooLarge()
+    return out
+
+
+_DECODERS = {"gzip": _gunzip, "x-gzip": _gunzip, "zstd": _unzstd}
+
+
+class RequestBodyDecompressionMiddleware:
+    """Content-Encoding: gzip/zstd 요청 본문을 파서가 읽기 전에 풀어준다 (JSON/columnar 공통).
+
+    WSGI/ASGI 양쪽에서 동작한다. ASGI 에서는 본문이 이미 메모리에 올라와 있으므로 해제만 한다.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._decode(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self._decode(request) or await self.get_response(request)
+
+    def _decode(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if not encoding or encoding == "identity":
+            return None
+        decoder = _DECODERS.get(encoding)
+        if decoder is None:
+            return JsonResponse({"error": f"Unsupported Content-Encoding: {encoding}"}, status=415)
+        limit = int(getattr(settings, "INGEST_MAX_DECOMPRESSED_BYTES", 32 * 1024 * 1024))
+        try:
+            body = decoder(request.body, limit)
+        except _TooLarge:
+            return JsonResponse({"error": "Decompressed body too large"}, status=413)
+        except Exception as e:
+            logger.warning(f"Failed to decode {encoding} request body: {e}")
+            return JsonResponse({"error": f"Invalid {encoding} body"}, status=400)
+        request._body = body
+        request._stream = io.BytesIO(body)
+        request.META["CONTENT_LENGTH"] = str(len(body))
+        del request.META["HTTP_CONTENT_ENCODING"]
+        return None
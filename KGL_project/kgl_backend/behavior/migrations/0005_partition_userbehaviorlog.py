@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from behavior.partitioning import convert_to_partitioned
+
+
+def partition_userbehaviorlog(apps, schema_editor):
+    # PostgreSQL 에서만 동작하고 SQLite 개발 DB 는 단일 테이블로 유지된다.
+    convert_to_partitioned(schema_editor.connection, 'behavior_userbehaviorlog')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior', '0004_remove_userbehaviorlog_is_processed_by_ml_and_more'),
+        # anomaly 쪽 FK 제약이 먼저 제거되어야 원본 테이블을 교체할 수 있다.
+        ('anomaly', '0004_anomalyresult_timestamp_not_null_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_userbehaviorlog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior', '0005_partition_userbehaviorlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=255)),
+                ('session_id', models.CharField(max_length=255)),
+                ('sensor_type', models.CharField(max_length=20)),
+                ('window_start', models.DateTimeField()),
+                ('window_end', models.DateTimeField()),
+                ('sample_count', models.IntegerField()),
+                ('ts_offsets', models.BinaryField()),
+                ('sequence_indexes', models.BinaryField()),
+                ('x', models.BinaryField()),
+                ('y', models.BinaryField()),
+                ('z', models.BinaryField()),
+                ('mean_x', models.FloatField()),
+                ('mean_y', models.FloatField()),
+                ('mean_z', models.FloatField()),
+                ('std_x', models.FloatField()),
+                ('std_y', models.FloatField()),
+                ('std_z', models.FloatField()),
+                ('magnitude_mean', models.FloatField()),
+                ('magnitude_max', models.FloatField()),
+                ('device_info', models.JSONField(default=dict)),
+                ('location', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'session_id', 'window_start'], name='behavior_se_user_id_4d3d4d_idx'), models.Index(fields=['window_start'], name='behavior_se_window__c1515d_idx')],
+            },
+        ),
+    ]
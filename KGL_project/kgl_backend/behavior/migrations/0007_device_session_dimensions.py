@@ -0,0 +1,105 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:10
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def device_fingerprint(info):
+    # behavior.dimensions.device_fingerprint 의 이 시점 사본 — 이후 그쪽이 바뀌어도 이 마이그레이션 결과는 그대로다.
+    canonical = json.dumps(info or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def backfill_dimensions(apps, schema_editor):
+    UserBehaviorLog = apps.get_model('behavior', 'UserBehaviorLog')
+    Device = apps.get_model('behavior', 'Device')
+    Session = apps.get_model('behavior', 'Session')
+
+    pairs = UserBehaviorLog.objects.values_list('user_id', 'session_id').distinct()
+    for user_id, session_id in pairs.iterator():
+        sess, _ = Session.objects.get_or_create(user_id=user_id, session_id=session_id)
+        UserBehaviorLog.objects.filter(
+            user_id=user_id, session_id=session_id, user_session__isnull=True,
+        ).update(user_session=sess)
+
+    # JSON 값 기준 DISTINCT 는 DB 마다 동작이 달라 지문 단위로 묶어서 처리한다.
+    while True:
+        pending = UserBehaviorLog.objects.filter(device__isnull=True)
+        info = pending.values_list('device_info', flat=True).first()
+        if info is None and not pending.exists():
+            break
+        fp = device_fingerprint(info)
+        dev, _ = Device.objects.get_or_create(fingerprint=fp, defaults={'info': info or {}})
+        pks = [
+            pk for pk, other in pending.values_list('pk', 'device_info').iterator()
+            if device_fingerprint(other) == fp
+        ]
+        for i in range(0, len(pks), 5000):
+            UserBehaviorLog.objects.filter(pk__in=pks[i:i + 5000]).update(device=dev)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior', '0006_sensorwindow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Device',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('info', models.JSONField(default=dict)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Session',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=255)),
+                ('session_id', models.CharField(max_length=255)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'session_id'), name='behavior_session_user_session_uniq')],
+            },
+        ),
+        migrations.AddField(
+            model_name='userbehaviorlog',
+            name='user_session',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='behavior.session'),
+        ),
+        migrations.AddField(
+            model_name='userbehaviorlog',
+            name='device',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='behavior.device'),
+        ),
+        migrations.RunPython(backfill_dimensions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userbehaviorlog',
+            name='user_session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='behavior.session'),
+        ),
+        migrations.AlterField(
+            model_name='userbehaviorlog',
+            name='device',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='behavior.device'),
+        ),
+        migrations.RemoveField(
+            model_name='userbehaviorlog',
+            name='user_id',
+        ),
+        migrations.RemoveField(
+            model_name='userbehaviorlog',
+            name='session_id',
+        ),
+        migrations.RemoveField(
+            model_name='userbehaviorlog',
+            name='device_info',
+        ),
+    ]
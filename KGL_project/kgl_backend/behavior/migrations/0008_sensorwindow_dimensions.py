@@ -0,0 +1,88 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:40
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def device_fingerprint(info):
+    # behavior.dimensions.device_fingerprint 의 이 시점 사본 (0007 과 같은 이유).
+    canonical = json.dumps(info or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def backfill_window_dimensions(apps, schema_editor):
+    SensorWindow = apps.get_model('behavior', 'SensorWindow')
+    Device = apps.get_model('behavior', 'Device')
+    Session = apps.get_model('behavior', 'Session')
+
+    pairs = SensorWindow.objects.values_list('user_id', 'session_id').distinct()
+    for user_id, session_id in pairs.iterator():
+        sess, _ = Session.objects.get_or_create(user_id=user_id, session_id=session_id)
+        SensorWindow.objects.filter(
+            user_id=user_id, session_id=session_id, user_session__isnull=True,
+        ).update(user_session=sess)
+
+    devices = {}
+    by_device = {}
+    for pk, info in SensorWindow.objects.filter(device__isnull=True).values_list('pk', 'device_info').iterator():
+        fp = device_fingerprint(info)
+        if fp not in devices:
+            devices[fp], _ = Device.objects.get_or_create(fingerprint=fp, defaults={'info': info or {}})
+        by_device.setdefault(fp, []).append(pk)
+    for fp, pks in by_device.items():
+        for i in range(0, len(pks), 5000):
+            SensorWindow.objects.filter(pk__in=pks[i:i + 5000]).update(device=devices[fp])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior', '0007_device_session_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sensorwindow',
+            name='user_session',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sensor_windows', to='behavior.session'),
+        ),
+        migrations.AddField(
+            model_name='sensorwindow',
+            name='device',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sensor_windows', to='behavior.device'),
+        ),
+        migrations.RunPython(backfill_window_dimensions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sensorwindow',
+            name='user_session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sensor_windows', to='behavior.session'),
+        ),
+        migrations.AlterField(
+            model_name='sensorwindow',
+            name='device',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sensor_windows', to='behavior.device'),
+        ),
+        migrations.RemoveIndex(
+            model_name='sensorwindow',
+            name='behavior_se_user_id_4d3d4d_idx',
+        ),
+        migrations.RemoveField(
+            model_name='sensorwindow',
+            name='user_id',
+        ),
+        migrations.RemoveField(
+            model_name='sensorwindow',
+            name='session_id',
+        ),
+        migrations.RemoveField(
+            model_name='sensorwindow',
+            name='device_info',
+        ),
+        migrations.AddIndex(
+            model_name='sensorwindow',
+            index=models.Index(fields=['user_session', 'window_start'], name='behavior_se_user_se_c3584e_idx'),
+        ),
+    ]
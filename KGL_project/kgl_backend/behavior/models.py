@@ -1,15 +1,106 @@
 from django.db import models
 
 # Create your models here.
-class UserBehaviorLog(models.Model):
+class Device(models.Model):
+    # device_info JSON 을 한 번만 저장하고 로그는 FK 로 참조한다. fingerprint = 정규화 JSON 의 sha1
+    fingerprint = models.CharField(max_length=40, unique=True)
+    info = models.JSONField(default=dict)
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Device {self.pk} | {self.fingerprint[:12]}"
+
+
+class Session(models.Model):
     user_id = models.CharField(max_length=255)
     session_id = models.CharField(max_length=255)
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'session_id'], name='behavior_session_user_session_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} | {self.session_id}"
+
+
+class UserBehaviorLog(models.Model):
+    user_session = models.ForeignKey(Session, on_delete=models.PROTECT, related_name='logs')
+    device = models.ForeignKey(Device, on_delete=models.PROTECT, related_name='logs')
     action_type = models.CharField(max_length=50)
     sequence_index = models.IntegerField()
     timestamp = models.DateTimeField()
     params = models.JSONField()
-    device_info = models.JSONField()
     location = models.JSONField(null=True, blank=True)
 
+    # 차원 테이블 분리 이전 필드명 호환용 (조회 시 select_related('user_session', 'device') 권장)
+    @property
+    def user_id(self):
+        return self.user_session.user_id
+
+    @property
+    def session_id(self):
+        return self.user_session.session_id
+
+    @property
+    def device_info(self):
+        return self.device.info
+
     def __str__(self):
         return f"{self.user_id} | {self.action_type} | seq={self.sequence_index} | {self.timestamp}"
+
+
+class SensorWindow(models.Model):
+    # 센서 샘플을 (user, session, sensor_type, 시간 창) 단위로 묶어 한 행에 저장한다.
+    # 배열은 little-endian float32/int32 로 packed 되어 있으며 behavior/sensor_windows.py 로 읽는다.
+    user_session = models.ForeignKey(Session, on_delete=models.PROTECT, related_name='sensor_windows')
+    device = models.ForeignKey(Device, on_delete=models.PROTECT, related_name='sensor_windows')
+    sensor_type = models.CharField(max_length=20)
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    sample_count = models.IntegerField()
+
+    ts_offsets = models.BinaryField()        # float32, window_start 기준 ms 오프셋
+    sequence_indexes = models.BinaryField()  # int32
+    x = models.BinaryField()                 # float32
+    y = models.BinaryField()
+    z = models.BinaryField()
+
+    mean_x = models.FloatField()
+    mean_y = models.FloatField()
+    mean_z = models.FloatField()
+    std_x = models.FloatField()
+    std_y = models.FloatField()
+    std_z = models.FloatField()
+    magnitude_mean = models.FloatField()
+    magnitude_max = models.FloatField()
+
+    location = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_session', 'window_start']),
+            models.Index(fields=['window_start']),
+        ]
+
+    # UserBehaviorLog 와 같은 호환 프로퍼티 (조회 시 select_related('user_session', 'device') 권장)
+    @property
+    def user_id(self):
+        return self.user_session.user_id
+
+    @property
+    def session_id(self):
+        return self.user_session.session_id
+
+    @property
+    def device_info(self):
+        return self.device.info
+
+    def __str__(self):
+        return f"{self.user_id} | {self.sensor_type} | n={self.sample_count} | {self.window_start}"
+
+    def samples(self):
+        from .sensor_windows import unpack_window
+        return unpack_window(self)
@@ -0,0 +1,16 @@
+# behavior/parsers.py
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .columnar import MEDIA_TYPE, ColumnarFormatError, decode_batch
+
+
+class ColumnarMsgPackParser(BaseParser):
+    """application/x-kgl-columns+msgpack 본문을 ColumnBatch(numpy 컬럼)로 디코딩."""
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return decode_batch(stream.read())
+        except ColumnarFormatError as e:
+            raise ParseError(f"Columnar parse error - {e}")
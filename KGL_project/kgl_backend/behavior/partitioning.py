@@ -0,0 +1,249 @@
+# behavior/partitioning.py
+# UserBehaviorLog / AnomalyResult 의 timestamp 기준 일 단위 range 파티셔닝 (PostgreSQL 전용).
+# SQLite 등 다른 DB에서는 모든 함수가 no-op 이고 기존 단일 테이블 경로를 그대로 사용한다.
+# 파티션 생성/삭제(DDL)는 요청 경로에서 하지 않는다 — cron 등으로 manage_log_partitions --drop-expired 를 돌린다.
+import logging
+import re
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("behavior_userbehaviorlog", "anomaly_anomalyresult")
+PARTITION_KEY = "timestamp"
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{8})$")
+_partitioned_cache: Dict[Tuple[str, str], bool] = {}
+
+
+def retention_days() -> int:
+    return int(getattr(settings, "LOG_PARTITION_RETENTION_DAYS", 7))
+
+
+def premake_days() -> int:
+    return int(getattr(settings, "LOG_PARTITION_PREMAKE_DAYS", 3))
+
+
+def is_postgres(conn=None) -> bool:
+    return (conn or default_connection).vendor == "postgresql"
+
+
+def clear_cache():
+    _partitioned_cache.clear()
+
+
+def is_partitioned(table: str, conn=None) -> bool:
+    conn = conn or default_connection
+    if not is_postgres(conn):
+        return False
+    key = (conn.alias, table)
+    if key not in _partitioned_cache:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+                [table],
+            )
+            _partitioned_cache[key] = cur.fetchone() is not None
+    return _partitioned_cache[key]
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _days(start: date, end: date) -> Iterable[date]:
+    d = start
+    while d <= end:
+        yield d
+        d += timedelta(days=1)
+
+
+def create_daily_partitions(table: str, start: date, end: date, conn=None) -> List[str]:
+    """start~end(포함) 구간의 일 단위 파티션을 없으면 생성하고, 새로 만든 파티션 이름을 반환.
+    DDL 마다 savepoint 를 두므로 하나가 실패해도 바깥 트랜잭션(마이그레이션 등)은 계속 쓸 수 있다."""
+    conn = conn or default_connection
+    if not is_partitioned(table, conn):
+        return []
+    qn = conn.ops.quote_name
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+            [table],
+        )
+        existing = {r[0] for r in cur.fetchall()}
+
+    created = []
+    for day in _days(start, end):
+        name = partition_name(table, day)
+        if name in existing:
+            continue
+        lo, hi = _day_bounds(day)
+        try:
+            with transaction.atomic(using=conn.alias), conn.cursor() as cur:
+                cur.execute(
+                    f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} "
+                    f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+                )
+            created.append(name)
+        except Exception as e:
+            # default 파티션에 해당 범위 행이 이미 있으면 생성이 거부된다.
+            logger.error(f"Failed to create partition {name}: {e}")
+    if created:
+        logger.info(f"Created {len(created)} partitions for {table}: {created[0]}..{created[-1]}")
+    return created
+
+
+def retention_cutoff(today: Optional[date] = None, days: Optional[int] = None) -> date:
+    """이 날짜(UTC) 이전의 행/파티션은 보존 기간이 지났다."""
+    today = today or timezone.now().astimezone(dt_timezone.utc).date()
+    return today - timedelta(days=retention_days() if days is None else days)
+
+
+def select_expired(table: str, names: Iterable[str], before: date) -> List[str]:
+    """table 의 일 파티션 이름 중 before 이전 날짜인 것. default 등 _pYYYYMMDD 가 아닌 이름은 제외."""
+    out = []
+    for name in names:
+        m = _PARTITION_SUFFIX.search(name)
+        if not m or name != f"{table}_p{m.group(1)}":
+            continue
+        try:
+            day = datetime.strptime(m.group(1), "%Y%m%d").date()
+        except ValueError:
+            continue
+        if day < before:
+            out.append(name)
+    return sorted(out)
+
+
+def expired_partitions(table: str, before: date, conn=None) -> List[str]:
+    conn = conn or default_connection
+    if not is_partitioned(table, conn):
+        return []
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+            [table],
+        )
+        names = [r[0] for r in cur.fetchall()]
+    return select_expired(table, names, before)
+
+
+def drop_expired_partitions(table: str, before: date, conn=None) -> List[str]:
+    # DROP 은 부모 테이블에 ACCESS EXCLUSIVE 락을 잡는다 → 파티션마다 따로 커밋해 락을 오래 들고 있지 않는다.
+    conn = conn or default_connection
+    qn = conn.ops.quote_name
+    dropped = []
+    for name in expired_partitions(table, before, conn):
+        try:
+            with transaction.atomic(using=conn.alias), conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {qn(name)}")
+            dropped.append(name)
+        except Exception as e:
+            logger.error(f"Failed to drop partition {name}: {e}")
+    if dropped:
+        logger.warning(f"Dropped {len(dropped)} expired partitions of {table} (before {before})")
+    return dropped
+
+
+def purge_default_partition(table: str, before: date, conn=None) -> int:
+    """default 파티션에서 before 이전 행을 지운다. 일 파티션이 없던 날(cron 누락 등)의 행은 default 로 들어가고
+    expired_partitions 로는 지워지지 않으므로 drop 과 함께 돌린다. 지운 행 수를 반환."""
+    conn = conn or default_connection
+    if not is_partitioned(table, conn):
+        return 0
+    qn = conn.ops.quote_name
+    lo, _ = _day_bounds(before)
+    with transaction.atomic(using=conn.alias), conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {qn(table + '_default')} WHERE {qn(PARTITION_KEY)} < %s", [lo])
+        deleted = cur.rowcount
+    if deleted:
+        logger.warning(f"Purged {deleted} expired rows from {table}_default (before {before})")
+    return deleted
+
+
+def convert_to_partitioned(conn, table: str):
+    """기존 heap 테이블을 timestamp 기준 range 파티션 테이블로 변환 (마이그레이션 전용).
+
+    - PK 는 (id, timestamp) 로 바뀌고 id 는 identity 대신 별도 시퀀스를 default 로 사용한다.
+    - 제약조건이 아닌 일반 인덱스는 부모 테이블에 다시 생성된다.
+    - 보존 기간이 이미 지난 행은 옮기지 않는다 (default 파티션에 쌓이면 지울 경로가 purge 뿐이다).
+    - 그 밖에 일 파티션 범위를 벗어나는 행(premake 이후 시각)은 default 파티션으로 들어간다.
+    """
+    if not is_postgres(conn) or is_partitioned(table, conn):
+        return
+    qn = conn.ops.quote_name
+    heap = f"{table}_heap"
+    seq = f"{table}_id_seq_p"
+
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [table, table],
+        )
+        index_defs = [r[0] for r in cur.fetchall()]
+        cur.execute(f"SELECT min({qn(PARTITION_KEY)}), max(id) FROM {qn(table)}")
+        min_ts, max_id = cur.fetchone()
+
+        cur.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(heap)}")
+        cur.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(heap)} INCLUDING DEFAULTS INCLUDING STORAGE) "
+            f"PARTITION BY RANGE ({qn(PARTITION_KEY)})"
+        )
+        cur.execute(f"CREATE SEQUENCE {qn(seq)} OWNED BY {qn(table)}.id")
+        cur.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{seq}')")
+        cur.execute("SELECT setval(%s, %s, %s)", [seq, max_id or 1, max_id is not None])
+        cur.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+
+    clear_cache()
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    cutoff = retention_cutoff(today)
+    first = min(min_ts.astimezone(dt_timezone.utc).date(), today) if min_ts else today
+    first = max(first, cutoff)
+    create_daily_partitions(table, first, today + timedelta(days=premake_days()), conn)
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"INSERT INTO {qn(table)} SELECT * FROM {qn(heap)} WHERE {qn(PARTITION_KEY)} >= %s",
+            [_day_bounds(cutoff)[0]],
+        )
+        logger.info(f"{table}: copied {cur.rowcount} rows, skipped rows before {cutoff} (retention)")
+        cur.execute(f"DROP TABLE {qn(heap)} CASCADE")
+        cur.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(PARTITION_KEY)})")
+        for indexdef in index_defs:
+            cur.execute(indexdef)
+    logger.info(f"{table} converted to daily range partitions on {PARTITION_KEY}")
+
+
+def timestamp_window(query_params, default_lookback: Optional[timedelta] = None):
+    """?since=&until= (ISO8601) 를 파티션 프루닝용 timestamp 범위로 변환."""
+    def _parse(name):
+        raw = query_params.get(name)
+        if not raw:
+            return None
+        dt = parse_datetime(raw)
+        if dt and timezone.is_naive(dt):
+            dt = timezone.make_aware(dt, dt_timezone.utc)
+        return dt
+
+    since, until = _parse("since"), _parse("until")
+    if since is None and default_lookback is not None:
+        since = timezone.now() - default_lookback
+    return since, until
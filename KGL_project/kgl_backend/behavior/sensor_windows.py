@@ -0,0 +1,166 @@
+# behavior/sensor_windows.py
+# SensorWindow 생성/해제 헬퍼. 업로드 한 건을 (user, session, sensor_type, 시간 창) 그룹으로 나눠
+# packed float32 배열과 창 단위 요약 통계로 저장한다.
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from . import dimensions
+from .columnar import ColumnBatch
+from .models import Device, SensorWindow, Session
+
+SENSOR_TYPE_ACTIONS = {
+    "accel": "sensor_accelerometer", "accelerometer": "sensor_accelerometer",
+    "gyro": "sensor_gyroscope", "gyroscope": "sensor_gyroscope",
+}
+_ACTION_TYPES = {"sensor_accelerometer": "accel", "sensor_gyroscope": "gyro"}
+
+
+def window_ms() -> int:
+    return int(getattr(settings, "SENSOR_WINDOW_MS", 5000))
+
+
+def windows_enabled() -> bool:
+    return getattr(settings, "SENSOR_STORAGE_MODE", "windows") == "windows"
+
+
+def normalize_sensor_type(stype: Optional[str]) -> str:
+    action = SENSOR_TYPE_ACTIONS.get(stype or "")
+    return _ACTION_TYPES.get(action, "unknown")
+
+
+def _factorize(values: Sequence[Any]):
+    table: Dict[Any, int] = {}
+    codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int64, count=len(values))
+    return codes, list(table)
+
+
+def _ms_to_dt(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000.0, tz=dt_timezone.utc)
+
+
+def _dt_to_ms(dt: datetime) -> int:
+    return int(round(dt.timestamp() * 1000))
+
+
+def _pack(arr: np.ndarray, dtype: str) -> bytes:
+    return np.ascontiguousarray(arr, dtype=dtype).tobytes()
+
+
+def build_windows(
+    user_ids: Sequence[str], session_ids: Sequence[str], sensor_types: Sequence[str],
+    seqs: np.ndarray, ts_ms: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+    device_info: Optional[Dict[str, Any]] = None, location: Optional[Dict[str, Any]] = None,
+    span_ms: Optional[int] = None,
+    session_meta: Optional[Dict[Tuple[str, str], Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]] = None,
+) -> List[SensorWindow]:
+    """샘플 컬럼을 창 단위 SensorWindow 객체(미저장)로 묶는다. 결측 xyz 는 0 으로 채운다.
+    session_meta[(user_id, session_id)] = (device_info, location) 가 있으면 그 세션의 창은 배치 공통값 대신 이것을 쓴다.
+    Session / Device 차원 행은 여기서 정해지므로(없으면 생성) 창 저장과 같은 트랜잭션 안에서 부른다."""
+    n = len(seqs)
+    if n == 0:
+        return []
+    span_ms = span_ms or window_ms()
+    seqs = np.asarray(seqs, dtype=np.int64)
+    ts_ms = np.asarray(ts_ms, dtype=np.int64)
+    xyz = np.nan_to_num(np.column_stack([x, y, z]).astype(np.float32, copy=False))
+
+    p_codes, pairs = _factorize(list(zip(user_ids, session_ids)))
+    t_codes, types = _factorize(sensor_types)
+    keys = np.column_stack([p_codes, t_codes, ts_ms // span_ms])
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    order = np.lexsort((ts_ms, inverse.ravel()))
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+
+    # 차원은 배치에 나온 세션 수만큼만 조회한다. 창에는 pk 와 값을 채운 인스턴스를 붙여 두어
+    # to_ml_batch / 직렬화에서 user_id 등을 읽을 때 다시 조회하지 않는다.
+    metas = [(session_meta or {}).get(p, (device_info, location)) for p in pairs]
+    infos = [info or {} for info, _ in metas]
+    devices = [Device(pk=pk, fingerprint=dimensions.device_fingerprint(info), info=info)
+               for info, pk in zip(infos, dimensions.resolve_devices(infos))]
+    sessions = [Session(pk=pk, user_id=str(u), session_id=str(s))
+                for (u, s), pk in zip(pairs, dimensions.resolve_sessions(pairs))]
+
+    windows = []
+    for g in range(len(counts)):
+        idx = order[bounds[g]:bounds[g + 1]]
+        first = idx[0]
+        g_ts = ts_ms[idx]
+        g_xyz = xyz[idx]
+        mag = np.sqrt(np.sum(g_xyz.astype(np.float64) ** 2, axis=1))
+        mean = g_xyz.mean(axis=0, dtype=np.float64)
+        std = g_xyz.std(axis=0, dtype=np.float64)
+        p = p_codes[first]
+        windows.append(SensorWindow(
+            user_session=sessions[p],
+            device=devices[p],
+            sensor_type=types[t_codes[first]],
+            window_start=_ms_to_dt(int(g_ts[0])),
+            window_end=_ms_to_dt(int(g_ts[-1])),
+            sample_count=len(idx),
+            ts_offsets=_pack(g_ts - g_ts[0], "<f4"),
+            sequence_indexes=_pack(seqs[idx], "<i4"),
+            x=_pack(g_xyz[:, 0], "<f4"),
+            y=_pack(g_xyz[:, 1], "<f4"),
+            z=_pack(g_xyz[:, 2], "<f4"),
+            mean_x=float(mean[0]), mean_y=float(mean[1]), mean_z=float(mean[2]),
+            std_x=float(std[0]), std_y=float(std[1]), std_z=float(std[2]),
+            magnitude_mean=float(mag.mean()),
+            magnitude_max=float(mag.max()),
+            location=metas[p][1],
+        ))
+    return windows
+
+
+def unpack_window(window: SensorWindow) -> Dict[str, np.ndarray]:
+    """창 하나를 ts(ms, int64)/seq/x/y/z numpy 배열로 푼다."""
+    offsets = np.frombuffer(bytes(window.ts_offsets), dtype="<f4")
+    return {
+        "ts": _dt_to_ms(window.window_start) + np.rint(offsets).astype(np.int64),
+        "seq": np.frombuffer(bytes(window.sequence_indexes), dtype="<i4").astype(np.int64),
+        "x": np.frombuffer(bytes(window.x), dtype="<f4"),
+        "y": np.frombuffer(bytes(window.y), dtype="<f4"),
+        "z": np.frombuffer(bytes(window.z), dtype="<f4"),
+    }
+
+
+def window_offsets(windows: Sequence[SensorWindow]) -> np.ndarray:
+    """to_ml_batch / to_ml_logs 가 이어 붙인 샘플 행에서 창 i 가 차지하는 구간 = [off[i], off[i + 1])."""
+    return np.concatenate([[0], np.cumsum([w.sample_count for w in windows], dtype=np.int64)])
+
+
+def to_ml_batch(windows: Sequence[SensorWindow]) -> ColumnBatch:
+    """/predict_columns 용 컬럼 배치. 창 여러 개를 샘플 단위로 이어 붙인다 (행 순서는 window_offsets)."""
+    parts = [unpack_window(w) for w in windows]
+    cols: Dict[str, Any] = {
+        k: (np.concatenate([p[k] for p in parts]) if parts else np.array([], dtype=np.float32))
+        for k in ("seq", "ts", "x", "y", "z")
+    }
+    actions, users, sessions = [], [], []
+    for w, p in zip(windows, parts):
+        n = len(p["seq"])
+        actions += [SENSOR_TYPE_ACTIONS.get(w.sensor_type, "sensor_unknown")] * n
+        users += [w.user_id] * n
+        sessions += [w.session_id] * n
+    cols.update({"action_type": actions, "user_id": users, "session_id": sessions})
+    meta = {"device_info": windows[0].device_info if windows else {}}
+    return ColumnBatch("sensor", cols, meta)
+
+
+def to_ml_logs(windows: Sequence[SensorWindow]) -> List[Dict[str, Any]]:
+    """구버전 ML 서버(/predict_hybrid JSON)용 샘플 단위 로그 dict (행 순서는 to_ml_batch 와 같다)."""
+    logs = []
+    for w in windows:
+        s = unpack_window(w)
+        action = SENSOR_TYPE_ACTIONS.get(w.sensor_type, "sensor_unknown")
+        for seq, ts, x, y, z in zip(s["seq"].tolist(), s["ts"].tolist(),
+                                    s["x"].tolist(), s["y"].tolist(), s["z"].tolist()):
+            logs.append({
+                "user_id": w.user_id, "session_id": w.session_id, "action_type": action,
+                "sequence_index": seq, "timestamp": _ms_to_dt(ts).isoformat(),
+                "params": {"x": x, "y": y, "z": z, "magnitude": None},
+                "device_info": w.device_info, "location": w.location,
+            })
+    return logs
@@ -1,8 +1,57 @@
 # behavior/serializers.py
 from rest_framework import serializers
-from .models import UserBehaviorLog
+from .models import UserBehaviorLog, SensorWindow
+from .sensor_windows import unpack_window
+from . import dimensions
+
+class BehaviorLogListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        # 배치 전체의 Session / Device pk 를 한 번에 정한 뒤 행을 만든다 (행마다 차원 조회를 하지 않는다).
+        # 캐시는 커밋 뒤에야 채워지므로 첫 배치도 차원 테이블마다 조회 한두 번으로 끝난다.
+        sessions = dimensions.resolve_sessions([(d.pop('user_id'), d.pop('session_id')) for d in validated_data])
+        devices = dimensions.resolve_devices([d.pop('device_info') for d in validated_data])
+        for d, session_pk, device_pk in zip(validated_data, sessions, devices):
+            d['user_session_id'], d['device_id'] = session_pk, device_pk
+        return [self.child.create(d) for d in validated_data]
+
 
 class BehaviorLogSerializer(serializers.ModelSerializer):
+    # user_id / session_id / device_info 는 Session, Device 차원 테이블로 분리되어 있지만
+    # 입출력 모양은 분리 이전과 동일하게 유지한다.
+    user_id = serializers.CharField(max_length=255)
+    session_id = serializers.CharField(max_length=255)
+    device_info = serializers.JSONField()
+
     class Meta:
         model = UserBehaviorLog
-        fields = '__all__'
+        list_serializer_class = BehaviorLogListSerializer
+        fields = (
+            'id', 'user_id', 'session_id', 'action_type', 'sequence_index',
+            'timestamp', 'params', 'device_info', 'location',
+        )
+
+    def create(self, validated_data):
+        if 'user_session_id' not in validated_data:  # 한 행만 저장할 때 (배치는 BehaviorLogListSerializer)
+            validated_data['user_session_id'] = dimensions.session_pk_for(
+                validated_data.pop('user_id'), validated_data.pop('session_id'),
+            )
+            validated_data['device_id'] = dimensions.device_pk_for(validated_data.pop('device_info'))
+        return super().create(validated_data)
+
+
+class SensorWindowSerializer(serializers.ModelSerializer):
+    # packed 배열은 기본적으로 내보내지 않고 요약 통계만 제공한다. (?include_samples=1 이면 샘플 포함)
+    # user_id / session_id / device_info 는 차원 테이블에서 읽어 분리 이전과 같은 모양으로 내보낸다.
+    user_id = serializers.CharField(source='user_session.user_id', read_only=True)
+    session_id = serializers.CharField(source='user_session.session_id', read_only=True)
+    device_info = serializers.JSONField(source='device.info', read_only=True)
+    samples = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SensorWindow
+        exclude = ("ts_offsets", "sequence_indexes", "x", "y", "z", "user_session", "device")
+
+    def get_samples(self, obj):
+        if not self.context.get("include_samples"):
+            return None
+        return {k: v.tolist() for k, v in unpack_window(obj).items()}
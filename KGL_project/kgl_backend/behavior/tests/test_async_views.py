@@ -0,0 +1,120 @@
+import gzip
+from unittest import mock
+
+import msgpack
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase, override_settings
+
+from anomaly.models import AnomalyResult
+from behavior import dimensions
+from behavior.columnar import MEDIA_TYPE, ColumnBatch, encode_batch
+from behavior.models import SensorWindow, UserBehaviorLog
+
+BASE_MS = 1_760_000_000_000
+
+
+def _count(model, **filters):
+    return sync_to_async(model.objects.filter(**filters).count)()
+
+
+# async 뷰는 DB 작업을 전용 스레드 풀(다른 연결)에서 하므로 TestCase 의 트랜잭션 안에서는 보이지 않는다.
+@mock.patch("behavior.async_views.call_ml_server", new_callable=mock.AsyncMock, return_value=None)
+@mock.patch("behavior.async_views.call_ml_server_columns", new_callable=mock.AsyncMock, return_value=[])
+class AsyncIngestTests(TransactionTestCase):
+    def setUp(self):
+        # 여기서는 실제로 커밋되므로 차원 캐시에 pk 가 남는다 → 테이블을 비우는 다음 테스트 전에 캐시도 비운다.
+        dimensions.clear_caches()
+        self.addCleanup(dimensions.clear_caches)
+
+    def _touch(self, i, **kw):
+        return {"user_id": "u1", "session_id": "s1", "action_type": "touch_pressure", "seq": i,
+                "ts": BASE_MS + i, "x": i, "pressure": 0.5, "device_info": {"model": "P7"}, **kw}
+
+    def _sensor(self, i, **kw):
+        return {"user_id": "u1", "session_id": "s1", "type": "accel", "seq": i, "ts": BASE_MS + 20 * i,
+                "x": 0.5, "y": 0.0, "z": 9.8, **kw}
+
+    async def _post_json(self, path, data, **extra):
+        return await self.async_client.post(path, data, content_type="application/json", **extra)
+
+    async def test_touch_json(self, columns, json_call):
+        json_call.return_value = [{"sequence_index": 2, "is_anomaly_combined": True, "anomaly_score_combined": 0.9}]
+        resp = await self._post_json("/api/async/touch-data/", [self._touch(1), self._touch(2)])
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual((resp.json()["created_count"], resp.json()["ml_saved_results"]), (2, 1))
+        self.assertEqual(await _count(UserBehaviorLog), 2)
+        self.assertEqual(await _count(AnomalyResult, behavior_log__sequence_index=2, is_anomaly=True), 1)
+        self.assertEqual([p["sequence_index"] for p in json_call.call_args.args[0]], [1, 2])
+
+    async def test_touch_columnar(self, columns, json_call):
+        columns.return_value = False  # 구버전 ML 서버 → JSON 폴백
+        batch = ColumnBatch("touch", {
+            "seq": np.array([1, 2], dtype=np.int64), "x": np.array([1.0, 2.0], dtype=np.float32),
+            "action_type": ["touch_drag"] * 2,
+        }, {"user_id": "u1", "session_id": "s1"})
+        resp = await self.async_client.post("/api/async/touch-data/", encode_batch(batch), content_type=MEDIA_TYPE)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(await _count(UserBehaviorLog, action_type="touch_drag"), 2)
+        json_call.assert_awaited_once()
+
+    async def test_network(self, columns, json_call):
+        data = [{"user_id": "u1", "seq": 1, "net_type": "wifi", "lat": 35.2, "lng": 129.1},
+                {"user_id": "u1", "seq": 2, "net_type": "lte", "lat": 40.7, "lng": -74.0},
+                {"user_id": "u1", "seq": 3, "net_type": "lte"}]
+        resp = await self._post_json("/api/async/network-data/", data)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual((resp.json()["created_count"], resp.json()["created_anomaly_rows"]), (3, 2))
+        self.assertEqual(await _count(AnomalyResult, is_anomaly=True, behavior_log__sequence_index=2), 1)
+
+    @override_settings(SENSOR_STORAGE_MODE="windows", SENSOR_WINDOW_MS=5000)
+    async def test_sensor_windows(self, columns, json_call):
+        resp = await self._post_json("/api/async/sensor-data/", [self._sensor(i) for i in range(4)])
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual((resp.json()["created_count"], resp.json()["window_count"]), (4, 1))
+        self.assertEqual(await _count(SensorWindow, sample_count=4), 1)
+        self.assertEqual(columns.call_args.args[0].n, 4)
+
+    @override_settings(SENSOR_STORAGE_MODE="rows")
+    async def test_sensor_rows(self, columns, json_call):
+        resp = await self._post_json("/api/async/sensor-data/", [self._sensor(i) for i in range(3)])
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(await _count(UserBehaviorLog, action_type="sensor_accelerometer"), 3)
+        self.assertEqual(await _count(SensorWindow), 0)
+
+    async def test_gzip_body(self, columns, json_call):
+        body = gzip.compress(b'[{"user_id": "u1", "action_type": "touch_drag", "seq": 1}]')
+        resp = await self._post_json("/api/async/touch-data/", body, headers={"Content-Encoding": "gzip"})
+        self.assertEqual(resp.status_code, 201, resp.content)
+
+    @override_settings(INGEST_MAX_DECOMPRESSED_BYTES=1024)
+    async def test_gzip_over_limit_is_413(self, columns, json_call):
+        body = gzip.compress(b"[" + b" " * 4096 + b"]")
+        resp = await self._post_json("/api/async/touch-data/", body, headers={"Content-Encoding": "gzip"})
+        self.assertEqual(resp.status_code, 413)
+
+    @override_settings(SENSOR_STORAGE_MODE="windows")
+    async def test_bad_requests_are_400(self, columns, json_call):
+        bad_dtype = msgpack.packb({"v": 1, "kind": "touch", "columns": {"x": {"dtype": "<U8", "data": b""}}},
+                                  use_bin_type=True)
+        cases = [
+            ("/api/async/touch-data/", b"[not json", "application/json", "error"),
+            ("/api/async/touch-data/", b'{"a": 1}', "application/json", "error"),
+            ("/api/async/touch-data/", b"\xc1 not msgpack", MEDIA_TYPE, "error"),
+            ("/api/async/touch-data/", bad_dtype, MEDIA_TYPE, "error"),
+            ("/api/async/network-data/", b'{"a": 1}', "application/json", "error"),
+            ("/api/async/sensor-data/", b'[{"seq": 2147483648}]', "application/json", "seq"),
+            ("/api/async/sensor-data/", b'[{"seq": 1.5}]', "application/json", "seq"),
+            ("/api/async/touch-data/", b'[{"user_id": "%s"}]' % (b"u" * 256), "application/json", "user_id"),
+        ]
+        for path, body, content_type, key in cases:
+            with self.subTest(path=path, body=body[:24]):
+                resp = await self.async_client.post(path, body, content_type=content_type)
+                self.assertEqual(resp.status_code, 400)
+                self.assertIn(key, resp.json())
+        resp = await self.async_client.post("/api/async/network-data/", b"\x80", content_type=MEDIA_TYPE)
+        self.assertEqual(resp.status_code, 415)
+        self.assertEqual(await _count(UserBehaviorLog), 0)
+        self.assertEqual(await _count(SensorWindow), 0)
+        columns.assert_not_awaited()
+        json_call.assert_not_awaited()
@@ -0,0 +1,180 @@
+import gzip
+from unittest import mock, skipUnless
+
+import msgpack
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from anomaly.models import AnomalyResult
+from behavior import middleware
+from behavior.columnar import (
+    MEDIA_TYPE, ColumnarFormatError, ColumnBatch, decode_batch, decode_results, encode_batch, logs_to_batch,
+)
+from behavior.models import UserBehaviorLog
+
+TOUCH = "/api/touch-data/"
+SENSOR = "/api/sensor-data/"
+
+
+def _touch_batch(n=3):
+    return ColumnBatch("touch", {
+        "seq": np.arange(1, n + 1, dtype=np.int64),
+        "ts": np.full(n, 1.76e12, dtype=np.float64),
+        "x": np.linspace(0, 100, n).astype(np.float32),
+        "pressure": np.array([0.5, np.nan, 0.7][:n], dtype=np.float32),
+        "action_type": ["touch_pressure"] * n,
+    }, {"user_id": "u1", "session_id": "s1", "device_info": {"model": "P7"}})
+
+
+def _raw(columns, **doc):
+    return msgpack.packb({"v": 1, "kind": "touch", "columns": columns, **doc}, use_bin_type=True)
+
+
+class ColumnarFormatTests(SimpleTestCase):
+    def test_round_trip(self):
+        batch = decode_batch(encode_batch(_touch_batch()))
+        self.assertEqual(batch.n, 3)
+        self.assertEqual(batch.meta["user_id"], "u1")
+        np.testing.assert_array_equal(batch.columns["seq"], [1, 2, 3])
+        self.assertTrue(np.isnan(batch.columns["pressure"][1]))
+        self.assertEqual(batch.strings("action_type"), ["touch_pressure"] * 3)
+
+    def test_rejects_malformed_bodies(self):
+        bad = [
+            b"\xc1 not msgpack",
+            msgpack.packb([1, 2, 3]),
+            _raw({"x": {"dtype": "<U8", "data": b""}}),
+            _raw({"x": {"dtype": "<f4", "data": b"\x00" * 6}}),
+            _raw({"x": {"dtype": "<f4", "data": "text"}}),
+            _raw({"x": 1.0}),
+            _raw({"x": [1, 2], "y": [1]}),
+            _raw({"x": [1, 2]}, n=3),
+            _raw({"x": [1, 2]}, n=True),
+            _raw({"x": [1, 2]}, v=2),
+        ]
+        for raw in bad:
+            with self.subTest(raw=raw[:24]), self.assertRaises(ColumnarFormatError):
+                decode_batch(raw)
+
+    def test_logs_to_batch(self):
+        logs = [
+            {"user_id": "u1", "session_id": f"s{i}", "action_type": "touch_drag", "sequence_index": i,
+             "timestamp": None, "params": {"x": i, "screen": "home", "type": "ignored"}}
+            for i in range(2)
+        ]
+        batch = logs_to_batch(logs, "touch")
+        self.assertEqual(batch.meta["user_id"], "u1")
+        self.assertEqual(batch.columns["session_id"], ["s0", "s1"])
+        np.testing.assert_array_equal(batch.columns["x"], [0.0, 1.0])
+        self.assertEqual(batch.columns["screen"], ["home", "home"])
+        self.assertNotIn("type", batch.columns)
+        # 중첩 값이나 상위 필드 이름과 겹치는 params 는 JSON 경로로 보낸다
+        self.assertIsNone(logs_to_batch([{"params": {"seq": 1}}]))
+        self.assertIsNone(logs_to_batch([{"params": {"view": {"id": 1}}}]))
+
+    def test_decode_results_keeps_row(self):
+        raw = encode_batch(ColumnBatch("results", {
+            "row": np.array([0, 2], dtype=np.int64), "is_anomaly": np.array([True, False]),
+        }))
+        self.assertEqual(decode_results(raw), [{"row": 0, "is_anomaly": True}, {"row": 2, "is_anomaly": False}])
+
+
+@mock.patch("behavior.views._call_ml_server", return_value=[])
+@mock.patch("behavior.views._call_ml_server_columns")
+class ColumnarIngestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def _post(self, path, body, **extra):
+        return self.client.post(path, data=body, content_type=MEDIA_TYPE, **extra)
+
+    def test_touch_upload_creates_logs_and_results(self, columns, _):
+        columns.return_value = [{"sequence_index": 2, "modality": "touch_pressure",
+                                 "is_anomaly_combined": True, "anomaly_score_combined": 0.9}]
+        resp = self._post(TOUCH, encode_batch(_touch_batch()))
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp.json()["created_count"], 3)
+        self.assertEqual(resp.json()["ml_saved_results"], 1)
+
+        logs = UserBehaviorLog.objects.select_related("user_session", "device").order_by("sequence_index")
+        self.assertEqual([log.sequence_index for log in logs], [1, 2, 3])
+        self.assertEqual({(log.user_id, log.session_id) for log in logs}, {("u1", "s1")})
+        self.assertEqual(logs[0].device_info, {"model": "P7"})
+        self.assertEqual(logs[1].params, {"x": 50.0, "pressure": None})
+        self.assertEqual(AnomalyResult.objects.get().behavior_log, logs[1])
+
+        sent = columns.call_args.args[0]
+        self.assertEqual(sent.strings("action_type"), ["touch_pressure"] * 3)
+
+    @override_settings(SENSOR_STORAGE_MODE="rows")
+    def test_sensor_upload_in_row_mode(self, columns, _):
+        columns.return_value = []
+        batch = ColumnBatch("sensor", {
+            "seq": np.array([1, 2], dtype=np.int64), "ts": np.array([1.76e12, 1.76e12 + 20]),
+            "x": np.array([0.1, 0.2], dtype=np.float32), "type": ["accel", "gyro"],
+        }, {"user_id": "u1", "session_id": "s1"})
+        resp = self._post(SENSOR, encode_batch(batch))
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(sorted(UserBehaviorLog.objects.values_list("action_type", flat=True)),
+                         ["sensor_accelerometer", "sensor_gyroscope"])
+
+    def test_falls_back_to_json_when_columns_unsupported(self, columns, json_call):
+        columns.return_value = False
+        json_call.return_value = [{"sequence_index": 1, "is_anomaly_combined": False, "anomaly_score_combined": 0.1}]
+        resp = self._post(TOUCH, encode_batch(_touch_batch()))
+        self.assertEqual(resp.json()["ml_saved_results"], 1)
+        logs = json_call.call_args.args[0]
+        self.assertEqual([log["sequence_index"] for log in logs], [1, 2, 3])
+        self.assertEqual(logs[0]["user_id"], "u1")
+
+    def test_malformed_msgpack_is_400(self, columns, _):
+        resp = self._post(TOUCH, b"\xc1 not msgpack")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("Columnar parse error", resp.json()["detail"])
+        self.assertFalse(UserBehaviorLog.objects.exists())
+        columns.assert_not_called()
+
+    def test_bad_dtype_is_400(self, columns, _):
+        resp = self._post(TOUCH, _raw({"x": {"dtype": "<U8", "data": b""}}))
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("unsupported dtype", resp.json()["detail"])
+        self.assertFalse(UserBehaviorLog.objects.exists())
+
+    def test_gzip_body(self, columns, _):
+        columns.return_value = []
+        resp = self._post(TOUCH, gzip.compress(encode_batch(_touch_batch())), HTTP_CONTENT_ENCODING="gzip")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(UserBehaviorLog.objects.count(), 3)
+
+    def test_gzip_json_body(self, columns, json_call):
+        body = b'[{"user_id": "u1", "action_type": "touch_drag", "seq": 1, "x": 1}]'
+        resp = self.client.post(TOUCH, data=gzip.compress(body), content_type="application/json",
+                                HTTP_CONTENT_ENCODING="gzip")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(UserBehaviorLog.objects.get().params["x"], 1)
+
+    @override_settings(INGEST_MAX_DECOMPRESSED_BYTES=1024)
+    def test_gzip_over_limit_is_413(self, columns, _):
+        body = gzip.compress(b"[" + b" " * 4096 + b"]")
+        self.assertLess(len(body), 1024)
+        resp = self.client.post(TOUCH, data=body, content_type="application/json", HTTP_CONTENT_ENCODING="gzip")
+        self.assertEqual(resp.status_code, 413)
+        self.assertFalse(UserBehaviorLog.objects.exists())
+
+    @skipUnless(middleware.zstandard is not None, "zstandard is not installed")
+    @override_settings(INGEST_MAX_DECOMPRESSED_BYTES=1024)
+    def test_zstd_body_and_limit(self, columns, _):
+        columns.return_value = []
+        zstd = middleware.zstandard.ZstdCompressor()
+        resp = self._post(TOUCH, zstd.compress(encode_batch(_touch_batch())), HTTP_CONTENT_ENCODING="zstd")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        resp = self.client.post(TOUCH, data=zstd.compress(b"[" + b" " * 4096 + b"]"),
+                                content_type="application/json", HTTP_CONTENT_ENCODING="zstd")
+        self.assertEqual(resp.status_code, 413)
+
+    def test_corrupt_or_unknown_encoding(self, columns, _):
+        resp = self._post(TOUCH, b"not gzip", HTTP_CONTENT_ENCODING="gzip")
+        self.assertEqual(resp.status_code, 400)
+        resp = self._post(TOUCH, b"x", HTTP_CONTENT_ENCODING="br")
+        self.assertEqual(resp.status_code, 415)
@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from behavior import dimensions
+from behavior.models import Device, Session, UserBehaviorLog
+
+
+class DimensionTestCase(TestCase):
+    def setUp(self):
+        # 캐시는 프로세스 전역이고 테스트 DB 는 테스트마다 롤백되므로 앞 테스트의 pk 가 남지 않게 비운다.
+        dimensions.clear_caches()
+        self.addCleanup(dimensions.clear_caches)
+
+
+class ResolveTests(DimensionTestCase):
+    def test_sessions_are_deduplicated(self):
+        pks = dimensions.resolve_sessions([("u1", "s1"), ("u1", "s1"), ("u2", "s1"), ("u1", "s2")])
+        self.assertEqual(Session.objects.count(), 3)
+        self.assertEqual(pks[0], pks[1])
+        self.assertEqual(len(set(pks)), 3)
+        self.assertEqual(dimensions.resolve_sessions([("u2", "s1")]), [pks[2]])
+        self.assertEqual(Session.objects.count(), 3)
+
+    def test_devices_are_deduplicated_by_content(self):
+        pks = dimensions.resolve_devices([{"model": "P7", "os": 14}, {"os": 14, "model": "P7"}, None, {}])
+        self.assertEqual(pks[0], pks[1])
+        self.assertEqual(pks[2], pks[3])
+        self.assertNotEqual(pks[0], pks[2])
+        self.assertEqual(Device.objects.get(pk=pks[0]).info, {"model": "P7", "os": 14})
+        self.assertEqual(Device.objects.get(pk=pks[2]).fingerprint, dimensions.device_fingerprint({}))
+
+    def test_cache_is_filled_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                session_pk = dimensions.session_pk_for("u1", "s1")
+                device_pk = dimensions.device_pk_for({"model": "P7"})
+        with self.assertNumQueries(0):
+            self.assertEqual(dimensions.session_pk_for("u1", "s1"), session_pk)
+            self.assertEqual(dimensions.device_pk_for({"model": "P7"}), device_pk)
+
+    def test_rolled_back_pks_are_not_cached(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                dimensions.resolve_sessions([("u1", "s1")])
+                dimensions.resolve_devices([{"model": "P7"}])
+                raise RuntimeError()
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Session.objects.exists())
+        self.assertIsNone(dimensions._sessions.get(("u1", "s1")))
+
+    def test_cache_is_bounded(self):
+        cache = dimensions.InternCache(maxsize=2)
+        cache.update({"a": 1, "b": 2})
+        cache.get("a")
+        cache.update({"c": 3})
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+
+@mock.patch("behavior.views._call_ml_server", return_value=None)
+class RowIngestDimensionTests(DimensionTestCase):
+    def test_batch_shares_dimension_rows(self, _):
+        item = {"action_type": "touch_drag", "x": 1, "device_info": {"model": "P7"}}
+        data = [
+            {**item, "user_id": "u1", "session_id": "s1", "seq": 1},
+            {**item, "user_id": "u1", "session_id": "s1", "seq": 2},
+            {**item, "user_id": "u2", "session_id": "s1", "seq": 3, "device_info": {"model": "Tab"}},
+        ]
+        resp = APIClient().post("/api/touch-data/", data, format="json")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual((Session.objects.count(), Device.objects.count()), (2, 2))
+        logs = UserBehaviorLog.objects.select_related("user_session", "device").order_by("sequence_index")
+        self.assertEqual([(log.user_id, log.device_info["model"]) for log in logs],
+                         [("u1", "P7"), ("u1", "P7"), ("u2", "Tab")])
+
+
+class DimensionMigrationTests(TransactionTestCase):
+    before = [("behavior", "0006_sensorwindow")]
+    after = [("behavior", "0008_sensorwindow_dimensions")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.old_apps = executor.loader.project_state(self.before).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def _migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        return executor.loader.project_state(self.after).apps
+
+    def test_backfill(self):
+        Log = self.old_apps.get_model("behavior", "UserBehaviorLog")
+        Window = self.old_apps.get_model("behavior", "SensorWindow")
+        now = timezone.now()
+        for i, (user, session, info) in enumerate([
+            ("u1", "s1", {"model": "P7", "os": 14}), ("u1", "s1", {"os": 14, "model": "P7"}),
+            ("u2", "s1", {}), ("u2", "s2", {}),
+        ]):
+            Log.objects.create(user_id=user, session_id=session, device_info=info, action_type="touch_drag",
+                               sequence_index=i, timestamp=now, params={})
+        Window.objects.create(
+            user_id="u1", session_id="s1", device_info={"model": "P7", "os": 14}, sensor_type="accel",
+            window_start=now, window_end=now, sample_count=0, ts_offsets=b"", sequence_indexes=b"",
+            x=b"", y=b"", z=b"", mean_x=0, mean_y=0, mean_z=0, std_x=0, std_y=0, std_z=0,
+            magnitude_mean=0, magnitude_max=0,
+        )
+
+        apps = self._migrate()
+        Log = apps.get_model("behavior", "UserBehaviorLog")
+        Window = apps.get_model("behavior", "SensorWindow")
+        Session_ = apps.get_model("behavior", "Session")
+        Device_ = apps.get_model("behavior", "Device")
+
+        rows = list(Log.objects.order_by("sequence_index").values_list(
+            "user_session__user_id", "user_session__session_id", "device__info"))
+        self.assertEqual(rows, [
+            ("u1", "s1", {"model": "P7", "os": 14}), ("u1", "s1", {"model": "P7", "os": 14}),
+            ("u2", "s1", {}), ("u2", "s2", {}),
+        ])
+        self.assertEqual(Session_.objects.count(), 3)
+        self.assertEqual(Device_.objects.count(), 2)
+        # 창도 같은 차원 행을 가리키고, 지문은 런타임 device_fingerprint 와 같다
+        log = Log.objects.get(sequence_index=0)
+        window = Window.objects.get()
+        self.assertEqual((window.user_session_id, window.device_id), (log.user_session_id, log.device_id))
+        self.assertEqual(Device_.objects.get(pk=log.device_id).fingerprint,
+                         dimensions.device_fingerprint({"model": "P7", "os": 14}))
@@ -0,0 +1,107 @@
+# behavior/tests/test_partitioning.py
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from behavior import partitioning
+
+TABLE = "behavior_userbehaviorlog"
+
+
+class RetentionSelectionTests(SimpleTestCase):
+    @override_settings(LOG_PARTITION_RETENTION_DAYS=7)
+    def test_retention_cutoff(self):
+        self.assertEqual(partitioning.retention_cutoff(date(2026, 10, 19)), date(2026, 10, 12))
+        self.assertEqual(partitioning.retention_cutoff(date(2026, 10, 19), 1), date(2026, 10, 18))
+
+    def test_select_expired_keeps_cutoff_day_and_skips_default(self):
+        names = [
+            f"{TABLE}_p20261010", f"{TABLE}_p20261011", f"{TABLE}_p20261012", f"{TABLE}_p20261013",
+            f"{TABLE}_default",
+        ]
+        self.assertEqual(
+            partitioning.select_expired(TABLE, names, date(2026, 10, 12)),
+            [f"{TABLE}_p20261010", f"{TABLE}_p20261011"],
+        )
+
+    def test_select_expired_ignores_other_tables_and_bad_suffixes(self):
+        names = ["anomaly_anomalyresult_p20200101", f"{TABLE}_p20261399", f"{TABLE}_heap_p20200101"]
+        self.assertEqual(partitioning.select_expired(TABLE, names, date(2026, 10, 12)), [])
+
+
+@skipUnless(connection.vendor != "postgresql", "non-PostgreSQL fallback")
+class NonPostgresTests(TransactionTestCase):
+    def test_retention_helpers_are_noops(self):
+        self.assertFalse(partitioning.is_partitioned(TABLE))
+        self.assertEqual(partitioning.expired_partitions(TABLE, date.today()), [])
+        self.assertEqual(partitioning.purge_default_partition(TABLE, date.today()), 0)
+        self.assertEqual(partitioning.drop_expired_partitions(TABLE, date.today()), [])
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning is PostgreSQL-only")
+class PostgresRetentionTests(TransactionTestCase):
+    def setUp(self):
+        partitioning.clear_cache()
+        self.today = datetime.now(dt_timezone.utc).date()
+
+    def _insert(self, table, ts):
+        with connection.cursor() as cur:
+            cur.execute(
+                f"INSERT INTO {table} (user_session_id, device_id, action_type, sequence_index, timestamp, params) "
+                "SELECT s.id, d.id, 'touch_pressure', 0, %s, '{}' FROM behavior_session s, behavior_device d LIMIT 1",
+                [ts],
+            )
+
+    def _count(self, table):
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM {table}")
+            return cur.fetchone()[0]
+
+    def _seed_dimensions(self):
+        from behavior.models import Device, Session
+        Session.objects.create(user_id="u", session_id="s")
+        Device.objects.create(fingerprint="f" * 40, info={})
+
+    def test_purge_default_partition_removes_only_expired_rows(self):
+        self._seed_dimensions()
+        cutoff = partitioning.retention_cutoff(self.today)
+        # 일 파티션이 없는 먼 과거/미래 시각은 default 로 들어간다.
+        old = datetime.combine(cutoff - timedelta(days=30), datetime.min.time(), dt_timezone.utc)
+        future = datetime.combine(self.today + timedelta(days=60), datetime.min.time(), dt_timezone.utc)
+        self._insert(TABLE, old)
+        self._insert(TABLE, future)
+        self.assertEqual(self._count(f"{TABLE}_default"), 2)
+
+        self.assertEqual(partitioning.purge_default_partition(TABLE, cutoff), 1)
+        self.assertEqual(self._count(f"{TABLE}_default"), 1)
+
+    def test_drop_expired_partitions(self):
+        old_day = partitioning.retention_cutoff(self.today) - timedelta(days=2)
+        created = partitioning.create_daily_partitions(TABLE, old_day, old_day)
+        self.assertEqual(created, [partitioning.partition_name(TABLE, old_day)])
+        self.assertIn(created[0], partitioning.expired_partitions(TABLE, partitioning.retention_cutoff(self.today)))
+
+        call_command("manage_log_partitions", "--drop-expired", stdout=StringIO())
+        self.assertNotIn(created[0], partitioning.expired_partitions(TABLE, self.today))
+
+    def test_convert_skips_rows_past_retention(self):
+        table = "behavior_partition_convert_test"
+        cutoff = partitioning.retention_cutoff(self.today)
+        old = datetime.combine(cutoff - timedelta(days=1), datetime.min.time(), dt_timezone.utc)
+        recent = datetime.combine(self.today, datetime.min.time(), dt_timezone.utc)
+        with connection.cursor() as cur:
+            cur.execute(f"CREATE TABLE {table} (id bigserial PRIMARY KEY, timestamp timestamptz NOT NULL)")
+            cur.execute(f"INSERT INTO {table} (timestamp) VALUES (%s), (%s)", [old, recent])
+        try:
+            partitioning.convert_to_partitioned(connection, table)
+            self.assertTrue(partitioning.is_partitioned(table))
+            self.assertEqual(self._count(table), 1)
+            self.assertEqual(self._count(f"{table}_default"), 0)
+        finally:
+            with connection.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+            partitioning.clear_cache()
@@ -0,0 +1,197 @@
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from anomaly.models import AnomalyResult
+from behavior import sensor_windows, views
+from behavior.columnar import MEDIA_TYPE, ColumnBatch, encode_batch
+from behavior.models import SensorWindow
+
+SENSOR = "/api/sensor-data/"
+BASE_MS = 1_760_000_000_000  # SENSOR_WINDOW_MS(5000) 의 배수 → 창 경계가 BASE_MS 에서 시작
+
+
+def _columns(types, ts, seqs=None, users=None, sessions=None):
+    n = len(types)
+    rng = np.random.default_rng(0)
+    return dict(
+        user_ids=users or ["u1"] * n, session_ids=sessions or ["s1"] * n, sensor_types=types,
+        seqs=np.arange(n) if seqs is None else np.asarray(seqs),
+        ts_ms=BASE_MS + np.asarray(ts, dtype=np.int64),
+        x=rng.normal(size=n), y=rng.normal(size=n), z=rng.normal(size=n),
+    )
+
+
+@override_settings(SENSOR_WINDOW_MS=5000)
+class BuildWindowsTests(TestCase):
+    def test_round_trip(self):
+        # 순서가 섞인 입력: accel 은 두 창(0~4999ms, 5000ms~), gyro 는 한 창
+        types = ["accel", "gyro", "accel", "accel", "gyro", "accel"]
+        ts = [4999, 5, 0, 5000, 1200, 10]
+        cols = _columns(types, ts, seqs=[10, 11, 12, 13, 14, 15])
+        cols["x"][1] = np.nan
+        windows = sensor_windows.build_windows(**cols, device_info={"model": "P7"}, location={"lat": 35.2})
+
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(sum(w.sample_count for w in windows), len(types))
+        for w in windows:
+            s = sensor_windows.unpack_window(w)
+            bucket = (s["ts"][0] - BASE_MS) // 5000
+            idx = sorted((i for i in range(len(types)) if types[i] == w.sensor_type and ts[i] // 5000 == bucket),
+                         key=lambda i: ts[i])
+            np.testing.assert_array_equal(s["ts"], BASE_MS + np.array(ts)[idx])
+            np.testing.assert_array_equal(s["seq"], np.array(cols["seqs"])[idx])
+            for k in ("x", "y", "z"):
+                expected = np.nan_to_num(np.asarray(cols[k])[idx]).astype(np.float32)
+                np.testing.assert_array_equal(s[k], expected)
+            self.assertEqual(w.user_id, "u1")
+            self.assertEqual(w.device_info, {"model": "P7"})
+            self.assertEqual(w.location, {"lat": 35.2})
+            self.assertAlmostEqual(w.mean_x, float(np.mean(s["x"], dtype=np.float64)), places=5)
+            self.assertAlmostEqual(w.magnitude_max, float(np.max(np.sqrt(
+                s["x"].astype(np.float64) ** 2 + s["y"] ** 2 + s["z"] ** 2))), places=5)
+
+        gyro = next(w for w in windows if w.sensor_type == "gyro")
+        self.assertEqual(sensor_windows.unpack_window(gyro)["x"][0], 0.0)  # 결측 → 0
+
+    def test_saved_windows_keep_samples(self):
+        cols = _columns(["accel"] * 4, [0, 20, 40, 60])
+        saved = views._store_sensor_windows(**cols)
+        w = SensorWindow.objects.select_related("user_session", "device").get()
+        s = sensor_windows.unpack_window(w)
+        np.testing.assert_array_equal(s["ts"], sensor_windows.unpack_window(saved[0])["ts"])
+        np.testing.assert_array_equal(s["x"], np.asarray(cols["x"], dtype=np.float32))
+
+    def test_session_meta_per_session(self):
+        cols = _columns(["accel"] * 2, [0, 1], users=["u1", "u2"], sessions=["s1", "s2"])
+        windows = sensor_windows.build_windows(**cols, session_meta={
+            ("u1", "s1"): ({"model": "A"}, {"lat": 1.0}),
+            ("u2", "s2"): ({"model": "B"}, None),
+        })
+        meta = {(w.user_id, w.session_id): (w.device_info, w.location) for w in windows}
+        self.assertEqual(meta, {("u1", "s1"): ({"model": "A"}, {"lat": 1.0}), ("u2", "s2"): ({"model": "B"}, None)})
+
+
+class PersistWindowResultsTests(TestCase):
+    def setUp(self):
+        # accel 3 샘플, gyro 2 샘플 — seq 가 겹친다 (0,1,2 / 0,1)
+        cols = _columns(["accel", "accel", "accel", "gyro", "gyro"], [0, 20, 40, 0, 20], seqs=[0, 1, 2, 0, 1])
+        self.windows = views._store_sensor_windows(**cols)
+        self.by_type = {w.sensor_type: w for w in self.windows}
+        self.rows = {w.sensor_type: int(o) for w, o in zip(self.windows, sensor_windows.window_offsets(self.windows))}
+
+    def _results(self):
+        return {r.sensor_window.sensor_type: r for r in AnomalyResult.objects.select_related("sensor_window")}
+
+    def test_matches_results_by_row(self):
+        gyro = self.rows["gyro"]
+        results = [
+            {"row": self.rows["accel"], "sequence_index": 0, "is_anomaly_combined": False, "anomaly_score_combined": 0.2},
+            {"row": gyro, "sequence_index": 0, "is_anomaly_combined": True, "anomaly_score_combined": 0.8},
+            {"row": gyro + 1, "sequence_index": 1, "is_anomaly_combined": False, "anomaly_score_combined": 0.4},
+            {"row": 99, "is_anomaly_combined": True},
+        ]
+        self.assertEqual(views.persist_window_results(self.windows, results), 2)
+        out = self._results()
+        self.assertFalse(out["accel"].is_anomaly)
+        self.assertAlmostEqual(out["accel"].anomaly_score, 0.2)
+        self.assertTrue(out["gyro"].is_anomaly)
+        self.assertAlmostEqual(out["gyro"].anomaly_score, 0.6)
+        self.assertEqual(out["gyro"].timestamp, self.by_type["gyro"].window_start)
+
+    def test_json_results_match_by_position(self):
+        flags = [False] * 5
+        flags[self.rows["gyro"] + 1] = True
+        results = [{"is_anomaly_combined": f, "anomaly_score_combined": float(f)} for f in flags]
+        self.assertEqual(views.persist_window_results(self.windows, results), 2)
+        out = self._results()
+        self.assertTrue(out["gyro"].is_anomaly)
+        self.assertFalse(out["accel"].is_anomaly)
+
+    def test_unmatched_json_results_are_skipped(self):
+        # 길이가 다르면(모달리티를 모르는 행이 빠진 응답) 위치로 맞출 수 없다
+        self.assertEqual(views.persist_window_results(self.windows, [{"is_anomaly": True}] * 3), 0)
+        self.assertFalse(AnomalyResult.objects.exists())
+
+
+@override_settings(SENSOR_STORAGE_MODE="windows", SENSOR_WINDOW_MS=5000)
+@mock.patch("behavior.views._call_ml_server", return_value=None)
+@mock.patch("behavior.views._call_ml_server_columns", return_value=[])
+class SensorWindowIngestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def _item(self, i, **kw):
+        return {"user_id": "u1", "session_id": "s1", "type": "accel", "seq": i, "ts": BASE_MS + 20 * i,
+                "x": 0.5 * i, "y": 1.0, "z": -1.0, "device_info": {"model": "P7"}, **kw}
+
+    def test_json_upload_round_trip(self, columns, _):
+        data = [self._item(i) for i in range(5)] + [self._item(5, type="gyro")]
+        resp = self.client.post(SENSOR, data, format="json")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp.json()["created_count"], 6)
+        self.assertEqual(resp.json()["window_count"], 2)
+
+        resp = self.client.get("/api/sensor-windows/", {"sensor_type": "accel", "include_samples": "1"})
+        (w,) = resp.json()
+        self.assertEqual((w["user_id"], w["session_id"], w["device_info"]), ("u1", "s1", {"model": "P7"}))
+        self.assertEqual(w["samples"]["seq"], [0, 1, 2, 3, 4])
+        self.assertEqual(w["samples"]["ts"], [BASE_MS + 20 * i for i in range(5)])
+        self.assertEqual(w["samples"]["x"], [0.5 * i for i in range(5)])
+
+        batch = columns.call_args.args[0]
+        self.assertEqual(batch.strings("action_type"), ["sensor_accelerometer"] * 5 + ["sensor_gyroscope"])
+
+    def test_columnar_upload(self, columns, _):
+        batch = ColumnBatch("sensor", {
+            "seq": np.arange(4, dtype=np.int64), "ts": BASE_MS + np.arange(4, dtype=np.float64) * 20,
+            "x": np.ones(4, dtype=np.float32), "type": ["gyro"] * 4,
+        }, {"user_id": "u1", "session_id": "s1", "device_info": {"model": "P7"}})
+        resp = self.client.post(SENSOR, data=encode_batch(batch), content_type=MEDIA_TYPE)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        w = SensorWindow.objects.select_related("user_session", "device").get()
+        self.assertEqual((w.sensor_type, w.sample_count, w.device_info), ("gyro", 4, {"model": "P7"}))
+
+    def test_mixed_sessions_keep_their_device_and_location(self, columns, _):
+        data = [self._item(0), self._item(1, session_id="s2", device_info={"model": "Tab"}, location={"lat": 35.1})]
+        self.assertEqual(self.client.post(SENSOR, data, format="json").status_code, 201)
+        got = {w.session_id: (w.device_info, w.location)
+               for w in SensorWindow.objects.select_related("user_session", "device")}
+        self.assertEqual(got, {"s1": ({"model": "P7"}, None), "s2": ({"model": "Tab"}, {"lat": 35.1})})
+
+    def test_invalid_json_upload_is_400(self, columns, _):
+        bad = [
+            ({"seq": 2 ** 31}, "seq"),
+            ({"seq": 1.5}, "seq"),
+            ({"seq": "abc"}, "seq"),
+            ({"user_id": "u" * 256}, "user_id"),
+            ({"session_id": "s" * 256}, "session_id"),
+        ]
+        for override, field in bad:
+            with self.subTest(field=field, value=str(override)[:30]):
+                resp = self.client.post(SENSOR, [self._item(0), self._item(1, **override)], format="json")
+                self.assertEqual(resp.status_code, 400)
+                self.assertIn(field, resp.json())
+        resp = self.client.post(SENSOR, [self._item(0), 3], format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("non_field_errors", resp.json())
+        self.assertFalse(SensorWindow.objects.exists())
+        columns.assert_not_called()
+
+    def test_invalid_columnar_upload_is_400(self, columns, _):
+        bad = [
+            ({"seq": np.array([0, 2 ** 31], dtype=np.int64)}, {}, "seq"),
+            ({"seq": np.array([0, 1.5])}, {}, "seq"),
+            ({"seq": [0, "abc"]}, {}, "seq"),
+            ({}, {"user_id": "u" * 256}, "user_id"),
+        ]
+        for cols, meta, field in bad:
+            batch = ColumnBatch("sensor", {"ts": BASE_MS + np.arange(2, dtype=np.float64), "x": np.zeros(2),
+                                           "type": ["accel"] * 2, **cols}, {"user_id": "u1", **meta})
+            with self.subTest(field=field):
+                resp = self.client.post(SENSOR, data=encode_batch(batch), content_type=MEDIA_TYPE)
+                self.assertEqual(resp.status_code, 400)
+                self.assertIn(field, resp.json())
+        self.assertFalse(SensorWindow.objects.exists())
@@ -1,8 +1,11 @@
 # behavior/urls.py
+from django.conf import settings
 from django.urls import path
+from .async_views import AsyncNetworkDataIngestView, AsyncSensorDataIngestView, AsyncTouchDataIngestView
 from .views import (
     BehaviorLogViewSet,
-    NetworkDataIngestView, SensorDataIngestView, TouchDataIngestView
+    NetworkDataIngestView, SensorDataIngestView, TouchDataIngestView,
+    SensorWindowList,
 )
 from rest_framework.routers import DefaultRouter
 from rest_framework.response import Response
@@ -19,6 +22,7 @@ class CustomAPIRootView(APIView):
             'network-data': request.build_absolute_uri('network-data/'),
             'sensor-data': request.build_absolute_uri('sensor-data/'),
             'touch-data': request.build_absolute_uri('touch-data/'),
+            'sensor-windows': request.build_absolute_uri('sensor-windows/'),
         }
 
         return Response({**router_urls, **extra_urls})
@@ -32,8 +36,19 @@ class CustomRouter(DefaultRouter):
 router = CustomRouter()
 router.register(r'behavior-logs', BehaviorLogViewSet, basename='behavior-log')
 
+# ASYNC_INGEST=True 면 기본 수집 경로를 async 뷰로 교체한다 (ASGI 서버 전제).
+# async/ 경로는 설정과 관계없이 항상 열려 있어 두 구현을 나란히 비교할 수 있다.
+if getattr(settings, "ASYNC_INGEST", False):
+    _network, _sensor, _touch = AsyncNetworkDataIngestView, AsyncSensorDataIngestView, AsyncTouchDataIngestView
+else:
+    _network, _sensor, _touch = NetworkDataIngestView, SensorDataIngestView, TouchDataIngestView
+
 urlpatterns = router.urls + [
-    path("network-data/", NetworkDataIngestView.as_view(), name="network-data"),
-    path("sensor-data/", SensorDataIngestView.as_view(), name="sensor-data"),
-    path("touch-data/", TouchDataIngestView.as_view(), name="touch-data"),
+    path("network-data/", _network.as_view(), name="network-data"),
+    path("sensor-data/", _sensor.as_view(), name="sensor-data"),
+    path("touch-data/", _touch.as_view(), name="touch-data"),
+    path("async/network-data/", AsyncNetworkDataIngestView.as_view(), name="async-network-data"),
+    path("async/sensor-data/", AsyncSensorDataIngestView.as_view(), name="async-sensor-data"),
+    path("async/touch-data/", AsyncTouchDataIngestView.as_view(), name="async-touch-data"),
+    path("sensor-windows/", SensorWindowList.as_view(), name="sensor-windows"),
 ]
\ No newline at end of file
@@ -1,17 +1,24 @@
 # behavior/views.py
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, generics, serializers
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django.utils import timezone
 from django.conf import settings
-import logging, requests
-from datetime import datetime, timezone as dt_timezone
+import logging, requests, time
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.db import transaction
 from django.utils.dateparse import parse_datetime
 from typing import Optional, Set, List, Dict, Any
-
-from .serializers import BehaviorLogSerializer
-from .models import UserBehaviorLog
+import numpy as np
+
+from .serializers import BehaviorLogSerializer, SensorWindowSerializer
+from .models import UserBehaviorLog, SensorWindow
+from . import dimensions, partitioning, sensor_windows
+from .sensor_windows import SENSOR_TYPE_ACTIONS
+from .columnar import MEDIA_TYPE as COLUMNAR_MEDIA_TYPE, ColumnBatch, decode_results, encode_batch, logs_to_batch
+from .parsers import ColumnarMsgPackParser
 from anomaly.models import AnomalyResult
 
 logger = logging.getLogger(__name__)
@@ -21,6 +28,8 @@ KOREA_LNG_MIN, KOREA_LNG_MAX = 124.6, 129.5
 
 MAX_LOG_QUEUE_SIZE = 1500
 
+INGEST_PARSER_CLASSES = list(api_settings.DEFAULT_PARSER_CLASSES) + [ColumnarMsgPackParser]
+
 def _ts(value):
     if value is None:
         return timezone.now()
@@ -37,14 +46,24 @@ def _ts(value):
     return timezone.now()
 
 
+def _ml_json_logs(logs_payload):
+    for log in logs_payload:
+        if isinstance(log.get('timestamp'), datetime):
+            log['timestamp'] = log['timestamp'].isoformat()
+    return logs_payload
+
+
 def _call_ml_server(logs_payload, endpoint):
+    # predict_hybrid 는 ML 서버가 /predict_columns 를 지원하면 컬럼 배치로 보낸다 (pydantic 검증/행 dict 왕복 생략).
+    if endpoint == "predict_hybrid" and _ml_columns_available():
+        batch = logs_to_batch(_ml_json_logs(logs_payload))
+        if batch is not None:
+            result = _call_ml_server_columns(batch)
+            if result is not False:
+                return result
     try:
-        for log in logs_payload:
-            if isinstance(log.get('timestamp'), datetime):
-                log['timestamp'] = log['timestamp'].isoformat()
-
         url = f"{settings.ML_SERVER_URL}/{endpoint}"
-        r = requests.post(url, json=logs_payload, timeout=10)
+        r = requests.post(url, json=_ml_json_logs(logs_payload), timeout=10)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -52,11 +71,56 @@ def _call_ml_server(logs_payload, endpoint):
         return None
 
 
+# 구버전 ML 서버(/predict_columns 없음)로 확인되면 ML_COLUMNS_RETRY_SECONDS 동안은 컬럼 경로를 시도하지 않는다.
+_ml_columns_retry_at = 0.0
+
+
+def _ml_columns_available() -> bool:
+    return time.monotonic() >= _ml_columns_retry_at
+
+
+def _mark_ml_columns_unavailable():
+    global _ml_columns_retry_at
+    retry = float(getattr(settings, "ML_COLUMNS_RETRY_SECONDS", 300))
+    _ml_columns_retry_at = time.monotonic() + retry
+    logger.info(f"ML 서버가 /predict_columns 를 지원하지 않음 → {retry:.0f}초 동안 JSON 경로 사용")
+
+
+def _ml_columns_response(status_code, content_type, content, as_json):
+    if status_code in (404, 405, 415):
+        _mark_ml_columns_unavailable()
+        return False
+    if (content_type or "").split(";")[0].strip() == COLUMNAR_MEDIA_TYPE:
+        return decode_results(content)
+    return as_json()
+
+
+def _call_ml_server_columns(batch: ColumnBatch, endpoint="predict_columns"):
+    # 컬럼 배치를 행 dict 로 풀지 않고 그대로 ML 서버에 전달하고, 결과도 컬럼 배치로 받는다.
+    # 구버전 ML 서버(엔드포인트 없음)면 None 대신 False 를 돌려 호출부가 JSON 경로로 폴백하게 한다.
+    if not _ml_columns_available():
+        return False
+    try:
+        url = f"{settings.ML_SERVER_URL}/{endpoint}"
+        r = requests.post(url, data=encode_batch(batch), timeout=10,
+                          headers={"Content-Type": COLUMNAR_MEDIA_TYPE, "Accept": COLUMNAR_MEDIA_TYPE})
+        if r.status_code not in (404, 405, 415):
+            r.raise_for_status()
+        return _ml_columns_response(r.status_code, r.headers.get("Content-Type"), r.content, r.json)
+    except Exception as e:
+        logger.error(f"통합 ML 서버(columnar) 호출 실패: {e}")
+        return None
+
+
 def _enforce_log_limit(
     model,
     max_count: int = MAX_LOG_QUEUE_SIZE,
     protect_pks: Optional[Set[int]] = None,
 ):
+    # 파티션 테이블(PostgreSQL)은 pk 단위 DELETE 대신 보존 기간이 지난 일 파티션을 통째로 DROP 한다.
+    # DDL 은 수집 트랜잭션 안에서 돌리지 않는다 — manage_log_partitions --drop-expired (cron) 가 맡는다.
+    if partitioning.is_partitioned(model._meta.db_table):
+        return
     try:
         current_count = model.objects.count()
         if current_count > max_count:
@@ -98,6 +162,293 @@ def _parse_ts_or(log_ts, fallback_dt: datetime):
         dt = None
     return dt or fallback_dt
 
+def _nan_to_none(values: List[Any]) -> List[Any]:
+    return [None if isinstance(v, float) and v != v else v for v in values]
+
+
+def _columnar_timestamps(batch: ColumnBatch) -> List[datetime]:
+    name = "ts" if "ts" in batch else "timestamp"
+    return [_ts(None if v != v else v) for v in batch.numeric(name).tolist()]
+
+
+_COLUMNAR_RESERVED = {"seq", "ts", "timestamp", "type", "action_type", "user_id", "session_id"}
+
+
+def _columnar_params(batch: ColumnBatch, names: List[str]) -> List[Dict[str, Any]]:
+    cols = []
+    for name in names:
+        col = batch.get(name)
+        if col is None:
+            cols.append([None] * batch.n)
+        elif isinstance(col, np.ndarray):
+            cols.append(_nan_to_none(col.tolist()))
+        else:
+            cols.append(list(col))
+    return [dict(zip(names, row)) for row in zip(*cols)] if names else [{} for _ in range(batch.n)]
+
+
+def _store_columnar(batch: ColumnBatch, action_types: List[str], param_names: List[str]):
+    """컬럼 배치를 UserBehaviorLog 로 저장하고 (저장 객체, ML 컬럼 배치, JSON 폴백 로그 생성 함수) 반환."""
+    meta = batch.meta
+    user_id = meta.get("user_id", "device-anonymous")
+    session_id = meta.get("session_id", "session-unknown")
+    device_info = meta.get("device_info", {})
+    location = meta.get("location", None)
+
+    seqs = batch.numeric("seq", np.int64, fill=0).tolist()
+    stamps = _columnar_timestamps(batch)
+    params = _columnar_params(batch, param_names)
+
+    with transaction.atomic():
+        session_pk = dimensions.session_pk_for(user_id, session_id)
+        device_pk = dimensions.device_pk_for(device_info)
+        objs = UserBehaviorLog.objects.bulk_create([
+            UserBehaviorLog(
+                user_session_id=session_pk, device_id=device_pk, action_type=action,
+                sequence_index=seq, timestamp=ts, params=p, location=location,
+            )
+            for action, seq, ts, p in zip(action_types, seqs, stamps, params)
+        ], batch_size=500)
+
+    ml_batch = ColumnBatch(batch.kind, {
+        **{k: v for k, v in batch.columns.items() if k not in ("type", "action_type")},
+        "action_type": action_types,
+    }, meta)
+
+    def fallback_logs():
+        return [{
+            "user_id": user_id, "session_id": session_id, "action_type": action,
+            "sequence_index": seq, "timestamp": ts, "params": p,
+            "device_info": device_info, "location": location,
+        } for action, seq, ts, p in zip(action_types, seqs, stamps, params)]
+
+    return objs, ml_batch, fallback_logs
+
+
+def _finalize_logs(objs: List[UserBehaviorLog], ml_results, method: str) -> int:
+    with transaction.atomic():
+        _enforce_log_limit(UserBehaviorLog, MAX_LOG_QUEUE_SIZE, protect_pks={o.pk for o in objs})
+        return persist_ml_results(objs, ml_results or [], method=method)
+
+
+def _ingest_columnar(batch: ColumnBatch, action_types: List[str], param_names: List[str]):
+    objs, ml_batch, fallback_logs = _store_columnar(batch, action_types, param_names)
+    ml_results = _call_ml_server_columns(ml_batch)
+    if ml_results is False:
+        ml_results = _call_ml_server(fallback_logs(), "predict_hybrid")
+    return len(objs), _finalize_logs(objs, ml_results, "hybrid")
+
+
+def _first_errors(errors):
+    # many=True 검증 오류 → 처음 실패한 행의 dict (행 단위로 검증하던 때의 응답 모양).
+    # DRF 버전에 따라 행별 리스트이거나 {행 번호: 오류} 이다. 목록 자체의 오류(non_field_errors)는 그대로.
+    if isinstance(errors, list):
+        return next((e for e in errors if e), {})
+    rows = sorted(k for k in errors if isinstance(k, int))
+    return errors[rows[0]] if rows else errors
+
+
+def _save_payloads(payloads: List[Dict[str, Any]]):
+    """행 단위 JSON 업로드 저장. 검증 실패 시 (None, errors) 를 반환한다 (아무 행도 저장하지 않음)."""
+    ser = BehaviorLogSerializer(data=payloads, many=True)
+    if not ser.is_valid():
+        return None, _first_errors(ser.errors)
+    with transaction.atomic():
+        return ser.save(), None
+
+
+def _to_epoch_ms(values: np.ndarray) -> np.ndarray:
+    # 초 단위로 들어온 값은 ms 로 올리고, 결측은 현재 시각으로 채운다.
+    values = np.asarray(values, dtype=np.float64)
+    now_ms = timezone.now().timestamp() * 1000.0
+    values = np.where(np.isnan(values), now_ms, values)
+    return np.where(values > 10 ** 12, values, values * 1000.0).astype(np.int64)
+
+
+def _enforce_window_retention(protect_pks: Optional[Set[int]] = None):
+    cutoff = timezone.now() - timedelta(days=partitioning.retention_days())
+    try:
+        SensorWindow.objects.filter(window_start__lt=cutoff).exclude(pk__in=protect_pks or ()).delete()
+    except Exception as e:
+        logger.error(f"Failed to clean up old sensor windows: {e}")
+
+
+# 창 단위 센서 업로드는 행 serializer 를 거치지 않으므로 UserBehaviorLog 와 같은 규칙을 필드 단위로 적용한다.
+# sequence_indexes 는 int32 로 packed 되므로 seq 는 그 범위여야 한다 (벗어나면 조용히 wrap 된다).
+_SENSOR_FIELDS = {
+    "user_id": serializers.CharField(max_length=255),
+    "session_id": serializers.CharField(max_length=255),
+    "seq": serializers.IntegerField(min_value=-2 ** 31, max_value=2 ** 31 - 1),
+}
+
+
+def _sensor_field(name: str, value):
+    """(검증·변환된 값, None) 또는 (None, {name: 오류})."""
+    try:
+        return _SENSOR_FIELDS[name].run_validation(value), None
+    except ValidationError as e:
+        return None, {name: e.detail}
+
+
+def _invalid_seq(values: np.ndarray) -> np.ndarray:
+    # 숫자 seq 컬럼에서 int32 정수가 아닌 값 (NaN 은 결측 → 0)
+    v = np.asarray(values, dtype=np.float64)
+    v = np.where(np.isnan(v), 0.0, v)
+    return ~np.isfinite(v) | (v != np.round(v)) | (v < -2 ** 31) | (v > 2 ** 31 - 1)
+
+
+def _clean_sensor_items(data: List[Any]):
+    """JSON 센서 업로드 검증. (user_ids, session_ids, seqs, 세션별 (device_info, location)) 또는 오류 dict."""
+    user_ids, session_ids, seqs, session_meta = [], [], [], {}
+    for item in data:
+        if not isinstance(item, dict):
+            return None, {api_settings.NON_FIELD_ERRORS_KEY: [
+                f"Invalid data. Expected a dictionary, but got {type(item).__name__}."]}
+        user_id = item.get("user_id", "device-anonymous")
+        session_id = item.get("session_id", "session-unknown")
+        seq = item.get("seq", 0)
+        clean = {}
+        for name, value in (("user_id", user_id), ("session_id", session_id), ("seq", 0 if seq is None else seq)):
+            clean[name], error = _sensor_field(name, value)
+            if error:
+                return None, error
+        user_ids.append(clean["user_id"])
+        session_ids.append(clean["session_id"])
+        seqs.append(clean["seq"])
+        # 한 배치에 여러 세션이 섞여 있으면 세션마다 그 세션 첫 항목의 기기/위치를 쓴다.
+        session_meta.setdefault((user_ids[-1], session_ids[-1]), (item.get("device_info", {}), item.get("location")))
+    return (user_ids, session_ids, np.array(seqs, dtype=np.int64), session_meta), None
+
+
+def _sensor_columns(data):
+    """센서 업로드(JSON 배열 또는 ColumnBatch)를 build_windows 인자 컬럼으로 정리. (컬럼 dict, None) 또는 (None, 오류)."""
+    if isinstance(data, ColumnBatch):
+        n, meta = data.n, data.meta
+        user_id = meta.get("user_id", "device-anonymous")
+        session_id = meta.get("session_id", "session-unknown")
+        for name, value in (("user_id", user_id), ("session_id", session_id)):
+            _, error = _sensor_field(name, value)
+            if error:
+                return None, error
+        seq_col = data.get("seq")
+        if seq_col is None:
+            seqs = np.zeros(n, dtype=np.int64)
+        elif isinstance(seq_col, np.ndarray):
+            bad = np.flatnonzero(_invalid_seq(seq_col))
+            if len(bad):
+                return None, _sensor_field("seq", seq_col[bad[0]].item())[1]
+            seqs = np.nan_to_num(seq_col.astype(np.float64), nan=0.0).astype(np.int64)
+        else:
+            values = []
+            for value in seq_col:
+                value, error = _sensor_field("seq", 0 if value is None else value)
+                if error:
+                    return None, error
+                values.append(value)
+            seqs = np.array(values, dtype=np.int64)
+        return dict(
+            user_ids=[str(user_id)] * n,
+            session_ids=[str(session_id)] * n,
+            sensor_types=[sensor_windows.normalize_sensor_type(t) for t in data.strings("type", "unknown")],
+            seqs=seqs,
+            ts_ms=_to_epoch_ms(data.numeric("ts" if "ts" in data else "timestamp")),
+            x=data.numeric("x"), y=data.numeric("y"), z=data.numeric("z"),
+            device_info=meta.get("device_info", {}), location=meta.get("location"),
+        ), None
+    cleaned, errors = _clean_sensor_items(data)
+    if errors:
+        return None, errors
+    user_ids, session_ids, seqs, session_meta = cleaned
+    x, y, z = (np.array([_to_float(item.get(k), np.nan) for item in data]) for k in ("x", "y", "z"))
+    return dict(
+        user_ids=user_ids,
+        session_ids=session_ids,
+        sensor_types=[sensor_windows.normalize_sensor_type(item.get("type")) for item in data],
+        seqs=seqs,
+        ts_ms=np.array([_ts(item.get("timestamp") or item.get("ts")).timestamp() * 1000.0
+                        for item in data], dtype=np.int64),
+        x=x, y=y, z=z,
+        session_meta=session_meta,
+    ), None
+
+
+def _store_sensor_windows(user_ids, session_ids, sensor_types, seqs, ts_ms, x, y, z,
+                          device_info=None, location=None, session_meta=None) -> List[SensorWindow]:
+    with transaction.atomic():
+        return SensorWindow.objects.bulk_create(sensor_windows.build_windows(
+            user_ids, session_ids, sensor_types, seqs, ts_ms, x, y, z,
+            device_info=device_info, location=location, session_meta=session_meta,
+        ))
+
+
+def _finalize_sensor_windows(windows: List[SensorWindow], ml_results) -> int:
+    with transaction.atomic():
+        _enforce_window_retention(protect_pks={w.pk for w in windows})
+        return persist_window_results(windows, ml_results or [])
+
+
+def _ingest_sensor_windows(user_ids, session_ids, sensor_types, seqs, ts_ms, x, y, z,
+                           device_info=None, location=None, session_meta=None):
+    windows = _store_sensor_windows(user_ids, session_ids, sensor_types, seqs, ts_ms, x, y, z,
+                                    device_info=device_info, location=location, session_meta=session_meta)
+
+    ml_results = _call_ml_server_columns(sensor_windows.to_ml_batch(windows))
+    if ml_results is False:
+        ml_results = _call_ml_server(sensor_windows.to_ml_logs(windows), "predict_hybrid")
+
+    saved = _finalize_sensor_windows(windows, ml_results)
+    return sum(w.sample_count for w in windows), len(windows), saved
+
+
+def _result_row(r: Dict[str, Any], i: int, n_results: int, n_rows: int) -> Optional[int]:
+    # 컬럼 응답은 row 를 싣고 온다. JSON(/predict_hybrid) 응답은 입력과 같은 길이/순서다.
+    if r.get("row") is not None:
+        return int(r["row"])
+    return i if n_results == n_rows else None
+
+
+@transaction.atomic
+def persist_window_results(windows: List[SensorWindow], ml_results: List[Dict[str, Any]]):
+    # 샘플 단위 ML 결과를 창 단위로 집계해 창 하나당 AnomalyResult 한 행만 남긴다.
+    # 결과는 보낸 샘플 행 번호로 창에 맞춘다 — sequence_index 는 센서 종류/세션이 다르면 겹칠 수 있다.
+    if not windows or not ml_results:
+        return 0
+    offsets = sensor_windows.window_offsets(windows)
+    n_rows = int(offsets[-1])
+
+    agg: Dict[int, Dict[str, Any]] = {}
+    skipped = 0
+    for i, r in enumerate(ml_results):
+        if not r:
+            continue
+        try:
+            row = _result_row(r, i, len(ml_results), n_rows)
+        except (TypeError, ValueError):
+            row = None
+        if row is None or not 0 <= row < n_rows:
+            skipped += 1
+            continue
+        w = windows[int(np.searchsorted(offsets, row, side="right")) - 1]
+        a = agg.setdefault(w.pk, {"window": w, "scores": [], "anomaly": False})
+        a["scores"].append(_to_float(r.get("anomaly_score_combined", r.get("anomaly_score"))))
+        a["anomaly"] = a["anomaly"] or _to_bool(r.get("is_anomaly_combined", r.get("is_anomaly")))
+    if skipped:
+        logger.warning("persist_window_results: skipped %d results that could not be matched to a window", skipped)
+
+    to_create = [AnomalyResult(
+        sensor_window=a["window"],
+        modality="sensor",
+        timestamp=a["window"].window_start,
+        anomaly_score=float(np.mean(a["scores"])) if a["scores"] else 0.0,
+        is_anomaly=a["anomaly"],
+        detection_method="hybrid",
+    ) for a in agg.values()]
+    if to_create:
+        AnomalyResult.objects.bulk_create(to_create, batch_size=500)
+        logger.info("persist_window_results: created %d anomaly rows for %d windows", len(to_create), len(windows))
+    return len(to_create)
+
+
 @transaction.atomic
 def persist_ml_results(behavior_logs: List[UserBehaviorLog], ml_results: List[Dict[str, Any]], method: str):
     if not behavior_logs or not ml_results:
@@ -154,27 +505,162 @@ def persist_ml_results(behavior_logs: List[UserBehaviorLog], ml_results: List[Di
     logger.info("persist_ml_results: created %d anomaly rows (method=%s)", len(to_create), method)
     return len(to_create)
 
+def _network_payload(item: Dict[str, Any]):
+    """네트워크 상태 한 건 → (로그 payload, 좌표 또는 None)."""
+    lat = item.get("lat") or item.get("latitude")
+    lng = item.get("lng") or item.get("lon") or item.get("longitude")
+    has_coords = lat is not None and lng is not None
+    try:
+        if has_coords:
+            lat = float(lat); lng = float(lng)
+    except Exception:
+        has_coords = False
+
+    payload = {
+        "user_id": item.get("user_id", "device-anonymous"),
+        "session_id": item.get("session_id", "session-unknown"),
+        "action_type": "network_status",
+        "sequence_index": item.get("seq", 0),
+        "timestamp": _ts(item.get("timestamp") or item.get("ts")),
+        "params": {
+            "net_type": item.get("net_type"),
+            "rssi": item.get("rssi"),
+        },
+        "device_info": item.get("device_info", {}),
+        "location": {
+            "latitude": lat if has_coords else None,
+            "longitude": lng if has_coords else None,
+            "accuracy": item.get("accuracy"),
+        } if has_coords else None,
+    }
+    return payload, ((lat, lng) if has_coords else None)
+
+
+def _sensor_payload(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": item.get("user_id", "device-anonymous"),
+        "session_id": item.get("session_id", "session-unknown"),
+        "action_type": SENSOR_TYPE_ACTIONS.get(item.get("type", "unknown"), "sensor_unknown"),
+        "sequence_index": item.get("seq", 0),
+        "timestamp": _ts(item.get("timestamp") or item.get("ts")),
+        "params": {
+            "x": item.get("x"), "y": item.get("y"), "z": item.get("z"),
+            "magnitude": item.get("magnitude"),
+        },
+        "device_info": item.get("device_info", {}),
+        "location": item.get("location", None),
+    }
+
+
+def _touch_payload(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": item.get("user_id", "device-anonymous"),
+        "session_id": item.get("session_id", "session-unknown"),
+        "action_type": item.get("action_type", "touch_unknown"),
+        "sequence_index": item.get("seq", 0),
+        "timestamp": _ts(item.get("timestamp") or item.get("ts")),
+        "params": {
+            "x": item.get("x"), "y": item.get("y"),
+            "pressure": item.get("pressure"),
+            "size": item.get("size"),
+            "duration": item.get("duration"),
+            "screen": item.get("screen"),
+            "view_id": item.get("view_id"),
+        },
+        "device_info": item.get("device_info", {}),
+        "location": item.get("location", None),
+    }
+
+
+def _save_network(data: List[Dict[str, Any]]):
+    """네트워크 로그 저장 + 국외 좌표 판정. 반환: (로그 수, 이상 행 수, errors)."""
+    created_anomalies = 0
+    payloads, coords_list = [], []
+    for item in data:
+        payload, coords = _network_payload(item)
+        payloads.append(payload)
+        coords_list.append(coords)
+    ser = BehaviorLogSerializer(data=payloads, many=True)
+    if not ser.is_valid():
+        return 0, 0, _first_errors(ser.errors)
+
+    with transaction.atomic():
+        objs = ser.save()
+        created_logs = len(objs)
+        for bl, coords in zip(objs, coords_list):
+            if coords is not None:
+                lat, lng = coords
+                outside_korea = not (KOREA_LAT_MIN <= lat <= KOREA_LAT_MAX and KOREA_LNG_MIN <= lng <= KOREA_LNG_MAX)
+                AnomalyResult.objects.create(
+                    behavior_log=bl,
+                    modality='network',
+                    timestamp=bl.timestamp,
+                    anomaly_score=1.0 if outside_korea else 0.0,
+                    is_anomaly=outside_korea,
+                    detection_method='hybrid',
+                )
+                created_anomalies += 1
+
+    with transaction.atomic():
+        _enforce_log_limit(UserBehaviorLog, MAX_LOG_QUEUE_SIZE, protect_pks={o.pk for o in objs})
+    return created_logs, created_anomalies, None
+
+
+# 수집 엔드포인트 응답 본문 (동기 DRF 뷰와 async_views 가 공유)
+def network_body(created_logs: int, created_anomalies: int) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "created_count": created_logs,
+        "created_anomaly_rows": created_anomalies,
+        "decision": "allow",
+        "risk_score": 0.10,
+        "confidence": 0.95,
+        "next_check_interval": 1000,
+    }
+
+
+def sensor_body(created: int, saved: int, **extra) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "created_count": created,
+        "decision": "allow",
+        "risk_score": 0.20,
+        "confidence": 0.88,
+        "next_check_interval": 1000,
+        "ml_saved_results": saved,
+        **extra,
+    }
+
+
+def touch_body(created: int, saved: int) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "created_count": created,
+        "decision": "allow",
+        "risk_score": 0.05,
+        "confidence": 0.92,
+        "next_check_interval": 100,
+        "ml_saved_results": saved,
+    }
+
+
 class BehaviorLogViewSet(viewsets.ViewSet):
     def create(self, request):
         logs = request.data.get('logs')
         if logs is None or not isinstance(logs, list):
             return Response({"error": "Missing 'logs' array"}, status=400)
 
-        created = 0
-        prepared_logs: List[Dict[str, Any]] = []
-        seq_to_log = {}
+        for item in logs:
+            item['timestamp'] = _ts(item.get('timestamp') or item.get('ts'))
+        ser = BehaviorLogSerializer(data=logs, many=True)
+        if not ser.is_valid():
+            return Response(_first_errors(ser.errors), status=400)
 
         with transaction.atomic():
-            for item in logs:
-                item['timestamp'] = _ts(item.get('timestamp') or item.get('ts'))
-                ser = BehaviorLogSerializer(data=item)
-                if not ser.is_valid():
-                    return Response(ser.errors, status=400)
-
-                obj = ser.save()
-                created += 1
-                seq_to_log[obj.sequence_index] = obj
-                prepared_logs.append(item)
+            objs = ser.save()
+        created = len(objs)
+        seq_to_log = {obj.sequence_index: obj for obj in objs}
+        prepared_logs: List[Dict[str, Any]] = logs
 
         ml_results = _call_ml_server(prepared_logs, 'predict')
 
@@ -198,179 +684,84 @@ class NetworkDataIngestView(APIView):
         if not isinstance(data, list):
             return Response({"error": "Expected a JSON array"}, status=400)
 
-        created_logs = 0
-        created_anomalies = 0
-        seq_to_log: Dict[int, UserBehaviorLog] = {}
-
-        with transaction.atomic():
-            for item in data:
-                lat = item.get("lat") or item.get("latitude")
-                lng = item.get("lng") or item.get("lon") or item.get("longitude")
-                has_coords = lat is not None and lng is not None
-                try:
-                    if has_coords:
-                        lat = float(lat); lng = float(lng)
-                except Exception:
-                    has_coords = False
-
-                payload = {
-                    "user_id": item.get("user_id", "device-anonymous"),
-                    "session_id": item.get("session_id", "session-unknown"),
-                    "action_type": "network_status",
-                    "sequence_index": item.get("seq", 0),
-                    "timestamp": _ts(item.get("timestamp") or item.get("ts")),
-                    "params": {
-                        "net_type": item.get("net_type"),
-                        "rssi": item.get("rssi"),
-                    },
-                    "device_info": item.get("device_info", {}),
-                    "location": {
-                        "latitude": lat if has_coords else None,
-                        "longitude": lng if has_coords else None,
-                        "accuracy": item.get("accuracy"),
-                    } if has_coords else None,
-                }
-                ser = BehaviorLogSerializer(data=payload)
-                if not ser.is_valid():
-                    return Response(ser.errors, status=400)
-
-                bl = ser.save()
-                created_logs += 1
-                seq_to_log[bl.sequence_index] = bl
-
-                if has_coords:
-                    outside_korea = not (KOREA_LAT_MIN <= lat <= KOREA_LAT_MAX and KOREA_LNG_MIN <= lng <= KOREA_LNG_MAX)
-                    AnomalyResult.objects.create(
-                        behavior_log=bl,
-                        modality='network',
-                        timestamp=bl.timestamp,
-                        anomaly_score=1.0 if outside_korea else 0.0,
-                        is_anomaly=outside_korea,
-                        detection_method='hybrid',
-                    )
-                    created_anomalies += 1
-
-        with transaction.atomic():
-            protect_pks = {o.pk for o in seq_to_log.values()}
-            _enforce_log_limit(UserBehaviorLog, MAX_LOG_QUEUE_SIZE, protect_pks=protect_pks)
-
-        return Response({
-            "status": "success",
-            "created_count": created_logs,
-            "created_anomaly_rows": created_anomalies,
-            "decision": "allow",
-            "risk_score": 0.10,
-            "confidence": 0.95,
-            "next_check_interval": 1000,
-        }, status=201)
-
+        created_logs, created_anomalies, errors = _save_network(data)
+        if errors:
+            return Response(errors, status=400)
+        return Response(network_body(created_logs, created_anomalies), status=201)
 
 
 class SensorDataIngestView(APIView):
+    parser_classes = INGEST_PARSER_CLASSES
+
     def post(self, request):
         data = request.data
-        if not isinstance(data, list):
+        if not isinstance(data, (list, ColumnBatch)):
             return Response({"error": "Expected a JSON array"}, status=400)
-
-        created = 0
-        prepared_logs, seq_to_log = [], {}
-
-        with transaction.atomic():
-            for item in data:
-                stype = item.get("type", "unknown")
-                action = "sensor_accelerometer" if stype in ("accel", "accelerometer") else \
-                         "sensor_gyroscope"     if stype in ("gyro", "gyroscope")     else "sensor_unknown"
-                payload = {
-                    "user_id": item.get("user_id", "device-anonymous"),
-                    "session_id": item.get("session_id", "session-unknown"),
-                    "action_type": action,
-                    "sequence_index": item.get("seq", 0),
-                    "timestamp": _ts(item.get("timestamp") or item.get("ts")),
-                    "params": {
-                        "x": item.get("x"), "y": item.get("y"), "z": item.get("z"),
-                        "magnitude": item.get("magnitude"),
-                    },
-                    "device_info": item.get("device_info", {}),
-                    "location": item.get("location", None),
-                }
-                ser = BehaviorLogSerializer(data=payload)
-                if ser.is_valid():
-                    obj = ser.save()
-                    created += 1
-                    seq_to_log[obj.sequence_index] = obj
-                    prepared_logs.append(payload)
-                else:
-                    return Response(ser.errors, status=400)
-
-        ml_results_hybrid = _call_ml_server(prepared_logs, "predict_hybrid")
-
-        with transaction.atomic():
-            protect_pks = {o.pk for o in seq_to_log.values()}
-            _enforce_log_limit(UserBehaviorLog, MAX_LOG_QUEUE_SIZE, protect_pks=protect_pks)
-            saved = persist_ml_results(list(seq_to_log.values()), ml_results_hybrid or [], method="hybrid")
-
-        return Response({
-            "status": "success",
-            "created_count": created,
-            "decision": "allow",
-            "risk_score": 0.20,
-            "confidence": 0.88,
-            "next_check_interval": 1000,
-            "ml_saved_results": saved,
-        }, status=201)
+        if sensor_windows.windows_enabled():
+            columns, errors = _sensor_columns(data)
+            if errors:
+                return Response(errors, status=400)
+            created, windows, saved = _ingest_sensor_windows(**columns)
+            return Response(sensor_body(created, saved, window_count=windows), status=201)
+        if isinstance(data, ColumnBatch):
+            actions = [SENSOR_TYPE_ACTIONS.get(t, "sensor_unknown") for t in data.strings("type", "unknown")]
+            created, saved = _ingest_columnar(data, actions, ["x", "y", "z", "magnitude"])
+            return Response(sensor_body(created, saved), status=201)
+
+        payloads = [_sensor_payload(item) for item in data]
+        objs, errors = _save_payloads(payloads)
+        if errors:
+            return Response(errors, status=400)
+
+        ml_results_hybrid = _call_ml_server(payloads, "predict_hybrid")
+        saved = _finalize_logs(objs, ml_results_hybrid, "hybrid")
+        return Response(sensor_body(len(objs), saved), status=201)
 
 
 class TouchDataIngestView(APIView):
+    parser_classes = INGEST_PARSER_CLASSES
+
     def post(self, request):
         data = request.data
+        if isinstance(data, ColumnBatch):
+            param_names = [k for k in data.columns if k not in _COLUMNAR_RESERVED]
+            created, saved = _ingest_columnar(data, data.strings("action_type", "touch_unknown"), param_names)
+            return Response(touch_body(created, saved), status=201)
         if not isinstance(data, list):
             return Response({"error": "Expected a JSON array"}, status=400)
 
-        created = 0
-        prepared_logs, seq_to_log = [], {}
-
-        with transaction.atomic():
-            for item in data:
-                payload = {
-                    "user_id": item.get("user_id", "device-anonymous"),
-                    "session_id": item.get("session_id", "session-unknown"),
-                    "action_type": item.get("action_type", "touch_unknown"),
-                    "sequence_index": item.get("seq", 0),
-                    "timestamp": _ts(item.get("timestamp") or item.get("ts")),
-                    "params": {
-                        "x": item.get("x"), "y": item.get("y"),
-                        "pressure": item.get("pressure"),
-                        "size": item.get("size"),
-                        "duration": item.get("duration"),
-                        "screen": item.get("screen"),
-                        "view_id": item.get("view_id"),
-                    },
-                    "device_info": item.get("device_info", {}),
-                    "location": item.get("location", None),
-                }
-                ser = BehaviorLogSerializer(data=payload)
-                if ser.is_valid():
-                    obj = ser.save()
-                    created += 1
-                    seq_to_log[obj.sequence_index] = obj
-                    prepared_logs.append(payload)
-                else:
-                    return Response(ser.errors, status=400)
-
-        ml_results_hybrid = _call_ml_server(prepared_logs, "predict_hybrid")
-
-        with transaction.atomic():
-            protect_pks = {o.pk for o in seq_to_log.values()}
-            _enforce_log_limit(UserBehaviorLog, MAX_LOG_QUEUE_SIZE, protect_pks=protect_pks)
-
-            saved = persist_ml_results(list(seq_to_log.values()), ml_results_hybrid or [], method="hybrid")
-
-        return Response({
-            "status": "success",
-            "created_count": created,
-            "decision": "allow",
-            "risk_score": 0.05,
-            "confidence": 0.92,
-            "next_check_interval": 100,
-            "ml_saved_results": saved,
-        }, status=201)
+        payloads = [_touch_payload(item) for item in data]
+        objs, errors = _save_payloads(payloads)
+        if errors:
+            return Response(errors, status=400)
+
+        ml_results_hybrid = _call_ml_server(payloads, "predict_hybrid")
+        saved = _finalize_logs(objs, ml_results_hybrid, "hybrid")
+        return Response(touch_body(len(objs), saved), status=201)
+
+
+class SensorWindowList(generics.ListAPIView):
+    serializer_class = SensorWindowSerializer
+
+    def get_queryset(self):
+        qs = SensorWindow.objects.all().order_by('-window_start').select_related('user_session', 'device')
+        params = self.request.query_params
+        for param, field in (("user_id", "user_session__user_id"), ("session_id", "user_session__session_id"),
+                             ("sensor_type", "sensor_type")):
+            if params.get(param):
+                qs = qs.filter(**{field: params[param]})
+        since, until = partitioning.timestamp_window(params)
+        if since:
+            qs = qs.filter(window_start__gte=since)
+        if until:
+            qs = qs.filter(window_start__lt=until)
+        try:
+            limit = min(max(int(params.get("limit", 200)), 1), 1000)
+        except ValueError:
+            limit = 200
+        return qs[:limit]
+
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        ctx["include_samples"] = _to_bool(self.request.query_params.get("include_samples"))
+        return ctx
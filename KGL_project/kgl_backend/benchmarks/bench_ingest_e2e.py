@@ -0,0 +1,320 @@
+# benchmarks/bench_ingest_e2e.py
+# 수집 엔드포인트(network-data / sensor-data / touch-data) 종단 간 벤치마크.
+# Android ApiService 가 보내는 모양의 배치(합성 또는 녹화본)를 Django 전체 스택(미들웨어 → 뷰 → DB → ML 호출)에 재생하고
+# 요청 수/s, 행 수/s, 지연 p50/p95/p99, 요청당 DB 쿼리 수를 JSON 으로 남긴다.
+#
+#   python benchmarks/bench_ingest_e2e.py                                  # SQLite + 고정 지연 ML 스텁
+#   python benchmarks/bench_ingest_e2e.py --ml real                        # kgl_model/main.py 앱을 프로세스 안에서 구동
+#   python benchmarks/bench_ingest_e2e.py --db postgres                    # settings.DATABASES 의 PG 에 test_ DB 생성
+#   python benchmarks/bench_ingest_e2e.py --replay recorded.jsonl          # {"endpoint": "sensor-data", "body": [...]} 한 줄씩
+#   python benchmarks/bench_ingest_e2e.py --compare benchmarks/results/<이전>.json
+#
+# DB 는 매 실행마다 새 테스트 DB 를 만들고(setup_databases) 끝나면 지운다. ML 서버는 같은 프로세스의
+# 스레드에서 uvicorn 으로 띄우고 settings.ML_SERVER_URL 을 그쪽으로 돌린다.
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "kgl_model")
+sys.path.insert(0, BACKEND_DIR)
+
+ENDPOINTS = ("network-data", "sensor-data", "touch-data")
+
+
+# ─── 합성 배치 (ApiService.sendNetworkLogs / sendSensorLogs / sendTouchLogs 와 같은 키) ──────────
+def network_batch(seq0: int, n: int, rng):
+    return [{
+        "seq": seq0 + i,
+        "lat": float(rng.uniform(35.0, 37.6)),
+        "lng": float(rng.uniform(126.8, 129.1)),
+        "net_type": "wifi" if rng.random() < 0.7 else "cellular",
+    } for i in range(n)]
+
+
+def sensor_batch(seq0: int, n: int, rng):
+    ts0 = int(time.time() * 1000)
+    return [{
+        "seq": seq0 + i,
+        "type": "accel" if i % 2 == 0 else "gyro",
+        "timestamp": ts0 + (i // 2) * 20,
+        "x": float(rng.normal(0, 0.3)), "y": float(rng.normal(0, 0.3)),
+        "z": float(rng.normal(9.8 if i % 2 == 0 else 0.0, 0.3)),
+    } for i in range(n)]
+
+
+def touch_batch(seq0: int, n: int, rng):
+    ts0 = int(time.time() * 1000)
+    rows = []
+    for i in range(n):
+        base = {"seq": seq0 + i, "timestamp": ts0 + i * 150}
+        if i % 4 == 3:
+            sx, sy = float(rng.uniform(100, 900)), float(rng.uniform(300, 1800))
+            ex, ey = sx + float(rng.normal(0, 200)), sy + float(rng.normal(0, 400))
+            base.update({
+                "action_type": "drag", "start_x": sx, "start_y": sy, "end_x": ex, "end_y": ey,
+                "total_distance": float(np.hypot(ex - sx, ey - sy)), "duration": int(rng.integers(80, 600)),
+                "drag_direction": "down" if ey > sy else "up", "move_count": int(rng.integers(3, 40)),
+                "touch_session": seq0 // n,
+            })
+        else:
+            base.update({
+                "action_type": "touch_pressure", "x": float(rng.uniform(0, 1080)), "y": float(rng.uniform(0, 2200)),
+                "size": float(rng.uniform(0.01, 0.08)), "touch_duration": int(rng.integers(40, 300)),
+                "touch_session": seq0 // n,
+            })
+        rows.append(base)
+    return rows
+
+
+GENERATORS = {"network-data": network_batch, "sensor-data": sensor_batch, "touch-data": touch_batch}
+
+
+def synthetic_workload(endpoints, batches: int, rows: int, seed: int):
+    rng = np.random.default_rng(seed)
+    for ep in endpoints:
+        for b in range(batches):
+            yield ep, GENERATORS[ep](b * rows, rows, rng)
+
+
+def replay_workload(path: str, endpoints):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            ep = rec["endpoint"].strip("/").split("/")[-1]
+            if ep in endpoints:
+                yield ep, rec["body"]
+
+
+def to_columnar(endpoint: str, body):
+    # sensor/touch 는 columnar(msgpack) 업로드도 받는다. network 는 JSON 그대로.
+    from behavior.columnar import MEDIA_TYPE, ColumnBatch, encode_batch
+    if endpoint == "network-data" or not body:
+        return json.dumps(body).encode(), "application/json"
+    keys = sorted({k for row in body for k in row})
+    cols = {}
+    for k in keys:
+        vals = [row.get(k) for row in body]
+        if all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool) for v in vals):
+            cols[k] = np.array([np.nan if v is None else v for v in vals], dtype=np.float64)
+        else:
+            cols[k] = [None if v is None else str(v) for v in vals]
+    return encode_batch(ColumnBatch(endpoint.split("-")[0], cols, {})), MEDIA_TYPE
+
+
+# ─── ML 서버 ───────────────────────────────────────────────────────────────
+def stub_ml_app(latency_ms: float):
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        more = True
+        while more:
+            more = (await receive()).get("more_body", False)
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000.0)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"[]"})
+    return app
+
+
+def real_ml_app(model_dir: str):
+    # AnomalyDetector 는 import 시점에 ./models 를 읽고 만든다 → 지정 디렉터리에서 import.
+    sys.path.insert(0, MODEL_DIR)
+    cwd = os.getcwd()
+    os.chdir(model_dir)
+    try:
+        import main as ml_main
+    finally:
+        os.chdir(cwd)
+    return ml_main.app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_ml_server(app) -> str:
+    import uvicorn
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("ML server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+# ─── 측정 ──────────────────────────────────────────────────────────────────
+def _percentiles(values_ms):
+    arr = np.asarray(values_ms, dtype=np.float64)
+    if arr.size == 0:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+
+def run(workload, fmt: str, warmup: int):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    stats = {ep: {"lat": [], "queries": [], "rows": 0, "errors": 0, "wall": 0.0} for ep in ENDPOINTS}
+    seen = {ep: 0 for ep in ENDPOINTS}
+
+    for ep, body in workload:
+        payload, ctype = to_columnar(ep, body) if fmt == "columnar" else (json.dumps(body).encode(), "application/json")
+        seen[ep] += 1
+        with CaptureQueriesContext(connection) as q:
+            t0 = time.perf_counter()
+            r = client.post(f"/api/{ep}/", payload, content_type=ctype)
+            dt = time.perf_counter() - t0
+        if seen[ep] <= warmup:
+            continue
+        s = stats[ep]
+        s["wall"] += dt
+        s["lat"].append(dt * 1000.0)
+        s["queries"].append(len(q.captured_queries))
+        s["rows"] += len(body)
+        if r.status_code != 201:
+            s["errors"] += 1
+
+    out = {}
+    for ep, s in stats.items():
+        if not s["lat"]:
+            continue
+        out[ep] = {
+            "requests": len(s["lat"]),
+            "rows": s["rows"],
+            "errors": s["errors"],
+            "req_per_s": round(len(s["lat"]) / s["wall"], 2),
+            "rows_per_s": round(s["rows"] / s["wall"], 1),
+            **_percentiles(s["lat"]),
+            "queries_per_request_mean": round(float(np.mean(s["queries"])), 2),
+            "queries_per_request_max": int(np.max(s["queries"])),
+        }
+    return out
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, previous_path: str):
+    with open(previous_path, encoding="utf-8") as f:
+        prev = json.load(f)
+    print(f"\ncompare with {previous_path} (commit {prev.get('commit')})")
+    keys = ("req_per_s", "rows_per_s", "p50_ms", "p99_ms", "queries_per_request_mean")
+    for ep, cur in current["results"].items():
+        old = prev.get("results", {}).get(ep)
+        if not old:
+            continue
+        parts = []
+        for k in keys:
+            a, b = old.get(k), cur.get(k)
+            if a in (None, 0) or b is None:
+                continue
+            parts.append(f"{k}={b} ({(b - a) / a * 100:+.1f}%)")
+        print(f"  {ep:<13} " + "  ".join(parts))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite")
+    ap.add_argument("--ml", choices=["stub", "real"], default="stub")
+    ap.add_argument("--ml-latency-ms", type=float, default=20.0, help="stub 응답 지연")
+    ap.add_argument("--ml-model-dir", help="--ml real 의 모델 디렉터리 (기본: 빈 임시 디렉터리 → collecting 모드부터)")
+    ap.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    ap.add_argument("--batches", type=int, default=50, help="엔드포인트당 요청 수")
+    ap.add_argument("--rows", type=int, default=100, help="배치당 행 수")
+    ap.add_argument("--format", choices=["json", "columnar"], default="json")
+    ap.add_argument("--warmup", type=int, default=3, help="엔드포인트당 측정에서 뺄 처음 요청 수")
+    ap.add_argument("--replay", help="녹화된 배치 JSONL ({endpoint, body})")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="결과 JSON 경로 (기본: benchmarks/results/e2e-<commit>-<시각>.json)")
+    ap.add_argument("--compare", help="이전 결과 JSON 과 비교 출력")
+    args = ap.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nac_backend.settings")
+    from django.conf import settings
+
+    tmpdir = tempfile.mkdtemp(prefix="kgl-e2e-")
+    if args.db == "sqlite":
+        settings.DATABASES = {"default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(tmpdir, "bench.sqlite3"),
+            "TEST": {"NAME": os.path.join(tmpdir, "test_bench.sqlite3")},
+        }}
+
+    import django
+    django.setup()
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+
+    if args.ml == "real":
+        ml_url = start_ml_server(real_ml_app(args.ml_model_dir or tmpdir))
+    else:
+        ml_url = start_ml_server(stub_ml_app(args.ml_latency_ms))
+    settings.ML_SERVER_URL = ml_url
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        workload = (replay_workload(args.replay, args.endpoints) if args.replay
+                    else synthetic_workload(args.endpoints, args.batches, args.rows, args.seed))
+        results = run(workload, args.format, args.warmup)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "db": args.db, "ml": args.ml, "ml_latency_ms": args.ml_latency_ms if args.ml == "stub" else None,
+            "format": args.format, "batches": args.batches, "rows": args.rows, "warmup": args.warmup,
+            "replay": args.replay, "sensor_storage_mode": getattr(settings, "SENSOR_STORAGE_MODE", None),
+        },
+        "results": results,
+    }
+
+    print(f"{'endpoint':<13} {'req':>5} {'err':>4} {'req/s':>8} {'rows/s':>10} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}")
+    for ep, r in results.items():
+        print(f"{ep:<13} {r['requests']:>5} {r['errors']:>4} {r['req_per_s']:>8.1f} {r['rows_per_s']:>10.0f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['queries_per_request_mean']:>6.1f}")
+
+    out = args.out or os.path.join(
+        BACKEND_DIR, "benchmarks", "results",
+        f"e2e-{report['commit'] or 'nogit'}-{datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults → {out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_ingest_formats.py
+# 센서 업로드 본문의 파싱 비용 비교: 현재 JSON 경로 vs 컬럼 기반 msgpack (+gzip/zstd).
+# DB 와 ML 서버 호출은 제외하고, 본문 디코딩 → 행 정리 → ML 서버용 본문 재직렬화까지만 측정한다.
+#
+#   python benchmarks/bench_ingest_formats.py --rows 200 1000 5000
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from behavior.columnar import ColumnBatch, decode_batch, encode_batch  # noqa: E402
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def make_json_body(n: int, rng) -> bytes:
+    # ApiService.sendSensorLogs 가 보내는 모양
+    ts0 = 1_700_000_000_000
+    rows = [{
+        "seq": i,
+        "type": "accel" if i % 2 == 0 else "gyro",
+        "timestamp": ts0 + i * 10,
+        "x": float(rng.normal()), "y": float(rng.normal()), "z": float(rng.normal() + 9.8),
+    } for i in range(n)]
+    return json.dumps(rows).encode()
+
+
+def make_columnar_body(n: int, rng) -> bytes:
+    batch = ColumnBatch("sensor", {
+        "seq": np.arange(n, dtype=np.int64),
+        "ts": 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 10,
+        "type": ["accel" if i % 2 == 0 else "gyro" for i in range(n)],
+        "x": rng.normal(size=n).astype(np.float32),
+        "y": rng.normal(size=n).astype(np.float32),
+        "z": (rng.normal(size=n) + 9.8).astype(np.float32),
+    }, {"user_id": "bench-user", "session_id": "bench-session", "device_info": {}})
+    return encode_batch(batch)
+
+
+def json_path(body: bytes) -> bytes:
+    data = json.loads(body)
+    prepared = []
+    for item in data:
+        stype = item.get("type", "unknown")
+        action = "sensor_accelerometer" if stype in ("accel", "accelerometer") else \
+                 "sensor_gyroscope" if stype in ("gyro", "gyroscope") else "sensor_unknown"
+        prepared.append({
+            "user_id": item.get("user_id", "device-anonymous"),
+            "session_id": item.get("session_id", "session-unknown"),
+            "action_type": action,
+            "sequence_index": item.get("seq", 0),
+            "timestamp": item.get("timestamp"),
+            "params": {"x": item.get("x"), "y": item.get("y"), "z": item.get("z"),
+                       "magnitude": item.get("magnitude")},
+            "device_info": item.get("device_info", {}),
+            "location": item.get("location", None),
+        })
+    return json.dumps(prepared).encode()
+
+
+def columnar_path(body: bytes) -> bytes:
+    batch = decode_batch(body)
+    types = batch.strings("type", "unknown")
+    batch.columns["action_type"] = ["sensor_accelerometer" if t == "accel" else "sensor_gyroscope" for t in types]
+    del batch.columns["type"]
+    return encode_batch(batch)
+
+
+def bench(fn, body: bytes, repeat: int) -> float:
+    fn(body)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[200, 1000, 5000])
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'rows':>7} {'format':<16} {'bytes':>10} {'best ms':>9} {'rows/s':>12}")
+    for n in args.rows:
+        jbody, cbody = make_json_body(n, rng), make_columnar_body(n, rng)
+        cases = [
+            ("json", jbody, json_path),
+            ("json+gzip", gzip.compress(jbody), lambda b: json_path(gzip.decompress(b))),
+            ("columnar", cbody, columnar_path),
+            ("columnar+gzip", gzip.compress(cbody), lambda b: columnar_path(gzip.decompress(b))),
+        ]
+        if zstandard is not None:
+            zc, zd = zstandard.ZstdCompressor(), zstandard.ZstdDecompressor()
+            cases.append(("columnar+zstd", zc.compress(cbody), lambda b: columnar_path(zd.decompress(b))))
+        for name, body, fn in cases:
+            t = bench(fn, body, args.repeat)
+            print(f"{n:>7} {name:<16} {len(body):>10} {t * 1000:>9.3f} {n / t:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# benchmarks/load_ingest_async.py
+# 동기 DRF 수집 뷰 vs async 수집 뷰(behavior/async_views.py) 부하 비교.
+# 동시 기기 N 대가 각자 센서/터치 배치를 연속 업로드할 때의 req/s 와 지연 p50/p95/p99 를 잰다.
+#
+# 기본 동작: 고정 지연 ML 스텁(127.0.0.1:8001 = settings.ML_SERVER_URL)과 Django(uvicorn ASGI)를
+# 하위 프로세스로 띄운 뒤 측정한다. --base-url 을 주면 이미 떠 있는 서버를 그대로 쓴다.
+#
+#   DJANGO_SETTINGS_MODULE=nac_backend.settings \
+#   python benchmarks/load_ingest_async.py --devices 200 --requests 10 --ml-latency-ms 50
+#
+# 동기 뷰는 WSGI 배포와 같은 조건이 되도록 별도 uvicorn --interface wsgi 프로세스로 띄운다
+# (uvicorn WSGI 어댑터의 고정 스레드 풀 크기만큼만 동시에 처리).
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stub_ml_app(latency_ms: float):
+    """/predict_hybrid, /predict_columns 를 흉내 내는 고정 지연 ML 서버 (결과는 빈 배열)."""
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        more = True
+        while more:
+            msg = await receive()
+            more = msg.get("more_body", False)
+        await asyncio.sleep(latency_ms / 1000.0)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"[]"})
+    return app
+
+
+def sensor_batch(device: int, seq0: int, n: int, rng):
+    ts0 = int(time.time() * 1000)
+    return [{
+        "user_id": f"bench-{device}", "session_id": f"bench-{device}-s",
+        "seq": seq0 + i, "type": "accel" if i % 2 == 0 else "gyro",
+        "timestamp": ts0 + i * 10,
+        "x": float(rng.normal()), "y": float(rng.normal()), "z": float(rng.normal() + 9.8),
+    } for i in range(n)]
+
+
+def touch_batch(device: int, seq0: int, n: int, rng):
+    ts0 = int(time.time() * 1000)
+    return [{
+        "user_id": f"bench-{device}", "session_id": f"bench-{device}-s",
+        "seq": seq0 + i, "action_type": "touch_drag" if i % 3 else "touch_pressure",
+        "timestamp": ts0 + i * 16,
+        "x": float(rng.uniform(0, 1080)), "y": float(rng.uniform(0, 2200)),
+        "pressure": float(rng.uniform(0.1, 1.0)), "size": 0.02, "duration": 120,
+    } for i in range(n)]
+
+
+async def run_load(base_url: str, path: str, modality: str, devices: int, requests: int, rows: int):
+    make = sensor_batch if modality == "sensor" else touch_batch
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=devices, max_keepalive_connections=devices)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def device(d: int):
+            nonlocal errors
+            rng = np.random.default_rng(d)
+            for k in range(requests):
+                body = json.dumps(make(d, k * rows, rows, rng))
+                t0 = time.perf_counter()
+                try:
+                    r = await client.post(path, content=body, headers={"Content-Type": "application/json"})
+                    ok = r.status_code == 201
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - t0)
+                errors += not ok
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(device(d) for d in range(devices)))
+        elapsed = time.perf_counter() - t0
+
+    lat = np.array(latencies) * 1000.0
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+        "p99_ms": round(float(np.percentile(lat, 99)), 1),
+    }
+
+
+def _spawn(args, env=None):
+    return subprocess.Popen(args, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start: {url}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--devices", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=10, help="기기당 업로드 횟수")
+    ap.add_argument("--rows", type=int, default=50, help="배치당 행 수")
+    ap.add_argument("--modality", choices=["sensor", "touch"], default="sensor")
+    ap.add_argument("--ml-latency-ms", type=float, default=50.0)
+    ap.add_argument("--base-url", help="이미 떠 있는 서버 (sync/async 경로 모두 이 서버로 보낸다)")
+    ap.add_argument("--serve-stub-ml", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve_stub_ml:
+        import uvicorn
+        uvicorn.run(stub_ml_app(args.ml_latency_ms), host="127.0.0.1", port=8001, log_level="warning")
+        return
+
+    endpoint = f"/api/{args.modality}-data/"
+    procs = []
+    try:
+        if args.base_url:
+            targets = [("sync", args.base_url, endpoint), ("async", args.base_url, "/api/async" + endpoint[4:])]
+        else:
+            procs.append(_spawn([sys.executable, os.path.abspath(__file__), "--serve-stub-ml",
+                                 "--ml-latency-ms", str(args.ml_latency_ms)]))
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])))
+            env.setdefault("DJANGO_SETTINGS_MODULE", "nac_backend.settings")
+            procs.append(_spawn([sys.executable, "-m", "uvicorn", "nac_backend.wsgi:application",
+                                 "--interface", "wsgi", "--port", "8010", "--log-level", "warning"], env))
+            procs.append(_spawn([sys.executable, "-m", "uvicorn", "nac_backend.asgi:application",
+                                 "--port", "8011", "--log-level", "warning"], env))
+            for port in (8001, 8010, 8011):
+                _wait_ready(f"http://127.0.0.1:{port}/")
+            targets = [("sync", "http://127.0.0.1:8010", endpoint),
+                       ("async", "http://127.0.0.1:8011", "/api/async" + endpoint[4:])]
+
+        results = []
+        for label, base, path in targets:
+            res = asyncio.run(run_load(base, path, args.modality, args.devices, args.requests, args.rows))
+            res["mode"] = label
+            results.append(res)
+            print(f"{label:>5} {path:<26} req={res['requests']:>5} err={res['errors']:>4} "
+                  f"{res['req_per_s']:>8.1f} req/s  p50={res['p50_ms']:>7.1f}ms  "
+                  f"p95={res['p95_ms']:>7.1f}ms  p99={res['p99_ms']:>7.1f}ms")
+        print(json.dumps({"devices": args.devices, "rows": args.rows,
+                          "ml_latency_ms": args.ml_latency_ms, "results": results}, indent=2))
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,11 @@ ASGI config for nac_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+    uvicorn nac_backend.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+The ingest endpoints under ``api/async/`` (or the default ones with
+``ASYNC_INGEST = True``) only pay off when served through this entry point.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
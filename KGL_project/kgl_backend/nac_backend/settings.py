@@ -41,6 +41,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'behavior.middleware.RequestBodyDecompressionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -110,6 +111,7 @@ CORS_ALLOWED_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
+    'content-encoding',
     'content-type',
     'dnt',
     'origin',
@@ -127,6 +129,26 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 ML_SERVER_URL = "http://127.0.0.1:8001"
+ML_COLUMNS_RETRY_SECONDS = 300        # ML 서버에 /predict_columns 가 없으면 이 시간 동안 JSON(/predict_hybrid)만 사용
+
+# UserBehaviorLog / AnomalyResult 일 단위 파티션 (PostgreSQL 전용, SQLite 에서는 무시)
+# 생성/삭제는 `python manage.py manage_log_partitions --drop-expired` 를 하루 한 번 이상 cron 으로 돌린다.
+LOG_PARTITION_RETENTION_DAYS = 7      # 이 기간이 지난 파티션은 통째로 DROP, default 파티션의 만료 행은 DELETE
+LOG_PARTITION_PREMAKE_DAYS = 3        # 미리 만들어 둘 미래 파티션 수
+MOBILE_ANOMALY_LOOKBACK_HOURS = 24    # mobile/anomaly/updates 기본 조회 범위 (파티션 테이블, since_id/created_after 없을 때만)
+ANOMALY_POLL_SLACK_MINUTES = 60       # since_id/created_after 조회의 timestamp 하한 여유 (늦게 올라온 결과용)
+
+# 센서 데이터 저장 방식: "windows" = 창 단위 packed 배열(SensorWindow), "rows" = 샘플당 UserBehaviorLog 한 행
+SENSOR_STORAGE_MODE = "windows"
+SENSOR_WINDOW_MS = 5000
+
+# gzip/zstd 로 압축된 요청 본문을 풀었을 때 허용하는 최대 크기
+INGEST_MAX_DECOMPRESSED_BYTES = 32 * 1024 * 1024
+
+# ASGI(uvicorn) 배포용 async 수집 엔드포인트 (behavior/async_views.py)
+ASYNC_INGEST = False              # True 면 network-data/sensor-data/touch-data 를 async 뷰로 교체
+ASYNC_INGEST_DB_THREADS = 8       # async 뷰의 DB 작업 전용 스레드 수 (= 프로세스당 최대 DB 연결 수)
+ASYNC_ML_MAX_CONNECTIONS = 64     # ML 서버로의 httpx 연결 풀 크기
 
 LOGGING = {
     'version': 1,
@@ -0,0 +1,131 @@
+# batcher.py
+# 동시에 들어오는 작은 업로드들을 짧은 창(max_wait) 동안 모아 검출기에 한 번에 넘기는 coalescing 배처.
+#
+#   batcher = MicroBatcher(score_fn, max_wait_ms=5, max_rows=2000)
+#   results = await batcher.submit(logs)      # logs 와 같은 길이/순서의 결과 리스트
+#
+# score_fn(all_logs) 는 입력과 같은 길이의 리스트를 돌려줘야 하며, 스레드 풀에서 한 번에 하나씩만 실행된다.
+# 실행 중에 도착한 요청은 다음 배치로 쌓이므로 부하가 높을수록 배치가 자연스럽게 커진다.
+import asyncio
+import contextvars
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from metrics import COALESCED_REQUESTS, COALESCED_ROWS, COALESCE_WAIT_SECONDS
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_wait_ms: float = 5.0, max_rows: int = 2000,
+                 name: str = "predict_hybrid"):
+        self.fn = fn
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_rows = max(1, int(max_rows))
+        self.name = name
+        self._pending: Deque[Tuple[List[Any], asyncio.Future, float]] = deque()
+        self._rows = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._arrived: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+        self._ensure_worker()
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((items, fut, time.perf_counter()))
+        self._rows += len(items)
+        self._wakeup.set()
+        self._arrived.set()
+        return await fut
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            if self._loop is not loop:
+                self._abandon_loop()
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._arrived = asyncio.Event()
+            # 첫 요청의 contextvar(프로파일 표시 등)가 워커에 영구히 묻어가지 않도록 빈 컨텍스트에서 돌린다.
+            self._task = loop.create_task(self._run(), context=contextvars.Context())
+
+    def _abandon_loop(self):
+        # 이벤트 루프가 바뀌면(테스트 클라이언트 재생성 등) 이전 루프의 워커는 더 돌지 않는다.
+        # 그 루프에서 기다리던 요청이 영원히 걸려 있지 않도록 대기 중 future 를 실패시키고 워커를 멈춘다.
+        old, task = self._loop, self._task
+        pending = [fut for _, fut, _ in self._pending]
+        self._pending.clear()
+        self._rows = 0
+        if old is None or old.is_closed():
+            return
+        err = RuntimeError(f"{self.name} batcher moved to another event loop")
+
+        def _fail():
+            for fut in pending:
+                if not fut.done():
+                    fut.set_exception(err)
+            if task is not None:
+                task.cancel()
+
+        old.call_soon_threadsafe(_fail)
+
+    def _take(self):
+        # 요청 단위로 자르고(한 요청을 쪼개지 않음) max_rows 에 닿으면 멈춘다.
+        taken, rows = [], 0
+        while self._pending and (not taken or rows + len(self._pending[0][0]) <= self.max_rows):
+            entry = self._pending.popleft()
+            taken.append(entry)
+            rows += len(entry[0])
+        self._rows -= rows
+        if not self._pending:
+            self._wakeup.clear()
+        return taken
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            first_at = self._pending[0][2]
+            while self._rows < self.max_rows:
+                remaining = self.max_wait - (time.perf_counter() - first_at)
+                if remaining <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take()
+            now = time.perf_counter()
+            all_items: List[Any] = []
+            for items, _, arrived in batch:
+                all_items.extend(items)
+                COALESCE_WAIT_SECONDS.labels(self.name).observe(now - arrived)
+            COALESCED_REQUESTS.labels(self.name).observe(len(batch))
+            COALESCED_ROWS.labels(self.name).observe(len(all_items))
+
+            try:
+                results = await run_in_threadpool(self.fn, all_items)
+                if len(results) != len(all_items):
+                    raise RuntimeError(f"batch fn returned {len(results)} results for {len(all_items)} items")
+            except asyncio.CancelledError:
+                # 루프 교체로 워커가 멈출 때 실행 중이던 배치의 요청도 걸어 두지 않는다.
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+                raise
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            offset = 0
+            for items, fut, _ in batch:
+                if not fut.done():
+                    fut.set_result(results[offset:offset + len(items)])
+                offset += len(items)
@@ -0,0 +1,182 @@
+# benchmarks/bench_cascade.py
+# cascade 채점(cascade.py) 비교: 모든 행에 LSTM (off) vs iForest / EWMA 1단계로 거른 뒤 LSTM.
+# 정상 로그 앞부분으로 학습한 뒤 남은 정상 로그와 이상 로그를 배치로 흘려 보내며, 배치마다 같은 버퍼 상태에서
+# 전체 LSTM 과 모드별 cascade 를 둘 다 돌려 결합 판정(is_anomaly_combined)의 정밀도/재현율/F1,
+# LSTM 통과율, LSTM 시간을 잰다. 고른 행의 LSTM 점수가 전체 채점과 다르면 종료 코드 1.
+#
+#   python benchmarks/bench_cascade.py                                  # 합성 로그 (bench_detector.LOGS + 변형)
+#   python benchmarks/bench_cascade.py --eval-dir logs/eval_logs        # evaluate_lstm_ae.py 와 같은 폴더 구조
+#   python benchmarks/bench_cascade.py --band 0.05 0.2 --sample 0.01
+#
+# --eval-dir 아래 normal_touch / abnormal_touch / normal_sensor / abnormal_sensor 의 *.json (로그 배열 또는 {"logs": [...]}).
+import argparse
+import json
+import os
+import sys
+import time
+from glob import glob
+from typing import Dict, List
+
+import numpy as np
+
+from bench_detector import LOGS, main_module, new_detector
+
+import cascade
+
+BATCH = 100
+
+
+def _load_dir(folder: str, modality: str) -> List[dict]:
+    m = main_module()
+    logs = []
+    for path in sorted(glob(os.path.join(folder, "**", "*.json"), recursive=True)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        items = data.get("logs", data) if isinstance(data, dict) else data
+        logs += [x for x in items if isinstance(x, dict) and m._infer_modality(x.get("action_type", "")) == modality]
+    return logs
+
+
+def _abnormal(modality: str, n: int, rng) -> List[dict]:
+    # 합성 이상: 같은 생성기에서 몇 가지 값을 사람 손에서 나오기 어려운 쪽으로 민다.
+    logs = LOGS[modality](n, rng)
+    for log in logs:
+        p = log["params"]
+        if modality == "sensor":
+            for k in ("x", "y", "z"):
+                p[k] = float(p[k]) * 4.0 + rng.normal(0, 2.0)
+        elif modality == "touch_drag":
+            p["duration"] = float(p["duration"]) * 0.2
+            p["straightness"] = 1.0
+            p["move_count"] = 2.0
+        else:
+            p["touch_duration"] = float(rng.integers(5, 20))
+            p["pressure"] = 1.0
+            p["size"] = float(p["size"]) * 0.2
+    return logs
+
+
+def _data(modality: str, args, rng):
+    if args.eval_dir:
+        kind = "sensor" if modality == "sensor" else "touch"
+        normal = _load_dir(os.path.join(args.eval_dir, f"normal_{kind}"), modality)
+        abnormal = _load_dir(os.path.join(args.eval_dir, f"abnormal_{kind}"), modality)
+    else:
+        # 센서는 두 샘플(가속도계+자이로)이 한 프레임, iForest 행은 프레임 창이라 로그를 더 만든다.
+        scale = 20 if modality == "sensor" else 1
+        normal = LOGS[modality](scale * (args.train + args.eval), rng)
+        abnormal = _abnormal(modality, scale * args.eval, rng)
+        # 같은 세션이 이어지도록 이상 로그 시각을 정상 로그 뒤로 민다 (센서 융합은 거꾸로 가는 시각을 버린다).
+        shift = normal[-1]["params"]["timestamp"] - abnormal[0]["params"]["timestamp"] + 20
+        for log in abnormal:
+            log["params"]["timestamp"] += shift
+    n_train = int(len(normal) * args.train_frac) if args.eval_dir else len(normal) - len(abnormal)
+    return normal[:n_train], normal[n_train:], abnormal
+
+
+def _scores(y: np.ndarray, pred: np.ndarray) -> Dict[str, float]:
+    tp = int((pred & y).sum())
+    fp = int((pred & ~y).sum())
+    fn = int((~pred & y).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def run(modality: str, args) -> bool:
+    m = main_module()
+    rng = np.random.default_rng(args.seed)
+    train, normal, abnormal = _data(modality, args, rng)
+    if not train or not normal or not abnormal:
+        print(f"[{modality}] 데이터 없음 (train {len(train)}, normal {len(normal)}, abnormal {len(abnormal)}) — 건너뜀")
+        return True
+
+    import torch
+    torch.manual_seed(args.seed)
+    # 관찰 중에는 학습하지 않고, 학습셋을 다 넣은 뒤 한 번 학습한다.
+    det = new_detector(len(train) + 1)
+    det.drift_retrain = False  # 이상 로그가 들어와도 재학습하지 않게
+    m.detector, saved = det, m.detector
+    try:
+        for i in range(0, len(train), BATCH):
+            m._observe_modality(modality, train[i:i + BATCH])
+        det.initial_samples[modality] = 1
+        det._train_iforest_model(modality)
+        det._train_lstm_model_from_logs(modality)
+        if det.lstm_live[modality] is None or det.iforest_live[modality] is None:
+            print(f"[{modality}] 학습 실패 — 건너뜀")
+            return True
+
+        modes = {"off": None}
+        for band in args.band:
+            modes[f"iforest band={band:g}"] = cascade.Cascade("iforest", band=band, sample=args.sample, seed=args.seed)
+        for z in args.z:
+            modes[f"ewma z={z:g}"] = cascade.Cascade("ewma", z=z, sample=args.sample, seed=args.seed)
+        labels, flags = [], {k: [] for k in modes}
+        passed = {k: 0 for k in modes}
+        seconds = {k: 0.0 for k in modes}
+        ok = True
+        for label, logs in ((False, normal), (True, abnormal)):
+            for i in range(0, len(logs), BATCH):
+                batch = logs[i:i + BATCH]
+                X, x_of, n_rows, row_of, end = m._observe_modality(modality, batch)
+                is_if, s_if = m._iforest_arrays(modality, X, x_of)
+                labels.append(np.full(len(batch), label))
+                full = None
+                for name, cas in modes.items():
+                    selection = None
+                    if cas is not None:
+                        det.cascade = cas
+                        selection = m._cascade_selection(modality, X, x_of, is_if, s_if,
+                                                         [log.get("user_id") for log in batch])
+                    t0 = time.perf_counter()
+                    is_ls, s_ls = m._lstm_tail_arrays(modality, n_rows, row_of, selection, end)
+                    seconds[name] += time.perf_counter() - t0
+                    if full is None:
+                        full = s_ls
+                        passed[name] += len(batch)
+                    else:
+                        need = selection.need if selection is not None else np.ones(len(batch), dtype=bool)
+                        passed[name] += int(need.sum())
+                        hit = need & (s_ls != 0)
+                        if not np.allclose(s_ls[hit], full[hit], rtol=1e-4):
+                            print(f"[{modality}] {name}: 고른 행의 LSTM 점수가 전체 채점과 다름")
+                            ok = False
+                    flags[name].append(is_if | is_ls)
+        det.cascade = cascade.Cascade("off")
+
+        y = np.concatenate(labels)
+        print(f"\n[{modality}] train {len(train)}, eval normal {len(normal)} / abnormal {len(abnormal)}")
+        print(f"{'mode':<20} {'precision':>9} {'recall':>7} {'f1':>6} {'lstm pass':>9} {'lstm s':>8} {'saved':>6}")
+        for name in modes:
+            s = _scores(y, np.concatenate(flags[name]))
+            saved_frac = 1.0 - seconds[name] / seconds["off"] if seconds["off"] else 0.0
+            print(f"{name:<20} {s['precision']:>9.4f} {s['recall']:>7.4f} {s['f1']:>6.4f} "
+                  f"{passed[name] / len(y):>9.1%} {seconds[name]:>8.3f} {saved_frac:>6.1%}")
+        return ok
+    finally:
+        m.detector = saved
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--eval-dir", default=None, help="evaluate_lstm_ae.py 의 eval_logs 폴더 (없으면 합성 로그)")
+    ap.add_argument("--modalities", nargs="+", default=list(LOGS))
+    ap.add_argument("--train", type=int, default=2000, help="합성: 학습 행 수")
+    ap.add_argument("--eval", type=int, default=1000, help="합성: 정상/이상 평가 행 수")
+    ap.add_argument("--train-frac", type=float, default=0.5, help="--eval-dir: 정상 로그 중 학습에 쓸 비율")
+    ap.add_argument("--band", type=float, nargs="+", default=[cascade.CASCADE_BAND])
+    ap.add_argument("--z", type=float, nargs="+", default=[cascade.CASCADE_Z])
+    ap.add_argument("--sample", type=float, default=cascade.CASCADE_SAMPLE)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    ok = all([run(modality, args) for modality in args.modalities])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
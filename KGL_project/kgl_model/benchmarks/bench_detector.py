@@ -0,0 +1,383 @@
+# benchmarks/bench_detector.py
+# main.py 핫 함수 마이크로 벤치마크: 파싱, 시퀀스 생성, 피처 추출, iForest/LSTM 추론, 학습 루프.
+# 모달리티별 합성 로그(/predict_hybrid 입력과 같은 모양)를 크기별로 만들어 시간(best/median)과
+# 최대 메모리(tracemalloc, 파이썬 힙 기준 — torch/sklearn 네이티브 버퍼는 포함되지 않음)를 잰다.
+#
+#   python benchmarks/bench_detector.py                         # 기본 크기, 결과 출력
+#   python benchmarks/bench_detector.py --sizes 1000 1000000 --only parse_touch parse_sensor
+#   python benchmarks/bench_detector.py --compare benchmarks/baseline.json
+#   python benchmarks/bench_detector.py --save benchmarks/baseline.json   # 기준선 갱신
+#
+# 케이스마다 max_rows 가 있어 학습/LSTM 처럼 무거운 케이스는 큰 크기에서 자동으로 건너뛴다 (--no-cap 으로 해제).
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+# 업로드 한 건의 전형적인 행 수 (Android 배치 전송 단위)
+UPLOAD_BATCHES = (50, 500)
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+TS0 = 1_700_000_000_000
+
+
+# ─── 합성 로그 ─────────────────────────────────────────────────────────────
+def _log(i, action, params):
+    return {
+        "user_id": "bench-user", "session_id": "bench-session", "action_type": action,
+        "sequence_index": i, "timestamp": datetime.fromtimestamp((TS0 + i * 10) / 1000, tz=timezone.utc).isoformat(),
+        "params": params, "device_info": {}, "location": None,
+    }
+
+
+def sensor_logs(n: int, rng) -> List[dict]:
+    xyz = rng.normal(0.0, 0.5, size=(n, 3))
+    xyz[0::2, 2] += 9.8
+    return [_log(i, "sensor_accelerometer" if i % 2 == 0 else "sensor_gyroscope", {
+        "timestamp": TS0 + (i // 2) * 20, "type": "accel" if i % 2 == 0 else "gyro",
+        "x": float(xyz[i, 0]), "y": float(xyz[i, 1]), "z": float(xyz[i, 2]),
+    }) for i in range(n)]
+
+
+def touch_drag_logs(n: int, rng) -> List[dict]:
+    dirs = ("down", "up", "left", "right")
+    sx, sy = rng.uniform(100, 900, n), rng.uniform(300, 1800, n)
+    dx, dy = rng.normal(0, 200, n), rng.normal(0, 400, n)
+    dur = rng.integers(80, 600, n)
+    moves = rng.integers(3, 40, n)
+    return [_log(i, "touch_drag", {
+        "timestamp": TS0 + i * 150, "start_x": float(sx[i]), "start_y": float(sy[i]),
+        "end_x": float(sx[i] + dx[i]), "end_y": float(sy[i] + dy[i]),
+        "total_distance": float(np.hypot(dx[i], dy[i])), "duration": float(dur[i]),
+        "straightness": float(rng.uniform(0.6, 1.0)), "move_count": float(moves[i]),
+        "drag_direction": dirs[i % 4],
+    }) for i in range(n)]
+
+
+def touch_pressure_logs(n: int, rng) -> List[dict]:
+    x, y = rng.uniform(0, 1080, n), rng.uniform(0, 2200, n)
+    size, dur, pres = rng.uniform(0.01, 0.08, n), rng.integers(40, 300, n), rng.uniform(0.1, 1.0, n)
+    return [_log(i, "touch_pressure", {
+        "timestamp": TS0 + i * 150, "x": float(x[i]), "y": float(y[i]), "size": float(size[i]),
+        "touch_duration": float(dur[i]), "pressure": float(pres[i]),
+    }) for i in range(n)]
+
+
+LOGS = {"sensor": sensor_logs, "touch_drag": touch_drag_logs, "touch_pressure": touch_pressure_logs}
+
+
+def lstm_logs(modality: str, n_rows: int, rng) -> List[dict]:
+    # LSTM 버퍼 n_rows 행을 채울 로그. 센서는 가속도계+자이로 두 샘플이 융합 프레임 한 행이 된다.
+    return LOGS[modality](2 * n_rows if modality == "sensor" else n_rows, rng)
+
+
+def iforest_logs(modality: str, n_rows: int, rng) -> List[dict]:
+    # iForest 입력 n_rows 행을 만들 로그. 센서는 융합 프레임 창(sensor_features)마다 한 행이다.
+    if modality != "sensor":
+        return LOGS[modality](n_rows, rng)
+    sf = main_module().sensor_features
+    return LOGS[modality](2 * ((max(n_rows, 1) - 1) * sf.SENSOR_WINDOW_HOP + sf.SENSOR_WINDOW + 2), rng)
+
+
+def iforest_rows(det, modality: str, logs: List[dict]) -> np.ndarray:
+    # iForest 입력 행렬 (/predict_hybrid 가 만드는 것과 같은 값).
+    if modality == "sensor":
+        return main_module().sensor_features.windows_from_logs(logs)
+    return np.array([_features(det, modality, log["params"]) for log in logs]).reshape(len(logs), -1)
+
+
+# ─── 검출기 준비 ────────────────────────────────────────────────────────────
+_main = None
+_workdir = tempfile.mkdtemp(prefix="kgl-bench-")
+
+
+def main_module():
+    # main 은 import 시 ./models 에 전역 detector 를 만든다 → 임시 디렉터리에서 import.
+    global _main
+    if _main is None:
+        cwd = os.getcwd()
+        os.chdir(_workdir)
+        try:
+            import main as m
+        finally:
+            os.chdir(cwd)
+        m.logger.setLevel("WARNING")
+        _main = m
+    return _main
+
+
+def new_detector(n_train: int = 0):
+    m = main_module()
+    det = m.AnomalyDetector(model_path=tempfile.mkdtemp(dir=_workdir),
+                            initial_samples={k: max(n_train, 1) for k in LOGS})
+    return det
+
+
+_trained: Dict[str, object] = {}
+
+
+def trained_detector(modality: str, n_train: int = 2000):
+    """해당 모달리티의 iForest/LSTM 이 inference 모드인 검출기 (모달리티당 한 번만 학습)."""
+    if modality not in _trained:
+        det = new_detector(n_train)
+        rng = np.random.default_rng(1)
+        if modality == "sensor":
+            frames, _, windows, _ = det._sensor_frames(
+                *main_module().sensor_fusion.samples_from_logs(iforest_logs(modality, n_train, rng)))
+            det.recent_data[modality].extend(windows)
+            det.lstm_rows[modality].extend(frames)
+        else:
+            for log in lstm_logs(modality, n_train, rng):
+                det.recent_data[modality].append(_features(det, modality, log["params"]))
+                det._append_lstm_log(modality, log)
+        det._train_iforest_model(modality)
+        det._train_lstm_model_from_logs(modality)
+        _trained[modality] = det
+    return _trained[modality]
+
+
+def _features(det, modality, params):
+    return {
+        "touch_drag": det._extract_touch_drag_features_from_dict,
+        "touch_pressure": det._extract_touch_pressure_features_from_dict,
+    }[modality](params)
+
+
+# ─── 케이스 ────────────────────────────────────────────────────────────────
+class Case(NamedTuple):
+    name: str
+    modality: str
+    # setup(n, rng) -> 인자 없는 측정 대상 함수
+    setup: Callable[[int, np.random.Generator], Callable[[], object]]
+    sizes: Optional[tuple] = None     # None 이면 --sizes 사용
+    max_rows: Optional[int] = None
+
+
+def _parse_touch(modality):
+    def setup(n, rng):
+        logs = LOGS[modality](n, rng)
+        return lambda: main_module().parse_touch(logs)
+    return setup
+
+
+def _parse_sensor(n, rng):
+    logs = sensor_logs(n, rng)
+    return lambda: main_module().parse_sensor(logs)
+
+
+def _parse_sensor_lstm(n, rng):
+    logs = sensor_logs(n, rng)
+    return lambda: main_module().parse_sensor_sequence_for_lstm(logs)
+
+
+def _create_sequences(n, rng):
+    arr = rng.normal(size=(n, 3))
+    return lambda: main_module().create_sequences(arr, 20)
+
+
+def _extract(modality):
+    def setup(n, rng):
+        det = new_detector()
+        if modality == "sensor":
+            # 센서: 로그 n 건 → 세션 융합 → 창 피처
+            logs = LOGS[modality](n, rng)
+            return lambda: main_module().sensor_features.windows_from_logs(logs)
+        params = [log["params"] for log in LOGS[modality](n, rng)]
+        fn = {
+            "touch_drag": det._extract_touch_drag_features_from_dict,
+            "touch_pressure": det._extract_touch_pressure_features_from_dict,
+        }[modality]
+        return lambda: [fn(p) for p in params]
+    return setup
+
+
+def _extract_batch(modality):
+    def setup(n, rng):
+        det = new_detector()
+        if modality == "sensor":
+            # 센서: 이미 융합된 프레임 n 행 → 창 피처 (창 계산만)
+            m = main_module()
+            frames = m.sensor_fusion.fuse_sessions(*m.sensor_fusion.samples_from_logs(LOGS[modality](2 * n, rng)))[1]
+            return lambda: m.sensor_features.window_features(frames)
+        params = [log["params"] for log in LOGS[modality](n, rng)]
+        fn = {
+            "touch_drag": det._extract_touch_drag_features_batch,
+            "touch_pressure": det._extract_touch_pressure_features_batch,
+        }[modality]
+        return lambda: fn(params)
+    return setup
+
+
+def _predict_iforest(modality):
+    # /predict_hybrid 와 같이 업로드 한 건의 행마다 _predict_one_iforest 를 부른다.
+    def setup(n, rng):
+        det = trained_detector(modality)
+        feats = iforest_rows(det, modality, LOGS[modality](n, rng))
+        return lambda: [det._predict_one_iforest(modality, f) for f in feats]
+    return setup
+
+
+def _predict_lstm(modality):
+    # n = 버퍼(lstm_rows) 에 쌓인 행 수, 요청은 50행. 버퍼 끝 문맥만 읽으므로 n 이 커져도 비용은 거의 같아야 한다.
+    def setup(n, rng):
+        m = main_module()
+        det = trained_detector(modality)
+        logs = LOGS[modality](n, rng)
+        buf = m.FeatureBuffer(m.LSTM_COLUMNS[modality], n)
+        if modality == "sensor":
+            # 센서 버퍼 행은 로그가 아니라 융합 프레임이다.
+            buf.extend(m.sensor_fusion.fuse_sessions(*m.sensor_fusion.samples_from_logs(logs))[1])
+        else:
+            for log in logs:
+                buf.append(m.lstm_row_from_log(modality, log, buf.seen, buf.last()))
+        request_logs = logs[-50:]
+
+        def run():
+            saved = det.lstm_rows[modality]
+            det.lstm_rows[modality] = buf
+            try:
+                return det._predict_lstm(modality, len(request_logs))
+            finally:
+                det.lstm_rows[modality] = saved
+        return run
+    return setup
+
+
+def _train_iforest(modality):
+    def setup(n, rng):
+        # 학습셋은 저수지 크기(KGL_RESERVOIR_ROWS)로 고정되므로 n 이 그보다 크면 표본 추출만 늘어난다.
+        det = new_detector(min(n, main_module().RESERVOIR_ROWS))
+        # 센서 창은 로그 수십 건마다 한 행이라 행 수를 맞추려면 로그가 너무 많다 → 최대 5000 창을 반복해 채운다.
+        X = iforest_rows(det, modality, iforest_logs(modality, min(n, 5000) if modality == "sensor" else n, rng))
+        X = np.resize(X, (n, X.shape[1]))
+        det.recent_data[modality].extend(X)
+        det.iforest_stats[modality].partial_fit(X.astype(np.float32))  # observe_and_maybe_train 과 같이
+        return lambda: det._train_iforest_model(modality)
+    return setup
+
+
+def _train_lstm(modality):
+    def setup(n, rng):
+        det = new_detector(min(n, main_module().BUFFER_ROWS))
+        for log in lstm_logs(modality, min(n, main_module().BUFFER_ROWS), rng):
+            det._append_lstm_log(modality, log)
+        buf = det.lstm_rows[modality]
+        det.lstm_stats[modality].partial_fit(det._lstm_matrix(buf.recent(), buf.columns, buf.columns))
+        return lambda: det._train_lstm_model_from_logs(modality)
+    return setup
+
+
+CASES: List[Case] = [
+    Case("parse_touch", "touch_drag", _parse_touch("touch_drag")),
+    Case("parse_touch", "touch_pressure", _parse_touch("touch_pressure")),
+    Case("parse_sensor", "sensor", _parse_sensor),
+    Case("parse_sensor_sequence_for_lstm", "sensor", _parse_sensor_lstm),
+    Case("create_sequences", "sensor", _create_sequences),
+    *[Case("extract_features", m, _extract(m)) for m in LOGS],
+    *[Case("extract_features_batch", m, _extract_batch(m)) for m in LOGS],
+    *[Case("predict_one_iforest", m, _predict_iforest(m), sizes=UPLOAD_BATCHES) for m in LOGS],
+    *[Case("predict_lstm", m, _predict_lstm(m), max_rows=100_000) for m in LOGS],
+    *[Case("train_iforest", m, _train_iforest(m), max_rows=100_000) for m in LOGS],
+    *[Case("train_lstm", m, _train_lstm(m), max_rows=10_000) for m in LOGS],
+]
+
+
+# ─── 측정 ──────────────────────────────────────────────────────────────────
+def measure(fn: Callable[[], object], repeat: int, min_time: float):
+    fn()  # 워밍업
+    times = []
+    t_start = time.perf_counter()
+    while len(times) < repeat or (time.perf_counter() - t_start < min_time and len(times) < 50):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        if len(times) >= repeat and times[-1] > min_time:
+            break
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"best_s": min(times), "median_s": statistics.median(times), "runs": len(times), "peak_mb": peak / 2 ** 20}
+
+
+def _key(case: Case, n: int) -> str:
+    return f"{case.name}[{case.modality}]@{n}"
+
+
+def run(sizes, only, repeat, min_time, cap=True):
+    results = {}
+    print(f"{'case':<48} {'best ms':>11} {'median ms':>11} {'rows/s':>13} {'peak MB':>9}")
+    for case in CASES:
+        if only and case.name not in only:
+            continue
+        for n in (case.sizes or sizes):
+            if cap and case.max_rows and n > case.max_rows:
+                continue
+            fn = case.setup(n, np.random.default_rng(0))
+            r = measure(fn, repeat, min_time)
+            r["rows"] = n
+            results[_key(case, n)] = r
+            print(f"{_key(case, n):<48} {r['best_s'] * 1e3:>11.3f} {r['median_s'] * 1e3:>11.3f} "
+                  f"{n / r['best_s']:>13,.0f} {r['peak_mb']:>9.2f}", flush=True)
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    print(f"\ncompare with {baseline_path}  (ratio = current / baseline, best time)")
+    for key, r in results.items():
+        b = base.get(key)
+        if not b:
+            continue
+        ratio = r["best_s"] / b["best_s"]
+        flag = "  << slower" if ratio > 1.2 else ("  >> faster" if ratio < 0.8 else "")
+        print(f"  {key:<48} {ratio:>6.2f}x  mem {r['peak_mb']:.2f}/{b['peak_mb']:.2f} MB{flag}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    ap.add_argument("--only", nargs="+", help="케이스 이름 필터 (예: parse_touch train_lstm)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--min-time", type=float, default=0.2, help="케이스당 최소 측정 시간(초)")
+    ap.add_argument("--no-cap", action="store_true", help="케이스별 max_rows 제한 해제")
+    ap.add_argument("--save", help="결과를 JSON 기준선으로 저장")
+    ap.add_argument("--compare", help="기준선 JSON 과 비교")
+    args = ap.parse_args()
+
+    results = run(args.sizes, set(args.only or ()), args.repeat, args.min_time, cap=not args.no_cap)
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.save:
+        import sklearn
+        import torch
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "env": {
+                    "python": platform.python_version(), "machine": platform.machine(),
+                    "cpus": os.cpu_count(), "numpy": np.__version__,
+                    "torch": torch.__version__, "sklearn": sklearn.__version__,
+                },
+                "results": results,
+            }, f, indent=1, sort_keys=True)
+        print(f"\nsaved → {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# benchmarks/bench_features.py
+# iForest 피처 추출: 행별(_extract_*_features_from_dict) vs 배치(_extract_*_features_batch) 결과 일치와 속도.
+# 합성 로그에 키 누락 / 빈 params / 문자열 숫자 / 대소문자 섞인 방향 / None 값을 섞어 비교하고,
+# FeatureBuffer.extend 가 append 를 n 번 부른 것과 같은 상태(링 + 저수지)를 만드는지,
+# RunningScaler 를 잘게 나눠 갱신/병합한 결과가 StandardScaler.fit 과 같은지도 확인한다.
+# 센서는 창 피처(sensor_features)를 창마다 따로 계산한 참조값과, 업로드를 잘게 나눠 SensorWindows 에 넣은 결과와 비교한다.
+# 원시 터치 이벤트는 gestures.assemble 결과를 이벤트 하나씩 상태 기계로 묶은 참조값과, 잘게 나눈 업로드와 비교한다.
+#
+#   python benchmarks/bench_features.py                     # 배치 50/500/5000
+#   python benchmarks/bench_features.py --batches 1 64 100000 --repeat 20
+#
+# 한 행이라도 다르면 종료 코드 1. (행별 함수가 예외를 내는 행 — duration=None 등 — 은 비교에서 뺀다.)
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from bench_detector import LOGS, main_module, new_detector
+
+
+def _perturb(params_list, rng):
+    out = []
+    for p in params_list:
+        p = dict(p)
+        r = rng.random()
+        if r < 0.05:
+            p = {}
+        elif r < 0.10:
+            p.pop(rng.choice(sorted(p)), None)
+        elif r < 0.15:
+            k = rng.choice(sorted(p))
+            p[k] = str(p[k]).upper() if k == "drag_direction" else str(p[k])
+        elif r < 0.20:
+            p[rng.choice(sorted(p))] = None
+        out.append(p)
+    return out
+
+
+def _rowwise(fn, params_list):
+    rows, ok = [], []
+    for p in params_list:
+        try:
+            rows.append(fn(p))
+            ok.append(True)
+        except (TypeError, ValueError):
+            ok.append(False)
+    return rows, np.array(ok, dtype=bool)
+
+
+def _median_ms(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e3
+
+
+def check_buffer(m, rng) -> int:
+    mismatches = 0
+    for capacity, reservoir, block in ((1000, 200, 1), (64, 16, 20), (10, 50, 1)):
+        a = m.FeatureBuffer(["a", "b", "c"], capacity, reservoir, block, seed=7)
+        b = m.FeatureBuffer(["a", "b", "c"], capacity, reservoir, block, seed=7)
+        for _ in range(50):
+            rows = rng.normal(size=(int(rng.integers(0, 200)), 3))
+            for row in rows:
+                a.append(row)
+            b.extend(rows)
+        if not (a.seen == b.seen and np.array_equal(a.recent(), b.recent())
+                and np.array_equal(a.reservoir_sample(), b.reservoir_sample())):
+            mismatches += 1
+            print(f"  MISMATCH FeatureBuffer.extend capacity={capacity} reservoir={reservoir} block={block}")
+    return mismatches
+
+
+def check_scaler(m, rng) -> int:
+    from sklearn.preprocessing import StandardScaler
+    mismatches = 0
+    for n, d in ((1, 3), (999, 9), (20000, 34)):
+        X = rng.normal(rng.uniform(-1e3, 1e3, d), rng.uniform(0.1, 1e3, d), size=(n, d))
+        X[rng.random(X.shape) < 0.03] = np.nan
+        X[:, 0] = 5.0  # 분산 0 열
+        chunks = np.array_split(X, 17)
+        a, b = m.RunningScaler(d), m.RunningScaler(d)
+        for chunk in chunks[:8]:
+            a.partial_fit(chunk)
+        for chunk in chunks[8:]:
+            b.partial_fit(chunk)
+        ref, got = StandardScaler().fit(X), a.merge(b).standard_scaler()
+        sample = X[:100]
+        if not all(np.allclose(getattr(ref, k), getattr(got, k), rtol=1e-9, atol=1e-9, equal_nan=True)
+                   for k in ("mean_", "var_", "scale_")) or \
+                not np.allclose(ref.transform(sample), got.transform(sample), equal_nan=True):
+            mismatches += 1
+            print(f"  MISMATCH RunningScaler n={n} d={d}")
+    return mismatches
+
+
+def _window_reference(sf, frames, window, hop, hz):
+    # window_features 를 창 하나씩 직접 계산한 값 (벡터화 결과 검증용)
+    edges = list(sf.BAND_EDGES_HZ) + [np.inf]
+    rows = []
+    for start in range(0, len(frames) - window + 1, hop):
+        w = frames[start:start + window]
+        row = [f(w[:, c]) for c in range(w.shape[1]) for f in (np.mean, np.std, lambda v: np.mean(v * v))]
+        row += [np.abs(np.diff(w[:, c])).mean() * hz for c in sf._SPECTRAL]
+        freqs = np.fft.rfftfreq(window, d=1.0 / hz)
+        for c in sf._SPECTRAL:
+            power = np.abs(np.fft.rfft(w[:, c] - w[:, c].mean())) ** 2 / window
+            row += [power[(freqs >= lo) & (freqs < hi)].sum() for lo, hi in zip(edges[:-1], edges[1:])]
+        rows.append(row)
+    return np.array(rows).reshape(-1, len(sf.WINDOW_FEATURES))
+
+
+def check_windows(m, rng, repeat: int) -> int:
+    sf = m.sensor_features
+    mismatches = 0
+    print(f"{'window':>7}{'hop':>5}{'frames':>8}{'windows':>9}{'loop ms':>10}{'numpy ms':>10}{'speedup':>9}")
+    for window, hop in ((50, 50), (50, 25), (16, 5)):
+        frames = rng.normal(size=(5003, len(m.sensor_fusion.FUSED_COLUMNS)))
+        X = sf.window_features(frames, window, hop)
+        ref = _window_reference(sf, frames, window, hop, sf.SENSOR_HZ)
+        stream = sf.SensorWindows(window, hop)
+        parts = [stream.push("k", chunk)[0] for chunk in np.array_split(frames, 41)]
+        if not (np.allclose(X, ref, rtol=1e-9, atol=1e-9) and np.array_equal(np.vstack(parts), X)):
+            mismatches += 1
+            print(f"  MISMATCH window features window={window} hop={hop}")
+        t_loop = _median_ms(lambda: _window_reference(sf, frames, window, hop, sf.SENSOR_HZ), max(1, repeat // 5))
+        t_np = _median_ms(lambda: sf.window_features(frames, window, hop), repeat)
+        print(f"{window:>7}{hop:>5}{len(frames):>8}{len(X):>9}{t_loop:>10.3f}{t_np:>10.3f}{t_loop / t_np:>8.1f}x",
+              flush=True)
+    return mismatches
+
+
+def _raw_touch_events(n_gestures, rng, n_sessions=7):
+    # 세션이 섞인 down/move/up 스트림. 탭, cancel, up 없이 다음 down, 짝 없는 move 도 섞는다.
+    events = []
+    for s in range(n_sessions):
+        t = 0.0
+        for _ in range(n_gestures // n_sessions):
+            x, y = rng.uniform(0, 1000, 2)
+            kind = rng.random()
+            events.append((s, t, 0, x, y))
+            for _ in range(0 if kind < 0.1 else int(rng.integers(1, 40))):
+                t += 16
+                x, y = x + rng.normal(6, 4), y + rng.normal(0, 4)
+                events.append((s, t, 1, x, y))
+            t += 16
+            if kind > 0.05:
+                events.append((s, t, 3 if kind > 0.95 else 2, x, y))
+            if kind > 0.9:
+                events.append((s, t + 1, 1, x, y))
+            t += float(rng.integers(50, 500))
+    events.sort(key=lambda e: (e[1], e[0]))
+    keys = [("u", e[0]) for e in events]
+    ts, phases, x, y = (np.array([e[i] for e in events]) for i in (1, 2, 3, 4))
+    return keys, ts, phases.astype(np.int64), x, y
+
+
+def _gesture_reference(g, keys, ts, phases, x, y):
+    # 이벤트를 하나씩 보는 상태 기계 (assemble 검증용): 닫은 up 위치 → (total, path, straightness, moves, duration)
+    out, open_ = {}, {}
+    for i in np.argsort(ts, kind="stable"):
+        k, ph = keys[i], phases[i]
+        if ph == g.DOWN:
+            open_[k] = [i]
+        elif k in open_:
+            open_[k].append(i)
+            if ph == g.CANCEL:
+                del open_[k]
+            elif ph == g.UP:
+                pts = open_.pop(k)
+                P = np.column_stack([x[pts], y[pts]])
+                path = float(np.hypot(*np.diff(P, axis=0).T).sum())
+                if np.hypot(*(P - P[0]).T).max() >= g.DRAG_MIN_DISTANCE:
+                    total = float(np.hypot(*(P[-1] - P[0])))
+                    out[i] = (total, path, total / path if path > 0 else 1.0,
+                              sum(phases[j] == g.MOVE for j in pts), ts[i] - ts[pts[0]])
+    return out
+
+
+def check_gestures(m, rng, repeat: int) -> int:
+    g = m.gestures
+    mismatches = 0
+    print(f"{'gestures':>9}{'events':>8}{'drags':>7}{'loop ms':>10}{'numpy ms':>10}{'speedup':>9}")
+    for n in (50, 500, 5000):
+        keys, ts, phases, x, y = _raw_touch_events(n, rng)
+        d = g.assemble(keys, ts, phases, x, y)
+        ref = _gesture_reference(g, keys, ts, phases, x, y)
+        cols = d.columns
+        got = {int(i): (cols["total_distance"][k], cols["path_length"][k], cols["straightness"][k],
+                        cols["move_count"][k], cols["duration"][k]) for k, i in enumerate(d.closed_at)}
+        stream = g.GestureAssembler(max_points=10 ** 9)
+        parts = [stream.push([keys[i] for i in idx], ts[idx], phases[idx], x[idx], y[idx]).closed_at + idx[0]
+                 for idx in np.array_split(np.arange(len(ts)), 23) if len(idx)]
+        if not (got.keys() == ref.keys() and all(np.allclose(got[i], ref[i]) for i in ref)
+                and np.array_equal(np.sort(np.concatenate(parts)), np.sort(d.closed_at))):
+            mismatches += 1
+            print(f"  MISMATCH gestures n={n}")
+        t_loop = _median_ms(lambda: _gesture_reference(g, keys, ts, phases, x, y), max(1, repeat // 5))
+        t_np = _median_ms(lambda: g.assemble(keys, ts, phases, x, y), repeat)
+        print(f"{n:>9}{len(ts):>8}{d.size:>7}{t_loop:>10.3f}{t_np:>10.3f}{t_loop / t_np:>8.1f}x", flush=True)
+    return mismatches
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batches", type=int, nargs="+", default=[50, 500, 5000])
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    m = main_module()
+    det = new_detector()
+    rng = np.random.default_rng(0)
+    mismatches = check_buffer(m, rng)
+    mismatches += check_scaler(m, rng)
+    mismatches += check_windows(m, rng, args.repeat)
+    mismatches += check_gestures(m, rng, args.repeat)
+
+    print(f"{'modality':<16}{'batch':>7}{'rows ok':>9}{'per-row ms':>12}{'batch ms':>10}{'speedup':>9}")
+    for modality, make_logs in LOGS.items():
+        if modality == "sensor":
+            continue  # 센서 iForest 피처는 로그별이 아니라 창 단위 (check_windows)
+        per_row = getattr(det, f"_extract_{modality}_features_from_dict")
+        batch_fn = getattr(det, f"_extract_{modality}_features_batch")
+        for n in args.batches:
+            params = _perturb([log["params"] for log in make_logs(n, rng)], rng)
+            rows, ok = _rowwise(per_row, params)
+            X = batch_fn(params)
+            ref = np.vstack(rows) if rows else X[:0]
+            if X.shape[0] != n or not np.array_equal(X[ok], ref, equal_nan=True):
+                mismatches += 1
+                print(f"  MISMATCH {modality} batch={n}")
+            clean = [log["params"] for log in make_logs(n, rng)]
+            t_row = _median_ms(lambda: [per_row(p) for p in clean], args.repeat)
+            t_batch = _median_ms(lambda: batch_fn(clean), args.repeat)
+            print(f"{modality:<16}{n:>7}{int(ok.sum()):>9}{t_row:>12.3f}{t_batch:>10.3f}{t_row / t_batch:>8.1f}x",
+                  flush=True)
+
+    print("batch features match per-row extraction" if not mismatches else f"{mismatches} mismatching runs")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
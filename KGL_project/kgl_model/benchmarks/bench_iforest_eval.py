@@ -0,0 +1,98 @@
+# benchmarks/bench_iforest_eval.py
+# iForest 채점 구현 비교: sklearn decision_function vs ForestArrays(numpy / numba).
+# 모달리티별로 검출기와 같은 설정(n_estimators=200, contamination=0.03, random_state=42)으로 학습해 model.pkl 로 저장하고,
+# 그 파일에서 ForestArrays 를 만든 뒤 배치 크기별 호출 시간과 결과 일치(비트 단위)를 확인한다.
+#
+#   python benchmarks/bench_iforest_eval.py                     # 배치 1/32/1024
+#   python benchmarks/bench_iforest_eval.py --batches 1 8 64 4096 --repeat 50
+#
+# 결과가 sklearn 과 한 비트라도 다르면 종료 코드 1.
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from bench_detector import LOGS, iforest_logs, iforest_rows, main_module
+
+import forest_arrays
+from forest_arrays import ForestArrays
+
+
+def _timed(fn: Callable, repeat: int) -> Dict[str, float]:
+    fn()  # 워밍업 (numba 는 첫 호출에서 컴파일)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best_ms": min(times) * 1e3, "median_ms": statistics.median(times) * 1e3}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batches", type=int, nargs="+", default=[1, 32, 1024])
+    ap.add_argument("--train-rows", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--only", nargs="*", help="modalities to run")
+    args = ap.parse_args()
+
+    m = main_module()
+    det = m.AnomalyDetector(model_path=tempfile.mkdtemp(prefix="kgl-bench-"))
+    workdir = tempfile.mkdtemp(prefix="kgl-forest-")
+    mismatches = 0
+
+    backends = ["numpy"] + (["numba"] if forest_arrays.numba is not None else [])
+    print(f"backends: {', '.join(backends)}" + ("" if forest_arrays.numba else "  (numba not installed)"))
+    print(f"{'modality':<16}{'batch':>7}{'sklearn ms':>12}" + "".join(f"{b + ' ms':>12}{'speedup':>9}" for b in backends))
+
+    for modality in LOGS:
+        if args.only and modality not in args.only:
+            continue
+        rng = np.random.default_rng(0)
+        X = iforest_rows(det, modality, iforest_logs(modality, args.train_rows, rng))
+        scaler = StandardScaler().fit(X)
+        model = IsolationForest(n_estimators=det.n_estimators, contamination=det.contamination, random_state=42)
+        model.fit(scaler.transform(X))
+        path = os.path.join(workdir, f"{modality}-model.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(model, f)
+
+        forests = {}
+        for backend in backends:
+            forest = ForestArrays.from_model_file(path)
+            forest.backend = backend
+            forests[backend] = forest
+
+        for batch in args.batches:
+            # 학습 분포 밖 값도 섞이도록 새 로그를 뽑고 일부 행은 크게 흔든다.
+            Q = iforest_rows(det, modality, iforest_logs(modality, batch, rng))[:batch]
+            Q[::7] *= 3.0
+            Qs = scaler.transform(Q)
+            ref = model.decision_function(Qs)
+            row = f"{modality:<16}{batch:>7}"
+            base = _timed(lambda: model.decision_function(Qs), args.repeat)["median_ms"]
+            row += f"{base:>12.3f}"
+            for backend, forest in forests.items():
+                out = forest.decision_function(Qs)
+                if not np.array_equal(out, ref):
+                    mismatches += 1
+                    print(f"  MISMATCH {modality} batch={batch} backend={backend}: "
+                          f"max |diff|={np.max(np.abs(out - ref)):.3e}")
+                t = _timed(lambda: forest.decision_function(Qs), args.repeat)["median_ms"]
+                row += f"{t:>12.3f}{base / t:>8.1f}x"
+            print(row, flush=True)
+
+    print("all outputs bit-identical to sklearn" if not mismatches else f"{mismatches} mismatching runs")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# benchmarks/bench_startup.py
+# ML 서버 콜드 스타트 측정: KGL_WARMUP=eager / background / lazy 별로 새 프로세스에서
+#   import main 시간, 첫 /healthz, 첫 /predict_hybrid(3개 모달리티) 지연, /readyz 가 200 이 될 때까지 시간, 두 번째 요청 지연
+# 을 잰다. 모델 파일(iForest pickle + LSTM 체크포인트)이 모두 있는 상태에서 시작한다.
+#
+#   python benchmarks/bench_startup.py                 # 모드별 1회
+#   python benchmarks/bench_startup.py --repeat 3 --modes eager lazy
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from bench_detector import LOGS, MODEL_DIR, _features, iforest_logs, lstm_logs, main_module
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 자식 프로세스: cwd(모델이 있는 디렉터리)에서 main 을 import 하고 ASGI 로 직접 요청한다.
+CHILD = r"""
+import asyncio, json, sys, time
+t_start = time.perf_counter()
+sys.path[:0] = [{model_dir!r}, {bench_dir!r}]
+import main
+t_import = time.perf_counter() - t_start
+import httpx
+import numpy as np
+from bench_detector import LOGS
+
+async def run():
+    rng = np.random.default_rng(0)
+    body = [log for make in LOGS.values() for log in make(20, rng)]
+    out = {{"import_s": t_import}}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://ml") as c:
+        t0 = time.perf_counter()
+        r = await c.get("/healthz")
+        out["healthz_ms"] = (time.perf_counter() - t0) * 1e3
+        r = await c.get("/readyz")
+        out["ready_at_import"] = r.status_code == 200
+        t0 = time.perf_counter()
+        r = await c.post("/predict_hybrid", json=body)
+        assert r.status_code == 200, r.text
+        out["first_request_ms"] = (time.perf_counter() - t0) * 1e3
+        while (await c.get("/readyz")).status_code != 200:
+            await asyncio.sleep(0.01)
+        out["ready_s"] = time.perf_counter() - t_start
+        t0 = time.perf_counter()
+        r = await c.post("/predict_hybrid", json=body)
+        out["second_request_ms"] = (time.perf_counter() - t0) * 1e3
+        out["modes"] = {{m: [main.detector.iforest_modes[m], main.detector.lstm_modes[m]] for m in main.detector.modalities}}
+    print(json.dumps(out))
+
+asyncio.run(run())
+"""
+
+
+def prepare_models(n_train: int) -> str:
+    """모든 모달리티의 iForest/LSTM 을 학습해 <dir>/models 에 저장하고 dir 를 돌려준다."""
+    main = main_module()
+    workdir = tempfile.mkdtemp(prefix="kgl-startup-")
+    det = main.AnomalyDetector(model_path=workdir, initial_samples={m: n_train for m in LOGS})
+    rng = np.random.default_rng(1)
+    for modality in LOGS:
+        if modality == "sensor":
+            # 센서는 업로드 단위로 융합/창 단계를 거쳐 LSTM(프레임)과 iForest(창)에 함께 들어간다.
+            logs = iforest_logs(modality, n_train, rng)
+            for i in range(0, len(logs), 500):
+                det.observe_sensor_samples(*main.sensor_fusion.samples_from_logs(logs[i:i + 500]))
+            continue
+        for log in lstm_logs(modality, n_train, rng):
+            det.observe_and_maybe_train_lstm(modality, log)
+            det.observe_and_maybe_train(modality, _features(det, modality, log["params"]))
+        assert det.iforest_modes[modality] == det.lstm_modes[modality] == "inference", modality
+    return workdir
+
+
+def run_child(workdir: str, mode: str) -> dict:
+    env = {**os.environ, "KGL_WARMUP": mode, "KGL_SNAPSHOT_SECONDS": "0", "KGL_BATCHING": "0"}
+    code = CHILD.format(model_dir=MODEL_DIR, bench_dir=BENCH_DIR)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} child failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modes", nargs="+", default=["eager", "background", "lazy"])
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--train-rows", type=int, default=500)
+    args = ap.parse_args()
+
+    workdir = prepare_models(args.train_rows)
+    print(f"models: {workdir}/models")
+    print(f"{'mode':<12}{'import s':>10}{'healthz ms':>12}{'1st req ms':>12}{'ready s':>10}{'2nd req ms':>12}")
+    for mode in args.modes:
+        runs = [run_child(workdir, mode) for _ in range(args.repeat)]
+        med = {k: statistics.median(r[k] for r in runs)
+               for k in ("import_s", "healthz_ms", "first_request_ms", "ready_s", "second_request_ms")}
+        print(f"{mode:<12}{med['import_s']:>10.2f}{med['healthz_ms']:>12.1f}{med['first_request_ms']:>12.1f}"
+              f"{med['ready_s']:>10.2f}{med['second_request_ms']:>12.1f}", flush=True)
+        not_ready = {m: v for m, v in runs[-1]["modes"].items() if v != ["inference", "inference"]}
+        if not_ready:
+            print(f"  not in inference after warm-up: {not_ready}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
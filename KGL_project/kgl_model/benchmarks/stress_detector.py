@@ -0,0 +1,176 @@
+# benchmarks/stress_detector.py
+# 검출기 동시성 스트레스: 여러 스레드가 /predict_hybrid 채점 경로(_score_hybrid_logs)를 동시에 두드리는 동안
+# 작은 initial_samples / lstm_retrain_interval 과 별도 트레이너 스레드로 iForest·LSTM 재학습을 계속 일으킨다.
+#
+#   python benchmarks/stress_detector.py                                  # 8 스레드 × 25 요청
+#   python benchmarks/stress_detector.py --threads 16 --requests 200 --retrain-interval 300
+#
+# 검사 항목 (하나라도 어기면 종료 코드 1):
+#   - 요청마다 결과가 입력과 같은 길이/순서이고 modality·sequence_index 가 맞으며 점수가 유한한지
+#   - 검출기 로그에 ERROR 가 없는지 (deque 동시 순회, 스케일러/모델 차원 불일치 같은 경합은 여기서 드러난다)
+#   - 버퍼에 붙은 행 수 == 관찰한 행 수 (센서는 샘플이 아니라 세션별 융합 프레임 / 창 수 — 스레드마다 따로 센서
+#     세션을 두고 같은 샘플을 새 SensorFusion/SensorWindows 에 넣어 기대값을 센다), lstm_since_retrain 이 음수가
+#     아니고 주기를 크게 넘지 않는지
+#   - 게시된 스냅샷의 스케일러와 모델 피처 수가 서로 맞는지
+import argparse
+import logging
+import math
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from bench_detector import LOGS, main_module
+
+ROWS = {"sensor": 20, "touch_drag": 5, "touch_pressure": 5}
+SENSOR_STEP_MS = 20  # bench_detector.sensor_logs 의 가속도계/자이로 한 쌍 간격
+
+
+class _ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.records: List[str] = []
+
+    def emit(self, record):
+        self.records.append(record.getMessage())
+
+
+def _request(rng, worker: int, k: int) -> List[dict]:
+    # 센서 세션은 스레드마다 하나이고 요청마다 시각이 이어진다 (같은 시각을 다시 보내면 융합이 중복으로 버린다).
+    span = (ROWS["sensor"] // 2) * SENSOR_STEP_MS
+    logs = []
+    for modality, n in ROWS.items():
+        for log in LOGS[modality](n, rng):
+            log["user_id"] = log["session_id"] = f"stress-{worker}"
+            log["sequence_index"] = k * 1000 + len(logs)
+            if modality == "sensor":
+                log["params"]["timestamp"] += k * span
+            logs.append(log)
+    logs.append({**logs[0], "action_type": "unknown_action", "sequence_index": k * 1000 + len(logs)})
+    return logs
+
+
+def _check(m, logs, results, problems):
+    if len(results) != len(logs):
+        problems.append(f"result length {len(results)} != {len(logs)}")
+        return
+    for log, res in zip(logs, results):
+        modality = m._infer_modality(log["action_type"])
+        if modality not in ROWS:
+            if res is not None:
+                problems.append(f"unknown action got a result: {res}")
+            continue
+        if res is None or res["modality"] != modality or res["sequence_index"] != log["sequence_index"]:
+            problems.append(f"misaligned result for {modality}#{log['sequence_index']}: {res}")
+            continue
+        for key in ("anomaly_score_iforest", "anomaly_score_lstm", "anomaly_score_combined"):
+            if not math.isfinite(res[key]):
+                problems.append(f"non-finite {key} for {modality}: {res[key]}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=25, help="requests per scoring thread")
+    ap.add_argument("--initial-samples", type=int, default=200)
+    ap.add_argument("--retrain-interval", type=int, default=150, help="LSTM periodic retrain interval (rows)")
+    ap.add_argument("--n-estimators", type=int, default=50)
+    args = ap.parse_args()
+
+    m = main_module()
+    det = m.AnomalyDetector(model_path=tempfile.mkdtemp(prefix="kgl-stress-"),
+                            initial_samples={k: args.initial_samples for k in ROWS},
+                            n_estimators=args.n_estimators)
+    det.lstm_retrain_interval = args.retrain_interval
+    m.detector = det  # _score_hybrid_logs 는 모듈 전역 detector 를 쓴다
+
+    errors = _ErrorCounter()
+    m.logger.addHandler(errors)
+    problems: List[str] = []
+    # 모달리티별로 iForest 버퍼(recent_data) / LSTM 버퍼(lstm_rows) 에 붙어야 할 행 수
+    observed: Dict[str, int] = {k: 0 for k in ROWS}
+    observed_lstm: Dict[str, int] = {k: 0 for k in ROWS}
+    observed_lock = threading.Lock()
+    done = threading.Event()
+    trainer_runs = [0]
+
+    def worker(i: int):
+        rng = np.random.default_rng(i)
+        local: List[str] = []
+        fusion, windows = m.sensor_fusion.SensorFusion(), m.sensor_features.SensorWindows()
+        frames = n_windows = 0
+        for k in range(args.requests):
+            logs = _request(rng, i, k)
+            keys, ts, kinds, xyz = m.sensor_fusion.samples_from_logs(
+                [log for log in logs if m._infer_modality(log["action_type"]) == "sensor"])
+            _, f = fusion.push(keys[0], ts, kinds, xyz)
+            frames += len(f)
+            n_windows += len(windows.push(keys[0], f)[0])
+            try:
+                results = m._score_hybrid_logs(logs, "stress")
+            except Exception as e:
+                local.append(f"worker {i} raised {type(e).__name__}: {e}")
+                continue
+            _check(m, logs, results, local)
+        with observed_lock:
+            for modality, n in ROWS.items():
+                sensor = modality == "sensor"
+                observed[modality] += n_windows if sensor else n * args.requests
+                observed_lstm[modality] += frames if sensor else n * args.requests
+            problems.extend(local)
+
+    def trainer():
+        # 채점 도중 iForest 스냅샷이 계속 교체되도록 학습 가능한 모달리티를 돌아가며 재학습한다.
+        while not done.is_set():
+            for modality in ROWS:
+                if det.recent_data[modality].seen >= args.initial_samples:
+                    det._train_once("iforest", modality, lambda: True, det._train_iforest_model)
+                    trainer_runs[0] += 1
+            time.sleep(0.1)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    trainer_thread = threading.Thread(target=trainer)
+    t0 = time.perf_counter()
+    trainer_thread.start()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    done.set()
+    trainer_thread.join()
+    elapsed = time.perf_counter() - t0
+
+    for modality in ROWS:
+        if det.recent_data[modality].seen != observed[modality]:
+            problems.append(f"{modality}: recent_data saw {det.recent_data[modality].seen}, observed {observed[modality]}")
+        if det.lstm_rows[modality].seen != observed_lstm[modality]:
+            problems.append(f"{modality}: lstm_rows saw {det.lstm_rows[modality].seen}, "
+                            f"observed {observed_lstm[modality]}")
+        since = det.lstm_since_retrain[modality]
+        if since < 0 or since > args.retrain_interval + args.threads * sum(ROWS.values()):
+            problems.append(f"{modality}: lstm_since_retrain out of range: {since}")
+        snap = det.iforest_live[modality]
+        if snap is not None and snap.scaler.n_features_in_ != snap.model.n_features_in_:
+            problems.append(f"{modality}: iForest snapshot scaler/model feature mismatch")
+        lsnap = det.lstm_live[modality]
+        if lsnap is not None and lsnap.scaler.n_features_in_ != len(lsnap.features):
+            problems.append(f"{modality}: LSTM snapshot scaler/features mismatch")
+
+    retrains = {kind: int(sum(c.value for key, c in m.RETRAIN_TOTAL._children.items() if key[0] == kind))
+                for kind in ("iforest", "lstm")}
+    rows = args.threads * args.requests * (sum(ROWS.values()) + 1)
+    print(f"threads={args.threads} requests={args.threads * args.requests} rows={rows} "
+          f"elapsed={elapsed:.2f}s ({rows / elapsed:.0f} rows/s)")
+    print(f"retrains: iforest={retrains['iforest']} (trainer loop {trainer_runs[0]}) lstm={retrains['lstm']}")
+    print(f"modes: iforest={det.iforest_modes} lstm={det.lstm_modes}")
+    print(f"logged errors: {len(errors.records)}  consistency problems: {len(problems)}")
+    for msg in (errors.records + problems)[:20]:
+        print(f"  - {msg}")
+    return 1 if (errors.records or problems) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
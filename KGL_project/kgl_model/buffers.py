@@ -0,0 +1,125 @@
+# buffers.py
+# 학습 버퍼: 숫자 피처 열만 미리 할당한 float32 배열에 담는다 (로그 dict / 행마다의 ndarray 를 들고 있지 않는다).
+#
+#   buf = FeatureBuffer(["x", "y", "z"], capacity=20000, reservoir=20000)
+#   buf.append(row)              # 링 버퍼(최근 capacity 행) + 저수지 표본에 동시에 반영
+#   buf.extend(rows)             # (n, n_cols) 를 한 번에. append 를 n 번 부른 것과 같은 상태가 된다
+#   buf.recent(500)              # 최근 500행 (시간 순서, 복사본)
+#   buf.recent(500, end=seen0)   # 절대 위치 seen0(그때의 buf.seen) 직전까지의 500행 — 그 뒤에 붙은 행은 빠진다
+#   buf.reservoir_sample()       # 지금까지 본 전체 스트림에서 균등 추출한 고정 크기 표본 (k, block, n_cols)
+#   buf.seen, len(buf), buf.nbytes
+#   buf.load_state(other.state())   # 웜 재시작 스냅샷 (ndarray dict). 크기가 바뀌었으면 들어가는 만큼만 옮긴다.
+#
+# 저수지는 Algorithm R 이다: 처음 reservoir 개 항목은 그대로 담고, t 번째 항목은 reservoir/t 확률로 임의 슬롯을 덮어쓴다.
+# block > 1 이면 연속된 block 행(겹치지 않게 자른 구간)을 한 항목으로 뽑으므로 LSTM 시퀀스를 그대로 보존한다.
+# 스레드 안전하지 않다 — 호출자(AnomalyDetector)가 모달리티별 버퍼 락을 잡고 부른다.
+import random
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class FeatureBuffer:
+    def __init__(self, columns: Sequence[str], capacity: int, reservoir: int = 0, block: int = 1,
+                 seed: Optional[int] = 0):
+        self.columns = list(columns)
+        self.capacity = max(1, int(capacity))
+        self.block = max(1, int(block))
+        self.ring = np.zeros((self.capacity, len(self.columns)), dtype=np.float32)
+        self.reservoir = np.zeros((max(0, int(reservoir)), self.block, len(self.columns)), dtype=np.float32)
+        self.seen = 0
+        self.held = 0
+        self.blocks_seen = 0
+        self._rng = random.Random(seed)
+
+    def __len__(self):
+        return self.held
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.ring.nbytes + self.reservoir.nbytes)
+
+    def last(self) -> Optional[np.ndarray]:
+        if self.seen == 0:
+            return None
+        return self.ring[(self.seen - 1) % self.capacity]
+
+    def append(self, row) -> int:
+        self.ring[self.seen % self.capacity] = row
+        self.seen += 1
+        self.held = min(self.held + 1, self.capacity)
+        if len(self.reservoir) and self.seen % self.block == 0 and self.capacity >= self.block:
+            t = self.blocks_seen
+            self.blocks_seen += 1
+            slot = t if t < len(self.reservoir) else self._rng.randrange(t + 1)
+            if slot < len(self.reservoir):
+                self.reservoir[slot] = self.recent(self.block)
+        return self.seen
+
+    def extend(self, rows) -> int:
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, len(self.columns))
+        n = len(rows)
+        if n == 0:
+            return self.seen
+        start = self.seen
+        if len(self.reservoir) and self.capacity >= self.block:
+            # 이번에 완성되는 블록마다 Algorithm R 한 단계 (append 와 같은 난수 순서). 블록은 이전 행에 걸칠 수 있다.
+            stream = np.concatenate([self.recent(self.block - 1), rows]) if self.block > 1 else rows
+            offset = len(stream) - n
+            first = -(-(start + 1) // self.block) * self.block
+            for end in range(first, start + n + 1, self.block):
+                t = self.blocks_seen
+                self.blocks_seen += 1
+                slot = t if t < len(self.reservoir) else self._rng.randrange(t + 1)
+                if slot < len(self.reservoir):
+                    e = end - start + offset
+                    self.reservoir[slot] = stream[e - self.block:e]
+        tail = rows[-self.capacity:]
+        self.ring[(start + n - len(tail) + np.arange(len(tail))) % self.capacity] = tail
+        self.seen += n
+        self.held = min(self.held + n, self.capacity)
+        return self.seen
+
+    def recent(self, n: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        # end 이후에 붙은 행 수만큼 링에서 밀려난 행은 돌려줄 수 없다 → 그만큼 덜 돌려준다.
+        end = self.seen if end is None else min(int(end), self.seen)
+        held = max(0, len(self) - (self.seen - end))
+        n = held if n is None else max(0, min(int(n), held))
+        end = end % self.capacity
+        start = end - n
+        if start >= 0:
+            return self.ring[start:end].copy()
+        return np.concatenate([self.ring[start:], self.ring[:end]])
+
+    def reservoir_sample(self) -> np.ndarray:
+        return self.reservoir[:min(self.blocks_seen, len(self.reservoir))].copy()
+
+    def state(self):
+        return {
+            "ring": self.recent(),
+            "reservoir": self.reservoir_sample(),
+            "counts": np.array([self.seen, self.blocks_seen], dtype=np.int64),
+        }
+
+    def load_state(self, state):
+        ring, reservoir = np.asarray(state["ring"]), np.asarray(state["reservoir"])
+        seen, blocks_seen = (int(v) for v in state["counts"])
+        if ring.ndim != 2 or ring.shape[1] != len(self.columns):
+            raise ValueError(f"buffer has {len(self.columns)} columns, snapshot has shape {ring.shape}")
+        # 링은 시간 순서로 저장돼 있다 → 최근 capacity 행을 seen 기준 위치에 다시 놓는다.
+        rows = ring[-self.capacity:]
+        self.ring[(seen - len(rows) + np.arange(len(rows))) % self.capacity] = rows
+        self.seen = seen
+        self.held = len(rows)
+        self.blocks_seen = 0
+        if reservoir.ndim == 3 and reservoir.shape[1:] == self.reservoir.shape[1:]:
+            k = min(len(reservoir), len(self.reservoir))
+            self.reservoir[:k] = reservoir[:k]
+            # 균등 표본의 부분집합도 균등 표본이므로 줄어든 경우엔 blocks_seen 을 그대로 둔다.
+            # 커졌는데 빈 슬롯이 남으면 지금 가진 k 개를 처음 k 개로 보고 다시 채워 나간다.
+            self.blocks_seen = blocks_seen if (k == len(self.reservoir) or blocks_seen == k) else k
+
+    def clear(self):
+        self.seen = 0
+        self.held = 0
+        self.blocks_seen = 0
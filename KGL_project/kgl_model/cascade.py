@@ -0,0 +1,144 @@
+# cascade.py
+# 싼 모델 먼저(cascade) 채점: 1단계가 모든 행을 채점하고, 비싼 LSTM 오토인코더(2단계)는 1단계가 애매하다고 본 행과
+# 보정용 무작위 표본에만 돌린다. 결합 판정이 OR 이므로 1단계가 이미 이상으로 본 행은 LSTM 결과와 상관없이 이상이다.
+# 하지만 1단계가 "확실히 정상"으로 본 행은 LSTM 이 이상으로 잡을 수 있었던 행이고, 건너뛰면 그 행은 결합 판정에서도
+# 정상으로 남는다 — 이것이 재현율을 내주고 LSTM 시간을 버는 trade-off 다 (1단계가 놓치고 LSTM 만 잡는 이상은 놓친다).
+# BAND/Z 를 넓힐수록 재현율은 off 에 가까워지고 절약은 줄어든다. 합성 로그에서 touch F1 은 off 0.98, iforest
+# BAND 0.2 에서 0.95, 0.05 에서 0.63 이었다 — 켜기 전에 benchmarks/bench_cascade.py 로 실제 로그에서 확인할 것.
+#
+#   KGL_CASCADE=off            off(기본) = 모든 행에 LSTM (이전 동작)
+#                              iforest   = iForest 점수로 거른다 (어차피 계산하는 점수라 1단계 비용이 0)
+#                              ewma      = (모달리티, 사용자)별 EWMA z-점수(iForest 입력 피처)로 거른다
+#   KGL_CASCADE_BAND=0.1       iforest: 임계값은 안 넘었지만 점수가 실시간 점수 분포의 하위 BAND 분위수 이하인 행
+#   KGL_CASCADE_Z=3.0          ewma: 열별 |x - 평균| / 표준편차 의 최대가 이 값 이상인 행
+#   KGL_CASCADE_EWMA_ALPHA=0.05, KGL_CASCADE_EWMA_WARMUP=20   (사용자별 행 수가 WARMUP 미만이면 LSTM 으로 넘긴다)
+#   KGL_CASCADE_SAMPLE=0.02    나머지 행 중 이 비율은 무작위로 LSTM 에 넘긴다. LSTM 점수 스케치(재보정, 드리프트)는
+#                              이 표본만 받는다 — 걸러진 행만 넣으면 오차 분포가 한쪽으로 치우친다.
+#
+#   cas = Cascade()
+#   sel = cas.select_iforest(scores, flagged, upper, scored)   # CascadeSelection(need, sampled)
+#   sel = cas.select_ewma(keys, X, row_of)                      # 결과 행 → X 행 (센서 샘플 → 창)
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+import sensor_fusion
+
+CASCADE_MODES = ("off", "iforest", "ewma")
+CASCADE = os.environ.get("KGL_CASCADE", "off").lower()
+CASCADE_BAND = float(os.environ.get("KGL_CASCADE_BAND", "0.1"))
+CASCADE_Z = float(os.environ.get("KGL_CASCADE_Z", "3.0"))
+CASCADE_EWMA_ALPHA = float(os.environ.get("KGL_CASCADE_EWMA_ALPHA", "0.05"))
+CASCADE_EWMA_WARMUP = int(os.environ.get("KGL_CASCADE_EWMA_WARMUP", "20"))
+CASCADE_SAMPLE = float(os.environ.get("KGL_CASCADE_SAMPLE", "0.02"))
+
+
+class CascadeSelection(NamedTuple):
+    need: np.ndarray     # (n,) bool — LSTM 으로 넘길 행 (sampled 포함)
+    sampled: np.ndarray  # (n,) bool — 그중 보정용 무작위 표본
+
+
+class _User:
+    __slots__ = ("n", "m1", "m2", "touched")
+
+    def __init__(self):
+        self.n = 0
+        self.m1 = self.m2 = None
+        self.touched = 0.0
+
+
+class EwmaZ:
+    """사용자별 지수가중 평균/분산으로 본 z-점수. 한 번에 들어온 같은 사용자 행은 배치 전 상태로 채점한 뒤
+    배치 전체를 닫힌 식으로 반영한다 (행마다 순차 갱신한 것과 같은 1·2차 모멘트)."""
+
+    def __init__(self, alpha: float = CASCADE_EWMA_ALPHA, warmup: int = CASCADE_EWMA_WARMUP,
+                 max_users: int = sensor_fusion.SENSOR_MAX_SESSIONS,
+                 idle_seconds: float = sensor_fusion.SENSOR_IDLE_SECONDS):
+        self.alpha = alpha
+        self.warmup = warmup
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self.users: "OrderedDict[Hashable, _User]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.users)
+
+    def push(self, keys: Sequence[Hashable], X) -> np.ndarray:
+        """행별 z (n,). 아직 WARMUP 행을 못 본 사용자의 행은 NaN."""
+        X = np.asarray(X, dtype=np.float64)
+        X = np.where(np.isnan(X), 0.0, X.reshape(len(X), -1))
+        z = np.full(len(X), np.nan)
+        groups = {}
+        for i, k in enumerate(keys):
+            groups.setdefault(k, []).append(i)
+        a = self.alpha
+        with self._lock:
+            for key, idx in groups.items():
+                u = sensor_fusion.lru_session(self.users, key, _User, self.max_users, self.idle_seconds)
+                rows, k = X[idx], len(idx)
+                if u.m1 is None:
+                    u.m1, u.m2, u.n = rows.mean(axis=0), np.square(rows).mean(axis=0), k
+                    continue
+                if u.n >= self.warmup:
+                    sd = np.sqrt(np.maximum(u.m2 - np.square(u.m1), 0.0))
+                    dev = np.abs(rows - u.m1)
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        r = np.where(sd > 0, dev / sd, np.where(dev > 0, np.inf, 0.0))
+                    z[idx] = r.max(axis=1)
+                # m ← (1-a)^k m + Σ a (1-a)^(k-1-i) x_i
+                w = a * (1.0 - a) ** np.arange(k - 1, -1, -1)
+                decay = (1.0 - a) ** k
+                u.m1 = decay * u.m1 + w @ rows
+                u.m2 = decay * u.m2 + w @ np.square(rows)
+                u.n += k
+        return z
+
+
+class Cascade:
+    def __init__(self, mode: str = CASCADE, band: float = CASCADE_BAND, z: float = CASCADE_Z,
+                 sample: float = CASCADE_SAMPLE, seed: Optional[int] = None):
+        mode = mode.lower()
+        if mode not in CASCADE_MODES:
+            raise ValueError(f"cascade mode must be one of {CASCADE_MODES}, got {mode!r}")
+        self.mode = mode
+        self.band = band
+        self.z = z
+        self.sample = sample
+        self.ewma = EwmaZ()
+        self._rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _sampled(self, n: int) -> np.ndarray:
+        with self._rng_lock:
+            return self._rng.random(n) < self.sample
+
+    def select_iforest(self, scores: np.ndarray, flagged: np.ndarray, upper: Optional[float],
+                       scored: Optional[np.ndarray] = None) -> CascadeSelection:
+        """iForest 점수(낮을수록 이상)로 거른다. upper = 실시간 점수의 BAND 분위수 (None 이면 전부 넘긴다).
+        scored 가 False 인 행(센서: 아직 창이 없는 샘플)은 1단계 점수가 없으므로 넘긴다."""
+        n = len(scores)
+        scored = np.ones(n, dtype=bool) if scored is None else scored
+        band = np.ones(n, dtype=bool) if upper is None else (~flagged & (scores <= upper))
+        sampled = self._sampled(n)
+        return CascadeSelection(~scored | band | sampled, sampled)
+
+    def select_ewma(self, keys: Sequence[Hashable], X: np.ndarray, row_of: Optional[np.ndarray] = None,
+                    ) -> CascadeSelection:
+        """X 행(사용자 keys)의 EWMA z 로 거른다. row_of 가 있으면 결과 행마다 X 행 번호 (-1 = 점수 없음 → 넘김)."""
+        z = self.ewma.push(keys, X) if len(X) else np.empty(0)
+        suspicious = np.isnan(z) | (z >= self.z)
+        if row_of is not None:
+            has = (row_of >= 0) & (row_of < len(z))
+            out = np.ones(len(row_of), dtype=bool)
+            out[has] = suspicious[row_of[has]]
+            suspicious = out
+        sampled = self._sampled(len(suspicious))
+        return CascadeSelection(suspicious | sampled, sampled)
@@ -0,0 +1,165 @@
+# columnar.py
+# Django 백엔드(behavior/columnar.py)와 공유하는 컬럼 기반 MessagePack 배치 포맷.
+#   {"v": 1, "kind": str, "n": int, "meta": {...},
+#    "columns": {name: {"dtype": "<f4", "data": bytes} | [str, ...]}}
+# /predict_columns 응답(Accept 에 MEDIA_TYPE)도 같은 포맷이다 (kind="results").
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/x-kgl-columns+msgpack"
+
+_ALLOWED_DTYPES = {"<f4", "<f8", "<i4", "<i8", "|u1", "|b1"}
+
+# 행 dict 로 풀 때 params 가 아닌 상위 필드로 올라가는 컬럼
+_ROW_FIELDS = {"seq", "ts", "timestamp", "action_type", "type", "user_id", "session_id"}
+
+
+class ColumnarFormatError(ValueError):
+    pass
+
+
+def _declared_n(value) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ColumnarFormatError(f"declared n must be an integer, got {value!r}")
+    return value
+
+
+def decode_batch(raw: bytes) -> Dict[str, Any]:
+    if msgpack is None:
+        raise ColumnarFormatError("msgpack is not installed")
+    try:
+        doc = msgpack.unpackb(raw, raw=False)
+    except Exception as e:
+        raise ColumnarFormatError(f"invalid msgpack body: {e}")
+    if not isinstance(doc, dict) or not isinstance(doc.get("columns"), dict):
+        raise ColumnarFormatError("expected a map with 'columns'")
+    if doc.get("v", FORMAT_VERSION) != FORMAT_VERSION:
+        raise ColumnarFormatError(f"unsupported format version: {doc.get('v')}")
+
+    columns: Dict[str, Any] = {}
+    for name, spec in doc["columns"].items():
+        if isinstance(spec, dict):
+            dtype = spec.get("dtype")
+            if dtype not in _ALLOWED_DTYPES:
+                raise ColumnarFormatError(f"unsupported dtype for column '{name}': {dtype}")
+            data = spec.get("data") or b""
+            if not isinstance(data, (bytes, bytearray)):
+                raise ColumnarFormatError(f"column '{name}' data must be bytes")
+            if len(data) % np.dtype(dtype).itemsize:
+                raise ColumnarFormatError(f"column '{name}' is not a multiple of {dtype}")
+            columns[name] = np.frombuffer(data, dtype=dtype)
+        elif isinstance(spec, list):
+            columns[name] = spec
+        else:
+            raise ColumnarFormatError(f"column '{name}' must be a typed array or list")
+
+    lengths = {len(c) for c in columns.values()}
+    if len(lengths) > 1:
+        raise ColumnarFormatError(f"column length mismatch: {sorted(lengths)}")
+    n = lengths.pop() if lengths else 0
+    if "n" in doc and _declared_n(doc["n"]) != n:
+        raise ColumnarFormatError(f"declared n={doc['n']} but columns have {n} rows")
+    return {
+        "kind": str(doc.get("kind") or ""),
+        "n": n,
+        "meta": doc.get("meta") or {},
+        "columns": columns,
+    }
+
+
+def numeric(columns: Dict[str, Any], name: str, n: int, fill=np.nan) -> np.ndarray:
+    """숫자 컬럼을 float64 배열로. 없는 컬럼은 fill, 문자열 리스트 컬럼은 숫자로 못 바꾸는 값을 NaN 으로."""
+    col = columns.get(name)
+    if col is None:
+        return np.full(n, fill, dtype=np.float64)
+    if isinstance(col, np.ndarray):
+        return col.astype(np.float64)
+    out = np.full(n, np.nan, dtype=np.float64)
+    for i, v in enumerate(col):
+        try:
+            out[i] = float(v)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+def select_rows(columns: Dict[str, Any], idx: np.ndarray) -> Dict[str, Any]:
+    return {k: (v[idx] if isinstance(v, np.ndarray) else [v[i] for i in idx]) for k, v in columns.items()}
+
+
+def encode_batch(kind: str, columns: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> bytes:
+    if msgpack is None:
+        raise ColumnarFormatError("msgpack is not installed")
+    lengths = {len(c) for c in columns.values()}
+    encoded = {}
+    for name, col in columns.items():
+        if isinstance(col, np.ndarray):
+            arr = np.ascontiguousarray(col)
+            if arr.dtype.str not in _ALLOWED_DTYPES:
+                arr = arr.astype("<f8" if arr.dtype.kind == "f" else "<i8")
+            encoded[name] = {"dtype": arr.dtype.str, "data": arr.tobytes()}
+        else:
+            encoded[name] = list(col)
+    return msgpack.packb({
+        "v": FORMAT_VERSION, "kind": kind, "n": lengths.pop() if lengths else 0,
+        "meta": meta or {}, "columns": encoded,
+    }, use_bin_type=True)
+
+
+def _as_list(col, n: int, default=None) -> List[Any]:
+    if col is None:
+        return [default] * n
+    if isinstance(col, np.ndarray):
+        vals = col.tolist()
+        if col.dtype.kind == "f":
+            vals = [None if v != v else v for v in vals]
+        return vals
+    return list(col)
+
+
+def _iso(ts) -> str:
+    if ts is None:
+        return ""
+    if isinstance(ts, (int, float)):
+        sec = ts / 1000.0 if ts > 10 ** 12 else float(ts)
+        return datetime.fromtimestamp(sec, tz=timezone.utc).isoformat()
+    return str(ts)
+
+
+def batch_to_logs(batch: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """/predict_hybrid 가 받는 것과 같은 모양의 로그 dict 리스트로 변환 (pydantic 검증 생략)."""
+    n, cols, meta = batch["n"], batch["columns"], batch["meta"]
+    seqs = _as_list(cols.get("seq"), n, 0)
+    ts_col = cols.get("ts", cols.get("timestamp"))
+    stamps = _as_list(ts_col, n)
+    actions = _as_list(cols.get("action_type"), n, "unknown")
+    param_names = [k for k in cols if k not in _ROW_FIELDS]
+    param_cols = [_as_list(cols[k], n) for k in param_names]
+
+    # user_id/session_id 는 보통 meta 에 한 번만 오지만, 여러 세션을 합친 배치는 행 단위 컬럼으로 온다.
+    users = _as_list(cols.get("user_id"), n, meta.get("user_id", "device-anonymous"))
+    sessions = _as_list(cols.get("session_id"), n, meta.get("session_id", "session-unknown"))
+    device_info = meta.get("device_info", {})
+    location: Optional[Dict[str, Any]] = meta.get("location")
+
+    logs = []
+    for i in range(n):
+        logs.append({
+            "user_id": users[i],
+            "session_id": sessions[i],
+            "action_type": actions[i] or "unknown",
+            "sequence_index": int(seqs[i] or 0),
+            "timestamp": _iso(stamps[i]),
+            "params": {k: c[i] for k, c in zip(param_names, param_cols)},
+            "device_info": device_info,
+            "location": location,
+        })
+    return logs
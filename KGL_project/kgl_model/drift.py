@@ -0,0 +1,193 @@
+# drift.py
+# 분포 드리프트 감시와 드리프트 기반 재학습 결정. 횟수 기준(N 건마다) 대신 입력/점수 분포가 실제로 바뀌었을 때만 재학습한다.
+#
+#   mon = DriftMonitor()
+#   mon.set_reference("features", X_train)   # 학습셋 → 열별 분위수 구간 + 기준 비율 (구간 KGL_DRIFT_BINS 개)
+#   mon.observe("features", X)               # 최근 KGL_DRIFT_WINDOW 행의 구간별 개수를 밀면서 갱신 (O(새 행 × 열))
+#   mon.stats()                              # {스트림: DriftStats(psi, ks, n)} — 열별 최대, 창이 덜 찼으면 빠짐
+#
+#   sched = RetrainScheduler()
+#   sched.decide(key, drifted)               # "retrain" / "cooldown" / "budget" / "stable"
+#   sched.spend(key, seconds)                # 실제 재학습에 쓴 시간 (예산에서 뺀다)
+#
+# PSI = Σ (p - q) ln(p / q), KS = max |CDF_p - CDF_q| 를 같은 구간 히스토그램에서 계산한다 (q = 기준, p = 최근 창).
+# 빈 구간은 KGL_DRIFT_EPS 로 채운다. 관례상 PSI 0.1 미만 = 안정, 0.25 이상 = 큰 변화.
+import os
+import threading
+import time
+import warnings
+from collections import deque
+from typing import Dict, Hashable, NamedTuple, Optional
+
+import numpy as np
+
+DRIFT_RETRAIN = os.environ.get("KGL_DRIFT_RETRAIN", "on").lower() in ("1", "on", "true", "yes")
+DRIFT_WINDOW = int(os.environ.get("KGL_DRIFT_WINDOW", "5000"))
+DRIFT_BINS = int(os.environ.get("KGL_DRIFT_BINS", "10"))
+DRIFT_MIN_ROWS = int(os.environ.get("KGL_DRIFT_MIN_ROWS", "1000"))
+DRIFT_EPS = float(os.environ.get("KGL_DRIFT_EPS", "1e-4"))
+DRIFT_PSI = float(os.environ.get("KGL_DRIFT_PSI", "0.25"))
+DRIFT_KS = float(os.environ.get("KGL_DRIFT_KS", "0.2"))
+DRIFT_CHECK_EVERY = int(os.environ.get("KGL_DRIFT_CHECK_EVERY", "1000"))
+# 같은 (모델, 모달리티) 재학습 사이 최소 간격, 그리고 KGL_DRIFT_BUDGET_WINDOW_SECONDS 동안 쓸 수 있는 재학습 시간 합계.
+DRIFT_COOLDOWN_SECONDS = float(os.environ.get("KGL_DRIFT_COOLDOWN_SECONDS", "3600"))
+DRIFT_BUDGET_SECONDS = float(os.environ.get("KGL_DRIFT_BUDGET_SECONDS", "600"))
+DRIFT_BUDGET_WINDOW_SECONDS = float(os.environ.get("KGL_DRIFT_BUDGET_WINDOW_SECONDS", "86400"))
+
+
+class DriftStats(NamedTuple):
+    psi: float
+    ks: float
+    n: int  # 창에 든 행 수
+
+    def drifted(self, psi: float = DRIFT_PSI, ks: float = DRIFT_KS) -> bool:
+        return self.psi >= psi or self.ks >= ks
+
+
+class _Stream:
+    def __init__(self, reference: np.ndarray, bins: int, window: int):
+        ref = np.asarray(reference, dtype=np.float64)
+        ref = ref.reshape(len(ref), -1)
+        self.d = ref.shape[1]
+        self.bins = bins
+        # 기준 분위수를 구간 경계로 (열마다 bins-1 개). 값이 몰려 경계가 겹치면 그 구간은 비고 옆 구간이 받는다.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # 전부 NaN 인 열 → 경계도 NaN, 값은 모두 마지막 구간
+            self.edges = np.nanquantile(ref, np.linspace(0, 1, bins + 1)[1:-1], axis=0).T.reshape(self.d, bins - 1)
+        self.ref_p = self._proportions(self._counts(self._bin(ref)), len(ref))
+        self.window = max(1, int(window))
+        self.ring = np.zeros((self.window, self.d), dtype=np.int16)
+        self.counts = np.zeros((self.d, bins), dtype=np.int64)
+        self.seen = 0
+
+    def _bin(self, X: np.ndarray) -> np.ndarray:
+        # NaN 은 마지막 구간 (searchsorted 에서 NaN 은 가장 큰 값으로 정렬된다).
+        return np.column_stack([np.searchsorted(self.edges[j], X[:, j], side="right") for j in range(self.d)]
+                               ).astype(np.int16).reshape(len(X), self.d)
+
+    def _counts(self, b: np.ndarray) -> np.ndarray:
+        flat = (np.arange(self.d) * self.bins + b).ravel()
+        return np.bincount(flat, minlength=self.d * self.bins).reshape(self.d, self.bins)
+
+    @staticmethod
+    def _proportions(counts: np.ndarray, n: int) -> np.ndarray:
+        bins = counts.shape[1]
+        return (counts + DRIFT_EPS) / (max(n, 0) + DRIFT_EPS * bins)
+
+    def push(self, X: np.ndarray):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.d)[-self.window:]
+        n = len(X)
+        if n == 0:
+            return
+        b = self._bin(X)
+        idx = self.seen + np.arange(n)
+        pos = idx % self.window
+        # 이미 한 바퀴 돈 자리는 창에서 밀려나는 가장 오래된 행이다 → 그 개수를 먼저 뺀다.
+        evict = pos[idx >= self.window]
+        if len(evict):
+            self.counts -= self._counts(self.ring[evict])
+        self.ring[pos] = b
+        self.counts += self._counts(b)
+        self.seen += n
+
+    def stats(self) -> Optional[DriftStats]:
+        n = min(self.seen, self.window)
+        if n == 0:
+            return None
+        p, q = self._proportions(self.counts, n), self.ref_p
+        psi = ((p - q) * np.log(p / q)).sum(axis=1)
+        ks = np.abs(np.cumsum(p, axis=1) - np.cumsum(q, axis=1)).max(axis=1)
+        return DriftStats(float(psi.max()), float(ks.max()), n)
+
+
+class DriftMonitor:
+    def __init__(self, window: int = DRIFT_WINDOW, bins: int = DRIFT_BINS, min_rows: int = DRIFT_MIN_ROWS):
+        self.window = window
+        self.bins = max(2, int(bins))
+        self.min_rows = min_rows
+        self.streams: Dict[str, _Stream] = {}
+        self._lock = threading.Lock()
+
+    def set_reference(self, stream: str, reference) -> bool:
+        """stream 의 기준 분포를 reference 로 바꾸고 최근 창을 비운다. 비어 있으면 False (기존 기준 유지)."""
+        reference = np.asarray(reference, dtype=np.float64)
+        if reference.size == 0:
+            return False
+        s = _Stream(reference, self.bins, self.window)
+        with self._lock:
+            self.streams[stream] = s
+        return True
+
+    def observe(self, stream: str, X):
+        # 기준이 아직 없는 스트림(모델 학습 전)은 버린다.
+        with self._lock:
+            s = self.streams.get(stream)
+            if s is not None:
+                s.push(X)
+
+    def stats(self, include_partial: bool = False) -> Dict[str, DriftStats]:
+        with self._lock:
+            out = {name: s.stats() for name, s in self.streams.items()}
+        return {k: v for k, v in out.items() if v is not None and (include_partial or v.n >= self.min_rows)}
+
+    def state(self):
+        # 기준 분포만 저장한다 (최근 창은 재시작 후 다시 찬다).
+        with self._lock:
+            out = {}
+            for name, s in self.streams.items():
+                out[f"{name}/edges"] = s.edges
+                out[f"{name}/ref_p"] = s.ref_p
+            return out
+
+    def load_state(self, state):
+        streams = {}
+        for key in state:
+            name, _, part = key.rpartition("/")
+            if part != "edges" or f"{name}/ref_p" not in state:
+                continue
+            edges, ref_p = np.asarray(state[key], dtype=np.float64), np.asarray(state[f"{name}/ref_p"])
+            if edges.ndim != 2 or edges.shape[1] != self.bins - 1 or ref_p.shape != (edges.shape[0], self.bins):
+                continue  # KGL_DRIFT_BINS 가 바뀌었으면 그 기준은 버린다 (다음 학습 때 다시 잡힌다)
+            s = _Stream(np.zeros((1, edges.shape[0])), self.bins, self.window)
+            s.edges, s.ref_p = edges, ref_p
+            streams[name] = s
+        with self._lock:
+            self.streams = streams
+
+
+class RetrainScheduler:
+    def __init__(self, cooldown_seconds: float = DRIFT_COOLDOWN_SECONDS, budget_seconds: float = DRIFT_BUDGET_SECONDS,
+                 budget_window_seconds: float = DRIFT_BUDGET_WINDOW_SECONDS, clock=time.monotonic):
+        self.cooldown_seconds = cooldown_seconds
+        self.budget_seconds = budget_seconds
+        self.budget_window_seconds = budget_window_seconds
+        self.clock = clock
+        self.last: Dict[Hashable, float] = {}
+        self.spent = deque()  # (시각, 재학습 초)
+        self._lock = threading.Lock()
+
+    def spent_seconds(self) -> float:
+        with self._lock:
+            return self._spent(self.clock())
+
+    def _spent(self, now: float) -> float:
+        while self.spent and now - self.spent[0][0] > self.budget_window_seconds:
+            self.spent.popleft()
+        return sum(s for _, s in self.spent)
+
+    def decide(self, key: Hashable, drifted: bool) -> str:
+        """재학습 여부. "retrain" 이면 바로 그 시각을 쿨다운 기준으로 잡는다 (다른 스레드가 중복으로 시작하지 않게)."""
+        if not drifted:
+            return "stable"
+        with self._lock:
+            now = self.clock()
+            if now - self.last.get(key, -np.inf) < self.cooldown_seconds:
+                return "cooldown"
+            if self._spent(now) >= self.budget_seconds:
+                return "budget"
+            self.last[key] = now
+            return "retrain"
+
+    def spend(self, key: Hashable, seconds: float):
+        with self._lock:
+            self.spent.append((self.clock(), float(seconds)))
@@ -0,0 +1,227 @@
+# forest_arrays.py
+# 학습된 sklearn IsolationForest 를 평평한 numpy 배열(.npy)로 내보내고, 그 배열만으로 decision_function 을 계산한다.
+#
+#   forest = ForestArrays.from_sklearn(model)            # 모든 트리의 노드를 한 배열로 이어 붙임
+#   forest = ForestArrays.from_model_file("models/sensor/iforest/model.pkl")
+#   forest.save(directory)                               # directory/*.npy + forest.json
+#   forest = ForestArrays.load(directory)                # np.load(mmap_mode="r") → 여러 프로세스가 같은 페이지를 공유
+#   forest.decision_function(X_scaled)                   # model.decision_function 과 비트 단위로 같은 값
+#
+# KGL_IFOREST_BACKEND=auto|numpy|numba — numba 가 설치돼 있으면(auto) 샘플별 트리 순회 커널을 쓰고,
+# 없으면 모든 (트리, 샘플) 쌍을 한 단계씩 내려보내는 numpy 구현을 쓴다.
+#
+# sklearn 과 같은 값을 내기 위해
+#   - X 를 float32 로 바꾼다 (sklearn 도 score_samples 에서 float32 로 검증한다)
+#   - 깊이는 트리 순서대로 누적한다 (depths += ... 와 같은 덧셈 순서)
+#   - 잎 노드는 자기 자신을 자식으로 가리키게 해서 고정 횟수(max_depth)만 내려가면 되도록 한다
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+ARRAYS = ("feature", "threshold", "threshold32", "children", "missing_left", "leaf_value", "roots")
+FORMAT_VERSION = 2
+
+BACKEND = os.environ.get("KGL_IFOREST_BACKEND", "auto").lower()
+# numpy 경로는 (트리 × 샘플) 중간 배열을 만들기 때문에 큰 배치는 잘라서 캐시에 머물게 한다.
+NUMPY_CHUNK_ROWS = 256
+
+
+def _average_path_length(n: np.ndarray) -> np.ndarray:
+    # sklearn.ensemble._iforest._average_path_length 와 같은 식
+    n = np.asarray(n, dtype=float)
+    out = np.zeros(n.shape)
+    mask_2 = n == 2
+    rest = n > 2
+    out[mask_2] = 1.0
+    out[rest] = 2.0 * (np.log(n[rest] - 1.0) + np.euler_gamma) - 2.0 * (n[rest] - 1.0) / n[rest]
+    return out
+
+
+def _node_depths(tree) -> np.ndarray:
+    depths = np.zeros(tree.node_count, dtype=float)
+    for i in range(tree.node_count):
+        for child in (tree.children_left[i], tree.children_right[i]):
+            if child >= 0:
+                depths[child] = depths[i] + 1.0
+    return depths
+
+
+def _round_down_f32(threshold: np.ndarray) -> np.ndarray:
+    # float32 x 에 대해 x <= t(float64) 와 x <= t32 가 같아지도록 t 이하의 가장 큰 float32 로 내림한다.
+    t32 = threshold.astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True, nogil=True)
+    def _depths_numba(X, feature, threshold, children, missing_left, leaf_value, roots, max_depth):
+        n = X.shape[0]
+        out = np.zeros(n)
+        for i in numba.prange(n):
+            acc = 0.0
+            for t in range(roots.shape[0]):
+                node = roots[t]
+                for _ in range(max_depth):
+                    x = X[i, feature[node]]
+                    if x != x:
+                        go_left = missing_left[node]
+                    else:
+                        go_left = x <= threshold[node]
+                    nxt = children[2 * node + (1 if go_left else 0)]
+                    if nxt == node:
+                        break
+                    node = nxt
+                acc += leaf_value[node]
+            out[i] = acc
+        return out
+else:
+    _depths_numba = None
+
+
+class ForestArrays:
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported forest format {meta.get('format')!r} (expected {FORMAT_VERSION})")
+        self.arrays = arrays
+        self.meta = meta
+        # np.asarray 는 memmap 을 복사 없이 일반 ndarray 뷰로 바꾼다 (numba 는 memmap 서브클래스를 못 받는다).
+        self.feature = np.asarray(arrays["feature"])
+        self.threshold = np.asarray(arrays["threshold"])
+        self.threshold32 = np.asarray(arrays["threshold32"])
+        self.children = np.asarray(arrays["children"])
+        self.missing_left = np.asarray(arrays["missing_left"])
+        self.leaf_value = np.asarray(arrays["leaf_value"])
+        self.roots = np.asarray(arrays["roots"])
+        self.n_features_in_ = int(meta["n_features"])
+        self.offset_ = float(meta["offset"])
+        self.denominator = float(meta["denominator"])
+        self.max_depth = int(meta["max_depth"])
+        self.backend = "numba" if (_depths_numba is not None and BACKEND in ("auto", "numba")) else "numpy"
+
+    @classmethod
+    def from_sklearn(cls, model) -> "ForestArrays":
+        n_features = int(model.n_features_in_)
+        subsample = model._max_features != n_features
+        path_lengths = getattr(model, "_decision_path_lengths", None)
+        avg_lengths = getattr(model, "_average_path_length_per_tree", None)
+
+        parts = {k: [] for k in ("feature", "threshold", "children", "missing_left", "leaf_value")}
+        roots, offset, max_depth = [], 0, 0
+        for t, (est, feats) in enumerate(zip(model.estimators_, model.estimators_features_)):
+            tree = est.tree_
+            is_leaf = tree.children_left < 0
+            own = np.arange(tree.node_count) + offset
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+            if subsample:
+                # 트리는 X[:, feats] 로 학습됐으므로 원래 열 번호로 되돌려 둔다.
+                feature[~is_leaf] = np.asarray(feats)[feature[~is_leaf]]
+            depth = path_lengths[t] if path_lengths is not None else _node_depths(tree)
+            avg = avg_lengths[t] if avg_lengths is not None else _average_path_length(tree.n_node_samples)
+            missing = getattr(tree, "missing_go_to_left", None)
+
+            # children[2i] = 오른쪽, children[2i+1] = 왼쪽 → children[2 * node + go_left]. 잎은 자기 자신.
+            children = np.empty(2 * tree.node_count, dtype=np.int32)
+            children[0::2] = np.where(is_leaf, own, tree.children_right + offset)
+            children[1::2] = np.where(is_leaf, own, tree.children_left + offset)
+
+            parts["feature"].append(feature)
+            parts["threshold"].append(tree.threshold.astype(np.float64))
+            parts["children"].append(children)
+            parts["missing_left"].append(
+                np.asarray(missing, dtype=bool) if missing is not None else np.ones(tree.node_count, dtype=bool)
+            )
+            # sklearn 은 샘플마다 (depth + avg) - 1.0 을 더한다 → 노드별로 같은 식을 미리 계산해도 값이 같다.
+            parts["leaf_value"].append((depth + avg) - 1.0)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, int(tree.max_depth))
+
+        arrays = {k: np.ascontiguousarray(np.concatenate(v)) for k, v in parts.items()}
+        arrays["threshold32"] = _round_down_f32(arrays["threshold"])
+        arrays["roots"] = np.asarray(roots, dtype=np.int32)
+        meta = {
+            "format": FORMAT_VERSION,
+            "n_features": n_features,
+            "n_trees": len(roots),
+            "offset": float(model.offset_),
+            "denominator": float(len(roots) * _average_path_length(np.array([model._max_samples]))[0]),
+            "max_depth": max_depth,
+        }
+        return cls(arrays, meta)
+
+    @classmethod
+    def from_model_file(cls, path: Path) -> "ForestArrays":
+        """AnomalyDetector 가 저장한 model.pkl (pickle 된 IsolationForest) 에서 바로 만든다."""
+        with open(path, "rb") as f:
+            return cls.from_sklearn(pickle.load(f))
+
+    def save(self, directory: Path):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for k in ARRAYS:
+            np.save(directory / f"{k}.npy", self.arrays[k])
+        (directory / "forest.json").write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "ForestArrays":
+        directory = Path(directory)
+        meta = json.loads((directory / "forest.json").read_text(encoding="utf-8"))
+        arrays = {k: np.load(directory / f"{k}.npy", mmap_mode="r" if mmap else None) for k in ARRAYS}
+        return cls(arrays, meta)
+
+    def _depths_numpy(self, X: np.ndarray) -> np.ndarray:
+        # 모든 (트리, 샘플) 쌍을 한 단계씩 동시에 내려보낸다. 잎은 제자리에 머문다.
+        n, d = X.shape
+        node = np.repeat(self.roots[:, None], n, axis=1)
+        base = np.arange(n, dtype=np.int64) * d
+        flat = X.ravel()
+        if np.isnan(flat).any():
+            for _ in range(self.max_depth):
+                x = flat[base + self.feature[node]]
+                go_left = np.where(np.isnan(x), self.missing_left[node], x <= self.threshold[node])
+                node = self.children[2 * node + go_left]
+        else:
+            for _ in range(self.max_depth):
+                node = self.children[2 * node + (flat[base + self.feature[node]] <= self.threshold32[node])]
+        # cumsum 은 트리 순서대로 누적하므로 sklearn 의 depths += ... 와 덧셈 순서가 같다.
+        return np.cumsum(self.leaf_value[node], axis=0)[-1]
+
+    def _depths(self, X: np.ndarray) -> np.ndarray:
+        if self.backend == "numba":
+            return _depths_numba(X, self.feature, self.threshold, self.children, self.missing_left,
+                                 self.leaf_value, self.roots, self.max_depth)
+        if X.shape[0] <= NUMPY_CHUNK_ROWS:
+            return self._depths_numpy(X)
+        return np.concatenate([
+            self._depths_numpy(X[i:i + NUMPY_CHUNK_ROWS]) for i in range(0, X.shape[0], NUMPY_CHUNK_ROWS)
+        ])
+
+    def score_samples(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, expected (n, {self.n_features_in_})")
+        if X.shape[0] == 0:
+            return np.zeros(0)
+        depths = self._depths(X)
+        denominator = self.denominator
+        scores = 2 ** (-np.divide(depths, denominator, out=np.ones_like(depths), where=denominator != 0))
+        return -scores
+
+    def decision_function(self, X) -> np.ndarray:
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X) -> np.ndarray:
+        out = np.ones(np.asarray(X).shape[0], dtype=int)
+        out[self.decision_function(X) < 0] = -1
+        return out
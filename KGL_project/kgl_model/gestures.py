@@ -0,0 +1,291 @@
+# gestures.py
+# 원시 터치 이벤트(down/move/up/cancel)를 (user, session)별 제스처로 묶고, 제스처가 닫힐 때 드래그 피처를 계산한다.
+# 클라이언트가 미리 계산해 보내던 total_distance / straightness / move_count 를 서버가 좌표 경로에서 직접 만들고,
+# 다른 제스처나 다른 사용자의 이벤트와 섞이지 않는다 (parse_touch 의 행 간 diff 와 달리).
+#
+#   asm = GestureAssembler()
+#   drags = asm.push(keys, ts_ms, phases, x, y)   # 이번 업로드로 닫힌 드래그들 (Drags), 열린 제스처는 다음 업로드로 이어짐
+#   drags = assemble(keys, ts_ms, phases, x, y)   # 상태 없이 한 번에 (오프라인)
+#   logs = drag_logs(drags)                       # 클라이언트가 보내던 touch_drag 로그와 같은 모양
+#   logs = assemble_logs(logs)                    # 로그 리스트의 원시 이벤트 → 닫힌 드래그 로그 (오프라인 parse_touch)
+#
+# 이벤트: action_type 이 touch_down / touch_move / touch_up / touch_cancel 이거나, touch_event 이고 params 의 phase
+# (또는 event) 가 DOWN / MOVE / UP / CANCEL (Android MotionEvent 이름).
+# 제스처 = down → move* → up. cancel, 다음 down, KGL_GESTURE_TIMEOUT_MS 넘게 이어지는 이벤트가 없으면 버린다.
+# 시작점에서 가장 멀리 간 거리가 KGL_DRAG_MIN_DISTANCE(px) 이상인 제스처만 드래그이고, 탭은 내보내지 않는다.
+# 세션 상태는 열린 제스처의 점뿐이고, KGL_GESTURE_MAX_POINTS 를 넘으면 점을 하나씩 걸러 솎는다 (끝점은 유지).
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from sensor_fusion import epoch_ms, lru_session
+
+GESTURE_TIMEOUT_MS = float(os.environ.get("KGL_GESTURE_TIMEOUT_MS", "10000"))
+DRAG_MIN_DISTANCE = float(os.environ.get("KGL_DRAG_MIN_DISTANCE", "16"))
+GESTURE_MAX_POINTS = int(os.environ.get("KGL_GESTURE_MAX_POINTS", "256"))
+GESTURE_MAX_SESSIONS = int(os.environ.get("KGL_GESTURE_MAX_SESSIONS", "10000"))
+GESTURE_IDLE_SECONDS = float(os.environ.get("KGL_GESTURE_IDLE_SECONDS", "600"))
+
+RAW_ACTIONS = ("touch_down", "touch_move", "touch_up", "touch_cancel", "touch_event")
+
+DOWN, MOVE, UP, CANCEL = 0, 1, 2, 3
+_CARRIED = 4  # 지난 업로드에서 이어진 점 (move 로 세지 않는다)
+_PHASES = {"down": DOWN, "move": MOVE, "up": UP, "cancel": CANCEL}
+
+# Drags.columns 의 숫자 열 (drag_direction 은 문자열 리스트)
+DRAG_COLUMNS = ("ts", "start_x", "start_y", "end_x", "end_y", "total_distance", "path_length", "duration",
+                "straightness", "move_count")
+
+
+def touch_phase(value: Any) -> int:
+    """"touch_move" / "MOVE" / "move" → MOVE 등. 모르는 값은 -1."""
+    s = str(value or "").lower()
+    for prefix in ("touch_", "action_"):
+        if s.startswith(prefix):
+            s = s[len(prefix):]
+    return _PHASES.get(s, -1)
+
+
+def events_from_logs(logs: Sequence[Dict[str, Any]]):
+    """원시 터치 로그 → (세션 키 리스트, ts_ms, phase 코드, x, y). 시각이 없으면 NaN (버려진다)."""
+    keys, ts, phases, xs, ys = [], [], [], [], []
+    for item in logs:
+        p = item.get("params") if isinstance(item.get("params"), dict) else {}
+        keys.append((item.get("user_id"), item.get("session_id")))
+        ts.append(epoch_ms(p.get("timestamp") or item.get("ts") or item.get("timestamp")))
+        phases.append(touch_phase(p.get("phase") or p.get("event") or item.get("action_type")))
+        xs.append(p.get("x", item.get("x")))
+        ys.append(p.get("y", item.get("y")))
+    return (keys, np.array(ts, dtype=np.float64), np.array(phases, dtype=np.int64),
+            _floats(xs), _floats(ys))
+
+
+def _floats(values: List[Any]) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+class Drags(NamedTuple):
+    keys: List[Hashable]  # 드래그별 (user_id, session_id)
+    closed_at: np.ndarray  # 드래그를 닫은 up 이벤트의 입력 위치
+    columns: Dict[str, Any]  # DRAG_COLUMNS 배열 + drag_direction 리스트
+
+    @property
+    def size(self) -> int:
+        return len(self.closed_at)
+
+
+def _empty() -> Drags:
+    cols: Dict[str, Any] = {c: np.zeros(0) for c in DRAG_COLUMNS}
+    cols["drag_direction"] = []
+    return Drags([], np.zeros(0, dtype=np.int64), cols)
+
+
+def _concat(parts: List[Drags]) -> Drags:
+    parts = [p for p in parts if p.size]
+    if not parts:
+        return _empty()
+    cols: Dict[str, Any] = {c: np.concatenate([p.columns[c] for p in parts]) for c in DRAG_COLUMNS}
+    cols["drag_direction"] = [d for p in parts for d in p.columns["drag_direction"]]
+    return Drags([k for p in parts for k in p.keys], np.concatenate([p.closed_at for p in parts]), cols)
+
+
+def drag_direction(dx: np.ndarray, dy: np.ndarray) -> List[str]:
+    # Android TouchEventCollector.getDragDirection 과 같은 규칙 (화면 좌표라 dy > 0 이 아래).
+    ax, ay = np.abs(dx), np.abs(dy)
+    names = np.select(
+        [(ax < 2) & (ay < 2), ax > ay + 3, ay > ax + 3, (dx > 0) & (dy > 0), (dx > 0) & (dy < 0),
+         (dx < 0) & (dy > 0), (dx < 0) & (dy < 0)],
+        ["stationary", np.where(dx > 0, "right", "left"),
+         np.where(dy > 0, "down", "up"), "down_right", "up_right", "down_left", "up_left"],
+        "diagonal",
+    )
+    return names.tolist()
+
+
+class _Open:
+    __slots__ = ("t", "x", "y", "moves", "touched")
+
+    def __init__(self):
+        self.t = self.x = self.y = np.zeros(0)
+        self.moves = 0
+        self.touched = 0.0
+
+
+def _thin(n: int, max_points: int) -> np.ndarray:
+    # 점이 max_points 를 넘으면 하나 걸러 남긴다 (첫 점/마지막 점은 항상 남긴다).
+    idx = np.arange(n)
+    while len(idx) > max_points > 1:
+        idx = np.union1d(idx[::2], idx[-1:])
+    return idx
+
+
+def _close_session(t, x, y, ph, src, carried_moves: int, min_distance: float):
+    """한 세션의 시간순 이벤트 → (닫힌 드래그 Drags 조각(키 없음), 열린 마지막 제스처의 이벤트 위치 또는 None)."""
+    g = np.cumsum(ph == DOWN)  # 0 = 첫 down 이전 (버림)
+    is_end = (ph == UP) | (ph == CANCEL)
+    ends = np.cumsum(is_end)
+    starts = np.flatnonzero(ph == DOWN)
+    base = np.concatenate([[0], ends[starts]])[g]
+    # 제스처 안에서 첫 up/cancel 까지만 쓴다 (그 뒤 같은 제스처 이벤트는 짝 없는 잔여물).
+    keep = (g > 0) & (ends - is_end - base == 0)
+    t, x, y, ph, src, g = t[keep], x[keep], y[keep], ph[keep], src[keep], g[keep]
+
+    open_tail = None
+    n_groups = int(g[-1]) if len(g) else 0
+    if n_groups and not ((ph == UP) | (ph == CANCEL))[g == n_groups].any():
+        open_tail = np.flatnonzero(keep)[g == n_groups]
+
+    up_groups = g[ph == UP]
+    if not len(up_groups):
+        return None, open_tail
+    sel = np.isin(g, up_groups)
+    t, x, y, ph, src, g = t[sel], x[sel], y[sel], ph[sel], src[sel], g[sel]
+    first = np.flatnonzero(np.concatenate([[True], g[1:] != g[:-1]]))
+    last = np.concatenate([first[1:], [len(g)]]) - 1
+
+    seg = np.hypot(np.diff(x), np.diff(y))
+    seg[g[1:] != g[:-1]] = 0.0
+    path = np.add.reduceat(np.concatenate([[0.0], seg]), first)
+    gid = np.repeat(np.arange(len(first)), np.diff(np.concatenate([first, [len(g)]])))
+    reach = np.maximum.reduceat(np.hypot(x - x[first][gid], y - y[first][gid]), first)
+    moves = np.add.reduceat((ph == MOVE).astype(np.int64), first)
+    if src[first[0]] < 0:  # 지난 업로드에서 이어진 제스처 (항상 첫 번째)
+        moves[0] += carried_moves
+
+    dx, dy = x[last] - x[first], y[last] - y[first]
+    total = np.hypot(dx, dy)
+    drag = reach >= min_distance
+    with np.errstate(divide="ignore", invalid="ignore"):
+        straightness = np.where(path > 0, total / path, 1.0)
+    cols: Dict[str, Any] = {
+        "ts": t[last], "start_x": x[first], "start_y": y[first], "end_x": x[last], "end_y": y[last],
+        "total_distance": total, "path_length": path, "duration": t[last] - t[first],
+        "straightness": straightness, "move_count": moves.astype(np.float64),
+    }
+    cols = {k: v[drag] for k, v in cols.items()}
+    cols["drag_direction"] = drag_direction(dx[drag], dy[drag])
+    return Drags([], src[last][drag], cols), open_tail
+
+
+class GestureAssembler:
+    def __init__(self, timeout_ms: float = GESTURE_TIMEOUT_MS, min_distance: float = DRAG_MIN_DISTANCE,
+                 max_points: int = GESTURE_MAX_POINTS, max_sessions: int = GESTURE_MAX_SESSIONS,
+                 idle_seconds: float = GESTURE_IDLE_SECONDS):
+        self.timeout_ms = timeout_ms
+        self.min_distance = min_distance
+        self.max_points = max_points
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions: "OrderedDict[Hashable, _Open]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def open_gestures(self) -> int:
+        return sum(1 for s in self.sessions.values() if len(s.t))
+
+    def push(self, keys: Sequence[Hashable], ts, phases, x, y) -> Drags:
+        """여러 세션이 섞인 이벤트를 넣고, 이번에 닫힌 드래그를 세션 첫 등장 순으로 돌려준다."""
+        ts = np.asarray(ts, dtype=np.float64)
+        phases = np.asarray(phases, dtype=np.int64)
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        groups: Dict[Hashable, List[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(key, []).append(i)
+        parts = []
+        with self._lock:
+            for key, idx in groups.items():
+                drags = self._push_session(key, np.array(idx), ts, phases, x, y)
+                if drags is not None and drags.size:
+                    parts.append(drags._replace(keys=[key] * drags.size))
+        return _concat(parts)
+
+    def _push_session(self, key, idx, ts, phases, x, y) -> Optional[Drags]:
+        ok = np.isfinite(ts[idx]) & (phases[idx] >= 0) & np.isfinite(x[idx]) & np.isfinite(y[idx])
+        idx = idx[ok]
+        idx = idx[np.argsort(ts[idx], kind="stable")]
+        sess = lru_session(self.sessions, key, _Open, self.max_sessions, self.idle_seconds)
+        if len(sess.t) and len(idx) and ts[idx[0]] - sess.t[-1] > self.timeout_ms:
+            sess.t = sess.x = sess.y = np.zeros(0)
+            sess.moves = 0
+        if not len(idx):
+            return None
+
+        n_pre = len(sess.t)
+        pre_ph = np.full(n_pre, _CARRIED, dtype=np.int64)
+        if n_pre:
+            pre_ph[0] = DOWN
+        t = np.concatenate([sess.t, ts[idx]])
+        px = np.concatenate([sess.x, x[idx]])
+        py = np.concatenate([sess.y, y[idx]])
+        ph = np.concatenate([pre_ph, phases[idx]])
+        src = np.concatenate([np.full(n_pre, -1, dtype=np.int64), idx])
+
+        drags, open_tail = _close_session(t, px, py, ph, src, sess.moves, self.min_distance)
+        if open_tail is None:
+            sess.t = sess.x = sess.y = np.zeros(0)
+            sess.moves = 0
+        else:
+            moves = int(np.sum(ph[open_tail] == MOVE)) + (sess.moves if open_tail[0] == 0 and n_pre else 0)
+            keep = open_tail[_thin(len(open_tail), self.max_points)]
+            sess.t, sess.x, sess.y, sess.moves = t[keep], px[keep], py[keep], moves
+        return drags
+
+    def drop(self, key: Hashable):
+        with self._lock:
+            self.sessions.pop(key, None)
+
+
+def assemble(keys: Sequence[Hashable], ts, phases, x, y, min_distance: float = DRAG_MIN_DISTANCE) -> Drags:
+    return GestureAssembler(timeout_ms=np.inf, min_distance=min_distance, max_points=np.iinfo(np.int64).max,
+                            idle_seconds=np.inf).push(keys, ts, phases, x, y)
+
+
+def drag_logs(drags: Drags, closing_logs: Optional[Sequence[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """드래그 → 클라이언트가 보내던 것과 같은 모양의 touch_drag 로그 (params 에 서버 계산 피처).
+    closing_logs(드래그별 닫은 up 이벤트 로그)를 주면 그 timestamp / sequence_index 를 그대로 쓴다."""
+    cols = drags.columns
+    numeric = {c: cols[c].tolist() for c in DRAG_COLUMNS}
+    out = []
+    for i, (user_id, session_id) in enumerate(drags.keys):
+        params = {c: numeric[c][i] for c in DRAG_COLUMNS if c != "ts"}
+        params["timestamp"] = int(numeric["ts"][i])
+        params["drag_direction"] = cols["drag_direction"][i]
+        log = {"user_id": user_id, "session_id": session_id, "action_type": "touch_drag",
+               "timestamp": params["timestamp"], "params": params}
+        if closing_logs is not None:
+            log["timestamp"] = closing_logs[i].get("timestamp", log["timestamp"])
+            log["sequence_index"] = closing_logs[i].get("sequence_index", i)
+        out.append(log)
+    return out
+
+
+def is_raw_event(item: Any) -> bool:
+    return isinstance(item, dict) and str(item.get("action_type") or "").lower() in RAW_ACTIONS
+
+
+def assemble_logs(logs: Sequence[Any]) -> List[Any]:
+    """오프라인용 (parse_touch): 원시 터치 이벤트를 상태 없이 제스처로 묶어, 드래그를 닫은 up 이벤트 자리에
+    touch_drag 로그를 넣고 나머지 원시 이벤트는 뺀다. 다른 로그는 순서 그대로."""
+    raw = [i for i, item in enumerate(logs) if is_raw_event(item)]
+    if not raw:
+        return list(logs)
+    raw_logs = [logs[i] for i in raw]
+    drags = assemble(*events_from_logs(raw_logs))
+    closing = [raw_logs[c] for c in drags.closed_at.tolist()]
+    replaced = dict(zip((raw[c] for c in drags.closed_at.tolist()), drag_logs(drags, closing)))
+    raw_set = set(raw)
+    return [replaced.get(i, item) for i, item in enumerate(logs) if i not in raw_set or i in replaced]
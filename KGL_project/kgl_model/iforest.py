@@ -3,6 +3,7 @@
 
 import os
 import json
+import time
 import pickle
 import numpy as np
 from datetime import datetime, timezone
@@ -15,6 +16,8 @@ from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 
+import drift
+
 # ----------------------
 # 로깅 설정
 # ----------------------
@@ -60,6 +63,14 @@ class AnomalyDetector:
         self.recent_data = {m: deque(maxlen=self.retrain_interval + self.initial_samples[m]) for m in self.modalities}
         self.infer_counts = {m: 0 for m in self.modalities}
         self.modes = {m: "collecting" for m in self.modalities}
+        # retrain_interval 회마다 무조건 재학습하지 않고, 최근 retrain_interval 건의 피처/점수 분포가
+        # 학습 때와 달라졌을 때만 재학습한다 (drift.py, 쿨다운/시간 예산 포함).
+        # KGL_DRIFT_RETRAIN=off 면 예전처럼 retrain_interval 회마다 재학습한다.
+        self.drift_retrain = drift.DRIFT_RETRAIN
+        self.drift = {m: drift.DriftMonitor(window=self.retrain_interval,
+                                            min_rows=min(drift.DRIFT_MIN_ROWS, self.retrain_interval))
+                      for m in self.modalities}
+        self.retrain_scheduler = drift.RetrainScheduler()
 
         for m in self.modalities:
             self._initialize_modality(m)
@@ -154,6 +165,8 @@ class AnomalyDetector:
             scores = model.decision_function(X_scaled)
             threshold = np.percentile(scores, self.anomaly_percentile * 100)
             self.thresholds[modality] = threshold
+            self.drift[modality].set_reference("features", data)
+            self.drift[modality].set_reference("score", scores)
             logger.info(f"[{modality}] 학습 완료. 임계값: {threshold}")
 
             # 모델/스케일러 저장
@@ -169,12 +182,22 @@ class AnomalyDetector:
             return False
 
     def _retrain_if_due(self, modality: str):
-        """재학습 필요 시 호출"""
+        """retrain_interval 회마다 드리프트를 확인하고, 필요할 때만 재학습 (드리프트 재학습을 끄면 매번 재학습)"""
         if self.infer_counts[modality] >= self.retrain_interval:
-            logger.info(f"[{modality}] {self.retrain_interval}회 추론 완료. 재학습을 시작합니다.")
             self.infer_counts[modality] = 0
-            # 재학습을 위해 데이터가 충분히 쌓일 때까지 기다림
-            self._train_model(modality)
+            if not self.drift_retrain:
+                logger.info(f"[{modality}] {self.retrain_interval}회 추론 완료. 재학습을 시작합니다.")
+                self._train_model(modality)
+                return
+            stats = self.drift[modality].stats()
+            drifted = any(s.drifted() for s in stats.values())
+            decision = self.retrain_scheduler.decide(modality, drifted)
+            summary = ", ".join(f"{k} psi={s.psi:.3f} ks={s.ks:.3f}" for k, s in stats.items())
+            logger.info(f"[{modality}] {self.retrain_interval}회 추론 완료. 드리프트 ({summary}) → {decision}")
+            if decision == "retrain":
+                t0 = time.perf_counter()
+                self._train_model(modality)
+                self.retrain_scheduler.spend(modality, time.perf_counter() - t0)
 
     def _predict_one(self, modality: str, features: np.ndarray):
         """단일 데이터에 대한 추론"""
@@ -194,6 +217,10 @@ class AnomalyDetector:
             else:
                 is_anom = (score <= (thr - self.margin))
 
+            # 재학습은 최근 데이터(deque)로 하므로 추론한 피처도 쌓는다.
+            self.recent_data[modality].append(features)
+            self.drift[modality].observe("features", features.reshape(1, -1))
+            self.drift[modality].observe("score", [score])
             self.infer_counts[modality] += 1
             self._retrain_if_due(modality)
 
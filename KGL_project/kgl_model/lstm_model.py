@@ -0,0 +1,39 @@
+# lstm_model.py
+# 서버(main.py)가 쓰는 LSTM 오토인코더와 체크포인트 로더. torch 는 무거우므로 main 은 이 모듈을 LSTM 을 처음 쓸 때 import 한다.
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+
+class LSTMAutoencoder(nn.Module):
+    def __init__(self, feature_dim, hidden_dim=64, latent_dim=32, num_layers=1):
+        super().__init__()
+        self.enc = nn.LSTM(feature_dim, hidden_dim, num_layers=num_layers, batch_first=True)
+        self.to_z = nn.Linear(hidden_dim, latent_dim)
+        self.from_z = nn.Linear(latent_dim, hidden_dim)
+        self.dec = nn.LSTM(feature_dim, hidden_dim, num_layers=num_layers, batch_first=True)
+        self.out_proj = nn.Linear(hidden_dim, feature_dim)
+
+    def forward(self, x):
+        h, _ = self.enc(x)
+        z = self.to_z(h[:, -1, :])
+        h0 = self.from_z(z).unsqueeze(0)
+        c0 = torch.zeros_like(h0)
+        dec_in = torch.zeros_like(x)
+        y, _ = self.dec(dec_in, (h0, c0))
+        return self.out_proj(y)
+
+def load_lstm_bundle(model_path: Path, feature_dim: int, device: str, mmap: bool = False):
+    if mmap:
+        # 파일을 mmap 한 텐서를 복사 없이 파라미터로 쓴다 → 같은 파일을 연 워커들이 페이지를 공유 (CPU 전용).
+        bundle = torch.load(model_path, map_location="cpu", mmap=True, weights_only=True)
+    else:
+        bundle = torch.load(model_path, map_location=device)
+    state_dict = bundle.get("state_dict", bundle)
+    model = LSTMAutoencoder(feature_dim=feature_dim).to(device)
+    model.load_state_dict(state_dict, assign=mmap)
+    model.eval()
+    q01 = bundle.get("q01", 0.0)
+    q99 = bundle.get("q99", 1.0)
+    return model, q01, q99
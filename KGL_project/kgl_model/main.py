@@ -1,25 +1,50 @@
 # main.py
 import os
 import json
+import time
 import pickle
-import joblib
+import copy
+import functools
+import threading
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timezone
-from collections import deque
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, NamedTuple, Optional
 
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 
-import pandas as pd
-import torch
-import torch.nn as nn
-import torch.optim as optim
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pandas / torch / sklearn / joblib 은 import 만 수 초가 걸리므로 쓰는 함수 안에서 import 한다 (KGL_WARMUP 참고).
+
+import cascade
+import columnar
+import drift
+from columnar import MEDIA_TYPE as COLUMNAR_MEDIA_TYPE, ColumnarFormatError, decode_batch, batch_to_logs
+import gestures
+import metrics
+import profiling
+from profiling import profiled
+from batcher import MicroBatcher
+from buffers import FeatureBuffer
+import sensor_features
+import sensor_fusion
+import serving
+import snapshots
+from forest_arrays import ForestArrays
+from sketches import QuantileSketch, RunningScaler
+from metrics import (
+    BATCH_SIZE, MODALITY_LATENCY, REQUEST_LATENCY, RETRAIN_SECONDS, RETRAIN_TOTAL, SNAPSHOT_SECONDS, SNAPSHOT_TOTAL,
+    STAGE_SECONDS, DRIFT_DECISIONS, CASCADE_ROWS, CASCADE_SAVED_SECONDS, GaugeFunc,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("AnomalyDetector")
@@ -71,10 +96,14 @@ def load_json_logs(path, filename_contains=None):
     return all_data
 
 
-def parse_touch(logs: List[Dict[str, Any]]) -> pd.DataFrame:
+def parse_touch(logs: List[Dict[str, Any]]) -> "pd.DataFrame":
+    import pandas as pd
+
     rows = []
     if not isinstance(logs, list):
         return pd.DataFrame()
+    # 원시 터치 이벤트(down/move/up)는 온라인과 같이 제스처로 묶어 닫힌 드래그 행으로 바꾼다.
+    logs = gestures.assemble_logs(logs)
     for idx, item in enumerate(logs):
         if not isinstance(item, dict):
             continue
@@ -123,58 +152,167 @@ def parse_touch(logs: List[Dict[str, Any]]) -> pd.DataFrame:
 
     return df
 
-def parse_sensor(logs: List[Dict[str, Any]]) -> pd.DataFrame:
+def parse_sensor(logs: List[Dict[str, Any]]) -> "pd.DataFrame":
+    """센서 로그 → 세션별 고정 주기 격자에 맞춘 융합 프레임 (ts + sensor_fusion.FUSED_COLUMNS)."""
+    import pandas as pd
 
-    rows = []
     if not isinstance(logs, list):
         return pd.DataFrame()
-    for idx, item in enumerate(logs):
-        if not isinstance(item, dict):
-            continue
-        p = item.get("params", {}) if isinstance(item.get("params"), dict) else {}
-        ts_val = p.get("timestamp") or item.get("ts") or item.get("timestamp") or idx
-        ttype = (p.get("type") or item.get("type") or "unknown").lower()
-        rows.append({
-            "ts": ts_val,
-            "type": ttype,
-            "x": p.get("x", item.get("x", np.nan)),
-            "y": p.get("y", item.get("y", np.nan)),
-            "z": p.get("z", item.get("z", np.nan)),
-        })
-    if not rows:
+    keys, ts, kinds, xyz = sensor_fusion.samples_from_logs(logs, position_fallback=True)
+    grid, frames = sensor_fusion.fuse_sessions(keys, ts, kinds, xyz)
+    if not len(grid):
         return pd.DataFrame()
-    df = pd.DataFrame(rows)
-    df["ts"] = pd.to_numeric(df["ts"], errors="coerce").fillna(0).astype(np.int64)
-    for c in ("x", "y", "z"):
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    if "type" in df.columns and df["type"].notna().any():
-        pivot_df = df.pivot_table(index="ts", columns="type", values=["x", "y", "z"], aggfunc="mean")
-        pivot_df.columns = [f"{col[1]}_{col[0]}" for col in pivot_df.columns]
-        pivot_df = pivot_df.sort_index(axis=1)
-        return pivot_df.reset_index()
-    else:
-        return df.groupby("ts", as_index=False).mean(numeric_only=True)
+    df = pd.DataFrame(frames, columns=list(sensor_fusion.FUSED_COLUMNS))
+    df.insert(0, "ts", grid.astype(np.int64))
+    return df
 
-def parse_sensor_sequence_for_lstm(logs: List[Dict[str, Any]]) -> pd.DataFrame:
+def parse_sensor_sequence_for_lstm(logs: List[Dict[str, Any]]) -> "pd.DataFrame":
+    # LSTM 입력 열만 (ts 제외). 예전처럼 가속도계/자이로 xyz 를 한 스트림에 섞지 않고 융합 프레임을 쓴다.
+    df = parse_sensor(logs)
+    return df.drop(columns="ts") if not df.empty else df
+
+# 학습 버퍼 열. LSTM 열은 parse_sensor_sequence_for_lstm / parse_touch 결과의 숫자 열과 같은 순서다.
+# 센서 iForest 는 샘플이 아니라 융합 프레임 창마다 한 행이다 (sensor_features.py).
+IFOREST_FEATURES = {
+    "sensor": sensor_features.WINDOW_FEATURES,
+    "touch_drag": ("duration", "total_distance", "velocity", "straightness", "move_count",
+                   "dir_down", "dir_up", "dir_left", "dir_right"),
+    "touch_pressure": ("touch_duration", "size", "x", "y"),
+}
+_TOUCH_LSTM_COLUMNS = ("ts", "touch_x", "touch_y", "touch_size", "touch_pressure", "start_x", "start_y",
+                       "end_x", "end_y", "total_distance", "duration", "move_count", "dx", "dy", "speed")
+LSTM_COLUMNS = {"sensor": sensor_fusion.FUSED_COLUMNS, "touch_drag": _TOUCH_LSTM_COLUMNS,
+                "touch_pressure": _TOUCH_LSTM_COLUMNS}
+
+def iforest_schema(modality: str) -> Dict[str, Any]:
+    # iForest meta.json 에 같이 저장하는 피처 스키마. 불러온 모델과 다르면 그 모델은 버리고 다시 수집/학습한다.
+    if modality == "sensor":
+        return sensor_features.schema()
+    return {"feature_schema": 1, "features": list(IFOREST_FEATURES[modality])}
+
+def check_iforest_schema(modality: str, meta: Dict[str, Any], scaler: Any):
+    # schema 가 없는 예전 meta.json 은 버전 1 (센서는 샘플별 x, y, z) 로 본다.
+    want = iforest_schema(modality)
+    stale = [k for k, v in want.items() if meta.get(k, 1 if k == "feature_schema" else v) != v]
+    if getattr(scaler, "n_features_in_", len(want["features"])) != len(want["features"]):
+        stale.append("n_features")
+    if stale:
+        raise ValueError(f"iForest 피처 스키마 불일치 {stale} (현재 v{want['feature_schema']}) → 재학습 필요")
+
+def _num(v) -> float:
+    # pd.to_numeric(errors="coerce") 처럼 숫자로 못 바꾸면 NaN
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _params_column(params_list: List[Dict[str, Any]], key: str) -> np.ndarray:
+    # 행마다 params.get(key, 0.0) 를 모은 float 열. 빈 params 는 0, None 은 NaN (행별 _extract_* 와 같다).
+    values = [p.get(key, 0.0) if p else 0.0 for p in params_list]
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([_num(v) for v in values], dtype=float)
+
+_DRAG_DIRECTIONS = np.array(["down", "up", "left", "right"])
+
+def touch_drag_matrix(duration: np.ndarray, total_distance: np.ndarray, straightness: np.ndarray,
+                      move_count: np.ndarray, directions: List[Any]) -> np.ndarray:
+    """touch_drag iForest 피처 (n, 9). velocity 는 duration > 0 인 행만 계산하고 나머지(0/음수/NaN)는 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocity = np.where(duration > 0, total_distance / (duration / 1000.0), 0.0)
+    dirs = np.array([str(d).lower() for d in directions], dtype=str).reshape(-1, 1)
+    onehot = (dirs == _DRAG_DIRECTIONS).astype(float)
+    return np.column_stack([duration, total_distance, velocity, straightness, move_count, onehot])
+
+def lstm_row_from_log(modality: str, item: Dict[str, Any], idx: int, prev: Optional[np.ndarray] = None) -> np.ndarray:
+    """touch 로그 한 건을 LSTM 버퍼 한 행으로. parse_touch 를 버퍼 전체에 돌린 결과의 해당 행과 같은 값이다.
+    dx/dy/speed 는 직전 행(prev) 기준, ts 가 없으면 스트림 위치 idx 를 쓴다. (센서는 sensor_fusion 프레임을 쓴다.)"""
+    p = item.get("params") if isinstance(item.get("params"), dict) else {}
+
+    def gv(k):
+        return _num(p.get(k, item.get(k, np.nan)))
+
+    ts = _num(p.get("timestamp") or item.get("ts") or item.get("timestamp") or idx)
+    row = [float(int(ts)) if np.isfinite(ts) else 0.0, gv("x"), gv("y"), gv("size"), gv("pressure"),
+           gv("start_x"), gv("start_y"), gv("end_x"), gv("end_y"), gv("total_distance"), gv("duration"),
+           gv("move_count")]
+    dx = dy = 0.0
+    if prev is not None:
+        dx = row[1] - float(prev[1])
+        dy = row[2] - float(prev[2])
+        dx = 0.0 if np.isnan(dx) else dx
+        dy = 0.0 if np.isnan(dy) else dy
+    row += [dx, dy, float(np.sqrt(dx * dx + dy * dy))]
+    return np.array(row, dtype=np.float32)
+
+_TOUCH_LSTM_PARAMS = ("x", "y", "size", "pressure", "start_x", "start_y", "end_x", "end_y",
+                      "total_distance", "duration", "move_count")
+
+def lstm_rows_from_columns(modality: str, cols: Dict[str, Any], n: int, start: int,
+                           prev: Optional[np.ndarray] = None) -> np.ndarray:
+    """touch 컬럼 배치 n 행을 LSTM 버퍼 행 (n, 열) 으로. batch_to_logs → lstm_row_from_log 를 행마다 돌린 것과 같은 값이다.
+    start 는 첫 행의 스트림 위치(buf.seen), prev 는 버퍼의 직전 행."""
+    # 로그 경로에서 ts 는 ISO 문자열로 바뀌어 숫자로 읽히지 않으므로(→ 0) 타임스탬프가 없는 행만 스트림 위치를 쓴다.
+    ts_col = cols.get("ts", cols.get("timestamp"))
+    if ts_col is None:
+        ts = np.arange(start, start + n, dtype=np.float64)
+    else:
+        if isinstance(ts_col, np.ndarray):
+            has_ts = ~np.isnan(ts_col.astype(np.float64))
+        else:
+            has_ts = np.array([v is not None and v != "" for v in ts_col], dtype=bool)
+        ts = np.where(has_ts, 0.0, np.arange(start, start + n, dtype=np.float64))
+    rows = np.empty((n, len(_TOUCH_LSTM_COLUMNS)), dtype=np.float64)
+    rows[:, 0] = ts
+    for j, k in enumerate(_TOUCH_LSTM_PARAMS, start=1):
+        rows[:, j] = columnar.numeric(cols, k, n)
+    x, y = rows[:, 1], rows[:, 2]
+    px = np.concatenate([[prev[1] if prev is not None else x[0] if n else 0.0], x[:-1]])
+    py = np.concatenate([[prev[2] if prev is not None else y[0] if n else 0.0], y[:-1]])
+    dx = np.nan_to_num(x - px, nan=0.0)
+    dy = np.nan_to_num(y - py, nan=0.0)
+    if prev is None and n:
+        dx[0] = dy[0] = 0.0
+    rows[:, -3], rows[:, -2], rows[:, -1] = dx, dy, np.sqrt(dx * dx + dy * dy)
+    return rows.astype(np.float32)
+
+def _session_keys_from_columns(cols: Dict[str, Any], n: int, meta: Dict[str, Any]) -> List[Any]:
+    users = cols.get("user_id")
+    users = [meta.get("user_id")] * n if users is None else list(users)
+    sessions = cols.get("session_id")
+    sessions = [meta.get("session_id")] * n if sessions is None else list(sessions)
+    return list(zip(users, sessions))
+
+def _epoch_ms_from_columns(cols: Dict[str, Any], n: int) -> np.ndarray:
+    ts_col = cols.get("ts", cols.get("timestamp"))
+    if isinstance(ts_col, np.ndarray):
+        return ts_col.astype(np.float64)
+    return np.array([sensor_fusion.epoch_ms(v) for v in (ts_col or [None] * n)], dtype=np.float64)
+
+def sensor_samples_from_columns(cols: Dict[str, Any], n: int, meta: Dict[str, Any]):
+    """컬럼 배치 → sensor_fusion 입력 (세션 키 리스트, ts_ms, 종류 리스트, xyz (n, 3))."""
+    kinds = [sensor_fusion.sensor_kind(v) for v in (cols.get("type") or cols.get("action_type") or [None] * n)]
+    xyz = np.column_stack([columnar.numeric(cols, c, n) for c in ("x", "y", "z")])
+    return _session_keys_from_columns(cols, n, meta), _epoch_ms_from_columns(cols, n), kinds, xyz
+
+def touch_events_from_columns(cols: Dict[str, Any], n: int, meta: Dict[str, Any]):
+    """컬럼 배치 → gestures 입력 (세션 키 리스트, ts_ms, phase 코드, x, y). phase 열이 없으면 action_type 으로."""
+    actions = columnar._as_list(cols.get("action_type"), n)
+    phase_col = cols.get("phase", cols.get("event"))
+    phases = columnar._as_list(phase_col, n) if phase_col is not None else actions
+    codes = np.array([gestures.touch_phase(p or a) for p, a in zip(phases, actions)], dtype=np.int64)
+    return (_session_keys_from_columns(cols, n, meta), _epoch_ms_from_columns(cols, n), codes,
+            columnar.numeric(cols, "x", n), columnar.numeric(cols, "y", n))
+
+def drag_columns(drags: "gestures.Drags") -> Dict[str, Any]:
+    # 닫힌 드래그 → touch_drag 컬럼 배치 (클라이언트가 보내던 drag 로그를 컬럼으로 펼친 것과 같은 키).
+    cols: Dict[str, Any] = {k: v for k, v in drags.columns.items() if k != "ts"}
+    cols["timestamp"] = drags.columns["ts"]
+    cols["user_id"] = [k[0] for k in drags.keys]
+    cols["session_id"] = [k[1] for k in drags.keys]
+    return cols
 
-    rows = []
-    if not isinstance(logs, list):
-        return pd.DataFrame()
-    for item in logs:
-        if not isinstance(item, dict):
-            continue
-        p = item.get("params", {}) if isinstance(item.get("params"), dict) else {}
-        x = p.get("x", item.get("x", np.nan))
-        y = p.get("y", item.get("y", np.nan))
-        z = p.get("z", item.get("z", np.nan))
-        rows.append({"x": x, "y": y, "z": z})
-    if not rows:
-        return pd.DataFrame()
-    df = pd.DataFrame(rows)
-    for c in ("x", "y", "z"):
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
-    return df
 
 def create_sequences(arr: np.ndarray, seq_len: int) -> np.ndarray:
     if arr is None or len(arr) < 2 or seq_len is None or seq_len < 2:
@@ -185,33 +323,85 @@ def create_sequences(arr: np.ndarray, seq_len: int) -> np.ndarray:
     return np.array(seqs) if seqs else np.array([])
 
 
-class LSTMAutoencoder(nn.Module):
-    def __init__(self, feature_dim, hidden_dim=64, latent_dim=32, num_layers=1):
-        super().__init__()
-        self.enc = nn.LSTM(feature_dim, hidden_dim, num_layers=num_layers, batch_first=True)
-        self.to_z = nn.Linear(hidden_dim, latent_dim)
-        self.from_z = nn.Linear(latent_dim, hidden_dim)
-        self.dec = nn.LSTM(feature_dim, hidden_dim, num_layers=num_layers, batch_first=True)
-        self.out_proj = nn.Linear(hidden_dim, feature_dim)
-
-    def forward(self, x):
-        h, _ = self.enc(x)
-        z = self.to_z(h[:, -1, :])
-        h0 = self.from_z(z).unsqueeze(0)
-        c0 = torch.zeros_like(h0)
-        dec_in = torch.zeros_like(x)
-        y, _ = self.dec(dec_in, (h0, c0))
-        return self.out_proj(y)
-
-def load_lstm_bundle(model_path: Path, feature_dim: int, device: str):
-    bundle = torch.load(model_path, map_location=device)
-    state_dict = bundle.get("state_dict", bundle)
-    model = LSTMAutoencoder(feature_dim=feature_dim).to(device)
-    model.load_state_dict(state_dict)
-    model.eval()
-    q01 = bundle.get("q01", 0.0)
-    q99 = bundle.get("q99", 1.0)
-    return model, q01, q99
+class IForestSnapshot(NamedTuple):
+    model: Any  # IsolationForest 또는 같은 decision_function/predict 를 가진 ForestArrays
+    scaler: Any  # StandardScaler
+    threshold: Optional[float]
+
+
+class LSTMSnapshot(NamedTuple):
+    model: Any  # lstm_model.LSTMAutoencoder
+    scaler: Any
+    features: List[str]
+    seq_len: int
+    thresholds: Dict[str, float]
+
+
+class SensorObservation(NamedTuple):
+    frames: int  # 이번에 LSTM 버퍼에 붙인 융합 프레임 수
+    frame_of: np.ndarray  # 샘플별 프레임 번호 (이번 프레임 안에서, 없으면 -1)
+    windows: np.ndarray  # 이번에 완성된 창 피처 (w, len(WINDOW_FEATURES)) — iForest 입력
+    window_of: np.ndarray  # 샘플별 창 번호 (없으면 -1)
+    end: int = -1  # 프레임을 붙인 직후의 LSTM 버퍼 seen (_predict_lstm 의 end)
+
+
+# 채점에 쓸 iForest 구현: arrays(기본) = ForestArrays 로 변환해 채점, sklearn = 학습된 모델 그대로.
+IFOREST_EVALUATOR = os.environ.get("KGL_IFOREST_EVALUATOR", "arrays").lower()
+
+# 시작 방식: eager(기본) = import 시 모든 모달리티의 모델을 읽고 준비한다.
+# background = import 는 바로 끝나고, 서버가 뜬 뒤 백그라운드 스레드가 모달리티를 차례로 준비한다 (/readyz 로 진행 확인).
+# lazy = 각 모달리티를 처음 쓰는 요청이 준비한다.
+WARMUP_MODES = ("eager", "background", "lazy")
+WARMUP = os.environ.get("KGL_WARMUP", "eager").lower()
+
+# iForest 갱신 방식 (모달리티별). refit(기본) = 수집이 끝나면 한 번 전체 학습.
+# online = 그 뒤에도 ONLINE_EVERY 행마다 트리의 ONLINE_FRACTION 만 최근 ONLINE_WINDOW 행으로 새로 키워
+# 가장 오래된 트리와 교체하고(rolling ensemble), 임계값은 버퍼 재채점 없이 실시간 점수 스케치에서 다시 뽑는다.
+#   KGL_IFOREST_ONLINE=sensor,touch_drag     (all 이면 전체)
+_online = os.environ.get("KGL_IFOREST_ONLINE", "").lower()
+IFOREST_ONLINE = {m.strip() for m in _online.split(",") if m.strip()}
+IFOREST_ONLINE_EVERY = int(os.environ.get("KGL_IFOREST_ONLINE_EVERY", "5000"))
+IFOREST_ONLINE_FRACTION = float(os.environ.get("KGL_IFOREST_ONLINE_FRACTION", "0.1"))
+IFOREST_ONLINE_WINDOW = int(os.environ.get("KGL_IFOREST_ONLINE_WINDOW", "10000"))
+
+# 임계값 재보정: 채점하면서 쌓는 점수 스케치(iForest decision_function, LSTM 재구성 오차)에서 버퍼를 다시 채점하지 않고
+# 임계값만 새로 뽑는다 (iForest = anomaly_percentile, LSTM = q01/q99). POST /calibrate 로 바로, 또는 자동으로.
+#   KGL_RECALIBRATE_EVERY=0      모달리티별로 채점 행이 이만큼 쌓일 때마다 자동 재보정 (0 = 끔)
+#   KGL_RECALIBRATE_MIN=1000     스케치(직전 + 현재 구간)의 점수가 이보다 적으면 재보정하지 않는다
+RECALIBRATE_EVERY = int(os.environ.get("KGL_RECALIBRATE_EVERY", "0"))
+RECALIBRATE_MIN = int(os.environ.get("KGL_RECALIBRATE_MIN", "1000"))
+
+# 학습 버퍼 (모달리티별, float32 로 미리 할당).
+#   KGL_BUFFER_ROWS      최근 행 링 버퍼 크기 — iForest online 창, LSTM 학습/채점 문맥
+#   KGL_RESERVOIR_ROWS   전체 스트림 균등 표본(저수지) 크기 — iForest 학습셋, LSTM 은 seq_len 행 블록 단위
+#   KGL_BUFFER_BUDGET_MB 모달리티당 상한. 위 두 값으로 계산한 크기가 넘으면 비율대로 줄인다.
+BUFFER_ROWS = int(os.environ.get("KGL_BUFFER_ROWS", "20000"))
+RESERVOIR_ROWS = int(os.environ.get("KGL_RESERVOIR_ROWS", "20000"))
+
+# 드리프트 감시 스트림 (drift.py). 모델 하나는 입력 또는 점수 스트림 중 하나라도 기준을 넘으면 재학습 후보가 된다.
+#   KGL_DRIFT_RETRAIN=on  KGL_DRIFT_PSI=0.25  KGL_DRIFT_KS=0.2  KGL_DRIFT_CHECK_EVERY=1000 (행)
+#   KGL_DRIFT_COOLDOWN_SECONDS=3600  KGL_DRIFT_BUDGET_SECONDS=600 / KGL_DRIFT_BUDGET_WINDOW_SECONDS=86400
+DRIFT_STREAMS = {"iforest": ("iforest_input", "iforest_score"), "lstm": ("lstm_input", "lstm_error")}
+# 시각처럼 계속 커지는 열은 분포가 늘 "바뀌므로" 입력 드리프트에서 뺀다.
+_DRIFT_SKIP_COLUMNS = ("ts",)
+BUFFER_BUDGET_MB = float(os.environ.get("KGL_BUFFER_BUDGET_MB", "16"))
+
+
+def _track_training(model_kind: str):
+    # 학습 함수(성공 시 True 반환)의 소요 시간과 성공/실패 횟수를 메트릭으로 남긴다.
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(self, modality, *args, **kwargs):
+            t0 = time.perf_counter()
+            ok = False
+            try:
+                ok = fn(self, modality, *args, **kwargs)
+                return ok
+            finally:
+                RETRAIN_SECONDS.labels(model_kind, modality).observe(time.perf_counter() - t0)
+                RETRAIN_TOTAL.labels(model_kind, modality, "ok" if ok else "failed").inc()
+        return wrapper
+    return deco
 
 
 class AnomalyDetector:
@@ -220,8 +410,12 @@ class AnomalyDetector:
         model_path: str = "./",
         initial_samples = {"sensor": 1000, "touch_drag": 1000, "touch_pressure": 1000},
         contamination=0.03, retrain_interval=50000000, n_estimators=200,
-        anomaly_percentile=0.005, margin=0.002
+        anomaly_percentile=0.005, margin=0.002, role: str = "standalone", warmup: str = None
     ):
+        self.role = role
+        self.warmup = (warmup or WARMUP).lower()
+        if self.warmup not in WARMUP_MODES:
+            raise ValueError(f"warmup must be one of {WARMUP_MODES}, got {self.warmup!r}")
         self.model_path = Path(model_path)
         self.model_path.mkdir(parents=True, exist_ok=True)
 
@@ -234,26 +428,275 @@ class AnomalyDetector:
         self.margin = margin
 
         self.iforest_models = {m: None for m in self.modalities}
-        self.iforest_scalers = {m: StandardScaler() for m in self.modalities}
+        self.iforest_scalers = {m: None for m in self.modalities}
         self.iforest_thresholds = {m: None for m in self.modalities}
         self.iforest_modes = {m: "collecting" for m in self.modalities}
-        self.recent_data = {m: deque(maxlen=self.retrain_interval + self.initial_samples[m]) for m in self.modalities}
+        self.buffer_budget_bytes = int(BUFFER_BUDGET_MB * 1024 * 1024)
+        self.buffer_rows = {m: self._buffer_rows(m) for m in self.modalities}
+        self.recent_data = {
+            m: FeatureBuffer(IFOREST_FEATURES[m], *self.buffer_rows[m]) for m in self.modalities
+        }
+        self.iforest_update_modes = {
+            m: "online" if ("all" in IFOREST_ONLINE or m in IFOREST_ONLINE) else "refit" for m in self.modalities
+        }
+        self.online_every = IFOREST_ONLINE_EVERY
+        self.online_fraction = IFOREST_ONLINE_FRACTION
+        self.online_window = IFOREST_ONLINE_WINDOW
+        self.iforest_since_update = {m: 0 for m in self.modalities}
+        self.iforest_online_updates = {m: 0 for m in self.modalities}
+        # 임계값용 점수 스케치: 현재 구간(cur) + 직전 구간(prev) → 갱신 때 둘을 합쳐 퍼센타일을 뽑는다 (약 2구간 창).
+        self.iforest_sketches = {m: QuantileSketch() for m in self.modalities}
+        self.iforest_prev_sketches = {m: QuantileSketch() for m in self.modalities}
+        # 학습 스케일러용 열 평균/분산: 행이 버퍼에 들어올 때 갱신하고, 학습은 버퍼 전체로 fit 하지 않고 이걸 쓴다.
+        self.iforest_stats = {m: RunningScaler(len(IFOREST_FEATURES[m])) for m in self.modalities}
+        self.lstm_stats = {m: RunningScaler(len(LSTM_COLUMNS[m])) for m in self.modalities}
+        # LSTM 재구성 오차 스케치 (iForest 와 같이 현재/직전 구간). 재보정과 /percentiles 에 쓴다.
+        self.lstm_sketches = {m: QuantileSketch() for m in self.modalities}
+        self.lstm_prev_sketches = {m: QuantileSketch() for m in self.modalities}
+        self.recalibrate_every = RECALIBRATE_EVERY
+        self.recalibrate_min = RECALIBRATE_MIN
+        self.scored_since_calibration = {(k, m): 0 for k in ("iforest", "lstm") for m in self.modalities}
+        # 드리프트 기반 재학습 (drift.py): 학습셋의 입력/점수 분포를 기준으로 최근 창과 PSI/KS 를 비교해,
+        # 기준을 넘고 쿨다운/시간 예산이 허락할 때만 최근 데이터로 다시 학습한다. 스트림은 DRIFT_STREAMS 참고.
+        self.drift = {m: drift.DriftMonitor() for m in self.modalities}
+        self.retrain_scheduler = drift.RetrainScheduler()
+        self.drift_retrain = drift.DRIFT_RETRAIN
+        self.drift_check_every = drift.DRIFT_CHECK_EVERY
+        self.drift_since_check = {(k, m): 0 for k in ("iforest", "lstm") for m in self.modalities}
+        self.lstm_drift_columns = {
+            m: [j for j, c in enumerate(LSTM_COLUMNS[m]) if c not in _DRIFT_SKIP_COLUMNS] for m in self.modalities
+        }
 
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.lstm_models = {m: None for m in self.modalities}
         self.lstm_scalers = {m: None for m in self.modalities}
         self.lstm_thresholds = {m: None for m in self.modalities}
         self.lstm_features = {m: [] for m in self.modalities}
         self.lstm_seq_lens = {m: 20 for m in self.modalities}
         self.lstm_modes = {m: "collecting" for m in self.modalities}
-        self.lstm_logs = {m: deque(maxlen=self.retrain_interval + self.initial_samples[m]) for m in self.modalities}
+        self.lstm_rows = {
+            m: FeatureBuffer(LSTM_COLUMNS[m], self.buffer_rows[m][0], self.buffer_rows[m][1] // self.lstm_seq_lens[m],
+                             block=self.lstm_seq_lens[m])
+            for m in self.modalities
+        }
         self.lstm_retrain_interval = retrain_interval
         self.lstm_since_retrain = {m: 0 for m in self.modalities}
+        # 싼 1단계가 애매하다고 본 행에만 LSTM 을 돌린다 (cascade.py). 절약 시간 추정용으로 시퀀스당 forward 시간을 둔다.
+        self.cascade = cascade.Cascade()
+        self.lstm_seq_seconds: Dict[str, Optional[float]] = {m: None for m in self.modalities}
+        # 센서 LSTM 은 원시 샘플 대신 세션별 가속도계/자이로 융합 프레임을 버퍼에 쌓는다 (sensor_fusion.py).
+        self.sensor_fusion = sensor_fusion.SensorFusion()
+        # 센서 iForest 는 같은 프레임을 세션별 창으로 묶은 피처를 쓴다 (sensor_features.py).
+        self.sensor_windows = sensor_features.SensorWindows()
+        # 원시 터치 이벤트(down/move/up)는 세션별로 제스처로 묶고, 닫힌 드래그만 touch_drag 모델에 넣는다 (gestures.py).
+        self.gestures = gestures.GestureAssembler()
+
+        # 추론 경로는 아래 스냅샷만 읽는다. 학습은 새 객체를 모두 만든 뒤 참조 한 번으로 교체(copy-on-write)하므로
+        # 채점 스레드는 락 없이 병렬로 돌면서도 모델/스케일러/임계값이 섞인 중간 상태를 보지 않는다.
+        self.iforest_live: Dict[str, Optional[IForestSnapshot]] = {m: None for m in self.modalities}
+        self.lstm_live: Dict[str, Optional[LSTMSnapshot]] = {m: None for m in self.modalities}
+        # 버퍼 append/복사용 락(짧게 잡음)과 학습 직렬화용 락을 모달리티별로 따로 둔다.
+        self._buffer_locks = {m: threading.Lock() for m in self.modalities}
+        self._train_locks = {(k, m): threading.Lock() for k in ("iforest", "lstm") for m in self.modalities}
+
+        # 종료 시(atexit) 저장할 때 cwd 가 바뀌어 있어도 같은 곳에 쓰도록 절대 경로로 잡아 둔다.
+        self.snapshot_path = (Path(snapshots.SNAPSHOT_PATH) if snapshots.SNAPSHOT_PATH else
+                              self.model_path / "models" / "detector_state.npz").resolve()
+
+        # 모달리티별 준비 상태: pending → warming → ready. 준비 전 모달리티는 첫 사용 시 _ready() 가 마저 준비한다.
+        self.warm_states = {m: "pending" for m in self.modalities}
+        self.warm_seconds: Dict[str, Optional[float]] = {m: None for m in self.modalities}
+        self._warm_locks = {m: threading.Lock() for m in self.modalities}
+        self._startup_snapshot: Optional[Dict[str, np.ndarray]] = None
+
+        if role == "worker":
+            # 워커는 학습하지 않는다: LSTM 채점 문맥만 짧게 들고 있고, 모델은 ModelWatcher 가 버전 디렉터리에서 연다.
+            self.recent_data = {m: FeatureBuffer(IFOREST_FEATURES[m], 1) for m in self.modalities}
+            self.lstm_rows = {m: FeatureBuffer(LSTM_COLUMNS[m], serving.WORKER_LSTM_CONTEXT) for m in self.modalities}
+            self.warm_states = {m: "ready" for m in self.modalities}
+            return
 
-        for m in self.modalities:
-            self._initialize_iforest_modality(m)
-            self._initialize_lstm_modality(m)
+        self._startup_snapshot = snapshots.read_snapshot(self.snapshot_path)
+        if self.warmup == "eager":
+            for m in self.modalities:
+                self.ensure_ready(m)
 
+    @property
+    def device(self) -> str:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+
+    def _ready(self, modality: str):
+        if self.warm_states.get(modality, "ready") != "ready":
+            self.ensure_ready(modality)
+
+    def ensure_ready(self, modality: str):
+        # 모델 파일 로드, 스냅샷 복원, (버퍼가 이미 찼으면) 첫 학습까지. 모달리티당 한 번만 실행된다.
+        with self._warm_locks[modality]:
+            if self.warm_states[modality] == "ready":
+                return
+            self.warm_states[modality] = "warming"
+            t0 = time.perf_counter()
+            snapshot = self._startup_snapshot
+            try:
+                restored = snapshot is not None and self.restore_state(snapshot, [modality])
+                self._initialize_iforest_modality(modality)
+                self._initialize_lstm_modality(modality)
+                if restored:
+                    self._restore_thresholds(modality, snapshot)
+                if self.role == "coordinator":
+                    self.export_version(modality, "iforest")
+                    self.export_version(modality, "lstm")
+                self._resume_training(modality)
+            finally:
+                self.warm_seconds[modality] = time.perf_counter() - t0
+                self.warm_states[modality] = "ready"
+            logger.info(f"[{modality}] 준비 완료 ({self.warm_seconds[modality]:.2f}s, warmup={self.warmup})")
+            if all(v == "ready" for v in self.warm_states.values()):
+                self._startup_snapshot = None
+
+    def start_warmup(self):
+        # background 모드: 서버가 요청을 받기 시작한 뒤 별도 스레드에서 모달리티를 차례로 준비한다.
+        def run():
+            for m in self.modalities:
+                try:
+                    self.ensure_ready(m)
+                except Exception as e:
+                    logger.error(f"[{m}] 워밍업 실패: {e}", exc_info=True)
+        threading.Thread(target=run, name="kgl-warmup", daemon=True).start()
+
+    def readiness(self) -> Dict[str, Any]:
+        ready = all(v == "ready" for v in self.warm_states.values())
+        return {
+            # lazy 모드는 첫 요청이 준비를 대신하므로 곧바로 ready 로 본다.
+            "ready": ready or self.warmup == "lazy",
+            "warmup": self.warmup,
+            "modalities": {
+                m: {
+                    "state": self.warm_states[m],
+                    "seconds": self.warm_seconds[m],
+                    "iforest": self.iforest_modes[m],
+                    "lstm": self.lstm_modes[m],
+                }
+                for m in self.modalities
+            },
+        }
+
+
+    def _buffer_rows(self, modality: str):
+        ring, reservoir = BUFFER_ROWS, RESERVOIR_ROWS
+        need = (ring + reservoir) * (len(IFOREST_FEATURES[modality]) + len(LSTM_COLUMNS[modality])) * 4
+        if need > self.buffer_budget_bytes:
+            scale = self.buffer_budget_bytes / need
+            ring, reservoir = int(ring * scale), int(reservoir * scale)
+            logger.warning(f"[{modality}] 버퍼 {need / 2**20:.1f}MB > 예산 {BUFFER_BUDGET_MB}MB → "
+                           f"링 {ring}행, 저수지 {reservoir}행으로 축소")
+        if min(ring, reservoir) < self.initial_samples[modality]:
+            logger.warning(f"[{modality}] 버퍼(링 {ring}, 저수지 {reservoir})가 initial_samples "
+                           f"{self.initial_samples[modality]} 보다 작아 첫 학습이 시작되지 않을 수 있습니다")
+        return ring, reservoir
+
+    def snapshot_state(self) -> Dict[str, np.ndarray]:
+        out = {"format": np.array([snapshots.FORMAT_VERSION]), "saved_at": np.array([time.time()])}
+        startup = self._startup_snapshot
+        for m in self.modalities:
+            if self.warm_states[m] != "ready" and startup is not None:
+                # 아직 복원 전인 모달리티는 시작 시 읽은 스냅샷 내용을 그대로 이어 쓴다 (빈 버퍼로 덮어쓰지 않게).
+                out.update({k: v for k, v in startup.items() if k.startswith(f"{m}/")})
+                continue
+            with self._buffer_locks[m]:
+                parts = (("recent_data", self.recent_data[m]), ("lstm_rows", self.lstm_rows[m]),
+                         ("sketch", self.iforest_sketches[m]), ("prev_sketch", self.iforest_prev_sketches[m]),
+                         *self._stats_parts(m))
+                for name, obj in parts:
+                    for k, v in obj.state().items():
+                        out[f"{m}/{name}/{k}"] = v
+                out[f"{m}/counters"] = np.array(
+                    [self.lstm_since_retrain[m], self.iforest_since_update[m], self.iforest_online_updates[m]],
+                    dtype=np.int64,
+                )
+            thr, lthr = self.iforest_thresholds[m], self.lstm_thresholds[m] or {}
+            out[f"{m}/thresholds"] = np.array(
+                [np.nan if thr is None else thr, lthr.get("q01", np.nan), lthr.get("q99", np.nan)], dtype=float,
+            )
+        return out
+
+    def _stats_parts(self, m: str):
+        return (("iforest_stats", self.iforest_stats[m]), ("lstm_stats", self.lstm_stats[m]),
+                ("lstm_sketch", self.lstm_sketches[m]), ("lstm_prev_sketch", self.lstm_prev_sketches[m]),
+                ("drift", self.drift[m]))
+
+    def restore_state(self, arrays: Dict[str, np.ndarray], modalities: Optional[List[str]] = None) -> bool:
+        """스냅샷에서 버퍼/통계/스케치/드리프트 상태를 읽는다. 실패한 모달리티는 빈 상태로 되돌리고 False."""
+        t0 = time.perf_counter()
+        failed = False
+        for m in modalities or self.modalities:
+            def part(name):
+                prefix = f"{m}/{name}/"
+                return {k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)}
+            try:
+                with self._buffer_locks[m]:
+                    self.recent_data[m].load_state(part("recent_data"))
+                    self.lstm_rows[m].load_state(part("lstm_rows"))
+                    self.iforest_sketches[m].load_state(part("sketch"))
+                    self.iforest_prev_sketches[m].load_state(part("prev_sketch"))
+                    # 통계/LSTM 스케치가 없는 예전 스냅샷이면 비워 둔다 (학습 때 스케일러를 버퍼로 fit 한다).
+                    for name, obj in self._stats_parts(m):
+                        state = part(name)
+                        if state:
+                            obj.load_state(state)
+                    c = arrays[f"{m}/counters"]
+                    self.lstm_since_retrain[m], self.iforest_since_update[m], self.iforest_online_updates[m] = \
+                        (int(v) for v in c[:3])
+                logger.info(f"[{m}] 스냅샷 복원: iForest 버퍼 {len(self.recent_data[m])}행, "
+                            f"LSTM 버퍼 {len(self.lstm_rows[m])}행 (누적 {self.lstm_rows[m].seen})")
+            except (KeyError, ValueError) as e:
+                logger.warning(f"[{m}] 스냅샷 복원 건너뜀: {e}")
+                failed = True
+                with self._buffer_locks[m]:
+                    self._reset_restored_state(m)
+        SNAPSHOT_SECONDS.labels("restore").observe(time.perf_counter() - t0)
+        SNAPSHOT_TOTAL.labels("restore", "failed" if failed else "ok").inc()
+        return not failed
+
+    def _reset_restored_state(self, m: str):
+        # 복원이 중간에 실패하면 이미 읽어 들인 부분(버퍼, 통계, 점수 스케치, 드리프트 기준)까지 모두 버려
+        # 깨진 스냅샷과 새로 쌓는 상태가 섞여 서빙되지 않게 한다. 호출자가 버퍼 락을 잡는다.
+        self.recent_data[m].clear()
+        self.lstm_rows[m].clear()
+        self.iforest_stats[m].clear()
+        self.lstm_stats[m].clear()
+        self.iforest_sketches[m], self.iforest_prev_sketches[m] = QuantileSketch(), QuantileSketch()
+        self.lstm_sketches[m], self.lstm_prev_sketches[m] = QuantileSketch(), QuantileSketch()
+        self.drift[m] = drift.DriftMonitor()
+
+    def _restore_thresholds(self, modality: str, arrays: Dict[str, np.ndarray]):
+        # 임계값은 모델 파일과 함께 저장되므로, 스냅샷이 그 모델 파일보다 나중에 찍힌 경우에만 덮어쓴다.
+        thr = arrays.get(f"{modality}/thresholds")
+        saved_at = float(arrays["saved_at"][0])
+        if thr is None:
+            return
+        model_file = self._iforest_model_files(modality)[0]
+        if (self.iforest_modes[modality] == "inference" and np.isfinite(thr[0])
+                and model_file.exists() and model_file.stat().st_mtime <= saved_at):
+            self.iforest_thresholds[modality] = float(thr[0])
+            self._publish_iforest(modality)
+        model_file = self._lstm_model_files(modality)[0]
+        if (self.lstm_modes[modality] == "inference" and np.all(np.isfinite(thr[1:]))
+                and model_file.exists() and model_file.stat().st_mtime <= saved_at):
+            self.lstm_thresholds[modality] = {"q01": float(thr[1]), "q99": float(thr[2])}
+            self._publish_lstm(modality)
+
+    def _resume_training(self, modality: str):
+        # 스냅샷으로 버퍼가 이미 차 있으면 요청을 기다리지 않고 바로 학습해 inference 로 돌아간다.
+        th = self.initial_samples[modality]
+        if self.iforest_modes[modality] == "collecting" and self.recent_data[modality].seen >= th:
+            self._train_once("iforest", modality, lambda: self.iforest_modes[modality] == "collecting",
+                             self._train_iforest_model)
+        if self.lstm_modes[modality] == "collecting" and self.lstm_rows[modality].seen >= th:
+            ok = self._train_once("lstm", modality, lambda: self.lstm_modes[modality] == "collecting",
+                                  self._train_lstm_model_from_logs)
+            if ok is not None:
+                self.lstm_since_retrain[modality] = 0
 
     def _iforest_model_files(self, modality: str):
         mdir = self.model_path / "models" / modality / "iforest"
@@ -265,6 +708,89 @@ class AnomalyDetector:
         mdir.mkdir(parents=True, exist_ok=True)
         return (mdir / "model.pth", mdir / "scaler.pkl")
 
+    def _publish_iforest(self, modality: str):
+        ready = (
+            self.iforest_modes[modality] == "inference"
+            and self.iforest_models[modality] is not None
+            and hasattr(self.iforest_scalers[modality], "mean_")
+        )
+        if not ready:
+            self.iforest_live[modality] = None
+            return
+        model = self.iforest_models[modality]
+        if IFOREST_EVALUATOR == "arrays":
+            # sklearn decision_function 은 호출당 고정 비용이 커서(행 1개에도 ~15ms) 같은 값을 내는 배열 평가기로 바꿔 둔다.
+            try:
+                model = ForestArrays.from_sklearn(model)
+            except Exception as e:
+                logger.warning(f"[{modality}-iForest] 배열 평가기 변환 실패, sklearn 으로 채점: {e}")
+        self.iforest_live[modality] = IForestSnapshot(
+            model, self.iforest_scalers[modality], self.iforest_thresholds[modality],
+        )
+
+    def _publish_lstm(self, modality: str):
+        ready = (
+            self.lstm_modes[modality] == "inference"
+            and self.lstm_models[modality] is not None
+            and self.lstm_scalers[modality] is not None
+            and bool(self.lstm_features[modality])
+        )
+        self.lstm_live[modality] = LSTMSnapshot(
+            self.lstm_models[modality], self.lstm_scalers[modality], list(self.lstm_features[modality]),
+            self.lstm_seq_lens[modality], dict(self.lstm_thresholds[modality]),
+        ) if ready else None
+
+    def export_version(self, modality: str, kind: str):
+        # 코디네이터: 현재 스냅샷을 워커용 버전 디렉터리로 내보낸다 (스냅샷이 없으면 아무 것도 안 함).
+        snap = self.iforest_live[modality] if kind == "iforest" else self.lstm_live[modality]
+        if snap is None:
+            return
+        if kind == "iforest":
+            def write(d: Path):
+                forest = snap.model if isinstance(snap.model, ForestArrays) else ForestArrays.from_sklearn(snap.model)
+                forest.save(d)
+                with open(d / "scaler.pkl", "wb") as f:
+                    pickle.dump(snap.scaler, f)
+                threshold = None if snap.threshold is None else float(snap.threshold)
+                meta = {"threshold": threshold, **iforest_schema(modality)}
+                (d / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        else:
+            def write(d: Path):
+                import joblib
+                import torch
+                state_dict = {k: v.detach().cpu() for k, v in snap.model.state_dict().items()}
+                torch.save({"state_dict": state_dict, **snap.thresholds}, d / "model.pth")
+                joblib.dump({"scaler": snap.scaler, "features": snap.features, "seq_len": snap.seq_len},
+                            d / "scaler.pkl")
+        try:
+            version = serving.publish_version(self.model_path / "models", modality, kind, write)
+            logger.info(f"[{modality}-{kind}] 워커용 버전 v{version} 게시")
+        except Exception as e:
+            logger.error(f"[{modality}-{kind}] 버전 게시 실패: {e}")
+
+    def load_version(self, modality: str, kind: str, directory: Path):
+        # 워커: 코디네이터가 게시한 버전을 mmap 으로 열어 스냅샷을 교체한다.
+        if kind == "iforest":
+            forest = ForestArrays.load(directory)
+            with open(directory / "scaler.pkl", "rb") as f:
+                scaler = pickle.load(f)
+            meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            check_iforest_schema(modality, meta, scaler)
+            threshold = meta.get("threshold")
+            self.iforest_live[modality] = IForestSnapshot(forest, scaler, threshold)
+            self.iforest_thresholds[modality] = threshold
+            self.iforest_modes[modality] = "inference"
+        else:
+            import joblib
+            from lstm_model import load_lstm_bundle
+            bundle = joblib.load(directory / "scaler.pkl")
+            features = list(bundle["features"])
+            model, q01, q99 = load_lstm_bundle(directory / "model.pth", len(features), "cpu", mmap=True)
+            self.lstm_live[modality] = LSTMSnapshot(
+                model, bundle["scaler"], features, bundle.get("seq_len", 20), {"q01": float(q01), "q99": float(q99)},
+            )
+            self.lstm_modes[modality] = "inference"
+
 
     def _initialize_iforest_modality(self, modality: str):
         model_file, scaler_file, meta_file = self._iforest_model_files(modality)
@@ -276,12 +802,14 @@ class AnomalyDetector:
                     self.iforest_scalers[modality] = pickle.load(f)
                 if not hasattr(self.iforest_scalers[modality], "mean_"):
                     raise AttributeError()
+                meta = {}
                 if meta_file.exists():
                     try:
                         meta = json.loads(meta_file.read_text(encoding="utf-8"))
-                        self.iforest_thresholds[modality] = meta.get("threshold", None)
                     except Exception:
                         pass
+                check_iforest_schema(modality, meta, self.iforest_scalers[modality])
+                self.iforest_thresholds[modality] = meta.get("threshold", None)
                 self.iforest_modes[modality] = "inference"
                 logger.info(f"[{modality}-iForest] 모델 로드 완료")
             except Exception as e:
@@ -289,17 +817,24 @@ class AnomalyDetector:
                 self.iforest_modes[modality] = "collecting"
         else:
             logger.info(f"[{modality}-iForest] 모델 없음 -> {self.initial_samples[modality]}개 수집 후 학습")
+        self._publish_iforest(modality)
 
     def _initialize_lstm_modality(self, modality: str):
         model_file, scaler_file = self._lstm_model_files(modality)
         if model_file.exists() and scaler_file.exists():
             try:
+                import joblib
+                from lstm_model import load_lstm_bundle
                 scaler_bundle = joblib.load(scaler_file)
                 self.lstm_scalers[modality] = scaler_bundle.get("scaler")
                 self.lstm_features[modality] = scaler_bundle.get("features") or []
                 self.lstm_seq_lens[modality] = scaler_bundle.get("seq_len", 20)
                 if not self.lstm_features[modality]:
                     raise ValueError("LSTM 피처 정보 없음")
+                # 버퍼 열에 없는 피처로 학습된 모델(예: 융합 전 x,y,z 센서 모델)은 채점할 수 없으므로 다시 학습한다.
+                unknown = set(self.lstm_features[modality]) - set(LSTM_COLUMNS[modality])
+                if unknown:
+                    raise ValueError(f"버퍼에 없는 LSTM 피처 {sorted(unknown)} → 재학습 필요")
 
                 lstm_model, q01, q99 = load_lstm_bundle(model_file, len(self.lstm_features[modality]), self.device)
                 self.lstm_models[modality] = lstm_model
@@ -317,6 +852,7 @@ class AnomalyDetector:
         else:
             self.lstm_modes[modality] = "collecting"
             logger.info(f"[{modality}-LSTM] 모델 없음 → {self.initial_samples[modality]}개 수집 후 학습")
+        self._publish_lstm(modality)
 
 
     def _save_iforest_model_and_meta(self, modality: str, threshold: float):
@@ -334,132 +870,529 @@ class AnomalyDetector:
                 "margin": self.margin,
                 "contamination": self.contamination,
                 "n_estimators": self.n_estimators,
+                "update_mode": self.iforest_update_modes[modality],
+                "online_updates": self.iforest_online_updates[modality],
+                **iforest_schema(modality),
             }
             meta_file.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
             logger.info(f"[{modality}-iForest] 모델/스케일러/메타 저장 완료 → {model_file.parent}")
         except Exception as e:
             logger.error(f"[{modality}-iForest] 모델/메타 저장 실패: {e}")
 
-    def _train_iforest_model(self, modality: str):
-        data = np.array(self.recent_data[modality])
+    @_track_training("iforest")
+    def _train_iforest_model(self, modality: str, recent: bool = False):
+        from sklearn.ensemble import IsolationForest
+        with self._buffer_locks[modality]:
+            # 저수지 = 지금까지 본 전체 스트림의 균등 표본 (처음 RESERVOIR_ROWS 행까지는 전부).
+            # 드리프트 재학습(recent=True)은 바뀐 분포만 보도록 최근 링만 쓰고, 스트림 통계도 그 데이터로 새로 시작한다.
+            data = self.recent_data[modality].reservoir_sample()[:, 0, :] if not recent else np.empty((0, 0))
+            if data.shape[0] == 0:
+                data = self.recent_data[modality].recent()
+            if recent:
+                self.iforest_stats[modality].clear()
+                self.iforest_stats[modality].partial_fit(data)
+            stats = copy.deepcopy(self.iforest_stats[modality])
         if data.shape[0] < self.initial_samples[modality]:
             return False
         try:
             logger.info(f"[{modality}-iForest] 모델 학습 시작. 데이터 수: {data.shape[0]}")
-            X_scaled = self.iforest_scalers[modality].fit_transform(data)
+            # 스케일러는 행이 들어올 때 갱신해 둔 스트림 통계로 새로 만든다 (서비스 중인 것을 제자리에서 바꾸지 않는다).
+            scaler = self._scaler_from_stats(stats, data)
+            X_scaled = scaler.transform(data)
+            # contamination 을 주면 sklearn 이 fit 안에서 학습셋을 한 번 채점해 offset_ 을 정하고, 임계값용으로
+            # decision_function 을 또 돌려야 했다. "auto" 로 fit 한 뒤 한 번 채점한 점수로 둘 다 정한다 (같은 값).
             model = IsolationForest(
                 n_estimators=self.n_estimators,
-                contamination=self.contamination,
+                contamination="auto",
                 random_state=42,
                 n_jobs=-1,
             )
             model.fit(X_scaled)
-            self.iforest_models[modality] = model
-            scores = model.decision_function(X_scaled)
+            raw = model.score_samples(X_scaled)
+            model.contamination = self.contamination
+            model.offset_ = np.percentile(raw, 100.0 * self.contamination)
+            scores = raw - model.offset_
             threshold = np.percentile(scores, self.anomaly_percentile * 100.0)
+            sketch = QuantileSketch()
+            sketch.update(scores)
+            with self._buffer_locks[modality]:
+                self.iforest_sketches[modality], self.iforest_prev_sketches[modality] = sketch, QuantileSketch()
+                self.iforest_since_update[modality] = 0
+                self.scored_since_calibration[("iforest", modality)] = 0
+                self.drift_since_check[("iforest", modality)] = 0
+            self.drift[modality].set_reference("iforest_input", data)
+            self.drift[modality].set_reference("iforest_score", scores)
+            self.iforest_models[modality] = model
+            self.iforest_scalers[modality] = scaler
             self.iforest_thresholds[modality] = threshold
             self.iforest_modes[modality] = "inference"
+            self._publish_iforest(modality)
             self._save_iforest_model_and_meta(modality, threshold)
+            if self.role == "coordinator":
+                self.export_version(modality, "iforest")
             logger.info(f"[{modality}-iForest] 학습 완료 (threshold={threshold:.6f}) → inference")
             return True
         except Exception as e:
             logger.error(f"[{modality}-iForest] 학습/저장 중 오류: {e}")
             self.iforest_modes[modality] = "collecting"
+            self._publish_iforest(modality)
+            return False
+
+    @_track_training("iforest_online")
+    def _update_iforest_online(self, modality: str):
+        from sklearn.ensemble import IsolationForest
+        # 스케일러와 offset_ 은 그대로 두므로 남은 트리와 새 트리의 점수 척도가 같다. 비용은 O(교체 트리 수 × 창 크기).
+        old = self.iforest_models[modality]
+        if old is None or self.iforest_modes[modality] != "inference":
+            return False
+        with self._buffer_locks[modality]:
+            window = self.recent_data[modality].recent(self.online_window)
+            prev, cur = self.iforest_prev_sketches[modality], self.iforest_sketches[modality]
+        n_new = max(1, int(round(len(old.estimators_) * self.online_fraction)))
+        if len(window) < old._max_samples:
+            return False
+        try:
+            X_scaled = self.iforest_scalers[modality].transform(window)
+            fresh = IsolationForest(
+                n_estimators=n_new,
+                max_samples=old._max_samples,
+                contamination=self.contamination,
+                random_state=42 + self.iforest_online_updates[modality] + 1,
+            ).fit(X_scaled)
+            model = copy.copy(old)
+            for attr in ("estimators_", "estimators_features_", "_decision_path_lengths", "_average_path_length_per_tree"):
+                if hasattr(old, attr):
+                    setattr(model, attr, list(getattr(old, attr))[n_new:] + list(getattr(fresh, attr)))
+            if hasattr(old, "_seeds"):
+                model._seeds = np.concatenate([old._seeds[n_new:], fresh._seeds])
+
+            window_sketch = QuantileSketch()
+            window_sketch.merge(prev)
+            window_sketch.merge(cur)
+            threshold = window_sketch.quantile(self.anomaly_percentile)
+            if threshold is None:
+                threshold = self.iforest_thresholds[modality]
+
+            self.iforest_online_updates[modality] += 1
+            self.iforest_models[modality] = model
+            self.iforest_thresholds[modality] = threshold
+            self._publish_iforest(modality)
+            # 트리를 바꾼 뒤에만 구간을 넘긴다 (창이 모자라거나 실패하면 지금까지 모은 점수를 그대로 둔다).
+            with self._buffer_locks[modality]:
+                self._rotate_sketches("iforest", modality)
+            self._save_iforest_model_and_meta(modality, threshold)
+            if self.role == "coordinator":
+                self.export_version(modality, "iforest")
+            logger.info(f"[{modality}-iForest] online 갱신 #{self.iforest_online_updates[modality]}: "
+                        f"트리 {n_new}/{len(model.estimators_)} 교체 (창 {len(window)}행, "
+                        f"스케치 {window_sketch.n}점, threshold={threshold:.6f})")
+            return True
+        except Exception as e:
+            logger.error(f"[{modality}-iForest] online 갱신 중 오류: {e}")
             return False
 
     def observe_and_maybe_train(self, modality: str, features: np.ndarray):
-        if modality not in self.modalities or features is None:
+        # features 는 한 행 (d,) 또는 배치 (n, d). 배치는 한 번에 버퍼에 넣고 학습 조건은 끝에서 한 번만 본다.
+        if modality not in self.modalities or features is None or self.role == "worker":
             return
+        self._ready(modality)
         try:
-            self.recent_data[modality].append(np.asarray(features, dtype=float))
+            X = np.atleast_2d(features)
+            n = len(X)
+            if n == 0:
+                return
+            online = self.iforest_update_modes[modality] == "online" and self.iforest_modes[modality] == "inference"
+            with self._buffer_locks[modality]:
+                cnt = self.recent_data[modality].extend(X)
+                # 버퍼와 같이 float32 로 본 값의 통계
+                self.iforest_stats[modality].partial_fit(X.astype(np.float32))
+                self.drift[modality].observe("iforest_input", X)
+                if online:
+                    self.iforest_since_update[modality] += n
+                if self.iforest_modes[modality] == "inference":
+                    self.drift_since_check[("iforest", modality)] += n
             if self.iforest_modes[modality] == "collecting":
-                cnt = len(self.recent_data[modality])
                 th = self.initial_samples[modality]
-                if (cnt % 25 == 0) or (cnt == th):
+                if (cnt % 25 < n) or (cnt - n < th <= cnt):
                     logger.info(f"[{modality}-iForest] collecting {cnt}/{th}")
                 if cnt >= th:
-                    self._train_iforest_model(modality)
+                    self._train_once("iforest", modality, lambda: self.iforest_modes[modality] == "collecting",
+                                     self._train_iforest_model)
+            elif online and self.iforest_since_update[modality] >= self.online_every:
+                due = lambda: self.iforest_since_update[modality] >= self.online_every
+                if self._train_once("iforest", modality, due, self._update_iforest_online) is not None:
+                    # 실패(창 부족 등)해도 카운터를 비워 매 행마다 재시도하지 않게 한다.
+                    with self._buffer_locks[modality]:
+                        self.iforest_since_update[modality] = 0
+            if self.drift_since_check[("iforest", modality)] >= self.drift_check_every:
+                self._check_drift("iforest", modality)
         except Exception as e:
             logger.error(f"[{modality}-iForest] 관찰 중 오류: {e}")
 
+    @staticmethod
+    def _scaler_from_stats(stats: RunningScaler, data: np.ndarray):
+        # 스냅샷에 통계가 없던 경우(예전 스냅샷 복원 직후 등)만 학습 데이터로 fit 한다.
+        from sklearn.preprocessing import StandardScaler
+        if stats.count.min(initial=0) > 0:
+            return stats.standard_scaler()
+        return StandardScaler().fit(data)
+
+    def _train_once(self, kind: str, modality: str, still_needed, train_fn):
+        # 같은 모델을 다른 스레드가 이미 학습 중이면 기다리지 않고 건너뛴다 (그 결과가 곧 스냅샷으로 반영된다).
+        lock = self._train_locks[(kind, modality)]
+        if not lock.acquire(blocking=False):
+            return None
+        try:
+            return train_fn(modality) if still_needed() else None
+        finally:
+            lock.release()
+
+    def _observe_scores(self, modality: str, scores):
+        # 실시간 점수를 임계값 스케치에 쌓는다 (online 갱신 / 재보정 / /percentiles).
+        with self._buffer_locks[modality]:
+            self.iforest_sketches[modality].update(scores)
+            self.scored_since_calibration[("iforest", modality)] += len(scores)
+        self.drift[modality].observe("iforest_score", scores)
+        self._maybe_recalibrate("iforest", modality)
+
+    def _observe_errors(self, modality: str, errors):
+        with self._buffer_locks[modality]:
+            self.lstm_sketches[modality].update(errors)
+            self.scored_since_calibration[("lstm", modality)] += len(errors)
+        self.drift[modality].observe("lstm_error", errors)
+        self._maybe_recalibrate("lstm", modality)
+
+    def drift_stats(self, kind: str, modality: str) -> Dict[str, "drift.DriftStats"]:
+        """kind(iforest / lstm) 모델의 입력·점수 스트림 중 창이 찬 것의 PSI/KS."""
+        stats = self.drift[modality].stats()
+        return {s: stats[s] for s in DRIFT_STREAMS[kind] if s in stats}
+
+    def _check_drift(self, kind: str, modality: str) -> str:
+        # 코디네이터는 점수를 매기지 않으므로 입력 스트림만으로 판단하게 된다 (점수 스트림은 창이 차지 않는다).
+        with self._buffer_locks[modality]:
+            self.drift_since_check[(kind, modality)] = 0
+        stats = self.drift_stats(kind, modality)
+        drifted = any(s.drifted() for s in stats.values())
+        decision = self.retrain_scheduler.decide((kind, modality), drifted) if self.drift_retrain or not drifted \
+            else "disabled"
+        DRIFT_DECISIONS.labels(kind, modality, decision).inc()
+        if drifted:
+            summary = ", ".join(f"{k} psi={s.psi:.3f} ks={s.ks:.3f}" for k, s in stats.items())
+            logger.info(f"[{modality}-{kind}] 분포 드리프트 ({summary}) → {decision}")
+        if decision == "retrain":
+            train_fn = self._train_iforest_model if kind == "iforest" else self._train_lstm_model_from_logs
+            t0 = time.perf_counter()
+            ok = self._train_once(kind, modality, lambda: True, functools.partial(train_fn, recent=True))
+            self.retrain_scheduler.spend((kind, modality), time.perf_counter() - t0)
+            if ok and kind == "lstm":
+                with self._buffer_locks[modality]:
+                    self.lstm_since_retrain[modality] = 0
+        return decision
+
+    def _maybe_recalibrate(self, kind: str, modality: str):
+        if self.recalibrate_every <= 0 or self.role == "coordinator":
+            return
+        due = lambda: self.scored_since_calibration[(kind, modality)] >= self.recalibrate_every
+        if due():
+            fn = self._recalibrate_iforest if kind == "iforest" else self._recalibrate_lstm
+            self._train_once(kind, modality, due, fn)
+
+    def score_window(self, kind: str, modality: str) -> QuantileSketch:
+        """직전 + 현재 구간 점수 스케치를 합친 사본 (kind: iforest / lstm)."""
+        if kind == "iforest":
+            cur, prev = self.iforest_sketches[modality], self.iforest_prev_sketches[modality]
+        else:
+            cur, prev = self.lstm_sketches[modality], self.lstm_prev_sketches[modality]
+        out = QuantileSketch()
+        with self._buffer_locks[modality]:
+            out.merge(prev)
+            out.merge(cur)
+        return out
+
+    def _rotate_sketches(self, kind: str, modality: str):
+        # 호출자가 버퍼 락을 잡고 있어야 한다. 현재 구간 → 직전 구간, 현재는 새로.
+        if kind == "iforest":
+            self.iforest_prev_sketches[modality] = self.iforest_sketches[modality]
+            self.iforest_sketches[modality] = QuantileSketch()
+        else:
+            self.lstm_prev_sketches[modality] = self.lstm_sketches[modality]
+            self.lstm_sketches[modality] = QuantileSketch()
+        self.scored_since_calibration[(kind, modality)] = 0
+
+    @_track_training("iforest_calibrate")
+    def _recalibrate_iforest(self, modality: str):
+        # 모델/스케일러는 그대로 두고 임계값만 실시간 점수 분포에서 다시 뽑는다. 스냅샷(detector_state)에 남는다.
+        window = self.score_window("iforest", modality)
+        if self.iforest_live[modality] is None or window.n < self.recalibrate_min:
+            return False
+        with self._buffer_locks[modality]:
+            self._rotate_sketches("iforest", modality)
+        old, threshold = self.iforest_thresholds[modality], window.quantile(self.anomaly_percentile)
+        self.iforest_thresholds[modality] = threshold
+        self._publish_iforest(modality)
+        logger.info(f"[{modality}-iForest] 임계값 재보정 {old} → {threshold:.6f} (스케치 {window.n}점)")
+        return True
+
+    @_track_training("lstm_calibrate")
+    def _recalibrate_lstm(self, modality: str):
+        window = self.score_window("lstm", modality)
+        if self.lstm_live[modality] is None or window.n < self.recalibrate_min:
+            return False
+        with self._buffer_locks[modality]:
+            self._rotate_sketches("lstm", modality)
+        old = self.lstm_thresholds[modality]
+        self.lstm_thresholds[modality] = {"q01": window.quantile(0.01), "q99": window.quantile(0.99)}
+        self._publish_lstm(modality)
+        logger.info(f"[{modality}-LSTM] 임계값 재보정 {old} → {self.lstm_thresholds[modality]} (스케치 {window.n}점)")
+        return True
+
+    def recalibrate(self, modality: str) -> Dict[str, Any]:
+        """두 모델의 임계값을 스케치로 재보정. 학습 중이거나 점수가 모자라면 그 모델은 건너뛴다 (False/None)."""
+        return {
+            "iforest": self._train_once("iforest", modality, lambda: True, self._recalibrate_iforest),
+            "lstm": self._train_once("lstm", modality, lambda: True, self._recalibrate_lstm),
+        }
+
+    def percentiles(self, qs: List[float]) -> Dict[str, Any]:
+        # 모달리티/모델별 실시간 점수 분포 추정 (직전 + 현재 구간)과 지금 쓰는 임계값.
+        out: Dict[str, Any] = {}
+        for m in self.modalities:
+            entry = {}
+            for kind, thresholds in (("iforest", {"threshold": self.iforest_thresholds[m]}),
+                                     ("lstm", dict(self.lstm_thresholds[m] or {}))):
+                window = self.score_window(kind, m)
+                entry[kind] = {"n": window.n, "quantiles": {f"{q:g}": window.quantile(q) for q in qs},
+                               **thresholds}
+            out[m] = entry
+        return out
+
     def _predict_one_iforest(self, modality: str, features: np.ndarray):
-        if (
-            self.iforest_modes[modality] != "inference"
-            or self.iforest_models[modality] is None
-            or not hasattr(self.iforest_scalers[modality], "mean_")
-        ):
+        self._ready(modality)
+        snap = self.iforest_live[modality]
+        if snap is None:
             return {"is_anomaly": False, "score": 0.0}
         try:
-            Xs = self.iforest_scalers[modality].transform(features.reshape(1, -1))
-            score = float(self.iforest_models[modality].decision_function(Xs)[0])
-            thr = self.iforest_thresholds.get(modality)
+            Xs = snap.scaler.transform(features.reshape(1, -1))
+            score = float(snap.model.decision_function(Xs)[0])
+            thr = snap.threshold
             if thr is None:
-                pred = int(self.iforest_models[modality].predict(Xs)[0])
+                pred = int(snap.model.predict(Xs)[0])
                 is_anom = (pred == -1)
             else:
                 is_anom = (score <= (thr - self.margin))
+            self._observe_scores(modality, [score])
             return {"is_anomaly": is_anom, "score": score}
         except Exception as e:
             logger.error(f"[{modality}-iForest] 추론 중 오류: {e}")
             return {"is_anomaly": False, "score": 0.0}
 
-    def observe_and_maybe_train_lstm(self, modality: str, one_log: Dict[str, Any]):
+    def _predict_iforest_batch(self, modality: str, X: np.ndarray):
+        # _predict_one_iforest 와 같은 판정을 (n, d) 행렬 한 번의 transform/decision_function 으로 수행한다.
+        n = X.shape[0]
+        self._ready(modality)
+        snap = self.iforest_live[modality]
+        if n == 0 or snap is None:
+            return np.zeros(n, dtype=bool), np.zeros(n, dtype=float)
+        try:
+            Xs = snap.scaler.transform(X)
+            scores = snap.model.decision_function(Xs).astype(float)
+            thr = snap.threshold
+            if thr is None:
+                is_anom = snap.model.predict(Xs) == -1
+            else:
+                is_anom = scores <= (thr - self.margin)
+            self._observe_scores(modality, scores)
+            return is_anom, scores
+        except Exception as e:
+            logger.error(f"[{modality}-iForest] 배치 추론 중 오류: {e}")
+            return np.zeros(n, dtype=bool), np.zeros(n, dtype=float)
+
+    # observe_* 는 붙인 직후의 LSTM 버퍼 seen 을 돌려준다 (붙인 행이 없으면 -1). 같은 락 안에서 읽은 값이라
+    # _predict_lstm(end=...) 으로 넘기면 그 사이 다른 요청이 버퍼에 붙인 행과 섞이지 않는다.
+    def observe_and_maybe_train_lstm(self, modality: str, one_log: Dict[str, Any]) -> int:
         if modality not in self.modalities:
-            return
+            return -1
+        if modality == "sensor":
+            return self.observe_sensor_samples(*sensor_fusion.samples_from_logs([one_log])).end
+        return self.observe_and_maybe_train_lstm_logs(modality, [one_log])
+
+    def observe_and_maybe_train_lstm_logs(self, modality: str, logs: List[Dict[str, Any]]) -> int:
+        # 터치 로그 배치를 한 락 안에서 이어 붙인다 (배치의 행이 버퍼에서 연속). 학습 조건은 배치 끝에서 한 번만 본다.
+        if modality not in self.modalities or modality == "sensor" or not logs:
+            return -1
+        self._ready(modality)
+
+        def append():
+            for log in logs:
+                cnt = self._append_lstm_log(modality, log)
+            return cnt, len(logs)
+        return self._observe_lstm(modality, append)
+
+    def observe_and_maybe_train_lstm_columns(self, modality: str, cols: Dict[str, Any], n: int) -> int:
+        # 컬럼 배치 n 행을 한 번에 행렬로 만들어 붙이고, 학습 조건은 배치 끝에서 한 번만 본다. (센서는 observe_sensor_samples)
+        if modality not in self.modalities or n == 0:
+            return -1
+        self._ready(modality)
+
+        def append():
+            buf = self.lstm_rows[modality]
+            return buf.extend(lstm_rows_from_columns(modality, cols, n, buf.seen, buf.last())), n
+        return self._observe_lstm(modality, append)
+
+    def observe_sensor_samples(self, keys, ts, kinds, xyz) -> SensorObservation:
+        """센서 샘플을 세션별 융합기에 넣어 새로 확정된 프레임은 LSTM 버퍼에, 새로 완성된 창 피처는 iForest 버퍼에 붙인다.
+        샘플별 프레임 번호는 그 샘플 시각 이전의 마지막 프레임, 창 번호는 그 프레임을 담은 창이다."""
+        none = np.full(len(ts), -1, dtype=np.int64)
+        if "sensor" not in self.modalities or len(ts) == 0:
+            return SensorObservation(0, none, np.empty((0, len(IFOREST_FEATURES["sensor"]))), none)
+        self._ready("sensor")
+        out = {}
+
+        def append():
+            frames, *rest = self._sensor_frames(keys, ts, kinds, xyz)
+            cnt = self.lstm_rows["sensor"].extend(frames)
+            out["obs"] = SensorObservation(len(frames), *rest, cnt)
+            return cnt, len(frames)
+        self._observe_lstm("sensor", append)
+        obs = out.get("obs") or SensorObservation(0, none, np.empty((0, len(IFOREST_FEATURES["sensor"]))), none)
+        if len(obs.windows):
+            self.observe_and_maybe_train("sensor", obs.windows)
+        return obs
+
+    def _sensor_frames(self, keys, ts, kinds, xyz):
+        # 세션(첫 등장 순)마다 융합기/창에 넣고 (프레임, 샘플별 프레임 번호, 창 피처, 샘플별 창 번호) 를 이어 붙인다.
+        # 호출자가 센서 버퍼 락을 잡고 있어야 한다.
+        ts = np.asarray(ts, dtype=np.float64)
+        xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+        groups: Dict[Any, List[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(key, []).append(i)
+        frame_of = np.full(len(ts), -1, dtype=np.int64)
+        window_of = np.full(len(ts), -1, dtype=np.int64)
+        frame_parts, window_parts, n_frames, n_windows = [], [], 0, 0
+        for key, idx in groups.items():
+            idx = np.array(idx)
+            grid, frames = self.sensor_fusion.push(key, ts[idx], [kinds[i] for i in idx], xyz[idx])
+            if not len(grid):
+                continue
+            pos = np.clip(np.searchsorted(grid, np.nan_to_num(ts[idx], nan=grid[-1]), side="right") - 1,
+                          0, len(grid) - 1)
+            windows, frame_window = self.sensor_windows.push(key, frames)
+            frame_of[idx] = n_frames + pos
+            window_of[idx] = np.where(frame_window[pos] >= 0, n_windows + frame_window[pos], -1)
+            frame_parts.append(frames)
+            window_parts.append(windows)
+            n_frames += len(grid)
+            n_windows += len(windows)
+        frames = np.vstack(frame_parts) if frame_parts else np.empty((0, len(sensor_fusion.FUSED_COLUMNS)))
+        windows = np.vstack(window_parts) if window_parts else np.empty((0, len(IFOREST_FEATURES["sensor"])))
+        return frames, frame_of, windows, window_of
+
+    def _observe_lstm(self, modality: str, append) -> int:
+        # append() 는 버퍼 락 안에서 불리고 (붙인 직후 seen, 붙인 행 수) 를 돌려준다. 반환값은 그 seen (오류면 -1).
+        cnt = -1
         try:
-            self.lstm_logs[modality].append(one_log)
-            cnt = len(self.lstm_logs[modality])
+            collecting = self.lstm_modes[modality] == "collecting"
+            with self._buffer_locks[modality]:
+                cnt, added = append()
+                if self.role != "worker" and added:
+                    buf = self.lstm_rows[modality]
+                    rows = self._lstm_matrix(buf.recent(added), buf.columns, buf.columns)
+                    self.lstm_stats[modality].partial_fit(rows)
+                    self.drift[modality].observe("lstm_input", rows[:, self.lstm_drift_columns[modality]])
+                if not collecting:
+                    self.lstm_since_retrain[modality] += added
+                    self.drift_since_check[("lstm", modality)] += added
+            if self.role == "worker":
+                return cnt
             th = self.initial_samples[modality]
 
-            if self.lstm_modes[modality] == "collecting":
-                if (cnt % 25 == 0) or (cnt == th):
+            if collecting:
+                if (cnt % 25 < added) or (cnt - added < th <= cnt):
                     logger.info(f"[{modality}-LSTM] collecting {cnt}/{th}")
                 if cnt >= th:
-                    ok = self._train_lstm_model_from_logs(modality)
-                    self.lstm_since_retrain[modality] = 0
-                return
-
-
-            self.lstm_since_retrain[modality] += 1
-            if self.lstm_since_retrain[modality] >= self.lstm_retrain_interval:
-                logger.info(f"[{modality}-LSTM] periodic retrain on {len(self.lstm_logs[modality])} logs")
-                ok = self._train_lstm_model_from_logs(modality)
-
-                self.lstm_since_retrain[modality] = 0 if ok else max(0, self.lstm_since_retrain[modality] // 2)
+                    ok = self._train_once("lstm", modality, lambda: self.lstm_modes[modality] == "collecting",
+                                          self._train_lstm_model_from_logs)
+                    if ok is not None:
+                        self.lstm_since_retrain[modality] = 0
+                return cnt
+
+            if self.drift_since_check[("lstm", modality)] >= self.drift_check_every:
+                if self._check_drift("lstm", modality) == "retrain":
+                    return cnt
+
+            due = lambda: self.lstm_since_retrain[modality] >= self.lstm_retrain_interval
+            if due():
+                logger.info(f"[{modality}-LSTM] periodic retrain on {cnt} logs")
+                ok = self._train_once("lstm", modality, due, self._train_lstm_model_from_logs)
+                if ok is not None:
+                    with self._buffer_locks[modality]:
+                        self.lstm_since_retrain[modality] = 0 if ok else max(0, self.lstm_since_retrain[modality] // 2)
 
         except Exception as e:
             logger.error(f"[{modality}-LSTM] 관찰 중 오류: {e}", exc_info=True)
-
-    def _train_lstm_model_from_logs(self, modality: str):
+        return cnt
+
+    def _append_lstm_log(self, modality: str, one_log: Dict[str, Any]) -> int:
+        # 호출자가 버퍼 락을 잡고 있어야 한다.
+        buf = self.lstm_rows[modality]
+        if modality == "sensor":
+            return buf.extend(self._sensor_frames(*sensor_fusion.samples_from_logs([one_log]))[0])
+        return buf.append(lstm_row_from_log(modality, one_log, buf.seen, buf.last()))
+
+    @staticmethod
+    def _lstm_matrix(rows: np.ndarray, columns: List[str], features: List[str]) -> np.ndarray:
+        # 버퍼 열 → 모델이 학습한 피처 순서 (없는 열은 0, NaN 은 0: 기존 reindex().fillna(0.0) 과 같음)
+        if list(features) == list(columns):
+            X = rows
+        else:
+            index = {c: i for i, c in enumerate(columns)}
+            X = np.zeros((len(rows), len(features)), dtype=np.float32)
+            for j, f in enumerate(features):
+                if f in index:
+                    X[:, j] = rows[:, index[f]]
+        return np.where(np.isnan(X), np.float32(0.0), X)
+
+    @_track_training("lstm")
+    def _train_lstm_model_from_logs(self, modality: str, recent: bool = False):
+        import joblib
+        import torch
+        from lstm_model import LSTMAutoencoder
         try:
-            logs = list(self.lstm_logs[modality])
-            if not logs or len(logs) < self.initial_samples[modality]:
-                logger.warning(f"[{modality}-LSTM] 학습 스킵: 데이터 부족({len(logs)}/{self.initial_samples[modality]})")
-                return False
-
-            df = parse_sensor_sequence_for_lstm(logs) if modality == "sensor" else parse_touch(logs)
-            if df.empty:
-                logger.warning(f"[{modality}-LSTM] 학습 스킵: 파싱 empty")
-                return False
-
-            numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
-            if not numeric_cols:
-                logger.warning(f"[{modality}-LSTM] 학습 스킵: 숫자 피처 없음")
+            seq_len = self.lstm_seq_lens[modality]
+            with self._buffer_locks[modality]:
+                buf = self.lstm_rows[modality]
+                rows = buf.recent()
+                # 링이 한 바퀴 돈 뒤에는 저수지의 과거 시퀀스 블록도 학습셋에 섞는다 (드리프트 재학습은 최근 링만).
+                blocks = buf.reservoir_sample() if buf.seen > buf.capacity and not recent else None
+                if recent:
+                    self.lstm_stats[modality].clear()
+                    self.lstm_stats[modality].partial_fit(self._lstm_matrix(rows, buf.columns, buf.columns))
+                stats = copy.deepcopy(self.lstm_stats[modality])
+            if len(rows) < self.initial_samples[modality]:
+                logger.warning(f"[{modality}-LSTM] 학습 스킵: 데이터 부족({len(rows)}/{self.initial_samples[modality]})")
                 return False
+            if blocks is not None and (len(blocks) == 0 or blocks.shape[1] != seq_len):
+                blocks = None
 
-            scaler = StandardScaler()
-            X = scaler.fit_transform(df[numeric_cols].fillna(0.0).values)
+            numeric_cols = list(buf.columns)
+            rows = self._lstm_matrix(rows, numeric_cols, numeric_cols)
+            if blocks is not None:
+                blocks = self._lstm_matrix(blocks.reshape(-1, len(numeric_cols)), numeric_cols, numeric_cols)
+            scaler = self._scaler_from_stats(stats, rows if blocks is None else np.concatenate([rows, blocks]))
+            X = scaler.transform(rows)
 
-            seq_len = self.lstm_seq_lens[modality]
             seqs = create_sequences(X, seq_len)
+            if seqs.size and blocks is not None:
+                seqs = np.concatenate([seqs, scaler.transform(blocks).reshape(-1, seq_len, len(numeric_cols))])
             if seqs.size == 0:
                 logger.warning(f"[{modality}-LSTM] 학습 스킵: 시퀀스 생성 실패")
                 return False
 
             X_tensor = torch.tensor(seqs, dtype=torch.float32).to(self.device)
             model = LSTMAutoencoder(feature_dim=X_tensor.shape[2]).to(self.device)
-            criterion = nn.MSELoss()
-            optimizer = optim.Adam(model.parameters(), lr=1e-3)
+            criterion = torch.nn.MSELoss()
+            optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
 
             epochs = 10
             for ep in range(epochs):
@@ -477,12 +1410,22 @@ class AnomalyDetector:
                 recon = model(X_tensor)
                 errors = torch.mean((X_tensor - recon) ** 2, dim=(1, 2)).cpu().numpy()
             q01, q99 = np.percentile(errors, [1, 99])
+            sketch = QuantileSketch()
+            sketch.update(errors)
+            with self._buffer_locks[modality]:
+                self.lstm_sketches[modality], self.lstm_prev_sketches[modality] = sketch, QuantileSketch()
+                self.scored_since_calibration[("lstm", modality)] = 0
+                self.drift_since_check[("lstm", modality)] = 0
+            reference = rows if blocks is None else np.concatenate([rows, blocks])
+            self.drift[modality].set_reference("lstm_input", reference[:, self.lstm_drift_columns[modality]])
+            self.drift[modality].set_reference("lstm_error", errors)
 
             self.lstm_models[modality] = model
             self.lstm_scalers[modality] = scaler
             self.lstm_thresholds[modality] = {"q01": float(q01), "q99": float(q99)}
             self.lstm_features[modality] = list(numeric_cols)
             self.lstm_modes[modality] = "inference"
+            self._publish_lstm(modality)
 
             model_file, scaler_file = self._lstm_model_files(modality)
             try:
@@ -492,65 +1435,83 @@ class AnomalyDetector:
                 logger.info(f"[{modality}-LSTM] 모델/스케일러 저장 완료 → {model_file.parent}")
             except Exception as se:
                 logger.warning(f"[{modality}-LSTM] 저장 경고: {se}")
+            if self.role == "coordinator":
+                self.export_version(modality, "lstm")
 
             logger.info(f"[{modality}-LSTM] 학습 완료 → inference (features={len(numeric_cols)}, seq_len={seq_len})")
             return True
         except Exception as e:
             logger.error(f"[{modality}-LSTM] 학습 실패: {e}", exc_info=True)
             self.lstm_modes[modality] = "collecting"
+            self._publish_lstm(modality)
             return False
 
-    def _predict_lstm(self, modality: str, logs: List[Dict[str, Any]]):
-        if (
-            self.lstm_modes[modality] != "inference"
-            or self.lstm_models[modality] is None
-            or self.lstm_scalers[modality] is None
-            or not self.lstm_features[modality]
-        ):
+    def _predict_lstm(self, modality: str, n_tail: int, need: Optional[np.ndarray] = None,
+                      observe: Optional[np.ndarray] = None, end: Optional[int] = None):
+        # 꼬리 = 버퍼의 절대 위치 end(observe_* 가 돌려준 seen, None 이면 지금 끝) 직전 n_tail 행.
+        # need (n_tail,) 이 있으면 그 꼬리 행으로 끝나는 시퀀스만 돌리고 키는 꼬리 위치다 (cascade).
+        # 그때 점수 스케치에는 observe 행(보정 표본)의 오차만 넣는다.
+        self._ready(modality)
+        snap = self.lstm_live[modality]
+        if snap is None:
             return None
+        import torch
         try:
-            acc_logs = list(self.lstm_logs[modality])
-            if not acc_logs:
-                return None
-
-            df = parse_sensor_sequence_for_lstm(acc_logs) if modality == "sensor" else parse_touch(acc_logs)
-            if df.empty:
-                return None
-
-            feature_list = list(self.lstm_features[modality])
-            valid_df = df.reindex(columns=feature_list).fillna(0.0)
-            if len(valid_df) < self.lstm_seq_lens[modality]:
+            # 요청 로그(버퍼 끝 n_tail 행)로 끝나는 시퀀스만 만들면 되므로 그만큼의 문맥만 복사한다.
+            with self._buffer_locks[modality]:
+                buf = self.lstm_rows[modality]
+                rows = buf.recent(max(n_tail, 1) + snap.seq_len - 1, end=end)
+            if len(rows) < snap.seq_len:
                 return None
 
-            features_np = self.lstm_scalers[modality].transform(valid_df.values)
-            seqs = create_sequences(features_np, self.lstm_seq_lens[modality])
+            t0 = time.perf_counter()
+            X = self._lstm_matrix(rows, buf.columns, snap.features)
+            STAGE_SECONDS.labels("lstm_parse", modality).observe(time.perf_counter() - t0)
+
+            features_np = snap.scaler.transform(X)
+            keys = None
+            if need is not None:
+                # 꼬리 위치 t 로 끝나는 시퀀스의 시작 = len(rows) - n_tail + t - seq_len + 1
+                pos = np.flatnonzero(need[:n_tail])
+                start = len(rows) - n_tail + pos - snap.seq_len + 1
+                keys, start = pos[start >= 0], start[start >= 0]
+                if len(start) == 0:
+                    return {}
+                windows = sliding_window_view(features_np, snap.seq_len, axis=0)
+                seqs = np.ascontiguousarray(windows[start].transpose(0, 2, 1))
+            else:
+                seqs = create_sequences(features_np, snap.seq_len)
             if seqs.size == 0:
                 return None
 
+            t0 = time.perf_counter()
             X = torch.tensor(seqs, dtype=torch.float32).to(self.device)
             with torch.no_grad():
-                recon = self.lstm_models[modality](X)
+                recon = snap.model(X)
                 errors = torch.mean((X - recon) ** 2, dim=(1, 2)).cpu().numpy()
-
-            thr = self.lstm_thresholds[modality]
+            dt = time.perf_counter() - t0
+            STAGE_SECONDS.labels("lstm_forward", modality).observe(dt)
+            prev = self.lstm_seq_seconds[modality]
+            per_seq = dt / len(seqs)
+            self.lstm_seq_seconds[modality] = per_seq if prev is None else 0.9 * prev + 0.1 * per_seq
+            if keys is None:
+                self._observe_errors(modality, errors)
+            elif observe is not None:
+                self._observe_errors(modality, errors[observe[:n_tail][keys]])
+
+            thr = snap.thresholds
             lower_bound = thr["q01"] * 0.5
             upper_bound = thr["q99"] * 1.5
 
             return {
                 i: {"is_anomaly": bool((float(e) <= lower_bound) or (float(e) >= upper_bound)),
                     "score": float(e)}
-                for i, e in enumerate(errors)
+                for i, e in zip(range(len(errors)) if keys is None else keys.tolist(), errors)
             }
         except Exception as e:
             logger.error(f"[{modality}-LSTM] 추론 중 오류: {e}", exc_info=True)
             return None
 
-    def _extract_sensor_features_from_dict(self, params: Dict[str, Any]):
-        if not params:
-            return np.zeros(3, dtype=float)
-        x = params.get("x", 0.0); y = params.get("y", 0.0); z = params.get("z", 0.0)
-        return np.array([x, y, z], dtype=float)
-
     def _extract_touch_drag_features_from_dict(self, params: Dict[str, Any]):
         if not params:
             return np.zeros(9, dtype=float)
@@ -577,8 +1538,175 @@ class AnomalyDetector:
         x = params.get("x", 0.0); y = params.get("y", 0.0)
         return np.array([duration, size, x, y], dtype=float)
 
-app = FastAPI()
-detector = AnomalyDetector()
+    # 아래 *_batch 는 위 행별 추출을 params 리스트 전체에 한 번에 적용한 (n, d) 행렬을 만든다 (같은 값).
+    # 행별 함수가 예외를 내는 입력(duration=None 등)은 velocity 0 으로 처리한다.
+    def _extract_touch_drag_features_batch(self, params_list: List[Dict[str, Any]]):
+        col = functools.partial(_params_column, params_list)
+        dirs = [p.get("drag_direction", "") if p else "" for p in params_list]
+        return touch_drag_matrix(col("duration"), col("total_distance"), col("straightness"), col("move_count"),
+                                 dirs).reshape(-1, 9)
+
+    def _extract_touch_pressure_features_batch(self, params_list: List[Dict[str, Any]]):
+        return np.column_stack([_params_column(params_list, k) for k in ("touch_duration", "size", "x", "y")]
+                               ).reshape(-1, 4)
+
+class FastJSONResponse(JSONResponse):
+    # orjson 이 있으면 그걸로 직렬화한다 (numpy 배열/스칼라도 그대로 받는다). 없으면 표준 json.
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+app = FastAPI(default_response_class=FastJSONResponse)
+detector = AnomalyDetector(role=serving.ROLE)
+if serving.ROLE == "worker":
+    serving.ModelWatcher(detector.model_path / "models", detector.load_version).start()
+    forwarder = serving.ObservationForwarder(serving.COORDINATOR_URL)
+else:
+    forwarder = None
+    if snapshots.SNAPSHOT_EVERY_SECONDS > 0:
+        snapshot_writer = snapshots.SnapshotWriter(detector.snapshot_path, detector.snapshot_state)
+        snapshot_writer.start()
+    if detector.warmup == "background":
+        detector.start_warmup()
+
+# 버퍼 크기/모드는 스크레이프 시점에 읽는다.
+GaugeFunc(
+    "kgl_ml_buffer_size", "Entries held in the training buffers.", ("buffer", "modality"),
+    lambda: {
+        **{("recent_data", m): len(detector.recent_data[m]) for m in detector.modalities},
+        **{("lstm_rows", m): len(detector.lstm_rows[m]) for m in detector.modalities},
+    },
+)
+GaugeFunc(
+    "kgl_ml_buffer_bytes", "Preallocated training buffer memory (ring + reservoir).", ("buffer", "modality"),
+    lambda: {
+        **{("recent_data", m): detector.recent_data[m].nbytes for m in detector.modalities},
+        **{("lstm_rows", m): detector.lstm_rows[m].nbytes for m in detector.modalities},
+    },
+)
+GaugeFunc(
+    "kgl_ml_buffer_budget_bytes", "Configured training buffer budget per modality.", ("modality",),
+    lambda: {(m,): detector.buffer_budget_bytes for m in detector.modalities},
+)
+GaugeFunc(
+    "kgl_ml_buffer_rows_seen", "Rows appended to each training buffer since start.", ("buffer", "modality"),
+    lambda: {
+        **{("recent_data", m): detector.recent_data[m].seen for m in detector.modalities},
+        **{("lstm_rows", m): detector.lstm_rows[m].seen for m in detector.modalities},
+    },
+)
+GaugeFunc(
+    "kgl_ml_modality_ready", "1 once a modality finished warm-up (model load / snapshot restore).", ("modality",),
+    lambda: {(m,): float(v == "ready") for m, v in detector.warm_states.items()},
+)
+GaugeFunc(
+    "kgl_ml_warmup_seconds", "Time a modality took to warm up.", ("modality",),
+    lambda: {(m,): v for m, v in detector.warm_seconds.items() if v is not None},
+)
+GaugeFunc(
+    "kgl_ml_model_mode", "1 for the current mode of each model and modality.", ("model", "modality", "mode"),
+    lambda: {
+        (model, m, mode): float(modes[m] == mode)
+        for model, modes in (("iforest", detector.iforest_modes), ("lstm", detector.lstm_modes))
+        for m in detector.modalities
+        for mode in ("collecting", "inference")
+    },
+)
+def _score_quantiles():
+    out = {}
+    for kind in ("iforest", "lstm"):
+        for m in detector.modalities:
+            window = detector.score_window(kind, m)
+            if window.n:
+                out.update({(kind, m, f"{q:g}"): window.quantile(q) for q in (0.01, 0.5, 0.99)})
+    return out
+
+
+def _drift_stats():
+    return {(m, name): s for m in detector.modalities for name, s in detector.drift[m].stats(include_partial=True).items()}
+
+
+GaugeFunc(
+    "kgl_ml_drift_psi", "PSI of the recent window against the training reference (max over columns).",
+    ("modality", "stream"), lambda: {k: s.psi for k, s in _drift_stats().items()},
+)
+GaugeFunc(
+    "kgl_ml_drift_ks", "Binned Kolmogorov-Smirnov distance of the recent window against the training reference.",
+    ("modality", "stream"), lambda: {k: s.ks for k, s in _drift_stats().items()},
+)
+GaugeFunc(
+    "kgl_ml_drift_window_rows", "Rows in the drift comparison window.",
+    ("modality", "stream"), lambda: {k: s.n for k, s in _drift_stats().items()},
+)
+GaugeFunc(
+    "kgl_ml_drift_retrain_budget_spent_seconds", "Drift-triggered retraining time spent in the current budget window.",
+    (), lambda: {(): detector.retrain_scheduler.spent_seconds()},
+)
+GaugeFunc(
+    "kgl_ml_cascade_pass_through", "Fraction of first-tier rows the cascade sent to the LSTM since start.", ("modality",),
+    lambda: {
+        (m,): CASCADE_ROWS.labels(m, "tier2").value / CASCADE_ROWS.labels(m, "tier1").value
+        for m in detector.modalities if CASCADE_ROWS.labels(m, "tier1").value
+    },
+)
+GaugeFunc(
+    "kgl_ml_score_quantile", "Live score quantile estimates from the scoring sketches (previous + current window).",
+    ("model", "modality", "quantile"), _score_quantiles,
+)
+
+
+@app.middleware("http")
+async def _observe_request_latency(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # 라우트 템플릿 경로만 라벨로 써서 카디널리티를 고정한다.
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(getattr(route, "path", "other"), status).observe(time.perf_counter() - t0)
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/healthz")
+def healthz():
+    # 프로세스가 요청을 받을 수 있는지만 본다 (모델 준비 여부와 무관).
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    status = detector.readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+SCORE_QUANTILES = (0.005, 0.01, 0.05, 0.5, 0.95, 0.99)
+
+
+@app.get("/percentiles")
+def percentiles(q: Optional[List[float]] = Query(None)):
+    # 채점하면서 쌓은 점수 스케치의 분위수 추정 (iForest = decision_function, LSTM = 재구성 오차). ?q=0.005&q=0.99
+    qs = q or list(SCORE_QUANTILES)
+    if any(not 0.0 <= v <= 1.0 for v in qs):
+        raise HTTPException(status_code=400, detail="q must be within [0, 1]")
+    return FastJSONResponse(detector.percentiles(qs))
+
+
+@app.post("/calibrate")
+def calibrate(modality: Optional[str] = None):
+    # 버퍼를 다시 채점하지 않고 스케치로 임계값만 재보정한다. modality 를 빼면 전체.
+    if modality is not None and modality not in detector.modalities:
+        raise HTTPException(status_code=404, detail=f"unknown modality {modality!r}")
+    return {m: detector.recalibrate(m) for m in ([modality] if modality else detector.modalities)}
+
 
 class PredictPayload(BaseModel):
     user_id: str
@@ -594,6 +1722,9 @@ def _infer_modality(action_type: str) -> str:
     at = (action_type or "").lower()
     if at.startswith("sensor_"):
         return "sensor"
+    # 원시 터치 이벤트는 모델 입력이 아니다 — 제스처로 묶여 닫힌 드래그가 touch_drag 로 채점된다.
+    if at in gestures.RAW_ACTIONS:
+        return "touch_raw"
     if "drag" in at:
         return "touch_drag"
     if "touch_pressure" in at:
@@ -607,40 +1738,126 @@ def _infer_modality(action_type: str) -> str:
 
 
 def _extract_features_by_modality(modality: str, params: Dict[str, Any]):
-    if modality == "sensor":
-        return detector._extract_sensor_features_from_dict(params)
-    elif modality == "touch_drag":
+    # 터치 로그 한 건의 iForest 피처. 센서는 로그 한 건이 아니라 창 단위라 여기서 만들지 않는다 (observe_sensor_samples).
+    if modality == "touch_drag":
         return detector._extract_touch_drag_features_from_dict(params)
     elif modality == "touch_pressure":
         return detector._extract_touch_pressure_features_from_dict(params)
     else:
         return None
 
-def _get_lstm_map_by_seq(modality: str, logs: List[Dict[str, Any]]) -> Dict[int, Dict[str, float]]:
-    lstm_map: Dict[int, Dict[str, float]] = {}
-    out = detector._predict_lstm(modality, logs)
-    if not out:
-        return lstm_map
-    values = list(out.values())
-    if not values:
-        return lstm_map
-    start = max(0, len(logs) - len(values))
-    for i, val in enumerate(values):
-        try:
-            seq = int(logs[start + i].get("sequence_index", start + i))
-        except Exception:
-            seq = start + i
-        lstm_map[seq] = {
-            "is_anomaly": bool(val.get("is_anomaly", False)),
-            "score": float(val.get("score", 0.0)),
-        }
-    return lstm_map
+def _extract_features_batch(modality: str, params_list: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    if modality == "touch_drag":
+        return detector._extract_touch_drag_features_batch(params_list)
+    elif modality == "touch_pressure":
+        return detector._extract_touch_pressure_features_batch(params_list)
+    else:
+        return None
+
+def _extract_features_from_columns(modality: str, cols: Dict[str, Any], n: int) -> Optional[np.ndarray]:
+    """_extract_*_features_from_dict 를 컬럼 배치 n 행에 한 번에 적용한 (n, d) 행렬.
+    컬럼 포맷에서 NaN 은 결측이므로 params 에 키가 없을 때(.get(k, 0.0))와 같이 0 으로 본다."""
+    def col(k):
+        v = columnar.numeric(cols, k, n, fill=0.0)
+        return np.where(np.isnan(v), 0.0, v)
+
+    if modality == "touch_drag":
+        return touch_drag_matrix(col("duration"), col("total_distance"), col("straightness"), col("move_count"),
+                                 cols.get("drag_direction", [""] * n))
+    if modality == "touch_pressure":
+        return np.column_stack([col("touch_duration"), col("size"), col("x"), col("y")])
+    return None
+
+def _per_row(values: np.ndarray, row_of: Optional[np.ndarray]) -> np.ndarray:
+    # row_of 가 있으면(센서: 샘플 → 융합 프레임/창) 입력 행마다 values[row_of] 를, -1 자리는 0/False 를 돌려준다.
+    if row_of is None:
+        return values
+    has = (row_of >= 0) & (row_of < len(values))
+    out = np.zeros(len(row_of), dtype=values.dtype)
+    out[has] = values[row_of[has]]
+    return out
+
+def _lstm_tail_arrays(modality: str, n: int, row_of: Optional[np.ndarray] = None,
+                      selection: Optional["cascade.CascadeSelection"] = None, end: Optional[int] = None):
+    # 방금 붙인 n 행(버퍼 절대 위치 end 직전) 각각에 "그 행으로 끝나는 시퀀스"의 재구성 오차를 위치 기준으로 대응시킨다.
+    # (여러 기기 요청이 한 배치로 합쳐지면 sequence_index 가 겹치므로 인덱스로 찾지 않는다. end 가 없으면 지금 버퍼 끝
+    # 인데, 그 사이 다른 요청이 붙인 행이 섞일 수 있다.)
+    # selection(결과 행 기준, cascade)이 있으면 고른 행의 LSTM 행만 채점하고 나머지는 0/False 로 둔다.
+    is_lstm = np.zeros(n, dtype=bool)
+    s_lstm = np.zeros(n, dtype=float)
+    if selection is None:
+        out = detector._predict_lstm(modality, n, end=end) if n else None
+        values = list(out.values())[-n:] if out else []
+        if values:
+            is_lstm[n - len(values):] = [v["is_anomaly"] for v in values]
+            s_lstm[n - len(values):] = [v["score"] for v in values]
+        return _per_row(is_lstm, row_of), _per_row(s_lstm, row_of)
+
+    need, sampled = _lstm_rows_selected(selection.need, row_of, n), _lstm_rows_selected(selection.sampled, row_of, n)
+    out = detector._predict_lstm(modality, n, need, sampled, end) if need.any() else None
+    for t, v in (out or {}).items():
+        is_lstm[t], s_lstm[t] = v["is_anomaly"], v["score"]
+    CASCADE_ROWS.labels(modality, "tier1").inc(len(selection.need))
+    CASCADE_ROWS.labels(modality, "tier2").inc(int(selection.need.sum()))
+    per_seq = detector.lstm_seq_seconds[modality]
+    if per_seq is not None:
+        CASCADE_SAVED_SECONDS.labels(modality).inc(per_seq * int(n - need.sum()))
+    return _per_row(is_lstm, row_of), _per_row(s_lstm, row_of)
+
+
+def _lstm_rows_selected(selected: np.ndarray, row_of: Optional[np.ndarray], n: int) -> np.ndarray:
+    # 결과 행 선택 → LSTM 버퍼 꼬리 n 행 선택 (센서: 샘플 → 융합 프레임).
+    if row_of is None:
+        return selected[:n]
+    out = np.zeros(n, dtype=bool)
+    hit = selected & (row_of >= 0) & (row_of < n)
+    out[row_of[hit]] = True
+    return out
+
+
+def _cascade_selection(modality: str, X: np.ndarray, x_of: Optional[np.ndarray], is_if: np.ndarray,
+                       s_if: np.ndarray, users: Optional[List[Any]] = None) -> Optional["cascade.CascadeSelection"]:
+    """결과 행별 LSTM 대상 (cascade). 끈 상태이거나 LSTM/1단계가 아직 없으면 None (전부 채점).
+    users 는 결과 행별 user_id (ewma 모드에서만 쓴다)."""
+    cas = detector.cascade
+    if not cas.enabled or detector.lstm_live[modality] is None:
+        return None
+    scored = None if x_of is None else (x_of >= 0) & (x_of < len(X))
+    if cas.mode == "iforest":
+        if detector.iforest_live[modality] is None:
+            return None
+        upper = detector.score_window("iforest", modality).quantile(cas.band)
+        return cas.select_iforest(s_if, is_if, upper, scored)
+    # EWMA 상태는 (모달리티, 사용자) 별 — 모달리티마다 피처가 다르다.
+    keys = [(modality, u) for u in (users if users is not None else [None] * len(is_if))]
+    if x_of is None:
+        return cas.select_ewma(keys, X)
+    # 센서: 창마다 그 창에 든 마지막 샘플의 사용자
+    x_keys: List[Any] = [(modality, None)] * len(X)
+    for r in np.flatnonzero(scored).tolist():
+        x_keys[x_of[r]] = keys[r]
+    return cas.select_ewma(x_keys, X, x_of)
+
+def _iforest_arrays(modality: str, X: np.ndarray, row_of: Optional[np.ndarray] = None):
+    # X 행(터치: 로그, 센서: 창)을 한 번에 채점하고 입력 행 기준으로 펼친다.
+    t0 = time.perf_counter()
+    is_if, s_if = detector._predict_iforest_batch(modality, X)
+    STAGE_SECONDS.labels("iforest_score", modality).observe(time.perf_counter() - t0)
+    return _per_row(np.asarray(is_if, dtype=bool), row_of), _per_row(np.asarray(s_if, dtype=float), row_of)
 
 @app.post("/predict")
+@profiled
 def predict_anomaly(payloads: List[PredictPayload]):
+    if forwarder is not None:
+        forwarder.submit([p.model_dump() for p in payloads])
     results: List[Dict[str, Any]] = []
+    # 행마다 히스토그램에 넣지 않고 모달리티별로 합산해 요청당 한 번만 기록한다.
+    counts: Dict[str, int] = {}
+    feat_t: Dict[str, float] = {}
+    score_t: Dict[str, float] = {}
     for p in payloads:
         modality = _infer_modality(p.action_type)
+        counts[modality] = counts.get(modality, 0) + 1
         if modality == "unknown":
             results.append({
                 "sequence_index": p.sequence_index, "modality": "unknown",
@@ -648,7 +1865,32 @@ def predict_anomaly(payloads: List[PredictPayload]):
             })
             continue
 
-        feats = _extract_features_by_modality(modality, p.params)
+        if modality == "sensor":
+            # 이 샘플로 창이 완성됐으면 그 창(들 중 마지막)의 점수, 아니면 0.
+            obs = detector.observe_sensor_samples(*sensor_fusion.samples_from_logs([p.model_dump()]))
+            is_if, s_if = detector._predict_iforest_batch(modality, obs.windows[-1:])
+            results.append({
+                "sequence_index": p.sequence_index, "modality": modality, "timestamp": p.timestamp,
+                "is_anomaly": bool(is_if[0]) if len(is_if) else False,
+                "anomaly_score": float(s_if[0]) if len(s_if) else 0.0,
+            })
+            continue
+
+        log = p.model_dump()
+        if modality == "touch_raw":
+            # 이 이벤트가 드래그를 닫았으면 그 드래그를 touch_drag 로 채점, 아니면 0.
+            dlogs, _ = _drag_logs_from_raw([log])
+            if not dlogs:
+                results.append({
+                    "sequence_index": p.sequence_index, "modality": modality,
+                    "timestamp": p.timestamp, "is_anomaly": False, "anomaly_score": 0.0,
+                })
+                continue
+            modality, log = "touch_drag", dlogs[0]
+
+        t0 = time.perf_counter()
+        feats = _extract_features_by_modality(modality, log["params"])
+        feat_t[modality] = feat_t.get(modality, 0.0) + time.perf_counter() - t0
         if feats is None:
             results.append({
                 "sequence_index": p.sequence_index, "modality": modality,
@@ -657,82 +1899,291 @@ def predict_anomaly(payloads: List[PredictPayload]):
             continue
 
         detector.observe_and_maybe_train(modality, feats)
-        detector.observe_and_maybe_train_lstm(modality, p.dict())
+        detector.observe_and_maybe_train_lstm(modality, log)
 
+        t0 = time.perf_counter()
         try:
             res = detector._predict_one_iforest(modality, feats)
             is_anom = bool(res.get("is_anomaly", False))
             score = float(res.get("score", 0.0))
         except Exception:
             is_anom, score = False, 0.0
+        score_t[modality] = score_t.get(modality, 0.0) + time.perf_counter() - t0
 
         results.append({
             "sequence_index": p.sequence_index, "modality": modality,
             "timestamp": p.timestamp, "is_anomaly": is_anom, "anomaly_score": score,
         })
-    return results
+
+    for modality, n in counts.items():
+        BATCH_SIZE.labels("/predict", modality).observe(n)
+    for modality, t in feat_t.items():
+        STAGE_SECONDS.labels("feature_extraction", modality).observe(t)
+    for modality, t in score_t.items():
+        STAGE_SECONDS.labels("iforest_score", modality).observe(t)
+    return FastJSONResponse(results)
 
 @app.post("/predict_hybrid")
-def predict_hybrid(payloads: List[PredictPayload]):
+async def predict_hybrid(payloads: List[PredictPayload]):
     logs: List[Dict[str, Any]] = [p.model_dump() for p in payloads]
+    return FastJSONResponse(await _run_hybrid(logs, "/predict_hybrid"))
 
-    grouped: Dict[str, List[Dict[str, Any]]] = {"sensor": [], "touch_drag": [], "touch_pressure": []}
+
+@app.post("/predict_columns")
+async def predict_columns(request: Request):
+    # Django 가 센서/터치 업로드를 컬럼 배치(msgpack) 그대로 넘겨주는 경로. 행 dict 를 만들지 않고 컬럼째 채점한다.
+    # Accept 에 COLUMNAR_MEDIA_TYPE 이 있으면 결과도 컬럼 배치로, 아니면 /predict_hybrid 와 같은 JSON 배열로 돌려준다.
+    ctype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if ctype != COLUMNAR_MEDIA_TYPE:
+        raise HTTPException(status_code=415, detail=f"Expected {COLUMNAR_MEDIA_TYPE}")
+    try:
+        batch = decode_batch(await request.body())
+    except ColumnarFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if forwarder is not None:
+        forwarder.submit(batch_to_logs(batch))
+    out = await run_in_threadpool(_score_columns, batch, "/predict_columns")
+    if COLUMNAR_MEDIA_TYPE in request.headers.get("accept", ""):
+        return Response(columnar.encode_batch("results", out), media_type=COLUMNAR_MEDIA_TYPE)
+    return FastJSONResponse(_result_rows(out, batch))
+
+
+@profiled
+def _score_columns(batch: Dict[str, Any], endpoint: str = "/predict_columns") -> Dict[str, Any]:
+    """컬럼 배치를 모달리티별로 나눠 채점한 결과 컬럼 (모달리티 순 → 입력 순, 알 수 없는 모달리티 행은 빠짐).
+    row 는 각 결과 행의 입력 행 번호."""
+    n, cols = batch["n"], batch["columns"]
+    actions = cols.get("action_type")
+    if actions is None:
+        actions = ["unknown"] * n
+    modality_of = {a: _infer_modality(a or "") for a in set(actions)}
+    row_modality = np.array([modality_of[a] for a in actions], dtype=object)
+
+    sources = {m: [] for m in detector.modalities}
+    for modality in detector.modalities:
+        idx = np.flatnonzero(row_modality == modality)
+        if len(idx):
+            BATCH_SIZE.labels(endpoint, modality).observe(len(idx))
+            sources[modality].append((idx, columnar.select_rows(cols, idx)))
+    raw = np.flatnonzero(row_modality == "touch_raw")
+    if len(raw):
+        # 원시 터치 이벤트 → 닫힌 드래그. 결과 행은 드래그를 닫은 up 이벤트의 입력 행이다.
+        t0 = time.perf_counter()
+        drags = detector.gestures.push(*touch_events_from_columns(columnar.select_rows(cols, raw), len(raw),
+                                                                  batch["meta"]))
+        STAGE_SECONDS.labels("feature_extraction", "touch_drag").observe(time.perf_counter() - t0)
+        if drags.size:
+            sources["touch_drag"].append((raw[drags.closed_at], drag_columns(drags)))
+
+    parts = []
+    for modality in detector.modalities:
+        for idx, mcols in sources[modality]:
+            t_modality = time.perf_counter()
+            if modality == "sensor":
+                t0 = time.perf_counter()
+                obs = detector.observe_sensor_samples(*sensor_samples_from_columns(mcols, len(idx), batch["meta"]))
+                STAGE_SECONDS.labels("feature_extraction", modality).observe(time.perf_counter() - t0)
+                X, x_of, n_rows, row_of, end = obs.windows, obs.window_of, obs.frames, obs.frame_of, obs.end
+            else:
+                end = detector.observe_and_maybe_train_lstm_columns(modality, mcols, len(idx))
+                t0 = time.perf_counter()
+                X = _extract_features_from_columns(modality, mcols, len(idx))
+                STAGE_SECONDS.labels("feature_extraction", modality).observe(time.perf_counter() - t0)
+                detector.observe_and_maybe_train(modality, X)
+                x_of, n_rows, row_of = None, len(idx), None
+
+            is_if, s_if = _iforest_arrays(modality, X, x_of)
+            users = [k[0] for k in _session_keys_from_columns(mcols, len(idx), batch["meta"])] \
+                if detector.cascade.mode == "ewma" else None
+            selection = _cascade_selection(modality, X, x_of, is_if, s_if, users)
+            is_ls, s_ls = _lstm_tail_arrays(modality, n_rows, row_of, selection, end)
+            parts.append((modality, idx, is_if, s_if, is_ls, s_ls))
+            MODALITY_LATENCY.labels(endpoint, modality).observe(time.perf_counter() - t_modality)
+
+    rows = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, dtype=np.int64)
+    rank = np.concatenate([np.full(len(p[1]), detector.modalities.index(p[0])) for p in parts]) if parts else rows
+    order = np.lexsort((rows, rank))  # 한 모달리티가 여러 조각(touch_drag + 원시 이벤트 드래그)이어도 입력 순으로
+    rows = rows[order]
+    cat = lambda k, dtype: (np.concatenate([p[k] for p in parts]).astype(dtype)[order] if parts
+                            else np.zeros(0, dtype=dtype))
+    s_if, s_ls = cat(3, np.float64), cat(5, np.float64)
+    is_if, is_ls = cat(2, bool), cat(4, bool)
+    seqs = columnar.numeric(cols, "seq", n, fill=0.0) if "seq" in cols else np.zeros(n)
+    return {
+        "row": rows.astype(np.int64),
+        "sequence_index": np.nan_to_num(seqs[rows]).astype(np.int64),
+        "modality": [detector.modalities[r] for r in rank[order].tolist()],
+        "is_anomaly_iforest": is_if,
+        "anomaly_score_iforest": s_if,
+        "is_anomaly_lstm": is_ls,
+        "anomaly_score_lstm": s_ls,
+        "is_anomaly_combined": is_if | is_ls,
+        "anomaly_score_combined": (s_if + s_ls) / 2.0,
+    }
+
+
+def _result_rows(out: Dict[str, Any], batch: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # /predict_hybrid 응답과 같은 모양 (timestamp 는 batch_to_logs 와 같은 ISO 문자열).
+    cols = batch["columns"]
+    ts_col = cols.get("ts", cols.get("timestamp"))
+    stamps = columnar._as_list(ts_col, batch["n"])
+    keys = [k for k in out if k not in ("row", "modality", "sequence_index")]
+    values = [out[k].tolist() for k in keys]
+    return [
+        {"sequence_index": seq, "modality": modality, "timestamp": columnar._iso(stamps[r]),
+         **dict(zip(keys, vals))}
+        for r, seq, modality, *vals in zip(out["row"].tolist(), out["sequence_index"].tolist(),
+                                           out["modality"], *values)
+    ]
+
+
+async def _run_hybrid(logs: List[Dict[str, Any]], endpoint: str) -> List[Dict[str, Any]]:
+    _observe_batch_sizes(logs, endpoint)
+    if forwarder is not None:
+        forwarder.submit(logs)
+    # 프로파일 대상 요청은 다른 요청과 섞이지 않도록 배처를 우회한다.
+    if hybrid_batcher is None or profiling.requested():
+        results = await run_in_threadpool(_score_hybrid_logs, logs, endpoint)
+    else:
+        results = await hybrid_batcher.submit(logs)
+    return _order_by_modality(results)
+
+
+def _observe_batch_sizes(logs: List[Dict[str, Any]], endpoint: str):
+    counts: Dict[str, int] = {}
     for log in logs:
         m = _infer_modality(log.get("action_type", ""))
-        if m in grouped:
-            grouped[m].append(log)
+        if m in detector.modalities:
+            counts[m] = counts.get(m, 0) + 1
+    for modality, n in counts.items():
+        BATCH_SIZE.labels(endpoint, modality).observe(n)
 
-    final_results: List[Dict[str, Any]] = []
-    for modality, mlogs in grouped.items():
-        if not mlogs:
-            continue
 
-        for log in mlogs:
-            detector.observe_and_maybe_train_lstm(modality, log)
+def _order_by_modality(results: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # 응답 순서는 기존과 같이 모달리티(sensor → touch_drag → touch_pressure) 묶음 순, 묶음 안은 입력 순.
+    return [r for m in detector.modalities for r in results if r is not None and r["modality"] == m]
 
-        iforest_list = []
-        for log in mlogs:
-            feats = _extract_features_by_modality(modality, log.get("params", {}))
-            if feats is not None:
-                detector.observe_and_maybe_train(modality, feats)
-            if feats is None:
-                iforest_list.append({"is_anomaly": False, "score": 0.0})
-                continue
-            try:
-                res = detector._predict_one_iforest(modality, feats)
-                iforest_list.append({
-                    "is_anomaly": bool(res.get("is_anomaly", False)),
-                    "score": float(res.get("score", 0.0)),
-                })
-            except Exception:
-                iforest_list.append({"is_anomaly": False, "score": 0.0})
 
-        lstm_by_seq = _get_lstm_map_by_seq(modality, mlogs)
+def _observe_modality(modality: str, mlogs: List[Dict[str, Any]]):
+    # 버퍼에 쌓고(필요하면 학습) (iForest 입력 X, 로그별 X 행 번호, 붙인 LSTM 행 수, 로그별 LSTM 행 번호,
+    # 붙인 직후 LSTM 버퍼 seen) 을 돌려준다.
+    # 터치는 로그 = X 행 = LSTM 행이라 번호가 None, 센서는 X 가 창 피처이고 LSTM 행이 융합 프레임이다.
+    if modality == "sensor":
+        t0 = time.perf_counter()
+        obs = detector.observe_sensor_samples(*sensor_fusion.samples_from_logs(mlogs))
+        STAGE_SECONDS.labels("feature_extraction", modality).observe(time.perf_counter() - t0)
+        return obs.windows, obs.window_of, obs.frames, obs.frame_of, obs.end
+
+    end = detector.observe_and_maybe_train_lstm_logs(modality, mlogs)
+    t0 = time.perf_counter()
+    X = _extract_features_batch(modality, [log.get("params", {}) for log in mlogs])
+    STAGE_SECONDS.labels("feature_extraction", modality).observe(time.perf_counter() - t0)
+    detector.observe_and_maybe_train(modality, X)
+    return X, None, len(mlogs), None, end
+
+
+def _drag_logs_from_raw(raw_logs: List[Dict[str, Any]]):
+    """원시 터치 이벤트 로그 → (이번에 닫힌 드래그의 touch_drag 로그, 각 드래그를 닫은 up 이벤트의 raw_logs 위치).
+    드래그 로그의 timestamp / sequence_index 는 닫은 이벤트의 것을 쓴다."""
+    t0 = time.perf_counter()
+    drags = detector.gestures.push(*gestures.events_from_logs(raw_logs))
+    closing = drags.closed_at.tolist()
+    dlogs = gestures.drag_logs(drags, [raw_logs[i] for i in closing])
+    STAGE_SECONDS.labels("feature_extraction", "touch_drag").observe(time.perf_counter() - t0)
+    return dlogs, closing
+
+
+def _observe_logs(logs: List[Dict[str, Any]]):
+    grouped: Dict[str, List[Dict[str, Any]]] = {m: [] for m in detector.modalities}
+    raw: List[Dict[str, Any]] = []
+    for log in logs:
+        m = _infer_modality(log.get("action_type", ""))
+        if m in grouped:
+            grouped[m].append(log)
+        elif m == "touch_raw":
+            raw.append(log)
+    if raw:
+        grouped["touch_drag"] += _drag_logs_from_raw(raw)[0]
+    for modality, mlogs in grouped.items():
+        if mlogs:
+            _observe_modality(modality, mlogs)
 
-        for i, log in enumerate(mlogs):
-            seq = int(log.get("sequence_index", i))
-            ts = log.get("timestamp")
-            iforest_res = iforest_list[i] if i < len(iforest_list) else {"is_anomaly": False, "score": 0.0}
-            lstm_res = lstm_by_seq.get(seq, {"is_anomaly": False, "score": 0.0})
 
-            is_iforest = bool(iforest_res.get("is_anomaly", False))
-            s_iforest = float(iforest_res.get("score", 0.0))
-            is_lstm = bool(lstm_res.get("is_anomaly", False))
-            s_lstm = float(lstm_res.get("score", 0.0))
+@profiled
+def _score_hybrid_logs(logs: List[Dict[str, Any]], endpoint: str = "/predict_hybrid") -> List[Optional[Dict[str, Any]]]:
+    """logs 와 같은 길이/순서의 결과 리스트. 모달리티를 알 수 없는 로그 자리는 None."""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(logs)
+    grouped: Dict[str, List[int]] = {"sensor": [], "touch_drag": [], "touch_pressure": [], "touch_raw": []}
+    for i, log in enumerate(logs):
+        m = _infer_modality(log.get("action_type", ""))
+        if m in grouped:
+            grouped[m].append(i)
+    members = {m: [logs[i] for i in idx] for m, idx in grouped.items()}
+    # 원시 터치 이벤트는 닫힌 드래그로 바꿔 touch_drag 에 붙이고, 결과는 드래그를 닫은 up 이벤트 자리에 둔다.
+    raw = grouped.pop("touch_raw")
+    if raw:
+        dlogs, closing = _drag_logs_from_raw(members.pop("touch_raw"))
+        grouped["touch_drag"] += [raw[c] for c in closing]
+        members["touch_drag"] += dlogs
+
+    for modality, idx in grouped.items():
+        if not idx:
+            continue
+        t_modality = time.perf_counter()
+        mlogs = members[modality]
+        X, x_of, n_rows, row_of, end = _observe_modality(modality, mlogs)
+
+        # 학습을 유발한 배치라면 배치 전체가 새 모델로 채점된다 (행 단위로 돌던 이전과의 차이).
+        is_if, s_if = _iforest_arrays(modality, X, x_of)
+        users = [log.get("user_id") for log in mlogs] if detector.cascade.mode == "ewma" else None
+        selection = _cascade_selection(modality, X, x_of, is_if, s_if, users)
+        is_ls, s_ls = _lstm_tail_arrays(modality, n_rows, row_of, selection, end)
+
+        for k, (i, log) in enumerate(zip(idx, mlogs)):
+            is_iforest = bool(is_if[k])
+            s_iforest = float(s_if[k])
+            is_lstm = bool(is_ls[k])
+            s_lstm = float(s_ls[k])
 
             combined_score = (s_iforest + s_lstm) / 2.0 if (s_iforest or s_lstm) else 0.0
             is_combined = is_iforest or is_lstm
 
-            final_results.append({
-                "sequence_index": seq,
+            results[i] = {
+                "sequence_index": int(log.get("sequence_index", k)),
                 "modality": modality,
-                "timestamp": ts,
+                "timestamp": log.get("timestamp"),
                 "is_anomaly_iforest": is_iforest,
                 "anomaly_score_iforest": s_iforest,
                 "is_anomaly_lstm": is_lstm,
                 "anomaly_score_lstm": s_lstm,
                 "is_anomaly_combined": is_combined,
                 "anomaly_score_combined": combined_score,
-            })
+            }
+        MODALITY_LATENCY.labels(endpoint, modality).observe(time.perf_counter() - t_modality)
+
+    return results
+
+
+if serving.ROLE == "coordinator":
+    @app.post("/observe")
+    async def observe(logs: List[Dict[str, Any]]):
+        # 채점 워커가 넘겨준 로그를 버퍼에 쌓고 학습만 한다 (채점 없음). 새 모델은 버전 디렉터리로 게시된다.
+        await run_in_threadpool(_observe_logs, logs)
+        return {"observed": len(logs)}
+
+
+# 동시에 들어온 /predict_hybrid 요청을 짧게 모아 한 번에 채점한다 (/predict_columns 는 이미 배치이므로 바로 채점).
+#   KGL_BATCHING=off          # 끄면 요청마다 바로 채점 (이전 동작)
+#   KGL_BATCH_MAX_WAIT_MS=5   # 첫 요청 도착 후 최대 대기
+#   KGL_BATCH_MAX_ROWS=2000   # 이만큼 쌓이면 대기 없이 바로 채점
+BATCHING = os.environ.get("KGL_BATCHING", "on").lower() in ("1", "on", "true", "yes")
+BATCH_MAX_WAIT_MS = float(os.environ.get("KGL_BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_ROWS = int(os.environ.get("KGL_BATCH_MAX_ROWS", "2000"))
+hybrid_batcher = (
+    MicroBatcher(functools.partial(_score_hybrid_logs, endpoint="coalesced"),
+                 max_wait_ms=BATCH_MAX_WAIT_MS, max_rows=BATCH_MAX_ROWS, name="predict_hybrid")
+    if BATCHING else None
+)
+
 
-    return final_results
+profiling.install(app)
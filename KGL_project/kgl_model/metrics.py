@@ -0,0 +1,248 @@
+# metrics.py
+# ML 서버용 경량 Prometheus 텍스트 포맷 메트릭 (외부 의존성 없음).
+#
+#   REQUEST_LATENCY.labels("/predict_hybrid").observe(0.012)
+#   with STAGE_SECONDS.labels("iforest_score", "sensor").time(): ...
+#   render()  -> /metrics 응답 본문 (text/plain; version=0.0.4)
+#
+# 요청 경로에서는 dict 조회 + 정수/실수 덧셈만 한다. 버퍼 크기·모드처럼 계속 변하는 값은
+# 관측 시점이 아니라 스크레이프 시점에 콜백으로 읽으므로(GaugeFunc) 핫 패스 비용이 없다.
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TRAIN_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}_total{_fmt_labels(self.labelnames, key)} {_fmt_value(child.value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(child.value)}"
+
+
+class GaugeFunc(_Metric):
+    """스크레이프 시점에 fn() 이 돌려주는 {(label 값...): value} 를 그대로 내보내는 게이지."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames, fn: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def _samples(self):
+        try:
+            values = self.fn() or {}
+        except Exception:
+            values = {}
+        for key, v in values.items():
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(float(v))}"
+
+
+class _Timer:
+    __slots__ = ("child", "t0")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # GIL 하에서 리스트 원소 증가는 원자적이지 않지만, 스크레이프 값이 한두 건 어긋나는 정도라 락을 생략한다.
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), list(child.counts)):
+                cumulative += c
+                le = (("le", _fmt_value(bound)),)
+                yield f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(child.sum)}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, key)} {child.count}"
+
+
+def render() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# ─── ML 서버 공통 메트릭 ──────────────────────────────────────────────
+REQUEST_LATENCY = Histogram(
+    "kgl_ml_request_duration_seconds", "HTTP request latency by endpoint.", ("endpoint", "status"),
+)
+MODALITY_LATENCY = Histogram(
+    "kgl_ml_modality_duration_seconds", "Per-modality processing time inside a request.", ("endpoint", "modality"),
+)
+STAGE_SECONDS = Histogram(
+    "kgl_ml_stage_duration_seconds",
+    "Time per pipeline stage (feature_extraction, iforest_score, lstm_parse, lstm_forward) per request.",
+    ("stage", "modality"),
+)
+BATCH_SIZE = Histogram(
+    "kgl_ml_batch_size", "Logs per request and modality.", ("endpoint", "modality"), buckets=SIZE_BUCKETS,
+)
+RETRAIN_TOTAL = Counter(
+    "kgl_ml_retrain", "Model (re)training runs.", ("model", "modality", "result"),
+)
+RETRAIN_SECONDS = Histogram(
+    "kgl_ml_retrain_duration_seconds", "Model (re)training wall time.", ("model", "modality"), buckets=TRAIN_BUCKETS,
+)
+DRIFT_DECISIONS = Counter(
+    "kgl_ml_drift_decision", "Drift checks by outcome (stable, retrain, cooldown, budget, disabled).",
+    ("model", "modality", "decision"),
+)
+CASCADE_ROWS = Counter(
+    "kgl_ml_cascade_rows", "Rows reaching each cascade tier (tier1 = cheap first tier, tier2 = LSTM).",
+    ("modality", "tier"),
+)
+CASCADE_SAVED_SECONDS = Counter(
+    "kgl_ml_cascade_lstm_seconds_saved", "Estimated LSTM forward time skipped by the cascade.", ("modality",),
+)
+COALESCED_REQUESTS = Histogram(
+    "kgl_ml_coalesced_batch_requests", "HTTP requests merged into one scoring pass.", ("batcher",),
+    buckets=SIZE_BUCKETS,
+)
+COALESCED_ROWS = Histogram(
+    "kgl_ml_coalesced_batch_rows", "Logs per coalesced scoring pass.", ("batcher",), buckets=SIZE_BUCKETS,
+)
+COALESCE_WAIT_SECONDS = Histogram(
+    "kgl_ml_coalesce_wait_seconds", "Time a request waited in the batcher queue before scoring.", ("batcher",),
+)
+FORWARDED_LOGS = Counter(
+    "kgl_ml_forwarded_logs", "Logs a scoring worker forwarded to the coordinator.", ("result",),
+)
+SNAPSHOT_TOTAL = Counter(
+    "kgl_ml_snapshot", "Detector state snapshot saves/restores.", ("op", "result"),
+)
+SNAPSHOT_SECONDS = Histogram(
+    "kgl_ml_snapshot_duration_seconds", "Time to write or restore a detector state snapshot.", ("op",),
+)
+SNAPSHOT_BYTES = Gauge(
+    "kgl_ml_snapshot_bytes", "Size of the last written detector state snapshot.",
+)
+SNAPSHOT_LAST_SUCCESS = Gauge(
+    "kgl_ml_snapshot_last_success_timestamp_seconds", "Unix time of the last successful snapshot write.",
+)
+SNAPSHOT_INTERVAL = Gauge(
+    "kgl_ml_snapshot_interval_seconds", "Configured snapshot interval (0 = disabled).",
+)
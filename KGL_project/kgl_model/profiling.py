@@ -0,0 +1,153 @@
+# profiling.py
+# ML 서버 요청 단위 opt-in 프로파일링 (cProfile).
+#
+#   KGL_PROFILING=on                 # 끄면(기본) 미들웨어/라우트/데코레이터가 아예 설치되지 않는다
+#   KGL_PROFILE_SAMPLE_RATE=0.01     # 플래그 없는 요청도 이 비율로 표본 프로파일 (기본 0)
+#   KGL_PROFILE_DIR=./profiles       # .prof 저장 위치 (pstats 포맷)
+#   KGL_PROFILE_KEEP=200             # 이보다 많으면 오래된 파일부터 삭제
+#
+#   curl -H 'X-Profile: 1' ...  또는  ...?profile=1   → 응답 헤더 X-Profile-Id 에 파일명
+#   GET /debug/profiles                 → 저장된 프로파일 목록
+#   GET /debug/profiles/{name}?sort=cumulative&limit=40   → pstats 요약 텍스트 (raw=1 이면 .prof 원본)
+#
+# 엔드포인트 본체는 스레드 풀에서 돌기 때문에 미들웨어가 아니라 @profiled 로 감싼 함수 안에서 프로파일러를 켠다.
+# 미들웨어는 contextvar 로 "이 요청을 프로파일하라"는 표시만 넘긴다 (run_in_threadpool 은 컨텍스트를 복사해 간다).
+import contextvars
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("AnomalyDetector")
+
+ENABLED = os.environ.get("KGL_PROFILING", "off").lower() in ("1", "on", "true", "yes")
+SAMPLE_RATE = float(os.environ.get("KGL_PROFILE_SAMPLE_RATE", "0") or 0)
+PROFILE_DIR = Path(os.environ.get("KGL_PROFILE_DIR", "./profiles"))
+KEEP = int(os.environ.get("KGL_PROFILE_KEEP", "200"))
+
+_NAME_RE = re.compile(r"^[\w.\-]+\.prof$")
+_request: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("kgl_profile", default=None)
+
+
+def _wanted(request) -> bool:
+    flag = request.headers.get("x-profile") or request.query_params.get("profile")
+    if flag is not None:
+        return flag.lower() in ("1", "true", "yes", "on")
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _rotate():
+    files = sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    for p in files[:max(0, len(files) - KEEP)]:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+def _save(prof: cProfile.Profile, req: Dict[str, Any], elapsed: float) -> str:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")[:-3]
+    endpoint = req["endpoint"].strip("/").replace("/", ".") or "root"
+    name = f"{ts}-{endpoint}-{int(elapsed * 1000)}ms-{req['id']}.prof"
+    prof.dump_stats(str(PROFILE_DIR / name))
+    _rotate()
+    return name
+
+
+def requested() -> bool:
+    """현재 요청이 프로파일 대상인지 (배처처럼 요청을 합치는 경로가 우회 여부를 판단할 때 쓴다)."""
+    return ENABLED and _request.get() is not None
+
+
+def profiled(fn):
+    """요청에 프로파일 표시가 있으면 fn 실행을 cProfile 로 감싼다. 비활성화 시 fn 을 그대로 반환."""
+    if not ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        req = _request.get()
+        if req is None or req.get("active"):
+            return fn(*args, **kwargs)
+        req["active"] = True
+        prof = cProfile.Profile()
+        t0 = time.perf_counter()
+        try:
+            return prof.runcall(fn, *args, **kwargs)
+        finally:
+            req["active"] = False
+            try:
+                req["name"] = _save(prof, req, time.perf_counter() - t0)
+            except Exception as e:
+                logger.error(f"프로파일 저장 실패: {e}")
+    return wrapper
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    if not PROFILE_DIR.exists():
+        return []
+    out = []
+    for p in sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True):
+        st = p.stat()
+        parts = p.stem.split("-")
+        out.append({
+            "name": p.name,
+            "endpoint": "/" + "-".join(parts[1:-2]).replace(".", "/") if len(parts) >= 4 else None,
+            "duration_ms": int(parts[-2][:-2]) if len(parts) >= 4 and parts[-2].endswith("ms") else None,
+            "size": st.st_size,
+            "created": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc).isoformat(),
+        })
+    return out
+
+
+def install(app):
+    """KGL_PROFILING 이 켜져 있을 때만 미들웨어와 /debug/profiles 라우트를 등록한다."""
+    if not ENABLED:
+        return
+    from fastapi import HTTPException
+    from fastapi.responses import FileResponse, PlainTextResponse
+
+    @app.middleware("http")
+    async def _profile_flag(request, call_next):
+        if not _wanted(request):
+            return await call_next(request)
+        req = {"endpoint": request.url.path, "id": uuid.uuid4().hex[:8]}
+        token = _request.set(req)
+        try:
+            response = await call_next(request)
+        finally:
+            _request.reset(token)
+        if req.get("name"):
+            response.headers["X-Profile-Id"] = req["name"]
+        return response
+
+    @app.get("/debug/profiles")
+    def debug_profiles():
+        return {"dir": str(PROFILE_DIR.resolve()), "keep": KEEP, "sample_rate": SAMPLE_RATE,
+                "profiles": list_profiles()}
+
+    @app.get("/debug/profiles/{name}")
+    def debug_profile(name: str, sort: str = "cumulative", limit: int = 40, raw: bool = False):
+        path = PROFILE_DIR / name
+        if not _NAME_RE.match(name) or not path.is_file():
+            raise HTTPException(status_code=404, detail="profile not found")
+        if raw:
+            return FileResponse(path, media_type="application/octet-stream", filename=name)
+        buf = io.StringIO()
+        try:
+            pstats.Stats(str(path), stream=buf).strip_dirs().sort_stats(sort).print_stats(limit)
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"unknown sort key: {sort}")
+        return PlainTextResponse(buf.getvalue())
+
+    logger.info(f"요청 프로파일링 활성화 (sample_rate={SAMPLE_RATE}, dir={PROFILE_DIR})")
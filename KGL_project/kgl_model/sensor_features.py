@@ -0,0 +1,128 @@
+# sensor_features.py
+# 센서 iForest 피처: 융합 프레임(sensor_fusion.FUSED_COLUMNS)을 세션별 N 프레임 창으로 잘라 창마다 벡터 하나를 만든다.
+# 샘플마다 [x, y, z] 한 행을 채점하던 것보다 채점 행 수가 창 크기만큼 줄고, 행이 움직임의 세기/떨림/주기를 담는다.
+#
+#   windows = SensorWindows()                             # KGL_SENSOR_WINDOW=50 프레임 (50Hz 에서 1초), hop 도 50
+#   X, window_of = windows.push(("u1", "s1"), frames)     # 이번에 완성된 창 (w, d), 입력 프레임별 창 번호 (-1 = 아직 없음)
+#   X = window_features(frames)                           # 상태 없이 한 세션 프레임 전체를 (학습/벤치마크용)
+#   X = windows_from_logs(logs)                           # 로그 → 융합 → 세션별 창
+#
+# 창 하나의 피처 (WINDOW_FEATURES 순서):
+#   융합 8열 각각의 mean / std / energy(제곱 평균)
+#   accel_mag, gyro_mag 의 jerk (인접 프레임 차이의 절대값 평균 × hz)
+#   accel_mag, gyro_mag 의 FFT 대역 파워 (평균을 뺀 뒤 BAND_EDGES_HZ 구간별 합, 마지막 구간은 나이퀴스트까지)
+# 창 크기/hop/주기나 위 목록이 바뀌면 FEATURE_SCHEMA 를 올린다 — 저장된 iForest 의 meta.json 과 다르면 다시 학습한다.
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import sensor_fusion
+from sensor_fusion import FUSED_COLUMNS, SENSOR_HZ
+
+SENSOR_WINDOW = int(os.environ.get("KGL_SENSOR_WINDOW", "50"))
+SENSOR_WINDOW_HOP = int(os.environ.get("KGL_SENSOR_WINDOW_HOP", str(SENSOR_WINDOW)))
+
+# 1 = 샘플별 [x, y, z] (예전), 2 = 융합 프레임 창 피처
+FEATURE_SCHEMA = 2
+
+BAND_EDGES_HZ = (0.0, 2.0, 5.0, 10.0)
+_SPECTRAL = (FUSED_COLUMNS.index("accel_mag"), FUSED_COLUMNS.index("gyro_mag"))
+
+WINDOW_FEATURES = (
+    tuple(f"{c}_{s}" for c in FUSED_COLUMNS for s in ("mean", "std", "energy"))
+    + tuple(f"{FUSED_COLUMNS[i]}_jerk" for i in _SPECTRAL)
+    + tuple(f"{FUSED_COLUMNS[i]}_pow_{lo:g}hz" for i in _SPECTRAL for lo in BAND_EDGES_HZ)
+)
+
+
+def schema(window: int = SENSOR_WINDOW, hop: int = SENSOR_WINDOW_HOP, hz: float = SENSOR_HZ) -> Dict[str, Any]:
+    """iForest meta.json 에 남기는 피처 스키마. 저장된 값과 하나라도 다르면 그 모델은 지금 피처로 채점할 수 없다."""
+    return {"feature_schema": FEATURE_SCHEMA, "features": list(WINDOW_FEATURES),
+            "window": int(window), "hop": _hop(window, hop), "hz": float(hz)}
+
+
+def _hop(window: int, hop: int) -> int:
+    # hop > window 면 창 사이 프레임을 버려야 해서 상태가 복잡해진다 → 겹치지 않는 창까지만 허용.
+    return int(min(max(1, hop), window))
+
+
+def window_features(frames, window: int = SENSOR_WINDOW, hop: int = SENSOR_WINDOW_HOP,
+                    hz: float = SENSOR_HZ) -> np.ndarray:
+    """한 세션의 연속 프레임 (k, 8) → 창 피처 (w, len(WINDOW_FEATURES)). 창 시작은 0, hop, 2*hop, ..."""
+    frames = np.asarray(frames, dtype=np.float64).reshape(-1, len(FUSED_COLUMNS))
+    if len(frames) < window:
+        return np.empty((0, len(WINDOW_FEATURES)))
+    W = sliding_window_view(frames, window, axis=0)[::_hop(window, hop)]  # (w, 8, window), 복사 없음
+    n = len(W)
+    stats = np.stack([W.mean(axis=2), W.std(axis=2), np.square(W).mean(axis=2)], axis=2).reshape(n, -1)
+
+    mags = W[:, _SPECTRAL, :]
+    jerk = np.abs(np.diff(mags, axis=2)).mean(axis=2) * hz if window > 1 else np.zeros((n, len(_SPECTRAL)))
+    power = np.square(np.abs(np.fft.rfft(mags - mags.mean(axis=2, keepdims=True), axis=2))) / window
+    freqs = np.fft.rfftfreq(window, d=1.0 / hz)
+    band = np.searchsorted(np.asarray(BAND_EDGES_HZ), freqs, side="right") - 1
+    bands = np.stack([power[:, :, band == b].sum(axis=2) for b in range(len(BAND_EDGES_HZ))], axis=2)
+    return np.column_stack([stats, jerk, bands.reshape(n, -1)])
+
+
+class _Pending:
+    __slots__ = ("frames", "touched")
+
+    def __init__(self):
+        self.frames = np.empty((0, len(FUSED_COLUMNS)))
+        self.touched = 0.0
+
+
+class SensorWindows:
+    def __init__(self, window: int = SENSOR_WINDOW, hop: int = SENSOR_WINDOW_HOP, hz: float = SENSOR_HZ,
+                 max_sessions: int = sensor_fusion.SENSOR_MAX_SESSIONS,
+                 idle_seconds: float = sensor_fusion.SENSOR_IDLE_SECONDS):
+        self.window = int(window)
+        self.hop = _hop(self.window, hop)
+        self.hz = hz
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions: "OrderedDict[Hashable, _Pending]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def push(self, key: Hashable, frames) -> Tuple[np.ndarray, np.ndarray]:
+        """한 세션의 새 프레임 (k, 8) 을 붙이고 (이번에 완성된 창 피처 (w, d), 새 프레임별 창 번호 (k,)) 를 돌려준다.
+        창 번호는 그 프레임을 담은 마지막 창 (0..w-1), 아직 완성된 창에 들지 않았으면 -1."""
+        frames = np.asarray(frames, dtype=np.float64).reshape(-1, len(FUSED_COLUMNS))
+        with self._lock:
+            sess = sensor_fusion.lru_session(self.sessions, key, _Pending, self.max_sessions, self.idle_seconds)
+            stream = np.concatenate([sess.frames, frames]) if len(sess.frames) else frames
+            n = (len(stream) - self.window) // self.hop + 1 if len(stream) >= self.window else 0
+            # 다음 창은 n*hop 에서 시작한다. 그 앞 프레임은 다시 쓰이지 않는다.
+            sess.frames = stream[n * self.hop:].copy()
+        X = window_features(stream[:(n - 1) * self.hop + self.window], self.window, self.hop, self.hz) if n \
+            else np.empty((0, len(WINDOW_FEATURES)))
+        pos = len(stream) - len(frames) + np.arange(len(frames))
+        w = np.minimum(pos // self.hop, n - 1)
+        window_of = np.where((w >= 0) & (pos < w * self.hop + self.window), w, -1)
+        return X, window_of.astype(np.int64)
+
+    def drop(self, key: Hashable):
+        with self._lock:
+            self.sessions.pop(key, None)
+
+
+def windows_from_logs(logs: Sequence[Dict[str, Any]], window: int = SENSOR_WINDOW, hop: int = SENSOR_WINDOW_HOP,
+                      hz: float = SENSOR_HZ) -> np.ndarray:
+    """센서 로그 → 세션별 융합 → 세션별 창 피처를 세션 첫 등장 순으로 이어 붙인 (w, d)."""
+    keys, ts, kinds, xyz = sensor_fusion.samples_from_logs(logs, position_fallback=True)
+    groups: Dict[Hashable, list] = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+    parts = []
+    for idx in map(np.array, groups.values()):
+        _, frames = sensor_fusion.fuse(ts[idx], [kinds[i] for i in idx], xyz[idx], hz=hz)
+        parts.append(window_features(frames, window, hop, hz))
+    return np.vstack(parts) if parts else np.empty((0, len(WINDOW_FEATURES)))
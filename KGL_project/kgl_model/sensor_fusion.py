@@ -0,0 +1,223 @@
+# sensor_fusion.py
+# 가속도계/자이로 샘플을 세션별 고정 주기 격자에 맞춰 6축 프레임 + 크기(magnitude)로 합친다.
+# 학습(train_lstm_sensor / utils.parse_sensor), 온라인 채점(main.py), 배치 탐지(detect_sensor)가 모두 이 단계를 쓴다.
+#
+#   fusion = SensorFusion()                                       # KGL_SENSOR_HZ=50 → 20ms 격자
+#   ts, frames = fusion.push(("u1", "s1"), ts_ms, kinds, xyz)     # 이번 업로드로 새로 확정된 프레임만 (k, 8)
+#   ts, frames = fuse(ts_ms, kinds, xyz)                          # 상태 없이 한 번에 (학습/배치 탐지용)
+#
+# 격자 시각 t 의 값은 스트림마다 t 를 감싸는 두 샘플의 선형 보간(np.interp)이다. 두 샘플 간격이 max_gap_ms 를
+# 넘거나 그 스트림 샘플이 아직 없으면 0 (LSTM 버퍼가 NaN 을 0 으로 채우는 것과 같다).
+# 격자는 살아 있는 스트림이 모두 도달한 시각까지만 확정하고, 그 뒤 샘플은 다음 업로드와 이어 붙이도록 꼬리로 남긴다.
+# 한 스트림이 stall_ms 넘게 뒤처지면(자이로 중단 등) 기다리지 않고 그 스트림을 결측으로 두고 진행한다.
+# 어느 스트림에도 샘플이 max_gap_ms 넘게 없는 구간(앱 백그라운드, 시각 단위가 섞인 로그 등)은 격자를 건너뛴다.
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+SENSOR_HZ = float(os.environ.get("KGL_SENSOR_HZ", "50"))
+SENSOR_MAX_GAP_MS = float(os.environ.get("KGL_SENSOR_MAX_GAP_MS", "200"))
+SENSOR_STALL_MS = float(os.environ.get("KGL_SENSOR_STALL_MS", "1000"))
+SENSOR_MAX_SESSIONS = int(os.environ.get("KGL_SENSOR_MAX_SESSIONS", "10000"))
+SENSOR_IDLE_SECONDS = float(os.environ.get("KGL_SENSOR_IDLE_SECONDS", "600"))
+
+STREAMS = ("accel", "gyro")
+FUSED_COLUMNS = ("accel_x", "accel_y", "accel_z", "gyro_x", "gyro_y", "gyro_z", "accel_mag", "gyro_mag")
+
+# 세션당 스트림 꼬리 상한 (격자가 오래 멈춰 있어도 메모리가 자라지 않게)
+_MAX_TAIL = 4096
+
+
+def sensor_kind(value: Any) -> Optional[str]:
+    """"accel"/"accelerometer"/"sensor_accelerometer" → "accel", 자이로 → "gyro", 그 외 None."""
+    s = str(value or "").lower()
+    if "gyro" in s:
+        return "gyro"
+    if "acc" in s:
+        return "accel"
+    return None
+
+
+def epoch_ms(value: Any) -> float:
+    # 숫자는 그대로(ms), ISO 문자열은 파싱, 그 외는 NaN.
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str) and value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000.0
+        except ValueError:
+            pass
+    return np.nan
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def samples_from_logs(logs: Sequence[Dict[str, Any]], position_fallback: bool = False):
+    """로그 dict 리스트(값이 params 안에 있든 밖에 있든) → (세션 키 리스트, ts_ms, 종류 리스트, xyz (n, 3)).
+    시각이 없는 샘플은 NaN (융합에서 빠진다). position_fallback=True 면 예전 parse_sensor 처럼 로그 위치를 ms 로 쓴다
+    (시각 없는 오프라인 로그 파일용 — 업로드마다 위치가 0 부터 다시 시작하는 온라인 경로에서는 쓰지 않는다)."""
+    keys, ts, kinds, xyz = [], [], [], []
+    for idx, item in enumerate(logs):
+        if not isinstance(item, dict):
+            continue
+        p = item.get("params") if isinstance(item.get("params"), dict) else {}
+        keys.append((item.get("user_id"), item.get("session_id")))
+        ts.append(epoch_ms(p.get("timestamp") or item.get("ts") or item.get("timestamp")
+                           or (idx if position_fallback else None)))
+        kinds.append(sensor_kind(p.get("type") or item.get("type") or item.get("action_type")))
+        xyz.append([_float(p.get(c, item.get(c))) for c in ("x", "y", "z")])
+    return keys, np.array(ts, dtype=np.float64), kinds, np.array(xyz, dtype=np.float64).reshape(-1, 3)
+
+
+class _Session:
+    __slots__ = ("next_t", "tails", "touched")
+
+    def __init__(self):
+        self.next_t: Optional[float] = None
+        self.tails: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.touched = time.monotonic()
+
+
+def lru_session(sessions: "OrderedDict[Hashable, Any]", key: Hashable, factory, max_sessions: int,
+                idle_seconds: float):
+    """sessions[key] 를 (없으면 factory() 로 만들어) 가장 최근 위치로 옮겨 돌려준다. 값에는 touched 속성이 있어야 한다.
+    가장 오래 안 쓰인 세션부터: 개수 상한을 넘거나 idle_seconds 동안 업로드가 없으면 버린다."""
+    now = time.monotonic()
+    sess = sessions.pop(key, None) or factory()
+    sess.touched = now
+    while sessions:
+        oldest = next(iter(sessions.values()))
+        if len(sessions) < max_sessions and now - oldest.touched < idle_seconds:
+            break
+        sessions.popitem(last=False)
+    sessions[key] = sess
+    return sess
+
+
+def _sorted_unique(t: np.ndarray, v: np.ndarray):
+    # 시각이나 축 값이 빠진 샘플은 보간에 쓸 수 없으므로 버린다.
+    ok = np.isfinite(t) & np.isfinite(v).all(axis=1)
+    t, v = t[ok], v[ok]
+    if len(t) == 0:
+        return t, v
+    order = np.argsort(t, kind="stable")
+    t, v = t[order], v[order]
+    # 같은 시각 샘플은 마지막 것만 (np.interp 는 증가하는 x 가 필요하다)
+    last = np.append(t[1:] != t[:-1], True)
+    return t[last], v[last]
+
+
+def _grid(t_all: np.ndarray, lo: float, hi: float, period: float, max_gap: float) -> np.ndarray:
+    # [lo, hi] 안의 period 배수 시각 중, 샘플 간격이 max_gap 이하로 이어진 구간에 드는 것만.
+    breaks = np.flatnonzero(np.diff(t_all) > max_gap)
+    starts = np.maximum(np.concatenate([t_all[:1], t_all[breaks + 1]]), lo)
+    ends = np.minimum(np.concatenate([t_all[breaks], t_all[-1:]]), hi)
+    first = np.ceil(starts / period)
+    counts = np.maximum(np.floor(ends / period) - first + 1, 0).astype(np.int64)
+    if not counts.sum():
+        return np.empty(0)
+    idx = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return (np.repeat(first, counts) + idx) * period
+
+
+class SensorFusion:
+    def __init__(self, hz: float = SENSOR_HZ, max_gap_ms: float = SENSOR_MAX_GAP_MS,
+                 stall_ms: float = SENSOR_STALL_MS, max_sessions: int = SENSOR_MAX_SESSIONS,
+                 idle_seconds: float = SENSOR_IDLE_SECONDS):
+        self.period = 1000.0 / hz
+        self.max_gap_ms = max_gap_ms
+        self.stall_ms = stall_ms
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions: "OrderedDict[Hashable, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _session(self, key: Hashable) -> _Session:
+        return lru_session(self.sessions, key, _Session, self.max_sessions, self.idle_seconds)
+
+    def push(self, key: Hashable, ts, kinds: Sequence[Optional[str]], xyz) -> Tuple[np.ndarray, np.ndarray]:
+        """한 세션의 새 샘플을 넣고 이번에 확정된 격자 (시각 (k,), 프레임 (k, 8)) 을 돌려준다.
+        kinds 는 sensor_kind() 결과 ("accel"/"gyro"/None — None 은 가속도계로 본다)."""
+        ts = np.asarray(ts, dtype=np.float64).ravel()
+        xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+        gyro = np.array([k == "gyro" for k in kinds], dtype=bool).reshape(-1)
+        with self._lock:
+            sess = self._session(key)
+            streams: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+            for kind, mask in (("accel", ~gyro), ("gyro", gyro)):
+                old_t, old_v = sess.tails.get(kind, (np.empty(0), np.empty((0, 3))))
+                t, v = _sorted_unique(np.concatenate([old_t, ts[mask]]), np.concatenate([old_v, xyz[mask]]))
+                if len(t):
+                    streams[kind] = (t, v)
+            if not streams:
+                return np.empty(0), np.empty((0, len(FUSED_COLUMNS)))
+
+            last = {k: t[-1] for k, (t, _) in streams.items()}
+            newest = max(last.values())
+            upper = min(v for v in last.values() if v >= newest - self.stall_ms)
+            if sess.next_t is None:
+                sess.next_t = float(np.ceil(max(t[0] for t, _ in streams.values()) / self.period) * self.period)
+            t_all = np.unique(np.concatenate([t for t, _ in streams.values()]))
+            grid = _grid(t_all, sess.next_t, upper, self.period, self.max_gap_ms)
+            k = len(grid)
+            frames = np.zeros((k, len(FUSED_COLUMNS)))
+            if k:
+                sess.next_t = float(grid[-1] + self.period)
+
+            for kind, (t, v) in streams.items():
+                off = 3 * STREAMS.index(kind)
+                if k:
+                    j = np.searchsorted(t, grid, side="right")
+                    lo, hi = np.clip(j - 1, 0, len(t) - 1), np.clip(j, 0, len(t) - 1)
+                    exact = t[lo] == grid
+                    bracketed = (j >= 1) & (j < len(t)) & (t[hi] - t[lo] <= self.max_gap_ms)
+                    valid = (j >= 1) & (exact | bracketed)
+                    for axis in range(3):
+                        frames[:, off + axis] = np.where(valid, np.interp(grid, t, v[:, axis]), 0.0)
+                # 다음 격자 점을 감쌀 마지막 확정 샘플부터 꼬리로 남긴다.
+                start = max(int(np.searchsorted(t, sess.next_t, side="right")) - 1, 0)
+                start = max(start, len(t) - _MAX_TAIL)
+                sess.tails[kind] = (t[start:], v[start:])
+
+            frames[:, 6] = np.linalg.norm(frames[:, 0:3], axis=1)
+            frames[:, 7] = np.linalg.norm(frames[:, 3:6], axis=1)
+            return grid, frames
+
+    def drop(self, key: Hashable):
+        with self._lock:
+            self.sessions.pop(key, None)
+
+
+def fuse(ts, kinds: Sequence[Optional[str]], xyz, hz: float = SENSOR_HZ) -> Tuple[np.ndarray, np.ndarray]:
+    return SensorFusion(hz=hz, max_sessions=1).push(None, ts, kinds, xyz)
+
+
+def fuse_sessions(keys: Sequence[Hashable], ts, kinds: Sequence[Optional[str]], xyz,
+                  hz: float = SENSOR_HZ) -> Tuple[np.ndarray, np.ndarray]:
+    """세션 키가 섞인 샘플을 세션별로 fuse 하고 세션 첫 등장 순으로 이어 붙인다."""
+    ts = np.asarray(ts, dtype=np.float64).ravel()
+    xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+    groups: Dict[Hashable, list] = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+    parts = [fuse(ts[idx], [kinds[i] for i in idx], xyz[idx], hz=hz) for idx in map(np.array, groups.values())]
+    if not parts:
+        return np.empty(0), np.empty((0, len(FUSED_COLUMNS)))
+    return np.concatenate([p[0] for p in parts]), np.vstack([p[1] for p in parts])
@@ -0,0 +1,173 @@
+# serving.py
+# 다중 프로세스 서빙: 수집 버퍼와 학습은 코디네이터 한 프로세스가 소유하고,
+# 채점 워커들은 코디네이터가 내보낸 모델 아티팩트를 mmap 으로 열어 읽기 전용 페이지를 공유한다.
+#
+#   KGL_SERVING_ROLE=coordinator uvicorn main:app --port 8101                       # 수집/학습 (+ 채점 가능)
+#   KGL_SERVING_ROLE=worker KGL_COORDINATOR_URL=http://127.0.0.1:8101 \
+#       uvicorn main:app --port 8000 --workers 4                                    # 채점 전용
+#   (기본값 standalone 은 지금처럼 한 프로세스가 수집/학습/채점을 모두 한다)
+#
+# 아티팩트 배치 — 코디네이터가 모델을 로드/학습할 때마다 새 버전 디렉터리를 만들고 versions.json 을 원자적으로 교체:
+#   models/versions.json                         {"sensor": {"iforest": 3, "lstm": 2}, ...}
+#   models/<modality>/iforest/v<N>/*.npy         ForestArrays (np.load(mmap_mode="r"))
+#   models/<modality>/iforest/v<N>/scaler.pkl, meta.json
+#   models/<modality>/lstm/v<N>/model.pth        torch.load(mmap=True) + load_state_dict(assign=True)
+#   models/<modality>/lstm/v<N>/scaler.pkl
+#
+# 워커는 KGL_VERSION_POLL_SECONDS 마다 versions.json 을 확인해 바뀐 모델만 다시 열고 검출기 스냅샷을 교체한다.
+# 워커가 받은 로그는 KGL_COORDINATOR_URL/observe 로 백그라운드 전달되어 코디네이터 버퍼에 쌓인다.
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import FORWARDED_LOGS
+
+logger = logging.getLogger("AnomalyDetector")
+
+ROLES = ("standalone", "coordinator", "worker")
+ROLE = os.environ.get("KGL_SERVING_ROLE", "standalone").lower()
+if ROLE not in ROLES:
+    raise ValueError(f"KGL_SERVING_ROLE must be one of {ROLES}, got {ROLE!r}")
+COORDINATOR_URL = os.environ.get("KGL_COORDINATOR_URL", "http://127.0.0.1:8101").rstrip("/")
+VERSION_POLL_SECONDS = float(os.environ.get("KGL_VERSION_POLL_SECONDS", "1.0"))
+WORKER_LSTM_CONTEXT = int(os.environ.get("KGL_WORKER_LSTM_CONTEXT", "2000"))
+KEEP_VERSIONS = int(os.environ.get("KGL_KEEP_MODEL_VERSIONS", "3"))
+# 코디네이터는 /observe 처리 중에 동기 학습을 하므로 학습 시간보다 넉넉히 잡는다.
+FORWARD_TIMEOUT = float(os.environ.get("KGL_FORWARD_TIMEOUT", "60"))
+
+VERSIONS_FILE = "versions.json"
+_publish_lock = threading.Lock()
+
+
+def read_versions(root: Path) -> Dict[str, Dict[str, int]]:
+    try:
+        return json.loads((Path(root) / VERSIONS_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def publish_version(root: Path, modality: str, kind: str, write: Callable[[Path], None]) -> int:
+    """write(dir) 로 새 버전 디렉터리를 채운 뒤 versions.json 을 교체한다. 새 버전 번호를 반환."""
+    root = Path(root)
+    with _publish_lock:
+        versions = read_versions(root)
+        version = int(versions.get(modality, {}).get(kind, 0)) + 1
+        base = root / modality / kind
+        base.mkdir(parents=True, exist_ok=True)
+        final = base / f"v{version}"
+        tmp = base / f".v{version}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(final, ignore_errors=True)
+        tmp.mkdir()
+        write(tmp)
+        os.replace(tmp, final)
+        versions.setdefault(modality, {})[kind] = version
+        _write_atomic(root / VERSIONS_FILE, json.dumps(versions, indent=2))
+        # 워커가 아직 열고 있을 수 있으므로 직전 몇 개는 남긴다 (Linux 에서는 mmap 중인 파일을 지워도 안전).
+        for old in base.glob("v*"):
+            try:
+                if int(old.name[1:]) <= version - KEEP_VERSIONS:
+                    shutil.rmtree(old, ignore_errors=True)
+            except ValueError:
+                pass
+        return version
+
+
+class ModelWatcher:
+    """versions.json 이 바뀌면 load(modality, kind, directory) 로 해당 버전만 다시 연다."""
+
+    def __init__(self, root: Path, load: Callable[[str, str, Path], None], interval: float = VERSION_POLL_SECONDS):
+        self.root = Path(root)
+        self.load = load
+        self.interval = interval
+        self.loaded: Dict[Tuple[str, str], int] = {}
+        self._mtime: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def poll_once(self):
+        try:
+            mtime = (self.root / VERSIONS_FILE).stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        for modality, kinds in read_versions(self.root).items():
+            for kind, version in kinds.items():
+                if self.loaded.get((modality, kind)) == version:
+                    continue
+                directory = self.root / modality / kind / f"v{version}"
+                try:
+                    self.load(modality, kind, directory)
+                    self.loaded[(modality, kind)] = version
+                    logger.info(f"[{modality}-{kind}] 모델 버전 v{version} 로드 (pid={os.getpid()})")
+                except Exception as e:
+                    # 다음 폴링에서 다시 시도하도록 mtime 을 되돌린다.
+                    self._mtime = None
+                    logger.error(f"[{modality}-{kind}] 모델 버전 v{version} 로드 실패: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.poll_once()
+
+    def start(self):
+        self.poll_once()
+        self._thread = threading.Thread(target=self._run, name="kgl-model-watcher", daemon=True)
+        self._thread.start()
+
+
+class ObservationForwarder:
+    """워커 → 코디네이터 /observe 로 로그를 넘긴다. 요청 경로를 막지 않도록 큐에 넣고 백그라운드 스레드가 묶어 보낸다."""
+
+    def __init__(self, url: str, max_pending: int = 1000, batch_rows: int = 2000,
+                 timeout: float = FORWARD_TIMEOUT):
+        self.url = f"{url}/observe"
+        self.batch_rows = batch_rows
+        self.timeout = timeout
+        self._queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="kgl-observe-forwarder", daemon=True)
+        self._thread.start()
+
+    def submit(self, logs: List[Dict[str, Any]]):
+        if not logs:
+            return
+        try:
+            self._queue.put_nowait(logs)
+        except queue.Full:
+            # 코디네이터가 밀리면 채점 지연 대신 학습용 관찰을 버린다.
+            FORWARDED_LOGS.labels("dropped").inc(len(logs))
+
+    def _post(self, logs: List[Dict[str, Any]]):
+        body = json.dumps(logs, default=float).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+            FORWARDED_LOGS.labels("ok").inc(len(logs))
+        except Exception as e:
+            FORWARDED_LOGS.labels("failed").inc(len(logs))
+            logger.warning(f"코디네이터 전달 실패 ({len(logs)}건): {e}")
+
+    def _run(self):
+        while True:
+            batch = list(self._queue.get())
+            while len(batch) < self.batch_rows:
+                try:
+                    batch.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._post(batch)
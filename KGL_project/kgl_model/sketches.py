@@ -0,0 +1,159 @@
+# sketches.py
+# 고정 메모리 분위수 스케치 (KLL 방식). 점수 스트림 전체를 들고 있지 않고도 하위/상위 퍼센타일을 추정한다.
+#
+#   sk = QuantileSketch(k=2000)   # 원소 ~3k 개 (~25KB)
+#   sk.update(scores)             # ndarray 한 번에 추가
+#   sk.quantile(0.005)            # 추정 분위수 (k=2000, 1e6 개 기준 rank 오차 ~0.05%)
+#   sk.merge(other)               # 다른 스케치와 합치기 (프로세스/윈도우 단위 집계용)
+#   sk.load_state(other.state())  # ndarray dict 로 저장/복원 (웜 재시작 스냅샷)
+#
+# 레벨 h 의 원소는 가중치 2**h 를 가진다. 레벨이 용량을 넘으면 정렬 후 홀/짝 중 하나만 골라 위 레벨로 올린다.
+#
+# 열별 평균/분산 (Welford/Chan 병합). 행이 들어올 때마다 갱신해 두면 학습 때 버퍼 전체로 fit 하지 않아도 된다.
+#
+#   st = RunningScaler(n_features=9)
+#   st.partial_fit(X)             # (n, d) 배치 한 번에. NaN 은 그 열에서만 건너뛴다 (StandardScaler 와 같은 규칙)
+#   st.merge(other)               # 다른 구간/프로세스 통계와 합치기
+#   st.standard_scaler()          # 같은 mean_/var_/scale_ 를 가진 sklearn StandardScaler (모델 번들에 그대로 저장)
+#   st.load_state(other.state())
+from typing import List, Optional
+
+import numpy as np
+
+
+class QuantileSketch:
+    def __init__(self, k: int = 2000, seed: Optional[int] = None):
+        self.k = int(k)
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, h: int) -> int:
+        # 위쪽(큰 가중치) 레벨일수록 용량이 크다: k * (2/3)^(깊이)
+        depth = len(self.levels) - 1 - h
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) <= self._capacity(h):
+                h += 1
+                continue
+            level = np.sort(level)
+            # 홀수 개면 하나는 현재 레벨에 남긴다.
+            keep = level[-1:] if len(level) % 2 else level[:0]
+            pairs = level[:len(level) - len(keep)]
+            promoted = pairs[int(self._rng.integers(2))::2]
+            self.levels[h] = keep
+            grew = h + 1 == len(self.levels)
+            if grew:
+                self.levels.append(np.empty(0))
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            if grew:
+                # 레벨이 늘면 아래 레벨들의 용량이 줄어들므로 처음부터 다시 본다.
+                h = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += int(values.size)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+
+    def state(self):
+        out = {"n": np.array([self.n], dtype=np.int64)}
+        out.update({f"level{h}": level for h, level in enumerate(self.levels)})
+        return out
+
+    def load_state(self, state):
+        self.n = int(np.asarray(state["n"])[0])
+        depth = sum(1 for k in state if k.startswith("level"))
+        self.levels = [np.asarray(state[f"level{h}"], dtype=float) for h in range(depth)] or [np.empty(0)]
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cum = np.cumsum(weights[order])
+        idx = int(np.searchsorted(cum, min(max(q, 0.0), 1.0) * cum[-1], side="left"))
+        return float(items[order][min(idx, len(items) - 1)])
+
+
+class RunningScaler:
+    def __init__(self, n_features: int):
+        self.count = np.zeros(int(n_features))
+        self.mean = np.zeros(int(n_features))
+        self.m2 = np.zeros(int(n_features))
+
+    def __len__(self):
+        return int(self.count.max()) if len(self.count) else 0
+
+    def _combine(self, n_b: np.ndarray, mean_b: np.ndarray, m2_b: np.ndarray):
+        # Chan et al. 병합: 두 구간의 (개수, 평균, 편차 제곱합) → 합친 구간
+        n = self.count + n_b
+        has = n_b > 0
+        frac = np.divide(n_b, n, out=np.zeros_like(n), where=has)
+        delta = np.where(has, mean_b - self.mean, 0.0)
+        self.mean = self.mean + delta * frac
+        self.m2 = self.m2 + np.where(has, m2_b, 0.0) + delta * delta * self.count * frac
+        self.count = n
+
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.mean))
+        if len(X) == 0:
+            return self
+        ok = ~np.isnan(X)
+        n_b = ok.sum(axis=0).astype(np.float64)
+        mean_b = np.divide(np.where(ok, X, 0.0).sum(axis=0), n_b, out=np.zeros_like(n_b), where=n_b > 0)
+        m2_b = np.square(np.where(ok, X - mean_b, 0.0)).sum(axis=0)
+        self._combine(n_b, mean_b, m2_b)
+        return self
+
+    def merge(self, other: "RunningScaler"):
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def var(self) -> np.ndarray:
+        return np.divide(self.m2, self.count, out=np.zeros_like(self.m2), where=self.count > 0)
+
+    def standard_scaler(self):
+        from sklearn.preprocessing import StandardScaler
+        scaler = StandardScaler()
+        var = self.var
+        scale = np.sqrt(var)
+        # sklearn 과 같이 0 에 가까운 분산은 1 로 나눈다 (_handle_zeros_in_scale).
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        scaler.mean_, scaler.var_, scaler.scale_ = self.mean.copy(), var, scale
+        counts = self.count.astype(np.int64)
+        scaler.n_samples_seen_ = int(counts[0]) if len(counts) and (counts == counts[0]).all() else counts
+        scaler.n_features_in_ = len(self.mean)
+        return scaler
+
+    def state(self):
+        return {"count": self.count.copy(), "mean": self.mean.copy(), "m2": self.m2.copy()}
+
+    def load_state(self, state):
+        count, mean, m2 = (np.asarray(state[k], dtype=np.float64) for k in ("count", "mean", "m2"))
+        if count.shape != self.count.shape:
+            raise ValueError(f"scaler has {len(self.count)} columns, snapshot has {count.shape}")
+        self.count, self.mean, self.m2 = count, mean, m2
+
+    def clear(self):
+        self.count, self.mean, self.m2 = (np.zeros_like(self.count) for _ in range(3))
@@ -0,0 +1,100 @@
+# snapshots.py
+# 웜 재시작: 검출기의 학습 버퍼/카운터/임계값/점수 스케치를 주기적으로 npz 한 파일에 저장하고, 시작할 때 복원한다.
+#
+#   KGL_SNAPSHOT_SECONDS=60    저장 주기 (0 이면 주기 저장 끔, 시작 시 복원은 파일이 있으면 항상 한다)
+#   KGL_SNAPSHOT_PATH=...      기본 <model_path>/models/detector_state.npz
+#
+# 파일에는 ndarray 만 담는다 (np.load(allow_pickle=False) 로 읽음). 키는 "<모달리티>/<항목>/<필드>" 형태.
+# 임시 파일에 쓰고 fsync 한 뒤 os.replace 로 바꾸므로, 저장 도중 프로세스가 죽어도 직전 스냅샷이 그대로 남는다.
+import atexit
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from metrics import SNAPSHOT_BYTES, SNAPSHOT_INTERVAL, SNAPSHOT_LAST_SUCCESS, SNAPSHOT_SECONDS, SNAPSHOT_TOTAL
+
+logger = logging.getLogger("AnomalyDetector")
+
+SNAPSHOT_EVERY_SECONDS = float(os.environ.get("KGL_SNAPSHOT_SECONDS", "60"))
+SNAPSHOT_PATH = os.environ.get("KGL_SNAPSHOT_PATH", "")
+FORMAT_VERSION = 1
+
+
+def write_snapshot(path: Path, arrays: Dict[str, np.ndarray]) -> int:
+    """arrays 를 path 에 원자적으로 쓴다. 쓴 파일 크기(바이트)를 반환."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+    return path.stat().st_size
+
+
+def read_snapshot(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files}
+        if int(arrays["format"][0]) != FORMAT_VERSION:
+            raise ValueError(f"snapshot format {int(arrays['format'][0])} (expected {FORMAT_VERSION})")
+    except Exception as e:
+        SNAPSHOT_TOTAL.labels("restore", "failed").inc()
+        logger.warning(f"스냅샷 읽기 실패, 빈 상태로 시작: {path} ({e})")
+        return None
+    return arrays
+
+
+class SnapshotWriter:
+    """interval 초마다 collect() 결과를 path 에 저장한다. 프로세스 종료 시(atexit)에도 한 번 저장."""
+
+    def __init__(self, path: Path, collect: Callable[[], Dict[str, np.ndarray]],
+                 interval: float = SNAPSHOT_EVERY_SECONDS):
+        self.path = Path(path)
+        self.collect = collect
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        SNAPSHOT_INTERVAL.labels().set(interval)
+
+    def save_now(self) -> Optional[int]:
+        with self._lock:
+            t0 = time.perf_counter()
+            try:
+                size = write_snapshot(self.path, self.collect())
+            except Exception as e:
+                SNAPSHOT_TOTAL.labels("save", "failed").inc()
+                logger.error(f"스냅샷 저장 실패: {e}")
+                return None
+            SNAPSHOT_SECONDS.labels("save").observe(time.perf_counter() - t0)
+            SNAPSHOT_TOTAL.labels("save", "ok").inc()
+            SNAPSHOT_BYTES.labels().set(size)
+            SNAPSHOT_LAST_SUCCESS.labels().set(time.time())
+            return size
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.save_now()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="kgl-snapshot-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.save_now)
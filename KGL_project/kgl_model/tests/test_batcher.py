@@ -0,0 +1,64 @@
+# tests/test_batcher.py
+# batcher.MicroBatcher: 요청별 결과 분배, 실패 전파, 이벤트 루프가 바뀌었을 때 이전 루프 요청이 걸려 있지 않는지.
+#
+#   cd KGL_project/kgl_model && python -m pytest -q tests
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batcher import MicroBatcher  # noqa: E402
+
+
+def test_results_are_split_per_request():
+    batcher = MicroBatcher(lambda items: [x * 2 for x in items], max_wait_ms=20)
+
+    async def go():
+        return await asyncio.gather(batcher.submit([1, 2]), batcher.submit([3]), batcher.submit([4, 5, 6]))
+
+    assert asyncio.run(go()) == [[2, 4], [6], [8, 10, 12]]
+
+
+def test_fn_error_fails_every_request_in_batch():
+    def boom(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(boom, max_wait_ms=20)
+
+    async def go():
+        return await asyncio.gather(batcher.submit([1]), batcher.submit([2]), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(go()))
+
+
+def test_requests_on_old_loop_fail_when_loop_changes():
+    gate = threading.Event()
+    batcher = MicroBatcher(lambda items: (gate.wait(5) if 1 in items else None, items)[1], max_wait_ms=0)
+    queued = threading.Event()
+    outcome = {}
+
+    async def old_requests():
+        running = asyncio.ensure_future(batcher.submit([1]))  # 워커가 실행 중인 배치 (gate 에서 막힘)
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(batcher.submit([2]))  # 대기열에 남은 요청
+        await asyncio.sleep(0)
+        queued.set()
+        outcome["results"] = await asyncio.gather(running, waiting, return_exceptions=True)
+
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_until_complete, args=(old_requests(),), daemon=True)
+    thread.start()
+    try:
+        assert queued.wait(5)
+        # 다른 루프에서 요청이 오면 이전 루프의 두 요청은 RuntimeError 로 끝나야 한다 (걸려 있으면 join 타임아웃).
+        assert asyncio.run(batcher.submit([3])) == [3]
+        thread.join(5)
+        assert not thread.is_alive()
+        assert [type(r) for r in outcome["results"]] == [RuntimeError, RuntimeError]
+    finally:
+        gate.set()
+        thread.join(5)
+        if not thread.is_alive():
+            old_loop.close()
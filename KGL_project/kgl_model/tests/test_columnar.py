@@ -0,0 +1,63 @@
+# tests/test_columnar.py
+# columnar.decode_batch 의 입력 검증. 잘못된 본문은 ColumnarFormatError(→ /predict_columns 400)여야 하고,
+# Django 쪽 디코더(kgl_backend/behavior/columnar.py)와 같은 입력을 거부해야 한다.
+#
+#   cd KGL_project/kgl_model && python -m pytest -q tests
+import importlib.util
+import os
+import sys
+
+import msgpack
+import numpy as np
+import pytest
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+import columnar  # noqa: E402
+
+
+def _backend_columnar():
+    path = os.path.join(HERE, "..", "kgl_backend", "behavior", "columnar.py")
+    spec = importlib.util.spec_from_file_location("backend_columnar", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+backend = _backend_columnar()
+
+
+def _doc(columns, **extra):
+    return msgpack.packb({"v": 1, "kind": "sensor", "meta": {}, "columns": columns, **extra}, use_bin_type=True)
+
+
+BAD = {
+    "not msgpack": b"\xc1\xc1",
+    "no columns": msgpack.packb({"v": 1}),
+    "bad version": _doc({}, v=2),
+    "bad dtype": _doc({"x": {"dtype": "<u8", "data": b"\0" * 8}}),
+    "truncated data": _doc({"x": {"dtype": "<f4", "data": b"abc"}}),
+    "data not bytes": _doc({"x": {"dtype": "<f4", "data": "abcd"}}),
+    "length mismatch": _doc({"x": {"dtype": "<f4", "data": b"\0" * 8}, "t": ["a"]}),
+    "declared n mismatch": _doc({"x": {"dtype": "<f4", "data": b"\0" * 8}}, n=3),
+    "declared n not int": _doc({"x": {"dtype": "<f4", "data": b"\0" * 8}}, n="2"),
+    "column not array": _doc({"x": 5}),
+}
+
+
+@pytest.mark.parametrize("name", sorted(BAD))
+def test_both_decoders_reject(name):
+    with pytest.raises(columnar.ColumnarFormatError):
+        columnar.decode_batch(BAD[name])
+    with pytest.raises(backend.ColumnarFormatError):
+        backend.decode_batch(BAD[name])
+
+
+def test_round_trip():
+    cols = {"x": np.arange(3, dtype=np.float32), "seq": np.arange(3, dtype=np.int64), "type": ["accel"] * 3}
+    batch = columnar.decode_batch(columnar.encode_batch("sensor", cols, {"user_id": "u"}))
+    assert batch["n"] == 3 and batch["meta"] == {"user_id": "u"}
+    np.testing.assert_array_equal(batch["columns"]["x"], cols["x"])
+    np.testing.assert_array_equal(batch["columns"]["seq"], cols["seq"])
+    assert batch["columns"]["type"] == cols["type"]
@@ -0,0 +1,61 @@
+# tests/test_iforest_retrain.py
+# iforest.py (단일 로그 앱)의 재학습 시점. KGL_DRIFT_RETRAIN=off 면 예전처럼 retrain_interval 회마다 재학습해야 한다.
+#
+#   cd KGL_project/kgl_model && python -m pytest -q tests
+import importlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def iforest(tmp_path, monkeypatch):
+    # 모듈을 import 하면 ./models 에 전역 검출기를 만든다 → 임시 폴더에서 import
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("iforest")
+
+
+def _log(rng):
+    return {
+        "action_type": "touch_pressure",
+        "params": {"touch_duration": float(rng.normal(120, 20)), "size": float(rng.normal(0.3, 0.05)),
+                   "x": float(rng.uniform(0, 1080)), "y": float(rng.uniform(0, 2400))},
+    }
+
+
+def _detector(iforest, tmp_path, drift_retrain):
+    det = iforest.AnomalyDetector(model_path=tmp_path / "models",
+                                  initial_samples={"sensor": 50, "touch_drag": 50, "touch_pressure": 50},
+                                  retrain_interval=20, n_estimators=20)
+    det.drift_retrain = drift_retrain
+    trained = []
+    train = det._train_model
+    det._train_model = lambda modality: trained.append(modality) or train(modality)
+    return det, trained
+
+
+def test_count_based_retrain_when_drift_retrain_off(iforest, tmp_path):
+    det, trained = _detector(iforest, tmp_path, drift_retrain=False)
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        det.predict_single_log(_log(rng))
+    assert trained == ["touch_pressure"]
+    assert det.modes["touch_pressure"] == "inference"
+
+    for _ in range(2 * det.retrain_interval):
+        det.predict_single_log(_log(rng))
+    assert trained == ["touch_pressure"] * 3
+    assert det.infer_counts["touch_pressure"] == 0
+
+
+def test_no_retrain_without_drift(iforest, tmp_path):
+    det, trained = _detector(iforest, tmp_path, drift_retrain=True)
+    det.retrain_scheduler.decide = lambda key, drifted: "stable"
+    rng = np.random.default_rng(0)
+    for _ in range(50 + 2 * det.retrain_interval):
+        det.predict_single_log(_log(rng))
+    assert trained == ["touch_pressure"]
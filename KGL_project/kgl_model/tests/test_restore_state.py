@@ -0,0 +1,67 @@
+# tests/test_restore_state.py
+# 스냅샷 복원. 중간에 깨진 모달리티는 "failed" 로 세고, 이미 읽어 들인 스케치/드리프트 기준까지 비워야 한다.
+#
+#   cd KGL_project/kgl_model && python -m pytest -q tests
+import importlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    # 모듈을 import 하면 ./models 에 전역 검출기를 만든다 → 임시 폴더에서 import
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("main")
+
+
+def _detector(main, path):
+    return main.AnomalyDetector(model_path=path, initial_samples={"sensor": 50, "touch_drag": 50, "touch_pressure": 50},
+                                n_estimators=20)
+
+
+def _fill(det, m):
+    rng = np.random.default_rng(0)
+    det.iforest_sketches[m].update(rng.normal(size=500))
+    det.lstm_sketches[m].update(rng.normal(size=500))
+    det.drift[m].set_reference("iforest_score", rng.normal(size=500))
+
+
+def _restores(main, outcome):
+    return main.SNAPSHOT_TOTAL.labels("restore", outcome).value
+
+
+def test_restore_round_trip(main, tmp_path):
+    src = _detector(main, tmp_path / "a")
+    _fill(src, "sensor")
+    dst = _detector(main, tmp_path / "b")
+    ok = _restores(main, "ok")
+
+    assert dst.restore_state(src.snapshot_state(), ["sensor"])
+    assert dst.iforest_sketches["sensor"].n == 500
+    assert "iforest_score" in dst.drift["sensor"].streams
+    assert _restores(main, "ok") == ok + 1
+
+
+def test_partial_restore_counts_failed_and_resets(main, tmp_path):
+    src = _detector(main, tmp_path / "a")
+    _fill(src, "sensor")
+    arrays = src.snapshot_state()
+    del arrays["sensor/counters"]  # 스케치/드리프트는 읽힌 뒤 마지막 단계에서 KeyError
+
+    dst = _detector(main, tmp_path / "b")
+    _fill(dst, "sensor")
+    monitor = dst.drift["sensor"]
+    ok, failed = _restores(main, "ok"), _restores(main, "failed")
+
+    assert dst.restore_state(arrays, ["sensor"]) is False
+    assert _restores(main, "failed") == failed + 1
+    assert _restores(main, "ok") == ok
+    for sketches in (dst.iforest_sketches, dst.iforest_prev_sketches, dst.lstm_sketches, dst.lstm_prev_sketches):
+        assert sketches["sensor"].n == 0
+    assert dst.drift["sensor"] is not monitor and not dst.drift["sensor"].streams
+    assert len(dst.recent_data["sensor"]) == 0
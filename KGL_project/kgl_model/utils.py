@@ -3,6 +3,9 @@ import os, json
 import numpy as np
 import pandas as pd
 
+import gestures
+import sensor_fusion
+
 def _json_safeload_one_file(p):
     """
     단일 파일 로드: 우선 json.load 시도 -> 실패 시 JSONL(라인별) 파싱 fallback.
@@ -66,6 +69,8 @@ def parse_touch(logs):
     rows = []
     if not isinstance(logs, list):
         return pd.DataFrame()
+    # 원시 터치 이벤트(down/move/up)는 main.py 온라인 경로와 같이 제스처로 묶어 닫힌 드래그 행으로 바꾼다.
+    logs = gestures.assemble_logs(logs)
 
     for idx, item in enumerate(logs):
         if not isinstance(item, dict):
@@ -107,38 +112,18 @@ def parse_touch(logs):
 
 def parse_sensor(logs):
     """
-    [수정] 단순 리스트 형태의 로그를 직접 처리하도록 수정
+    센서 로그 → 세션별 고정 주기 격자에 맞춘 가속도계/자이로 융합 프레임 (ts + accel_*/gyro_*/*_mag).
+    main.py 온라인 채점과 같은 sensor_fusion 단계를 쓴다.
     """
-    rows = []
     if not isinstance(logs, list):
         return pd.DataFrame()
-
-    for idx, item in enumerate(logs):
-        if not isinstance(item, dict):
-            continue
-        ts_val = item.get("ts") or item.get("timestamp") or idx
-        ttype = item.get("type", "unknown")
-        rows.append({
-            "ts": ts_val,
-            "type": ttype, # [수정] pivot을 위해 type 컬럼 추가
-            "x": item.get("x", np.nan),
-            "y": item.get("y", np.nan),
-            "z": item.get("z", np.nan)
-        })
-
-    if not rows:
+    keys, ts, kinds, xyz = sensor_fusion.samples_from_logs(logs, position_fallback=True)
+    grid, frames = sensor_fusion.fuse_sessions(keys, ts, kinds, xyz)
+    if not len(grid):
         return pd.DataFrame()
-    
-    df = pd.DataFrame(rows)
-    df["ts"] = pd.to_numeric(df["ts"], errors="coerce").fillna(0).astype(np.int64)
-
-    # [수정] pivot_table을 사용하여 wide-format으로 변환
-    if "type" in df.columns:
-        pivot_df = df.pivot_table(index='ts', columns='type', values=['x', 'y', 'z'])
-        pivot_df.columns = [f'{col[1]}_{col[0]}' for col in pivot_df.columns]
-        return pivot_df.reset_index()
-    else: # type 컬럼이 없는 구형 데이터 호환
-        return df.groupby("ts").mean(numeric_only=True).reset_index()
+    df = pd.DataFrame(frames, columns=list(sensor_fusion.FUSED_COLUMNS))
+    df.insert(0, "ts", grid.astype(np.int64))
+    return df
 
 def create_sequences(arr, seq_len):
     if arr is None or len(arr) < 2 or seq_len is None or seq_len < 2: